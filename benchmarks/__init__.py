@@ -0,0 +1 @@
+# Benchmarks for CapyMind tools
\ No newline at end of file
@@ -0,0 +1,248 @@
+#!/usr/bin/env python3
+"""
+Load test of the served FastAPI app (main.app) without Gemini or Firestore.
+
+Every agent model resolves to StubLlm (benchmarks/stub_model.py, scripted
+transfers and tool calls for capymind_agent, data_fetcher and crisis_line)
+and Firestore is the in-memory fake seeded by seed_synthetic. The app is
+main.app itself, driven in-process over ASGI with httpx, with the session
+store it is configured with: a fresh SQLite file by default, like
+production, ``memory``, or the shared stores of
+capymind_agent.tools.session_store over fakes (``firestore``, ``kv``).
+
+For each concurrency level, that many sessions run at once; each creates an
+ADK session and sends ``--turns`` /run requests cycling through chat, data
+(router and model paths) and crisis-line messages. Reported per level:
+
+- requests/s and p50/p95/p99 request latency;
+- session store contention: p99 of create/get/append_event calls and the
+  share of request time spent in them;
+- event loop lag p99 (blocking work such as synchronous SQLite I/O);
+- resident memory growth per session.
+
+The last level within ``--slo`` (p99 seconds) is a starting point for the
+Cloud Run ``--concurrency`` setting of one instance.
+
+    python benchmarks/bench_app_load.py [--levels 10,50,100,200] [--turns 4]
+        [--model-latency 0.3] [--latency 0.02] [--kv-latency 0.001]
+        [--session-uri URI|memory|firestore|kv] [--slo 3.0]
+"""
+
+import os
+import gc
+import sys
+import time
+import asyncio
+import logging
+import argparse
+import tempfile
+import functools
+from collections import defaultdict
+from typing import Dict, List
+from unittest import mock
+
+# Add the project root to the path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import httpx
+
+from benchmarks.common import percentile, print_table
+from benchmarks.stub_model import serve_stub
+from capymind_agent.tools import firestore_data, session_store
+from tests.fake_firestore import FakeAsyncFirestoreClient, FakeFirestoreClient, seed_synthetic
+from tests.fake_kv import FakeKeyValueStore
+
+APP_NAME = "capymind_agent"
+
+# (kind, message); "router" requests are answered without the model
+MESSAGES = [
+    ("chat", "I slept badly and feel anxious about tomorrow"),
+    ("router", "show my settings"),
+    ("data", "What did I write in my notes about sleep?"),
+    ("chat", "Can you help me plan a calmer evening?"),
+    ("crisis_line", "Can you find a crisis hotline near me?"),
+    ("router", "show my last 5 notes"),
+]
+
+# Session store calls timed for the contention report
+STORE_METHODS = ("create_session", "get_session", "append_event")
+
+
+def rss_bytes() -> int:
+    """Current resident set size (Linux), falling back to peak RSS."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError):
+        import resource
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+def instrument_session_store(service_classes, samples: List[float]) -> List:
+    """Patch the session store methods to record call durations into ``samples``."""
+    patches = []
+    for cls in service_classes:
+        for name in STORE_METHODS:
+            original = getattr(cls, name)
+
+            @functools.wraps(original)
+            async def timed(self, *args, __original=original, **kwargs):
+                started = time.perf_counter()
+                try:
+                    return await __original(self, *args, **kwargs)
+                finally:
+                    samples.append(time.perf_counter() - started)
+
+            patches.append(mock.patch.object(cls, name, timed))
+    return patches
+
+
+async def monitor_loop_lag(samples: List[float], interval: float = 0.01) -> None:
+    while True:
+        started = time.perf_counter()
+        await asyncio.sleep(interval)
+        samples.append(max(0.0, time.perf_counter() - started - interval))
+
+
+async def run_session(client: httpx.AsyncClient, user_id: str, turns: int, offset: int, latencies) -> int:
+    errors = 0
+    started = time.perf_counter()
+    response = await client.post(f"/apps/{APP_NAME}/users/{user_id}/sessions")
+    latencies["create_session"].append(time.perf_counter() - started)
+    if response.status_code != 200:
+        return turns + 1
+    session_id = response.json()["id"]
+    for turn in range(turns):
+        kind, text = MESSAGES[(offset + turn) % len(MESSAGES)]
+        started = time.perf_counter()
+        response = await client.post("/run", json={
+            "app_name": APP_NAME,
+            "user_id": user_id,
+            "session_id": session_id,
+            "new_message": {"role": "user", "parts": [{"text": text}]},
+        })
+        latencies[kind].append(time.perf_counter() - started)
+        errors += response.status_code != 200
+    return errors
+
+
+async def run_level(app, sessions: int, turns: int, users: List[str], store_samples: List[float]) -> Dict[str, float]:
+    latencies: Dict[str, List[float]] = defaultdict(list)
+    lag: List[float] = []
+    store_samples.clear()
+    gc.collect()
+    rss_before = rss_bytes()
+    monitor = asyncio.create_task(monitor_loop_lag(lag))
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://capymind", timeout=None) as client:
+        started = time.perf_counter()
+        errors = await asyncio.gather(*(
+            run_session(client, users[i % len(users)], turns, i, latencies) for i in range(sessions)
+        ))
+        wall = time.perf_counter() - started
+    monitor.cancel()
+    gc.collect()
+
+    requests = [value for values in latencies.values() for value in values]
+    return {
+        "requests_per_s": len(requests) / wall,
+        "p50": percentile(requests, 50),
+        "p95": percentile(requests, 95),
+        "p99": percentile(requests, 99),
+        "by_kind": {kind: percentile(values, 50) for kind, values in latencies.items()},
+        "store_p99_ms": percentile(store_samples, 99) * 1e3,
+        "store_share": sum(store_samples) / sum(requests) if requests else 0.0,
+        "loop_lag_p99_ms": percentile(lag, 99) * 1e3,
+        "rss_kb_per_session": max(0, rss_bytes() - rss_before) / 1024 / sessions,
+        "errors": sum(errors),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--levels", default="10,50,100,200", help="comma-separated concurrent sessions")
+    parser.add_argument("--turns", type=int, default=4, help="/run requests per session")
+    parser.add_argument("--model-latency", type=float, default=0.3, help="stub model latency per call")
+    parser.add_argument("--latency", type=float, default=0.02, help="Firestore RPC latency in seconds")
+    parser.add_argument("--users", type=int, default=1000, help="synthetic Firestore users")
+    parser.add_argument("--kv-latency", type=float, default=0.001, help="key-value store latency for --session-uri kv")
+    parser.add_argument("--session-uri", help="session store URI, 'memory', or 'firestore' / 'kv' fakes (default: fresh SQLite file)")
+    parser.add_argument("--slo", type=float, default=3.0, help="p99 request latency budget in seconds")
+    args = parser.parse_args()
+    levels = [int(level) for level in args.levels.split(",")]
+    logging.getLogger("google_adk").setLevel(logging.ERROR)
+    logging.getLogger("capymind").setLevel(logging.WARNING)
+
+    workdir = tempfile.mkdtemp(prefix="capymind-load-")
+    session_uri = args.session_uri or f"sqlite:///{os.path.join(workdir, 'sessions.db')}"
+    os.environ["CAPY_SESSION_URI"] = "" if session_uri == "memory" else session_uri
+    shared_stores = {
+        # A separate fake, so session RPCs do not count against the tools' Firestore
+        "firestore": lambda: session_store.FirestoreSessionService(
+            client=FakeAsyncFirestoreClient(FakeFirestoreClient(latency=args.latency))),
+        "kv": lambda: session_store.KeyValueSessionService(FakeKeyValueStore(latency=args.kv_latency)),
+    }
+
+    stub = serve_stub(latency=args.model_latency)
+    client = FakeFirestoreClient(latency=args.latency)
+    users = seed_synthetic(client, users=args.users, notes_per_user=20)
+
+    from google.adk.sessions import InMemorySessionService
+    from google.adk.sessions.database_session_service import DatabaseSessionService
+
+    store_samples: List[float] = []
+    patches = [
+        mock.patch.object(firestore_data, "_get_firestore_client", return_value=client),
+        mock.patch.object(firestore_data, "_get_async_firestore_client",
+                          return_value=FakeAsyncFirestoreClient(client)),
+        *instrument_session_store(
+            (DatabaseSessionService, InMemorySessionService, session_store.CachedSessionService), store_samples
+        ),
+    ]
+    if session_uri in shared_stores:
+        patches.append(mock.patch.object(
+            session_store, "create_session_service", return_value=shared_stores[session_uri]()
+        ))
+    for patch in patches:
+        patch.start()
+
+    import main  # builds the app with the patched model registry and session store URI
+
+    print(f"main.app with session store {session_uri}; model {args.model_latency * 1000:.0f} ms/call, "
+          f"Firestore {args.latency * 1000:.0f} ms/RPC, {args.turns} turns per session")
+    # Load the agent, open the store and fill import caches outside the measurements
+    asyncio.run(run_level(main.app, 2, len(MESSAGES), users, store_samples))
+    rows, by_kind, fitting = [], {}, None
+    for level in levels:
+        calls_before = stub.total_calls
+        result = asyncio.run(run_level(main.app, level, args.turns, users, store_samples))
+        rows.append([
+            level, result["requests_per_s"], result["p50"], result["p95"], result["p99"],
+            result["store_p99_ms"], f"{result['store_share']:.1%}", result["loop_lag_p99_ms"],
+            result["rss_kb_per_session"], (stub.total_calls - calls_before) / (level * args.turns), result["errors"],
+        ])
+        by_kind[level] = result["by_kind"]
+        if result["p99"] <= args.slo and not result["errors"]:
+            fitting = level
+
+    print_table(
+        ["sessions", "req/s", "p50 s", "p95 s", "p99 s", "store p99 ms", "store share",
+         "loop lag p99 ms", "RSS KB/session", "model calls/req", "errors"],
+        rows,
+    )
+    print()
+    kinds = ["create_session"] + sorted({kind for kind, _ in MESSAGES})
+    print_table(["sessions"] + [f"{kind} p50 s" for kind in kinds],
+                [[level] + [by_kind[level].get(kind, 0.0) for kind in kinds] for level in levels])
+    print()
+    if fitting:
+        print(f"Highest level within p99 <= {args.slo:.1f} s: {fitting} concurrent sessions per instance")
+    else:
+        print(f"No level met p99 <= {args.slo:.1f} s")
+
+    for patch in patches:
+        patch.stop()
+
+
+if __name__ == "__main__":
+    main()
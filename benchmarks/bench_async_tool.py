@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+"""
+Concurrent sessions per worker: sync vs asyncio Firestore tool.
+
+Each simulated session runs one personalised turn on a single event loop (one
+uvicorn worker): an awaited "model call", then get_settings and get_notes
+through the ADK FunctionTool wrapper, then a second model call. Firestore is the
+in-memory fake with per-RPC latency, so the sync tool blocks the loop exactly
+like a real slow read would. The document cache is disabled so every call
+reaches the backend.
+
+    python benchmarks/bench_async_tool.py [--latency 0.02] [--model-latency 0.3] [--slo 1.5]
+"""
+
+import os
+import sys
+import time
+import asyncio
+import argparse
+from unittest import mock
+
+# Add the project root to the path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from google.adk.tools import FunctionTool
+
+from benchmarks.common import percentile, print_table
+from capymind_agent.tools import firestore_data
+from capymind_agent.tools.doc_cache import DocumentCache
+from tests.fake_firestore import FakeAsyncFirestoreClient, FakeFirestoreClient, FakeToolContext
+
+CONCURRENCY_LEVELS = [1, 10, 25, 50, 100, 200, 400]
+
+
+def seed(client: FakeFirestoreClient, users: int) -> None:
+    for i in range(users):
+        user_ref = client.seed("users", f"u{i}", {"FirstName": f"User {i}"})
+        client.seed("settings", f"u{i}", {"Location": "Kyiv", "SecondsFromUTC": 7200})
+        for n in range(5):
+            client.seed("notes", f"u{i}-n{n}", {"text": f"note {n}", "timestamp": n, "user": user_ref})
+
+
+async def run_level(tool: FunctionTool, sessions: int, model_latency: float) -> dict:
+    async def turn(index: int) -> float:
+        context = FakeToolContext(f"u{index % 50}")
+        started = time.perf_counter()
+        await asyncio.sleep(model_latency)
+        await tool.run_async(args={"operation": "get_settings"}, tool_context=context)
+        await tool.run_async(args={"operation": "get_notes", "limit": 5}, tool_context=context)
+        await asyncio.sleep(model_latency)
+        return time.perf_counter() - started
+
+    started = time.perf_counter()
+    latencies = await asyncio.gather(*(turn(i) for i in range(sessions)))
+    wall = time.perf_counter() - started
+    return {
+        "p50": percentile(latencies, 50),
+        "p99": percentile(latencies, 99),
+        "turns_per_s": sessions / wall,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--latency", type=float, default=0.02, help="Firestore RPC latency in seconds")
+    parser.add_argument("--model-latency", type=float, default=0.3, help="awaited model latency per call")
+    parser.add_argument("--slo", type=float, default=1.5, help="p99 turn latency budget in seconds")
+    args = parser.parse_args()
+
+    client = FakeFirestoreClient(latency=args.latency)
+    seed(client, 50)
+    async_client = FakeAsyncFirestoreClient(client)
+    variants = {
+        "sync": FunctionTool(firestore_data.capy_firestore_data),
+        "async": FunctionTool(firestore_data.capy_firestore_data_async),
+    }
+
+    rows = []
+    capacity = {name: 0 for name in variants}
+    with mock.patch.object(firestore_data, "_get_firestore_client", return_value=client), \
+            mock.patch.object(firestore_data, "_get_async_firestore_client", return_value=async_client), \
+            mock.patch.object(firestore_data, "document_cache", DocumentCache(ttl_seconds=0)):
+        for name, tool in variants.items():
+            for sessions in CONCURRENCY_LEVELS:
+                result = asyncio.run(run_level(tool, sessions, args.model_latency))
+                if result["p99"] <= args.slo:
+                    capacity[name] = sessions
+                rows.append([name, sessions, result["p50"], result["p99"], result["turns_per_s"]])
+
+    print(f"Firestore latency {args.latency * 1000:.0f} ms/RPC, model latency {args.model_latency * 1000:.0f} ms/call")
+    print_table(["tool", "sessions", "p50 s", "p99 s", "turns/s"], rows)
+    print()
+    for name, sessions in capacity.items():
+        print(f"{name}: {sessions} concurrent sessions within p99 <= {args.slo}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+"""
+Latency and precision/recall of the pre-model crisis detector.
+
+Runs crisis_detector.detect over the labelled corpus in
+benchmarks/data/crisis_corpus.tsv (high / medium / none, several languages)
+and reports:
+
+- precision and recall of the "high" decision, which skips the model and
+  replies with crisis numbers, and of "any risk" (high or medium);
+- recall of high-risk messages per language;
+- per-message detection latency on the corpus and on long journal-style
+  messages.
+
+    python benchmarks/bench_crisis_detector.py [--repeat 200] [--show-errors]
+"""
+
+import os
+import sys
+import argparse
+from collections import defaultdict
+from typing import List, Tuple
+
+# Add the project root to the path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.common import percentile, print_table, time_calls
+from capymind_agent.tools.crisis_detector import HIGH, MEDIUM, crisis_detector
+
+CORPUS_PATH = os.path.join(os.path.dirname(__file__), "data", "crisis_corpus.tsv")
+
+
+def load_corpus(path: str = CORPUS_PATH) -> List[Tuple[str, str, str]]:
+    rows = []
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            if line.strip() and not line.startswith("#"):
+                label, language, message = line.rstrip("\n").split("\t", 2)
+                rows.append((label, language, message))
+    return rows
+
+
+def precision_recall(pairs: List[Tuple[bool, bool]]) -> Tuple[float, float]:
+    tp = sum(1 for expected, got in pairs if expected and got)
+    fp = sum(1 for expected, got in pairs if not expected and got)
+    fn = sum(1 for expected, got in pairs if expected and not got)
+    precision = tp / (tp + fp) if tp + fp else 1.0
+    recall = tp / (tp + fn) if tp + fn else 1.0
+    return precision, recall
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=200, help="timed passes per message")
+    parser.add_argument("--show-errors", action="store_true", help="print misclassified messages")
+    args = parser.parse_args()
+
+    corpus = load_corpus()
+    predictions = []
+    for label, language, message in corpus:
+        detection = crisis_detector.detect(message)
+        predictions.append((label, language, message, detection.level if detection else "none"))
+
+    high = precision_recall([(label == HIGH, got == HIGH) for label, _, _, got in predictions])
+    risk = precision_recall([(label != "none", got != "none") for label, _, _, got in predictions])
+    print(f"Corpus: {len(corpus)} messages, phrase list {crisis_detector.version}")
+    print_table(
+        ["decision", "precision", "recall"],
+        [["high (short-circuit)", high[0], high[1]], ["any risk", risk[0], risk[1]]],
+    )
+
+    per_language = defaultdict(lambda: [0, 0])
+    for label, language, _, got in predictions:
+        if label == HIGH:
+            per_language[language][0] += got == HIGH
+            per_language[language][1] += 1
+    print()
+    print_table(
+        ["language", "high found", "high total", "recall"],
+        [[language, found, total, found / total] for language, (found, total) in sorted(per_language.items())],
+    )
+
+    long_message = " ".join(message for label, _, message in corpus if label == "none") * 4
+    workloads = {
+        "corpus message": [message for _, _, message in corpus],
+        f"journal entry ({len(long_message)} chars)": [long_message],
+    }
+    rows = []
+    for name, messages in workloads.items():
+        durations = []
+        for message in messages:
+            durations.extend(time_calls(lambda: crisis_detector.detect(message), args.repeat))
+        rows.append([name, percentile(durations, 50) * 1e6, percentile(durations, 99) * 1e6])
+    print()
+    print_table(["workload", "p50 us", "p99 us"], rows)
+
+    if args.show_errors:
+        print()
+        for label, language, message, got in predictions:
+            if label != got and (label == HIGH or got == HIGH or MEDIUM in (label, got)):
+                print(f"expected={label:<6} got={got:<6} [{language}] {message}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+"""
+Web searches and latency of crisis line searches with the per-location cache.
+
+Users are spread over ``--locations`` places the bundled directory does not
+cover, with Zipf-like popularity (a few big cities, a long tail), and
+``--calls`` crisis searches arrive ``--concurrency`` at a time. The search
+is a stub sleeping ``--search-latency`` seconds, standing in for the search
+agent. Variants: no cache, caches of several sizes starting cold, and a
+cache pre-warmed with the ``--warm`` most common places.
+
+    python benchmarks/bench_crisis_search.py [--calls 2000] [--locations 300] [--sizes 32,128,512]
+"""
+
+import os
+import sys
+import time
+import random
+import asyncio
+import argparse
+from typing import List, Optional
+
+# Add the project root to the path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.common import percentile, print_table
+from capymind_agent.tools.crisis_search import SearchCache, search_crisis_lines, warm
+
+
+class StubSearch:
+    def __init__(self, latency: float):
+        self.latency = latency
+        self.searches = 0
+
+    async def __call__(self, location: str) -> str:
+        self.searches += 1
+        await asyncio.sleep(self.latency)
+        return f"- Helpline for {location}: 555-0100\n- Emergency: 112"
+
+
+async def run(locations: List[str], cache: Optional[SearchCache], search: StubSearch, concurrency: int) -> List[float]:
+    latencies: List[float] = []
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one(location: str) -> None:
+        async with semaphore:
+            started = time.perf_counter()
+            if cache is None:
+                await search(location)
+            else:
+                await search_crisis_lines(location, cache, search)
+            latencies.append(time.perf_counter() - started)
+
+    await asyncio.gather(*(one(location) for location in locations))
+    return latencies
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--calls", type=int, default=2000, help="crisis searches")
+    parser.add_argument("--locations", type=int, default=300, help="distinct places")
+    parser.add_argument("--sizes", default="32,128,512", help="comma-separated cache sizes")
+    parser.add_argument("--warm", type=int, default=50, help="places pre-warmed in the warm variant")
+    parser.add_argument("--concurrency", type=int, default=8, help="searches in flight at once")
+    parser.add_argument("--search-latency", type=float, default=0.02, help="stub search latency in seconds")
+    args = parser.parse_args()
+
+    rng = random.Random(7)
+    places = [f"City {i}, Country {i % 40}" for i in range(args.locations)]
+    weights = [1.0 / (rank + 1) for rank in range(args.locations)]
+    # Users type their Location in different ways
+    spell = (lambda place: place, str.lower, str.upper, lambda place: place.replace(",", "") + " ")
+    calls = [rng.choice(spell)(place) for place in rng.choices(places, weights=weights, k=args.calls)]
+
+    variants = [("no cache", None, 0)]
+    variants += [(f"cache {size}", size, 0) for size in map(int, args.sizes.split(","))]
+    variants.append((f"cache {variants[-1][1]} + warm {args.warm}", variants[-1][1], args.warm))
+
+    rows = []
+    for name, size, warm_top in variants:
+        search = StubSearch(args.search_latency)
+        cache = SearchCache(max_entries=size) if size else None
+        if cache is not None and warm_top:
+            asyncio.run(warm(cache, places[:warm_top], StubSearch(args.search_latency)))
+        latencies = asyncio.run(run(calls, cache, search, args.concurrency))
+        stats = cache.stats() if cache is not None else {"hit_rate": 0.0, "evictions": 0}
+        rows.append([
+            name,
+            search.searches,
+            stats["hit_rate"] * 100,
+            stats["evictions"],
+            percentile(latencies, 50) * 1e3,
+            percentile(latencies, 95) * 1e3,
+        ])
+
+    print(f"{args.calls} searches over {args.locations} places (Zipf), {args.concurrency} at a time, "
+          f"{args.search_latency * 1000:.0f} ms per search")
+    print_table(["variant", "searches", "hit rate %", "evictions", "p50 ms", "p95 ms"], rows)
+
+
+if __name__ == "__main__":
+    main()
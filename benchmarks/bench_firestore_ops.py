@@ -0,0 +1,198 @@
+#!/usr/bin/env python3
+"""
+Latency and throughput of every capy_firestore_data operation at scale.
+
+Seeds the in-memory Firestore fake with synthetic users, settings and notes
+(tests.fake_firestore.seed_synthetic; 10,000 users and ~200,000 notes by
+default), then drives each operation through the asyncio tool from
+``--concurrency`` concurrent callers against random users, with per-RPC
+latency plus exponential jitter. The document cache is off so every call
+reaches the backend. For each operation it reports p50/p99 latency, calls per
+second, and Firestore reads and round trips per call.
+
+With ``--baseline`` the run fails (exit code 1) when an operation needs more
+reads or round trips per call than recorded, or its p99 exceeds the recorded
+p99 by more than ``--tolerance``; ``--write-baseline`` records a new one. The
+CI workflow runs ``--quick --baseline benchmarks/data/firestore_ops_baseline.json``.
+
+    python benchmarks/bench_firestore_ops.py [--users 10000] [--notes-per-user 20]
+        [--calls 1000] [--concurrency 50] [--latency 0.005] [--jitter 0.001]
+        [--quick] [--baseline FILE] [--write-baseline FILE]
+"""
+
+import gc
+import os
+import sys
+import json
+import time
+import random
+import asyncio
+import argparse
+from typing import Any, Callable, Dict, List
+from unittest import mock
+
+# Add the project root to the path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.common import percentile, print_table
+from capymind_agent.tools import firestore_data
+from capymind_agent.tools.doc_cache import DocumentCache
+from tests.fake_firestore import (
+    FakeAsyncFirestoreClient,
+    FakeFirestoreClient,
+    FakeToolContext,
+    seed_synthetic,
+)
+
+# Synthetic notes span 2025; windows below fall inside it
+WINDOW = {"since": "2025-10-01T00:00:00Z", "until": "2025-12-31T00:00:00Z"}
+
+# operation name -> (tool operation, extra arguments)
+OPERATIONS: Dict[str, Any] = {
+    "get_user": ("get_user", {}),
+    "get_settings": ("get_settings", {}),
+    "get_notes": ("get_notes", {"limit": 10}),
+    "get_notes page 2": ("get_notes", {"limit": 10, "start_after": None}),
+    "get_notes window+fields": ("get_notes", {"limit": 20, "fields": ["text", "timestamp"], **WINDOW}),
+    "get_context": ("get_context", {"limit": 5}),
+    "notes_stats week": ("notes_stats", {"bucket": "week", **WINDOW}),
+}
+
+
+async def call(user_id: str, operation: str, arguments: Dict[str, Any]) -> Dict[str, Any]:
+    return await firestore_data.capy_firestore_data_async(operation, FakeToolContext(user_id), **arguments)
+
+
+async def cursors(user_ids: List[str]) -> Dict[str, str]:
+    """First-page cursors for users with more than one page of notes."""
+    results = await asyncio.gather(*(call(user_id, "get_notes", {"limit": 10}) for user_id in user_ids))
+    return {user_id: result["next_cursor"] for user_id, result in zip(user_ids, results) if "next_cursor" in result}
+
+
+async def run_operation(
+    client: FakeFirestoreClient,
+    users: List[str],
+    operation: str,
+    arguments: Dict[str, Any],
+    calls: int,
+    concurrency: int,
+    arguments_for: Callable[[str], Dict[str, Any]],
+) -> Dict[str, float]:
+    rng = random.Random(operation)
+    picks = [rng.choice(users) for _ in range(calls)]
+    gate = asyncio.Semaphore(concurrency)
+    latencies: List[float] = []
+    failures = 0
+
+    async def one(user_id: str) -> None:
+        nonlocal failures
+        async with gate:
+            started = time.perf_counter()
+            result = await call(user_id, operation, arguments_for(user_id))
+            latencies.append(time.perf_counter() - started)
+            failures += not result.get("ok")
+
+    reads, rpcs = client.reads, client.rpcs
+    started = time.perf_counter()
+    await asyncio.gather(*(one(user_id) for user_id in picks))
+    wall = time.perf_counter() - started
+    return {
+        "p50_ms": percentile(latencies, 50) * 1e3,
+        "p99_ms": percentile(latencies, 99) * 1e3,
+        "calls_per_s": calls / wall,
+        "reads_per_call": (client.reads - reads) / calls,
+        "rpcs_per_call": (client.rpcs - rpcs) / calls,
+        "failures": failures,
+    }
+
+
+async def run_suite(client: FakeFirestoreClient, user_ids: List[str], args) -> Dict[str, Dict[str, float]]:
+    results = {}
+    page_two = await cursors(user_ids[: min(len(user_ids), 2000)])
+    for name, (operation, arguments) in OPERATIONS.items():
+        users = user_ids
+        arguments_for = lambda user_id, arguments=arguments: arguments
+        if "start_after" in arguments:
+            users = list(page_two)
+            arguments_for = lambda user_id, arguments=arguments: {**arguments, "start_after": page_two[user_id]}
+        results[name] = await run_operation(
+            client, users, operation, arguments, args.calls, args.concurrency, arguments_for
+        )
+    return results
+
+
+def check_baseline(results: Dict[str, Dict[str, float]], baseline: Dict[str, Dict[str, float]], tolerance: float) -> List[str]:
+    problems = []
+    for name, expected in baseline.items():
+        got = results.get(name)
+        if got is None:
+            problems.append(f"{name}: missing from this run")
+            continue
+        for key in ("reads_per_call", "rpcs_per_call"):
+            # Random user picks are seeded, so these are exact for the same dataset
+            if got[key] > expected[key] * 1.01 + 0.01:
+                problems.append(f"{name}: {key} {got[key]:.2f} > baseline {expected[key]:.2f}")
+        if got["p99_ms"] > expected["p99_ms"] * tolerance:
+            problems.append(f"{name}: p99 {got['p99_ms']:.1f} ms > {tolerance}x baseline {expected['p99_ms']:.1f} ms")
+    return problems
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=10_000, help="synthetic users")
+    parser.add_argument("--notes-per-user", type=float, default=20, help="mean notes per user")
+    parser.add_argument("--calls", type=int, default=1000, help="calls per operation")
+    parser.add_argument("--concurrency", type=int, default=50, help="concurrent callers")
+    parser.add_argument("--latency", type=float, default=0.005, help="Firestore RPC latency in seconds")
+    parser.add_argument("--jitter", type=float, default=0.001, help="mean exponential extra latency per RPC")
+    parser.add_argument("--quick", action="store_true", help="1,000 users and 200 calls per operation (CI)")
+    parser.add_argument("--baseline", help="fail on regressions against this JSON baseline")
+    parser.add_argument("--write-baseline", help="write this run's results as a JSON baseline")
+    parser.add_argument("--tolerance", type=float, default=2.0, help="allowed p99 growth factor vs baseline")
+    args = parser.parse_args()
+    if args.quick:
+        args.users, args.calls = 1000, 200
+
+    started = time.perf_counter()
+    client = FakeFirestoreClient(latency=args.latency, jitter=args.jitter)
+    user_ids = seed_synthetic(client, users=args.users, notes_per_user=args.notes_per_user)
+    # The seeded fake is a long-lived heap a production process keeps in
+    # Firestore instead; frozen, full collections stop rescanning it and
+    # adding pauses of hundreds of ms to the measured p99
+    gc.collect()
+    gc.freeze()
+    print(f"Seeded {args.users} users, {client.count('notes')} notes in {time.perf_counter() - started:.1f} s; "
+          f"RPC latency {args.latency * 1000:.1f} ms + {args.jitter * 1000:.1f} ms mean jitter, "
+          f"{args.concurrency} concurrent callers")
+
+    with mock.patch.object(firestore_data, "_get_async_firestore_client", return_value=FakeAsyncFirestoreClient(client)), \
+            mock.patch.object(firestore_data, "document_cache", DocumentCache(ttl_seconds=0)):
+        results = asyncio.run(run_suite(client, user_ids, args))
+
+    print_table(
+        ["operation", "p50 ms", "p99 ms", "calls/s", "reads/call", "RPCs/call", "failed"],
+        [
+            [name, r["p50_ms"], r["p99_ms"], r["calls_per_s"], r["reads_per_call"], r["rpcs_per_call"], r["failures"]]
+            for name, r in results.items()
+        ],
+    )
+
+    if args.write_baseline:
+        with open(args.write_baseline, "w", encoding="utf-8") as f:
+            json.dump({"args": {"users": args.users, "calls": args.calls}, "results": results}, f, indent=2)
+            f.write("\n")
+        print(f"\nBaseline written to {args.write_baseline}")
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            problems = check_baseline(results, json.load(f)["results"], args.tolerance)
+        print()
+        if problems:
+            print("Regressions against baseline:")
+            for problem in problems:
+                print(f"  {problem}")
+            sys.exit(1)
+        print("No regressions against baseline")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,240 @@
+#!/usr/bin/env python3
+"""
+Throughput of format_data: compiled/streaming engine vs the previous version.
+
+Renders synthetic note histories (10 / 100 / 1,000 / 10,000 notes) plus the
+settings and user documents, checks the output is byte-for-byte identical to
+the previous implementation (kept below as ``legacy_format_data``) and reports
+the median time per call. The streaming row consumes iter_format_data chunk by
+chunk without building the joined string.
+
+    python benchmarks/bench_format_data.py [--repeat 30]
+"""
+
+import os
+import sys
+import argparse
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List
+
+# Add the project root to the path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.common import percentile, print_table, time_calls
+from capymind_agent.tools.format_data import format_data, iter_format_data
+
+NOTE_COUNTS = [10, 100, 1000, 10000]
+
+
+def legacy_format_data(data_type: str, data: List[Dict[str, Any]]) -> str:
+    """format_data as it was before the compiled/streaming rewrite."""
+    if not data:
+        return f"No {data_type} found."
+    
+    # Handle case where data might be a single dict instead of list
+    if isinstance(data, dict):
+        data = [data]
+    
+    if data_type == "notes":
+        formatted_notes = []
+        for note in data:
+            # Parse timestamp for better formatting
+            timestamp_str = note.get("timestamp", "")
+            try:
+                if timestamp_str:
+                    dt = datetime.fromisoformat(timestamp_str.replace('Z', '+00:00'))
+                    formatted_time = dt.strftime("%B %d, %Y at %I:%M %p")
+                else:
+                    formatted_time = "Unknown date"
+            except:
+                formatted_time = timestamp_str
+            
+            formatted_notes.append(
+                f"📝 **Note from {formatted_time}**\n"
+                f"{note.get('text', 'No content')}\n"
+            )
+        return "\n".join(formatted_notes)
+    
+    elif data_type == "settings":
+        if not data:
+            return "No settings found."
+        
+        settings_doc = data[0]  # Settings should be a single document
+        
+        # Handle nested settings structure
+        if "settings" in settings_doc:
+            settings = settings_doc["settings"]
+        else:
+            settings = settings_doc
+            
+        formatted_settings = ["⚙️ **Your Settings:**\n"]
+        
+        # Format specific settings with better labels
+        setting_labels = {
+            "EveningReminderOffset": "Evening Reminder Time (hours from midnight)",
+            "HasEveningReminder": "Evening Reminder Enabled",
+            "HasMorningReminder": "Morning Reminder Enabled", 
+            "Location": "Location",
+            "MorningReminderOffset": "Morning Reminder Time (hours from midnight)",
+            "SecondsFromUTC": "Timezone Offset (seconds from UTC)"
+        }
+        
+        for key, value in settings.items():
+            if key == "id":
+                continue
+                
+            # Use custom label if available, otherwise format the key
+            if key in setting_labels:
+                label = setting_labels[key]
+            else:
+                label = key.replace("_", " ").title()
+            
+            # Format boolean values
+            if isinstance(value, bool):
+                value_str = "Yes" if value else "No"
+            else:
+                value_str = str(value)
+                
+            formatted_settings.append(f"• **{label}**: {value_str}")
+        
+        return "\n".join(formatted_settings)
+    
+    elif data_type == "user":
+        if not data:
+            return "No user profile found."
+        
+        user_doc = data[0]  # User should be a single document
+        
+        # Handle nested user_data structure
+        if "user_data" in user_doc:
+            user = user_doc["user_data"]
+        else:
+            user = user_doc
+            
+        formatted_user = ["👤 **Your Profile:**\n"]
+        
+        # Format specific user fields with better labels
+        user_labels = {
+            "ChatID": "Chat ID",
+            "FirstName": "First Name",
+            "ID": "User ID",
+            "IsDeleted": "Account Status",
+            "IsOnboarded": "Onboarding Complete",
+            "IsTyping": "Currently Typing",
+            "LastCommand": "Last Command Used",
+            "LastName": "Last Name",
+            "Locale": "Language/Locale",
+            "Role": "User Role",
+            "SecondsFromUTC": "Timezone Offset (seconds from UTC)",
+            "TherapySessionEndAt": "Therapy Session Ends At",
+            "TherapySessionId": "Current Therapy Session ID",
+            "Timestamp": "Last Updated",
+            "UserName": "Username"
+        }
+        
+        for key, value in user.items():
+            if key == "id":
+                continue
+                
+            # Use custom label if available, otherwise format the key
+            if key in user_labels:
+                label = user_labels[key]
+            else:
+                label = key.replace("_", " ").title()
+            
+            # Format specific value types
+            if isinstance(value, bool):
+                if key == "IsDeleted":
+                    value_str = "Deleted" if value else "Active"
+                else:
+                    value_str = "Yes" if value else "No"
+            elif key in ["TherapySessionEndAt", "Timestamp"] and value:
+                # Format timestamps
+                try:
+                    dt = datetime.fromisoformat(value.replace('Z', '+00:00'))
+                    value_str = dt.strftime("%B %d, %Y at %I:%M %p")
+                except:
+                    value_str = str(value)
+            else:
+                value_str = str(value)
+                
+            formatted_user.append(f"• **{label}**: {value_str}")
+        
+        return "\n".join(formatted_user)
+    
+    else:
+        return f"Unknown data type: {data_type}"
+
+
+def synthetic_notes(count: int) -> List[Dict[str, Any]]:
+    base = datetime(2025, 1, 1, tzinfo=timezone.utc)
+    return [
+        {
+            "id": f"n{i}",
+            "text": "Slept badly again, anxious about the presentation tomorrow.",
+            # Journaling happens a few times a day, so timestamps rarely repeat
+            "timestamp": (base - timedelta(minutes=371 * i)).isoformat(),
+        }
+        for i in range(count)
+    ]
+
+
+SETTINGS = [{
+    "id": "u1",
+    "EveningReminderOffset": 21,
+    "HasEveningReminder": True,
+    "HasMorningReminder": False,
+    "Location": "Kyiv, Ukraine",
+    "MorningReminderOffset": 8,
+    "SecondsFromUTC": 7200,
+}]
+
+USER = [{
+    "id": "u1",
+    "ChatID": 123456,
+    "FirstName": "Ada",
+    "IsDeleted": False,
+    "IsOnboarded": True,
+    "Locale": "en",
+    "Role": "user",
+    "Timestamp": "2025-01-01T08:00:00Z",
+    "TherapySessionEndAt": "2025-01-01T09:00:00Z",
+    "UserName": "ada",
+}]
+
+
+def consume_stream(data_type: str, data: List[Dict[str, Any]]) -> int:
+    size = 0
+    for chunk in iter_format_data(data_type, data):
+        size += len(chunk)
+    return size
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=30, help="timed runs per workload")
+    args = parser.parse_args()
+
+    workloads = [(f"notes x{n}", "notes", synthetic_notes(n)) for n in NOTE_COUNTS]
+    workloads += [("settings", "settings", SETTINGS), ("user", "user", USER)]
+    variants = {
+        "legacy": lambda data_type, data: legacy_format_data(data_type, data),
+        "compiled": lambda data_type, data: format_data(data_type, data, None),
+        "streaming": consume_stream,
+    }
+
+    rows = []
+    for name, data_type, data in workloads:
+        assert legacy_format_data(data_type, data) == format_data(data_type, data, None)
+        medians = {}
+        for variant, render in variants.items():
+            render(data_type, data)  # warm up (fills the timestamp memo)
+            medians[variant] = percentile(time_calls(lambda: render(data_type, data), args.repeat), 50)
+            rows.append([name, variant, medians[variant] * 1e3, 1 / medians[variant]])
+        rows.append([name, "speedup", "", f"{medians['legacy'] / medians['compiled']:.1f}x"])
+
+    print_table(["workload", "variant", "p50 ms", "calls/s"], rows)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+"""
+Prompt size per turn of a long therapy session with and without history compaction.
+
+Replays a synthetic ``--turns``-turn session against the root agent's real
+instruction: chat turns of a few sentences each way, a notes lookup (tool
+call plus a 10-note result) every 7th turn and one crisis disclosure. For
+every turn the request the root agent would send is measured (estimated
+tokens, as HistoryCompactor counts them) twice: with the full history, and
+after compact_history's logic with a stub summariser that keeps the first
+sentence of each folded user message (capped at 250 words, the length the
+real summary prompt asks for).
+
+Reported: prompt tokens at sampled turns, total prompt tokens over the
+session, summariser calls and the callback's own time per request.
+
+    python benchmarks/bench_history_compaction.py [--turns 80] [--budget 8000] [--keep-turns 4] [--every 10]
+"""
+
+import os
+import sys
+import time
+import asyncio
+import argparse
+from typing import List
+
+# Add the project root to the path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from google.adk.models import LlmRequest
+from google.genai import types
+
+from benchmarks.common import percentile, print_table
+from capymind_agent.prompt import prompt
+from capymind_agent.tools.history_compactor import HistoryCompactor, request_tokens, split_turns
+from tests.fake_firestore import FakeCallbackContext
+
+_USER = (
+    "Today was {mood} again. My manager moved the deadline and I stayed late, so I skipped dinner "
+    "and only slept five hours. I keep replaying the meeting in my head and wondering whether I "
+    "said something wrong. My sister called but I didn't pick up because I didn't want to talk."
+)
+_MODEL = (
+    "Thank you for sharing that. It sounds like the deadline change left you carrying a lot, and "
+    "losing sleep makes everything feel heavier. Replaying the meeting is a very common response "
+    "to stress. Would it help to try a short grounding exercise, or would you rather talk through "
+    "what happened in the meeting? Also, how do you feel about calling your sister back tomorrow?"
+)
+_MOODS = ("heavy", "tense", "a bit better", "exhausting", "quiet", "overwhelming", "calmer")
+
+
+def _content(role: str, part: types.Part) -> types.Content:
+    return types.Content(role=role, parts=[part])
+
+
+def session_turn(index: int) -> List[types.Content]:
+    """One turn of the synthetic session: user message, optional tool call, reply."""
+    if index == 11:
+        user = "Honestly some nights I feel like I want to die. I don't know who to call."
+        return [
+            _content("user", types.Part(text=user)),
+            _content("model", types.Part(text="I'm really glad you told me. Please call or text 988 now. Are you safe right now?")),
+        ]
+    turn = [_content("user", types.Part(text=_USER.format(mood=_MOODS[index % len(_MOODS)])))]
+    if index % 7 == 3:
+        notes = [{"text": _USER.format(mood=mood), "timestamp": f"2025-03-{day + 1:02d}T21:00:00Z"}
+                 for day, mood in enumerate(_MOODS + _MOODS[:3])]
+        call = types.FunctionCall(name="capy_firestore_data_async", args={"operation": "get_notes", "limit": 10})
+        response = types.FunctionResponse(name=call.name, response={"ok": True, "data": notes})
+        turn += [_content("model", types.Part(function_call=call)), _content("user", types.Part(function_response=response))]
+    turn.append(_content("model", types.Part(text=_MODEL)))
+    return turn
+
+
+async def first_sentences(previous: str, contents: List[types.Content]) -> str:
+    _, turns = split_turns(contents)
+    lines = [previous] if previous else []
+    lines += [turn[0].parts[0].text.split(".")[0] + "." for turn in turns]
+    words = " ".join(lines).split()
+    return " ".join(words[-250:])
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--turns", type=int, default=80, help="turns in the session")
+    parser.add_argument("--budget", type=int, default=8000, help="compaction budget in estimated tokens")
+    parser.add_argument("--keep-turns", type=int, default=4, help="recent turns kept verbatim")
+    parser.add_argument("--every", type=int, default=10, help="print every Nth turn")
+    args = parser.parse_args()
+
+    compactor = HistoryCompactor(first_sentences, budget_tokens=args.budget, keep_turns=args.keep_turns)
+    context = FakeCallbackContext("u1")
+    history: List[types.Content] = []
+    rows = []
+    totals = {"full": 0, "compacted": 0}
+    overhead: List[float] = []
+    for index in range(args.turns):
+        turn = session_turn(index)
+        # The first model call of the turn sees the history plus the new message
+        history.append(turn[0])
+        full = LlmRequest(contents=list(history), config=types.GenerateContentConfig(system_instruction=prompt))
+        compacted = LlmRequest(contents=list(history), config=types.GenerateContentConfig(system_instruction=prompt))
+        started = time.perf_counter()
+        asyncio.run(compactor.compact(context, compacted))
+        overhead.append(time.perf_counter() - started)
+        history.extend(turn[1:])
+
+        sizes = request_tokens(full), request_tokens(compacted)
+        totals["full"] += sizes[0]
+        totals["compacted"] += sizes[1]
+        if (index + 1) % args.every == 0 or index == 0:
+            rows.append([index + 1, sizes[0], sizes[1], f"{1 - sizes[1] / sizes[0]:.0%}", compactor.folds])
+
+    print(f"{args.turns} turns, budget {args.budget} tokens, last {args.keep_turns} turns kept verbatim")
+    print_table(["turn", "full prompt tokens", "compacted tokens", "saved", "summaries so far"], rows)
+    print()
+    print_table(
+        ["", "full", "compacted"],
+        [
+            ["prompt tokens over the session", totals["full"], totals["compacted"]],
+            ["mean prompt tokens per turn", totals["full"] / args.turns, totals["compacted"] / args.turns],
+        ],
+    )
+    print(f"summariser calls: {compactor.folds}; callback p50 {percentile(overhead, 50) * 1e3:.2f} ms, "
+          f"p99 {percentile(overhead, 99) * 1e3:.2f} ms (stub summariser included)")
+
+
+if __name__ == "__main__":
+    main()
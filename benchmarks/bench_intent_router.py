@@ -0,0 +1,140 @@
+#!/usr/bin/env python3
+"""
+Model calls and turn latency saved by the deterministic intent router.
+
+Runs a mix of chat and plain data requests ("show my settings", "show my last
+5 notes") through the real agent tree with every model replaced by StubLlm
+(benchmarks/stub_model.py), once with only the crisis guard in front of the
+agents ("agents") and once with route_data_intent as well ("router").
+Firestore is the in-memory fake with per-RPC latency.
+
+    python benchmarks/bench_intent_router.py [--model-latency 0.3] [--latency 0.02]
+"""
+
+import os
+import sys
+import time
+import asyncio
+import logging
+import argparse
+from unittest import mock
+
+# Add the project root to the path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from google.adk.agents import Agent
+from google.adk.runners import Runner
+from google.adk.sessions import InMemorySessionService
+from google.genai import types
+
+from benchmarks.common import percentile, print_table
+from benchmarks.stub_model import StubLlm
+from capymind_agent.tools import firestore_data
+from capymind_agent.tools.crisis_detector import crisis_guard
+from capymind_agent.tools.doc_cache import DocumentCache
+from capymind_agent.tools.format_data import format_data_tool
+from capymind_agent.tools.intent_router import route_data_intent
+from tests.fake_firestore import FakeAsyncFirestoreClient, FakeFirestoreClient
+
+DATA_MESSAGES = [
+    "show my settings",
+    "Show me my last 5 notes",
+    "What are my settings?",
+    "show my profile",
+    "my notes",
+]
+CHAT_MESSAGES = [
+    "I slept badly and feel anxious",
+    "How can I calm down before the exam?",
+    "My notes say I was sad all week, what does that mean?",
+    "I had an argument with my sister",
+    "Can you help me plan a calmer evening?",
+]
+
+
+def build_root(model: StubLlm, router: bool) -> Agent:
+    """The capymind agent tree with ``model`` behind every agent."""
+    callbacks = [crisis_guard, route_data_intent] if router else [crisis_guard]
+    data_fetcher = Agent(
+        model=model,
+        name="data_fetcher",
+        description="Fetches Firestore data (user, notes, settings) and formats it",
+        instruction="",
+        tools=[firestore_data.firestore_data_tool, format_data_tool],
+        before_model_callback=callbacks,
+    )
+    return Agent(
+        model=model,
+        name="capymind_agent",
+        description="An AI agent that handles therapy session requests",
+        instruction="",
+        sub_agents=[data_fetcher],
+        before_model_callback=callbacks,
+    )
+
+
+async def run_turn(runner: Runner, session_service: InMemorySessionService, message: str) -> float:
+    session = await session_service.create_session(app_name="bench", user_id="u1")
+    started = time.perf_counter()
+    async for _ in runner.run_async(
+        user_id="u1",
+        session_id=session.id,
+        new_message=types.Content(role="user", parts=[types.Part(text=message)]),
+    ):
+        pass
+    return time.perf_counter() - started
+
+
+async def run_variant(router: bool, model_latency: float, messages) -> dict:
+    model = StubLlm(latency=model_latency)
+    session_service = InMemorySessionService()
+    runner = Runner(app_name="bench", agent=build_root(model, router), session_service=session_service)
+    results = {}
+    for kind, texts in messages.items():
+        calls_before = model.calls
+        latencies = [await run_turn(runner, session_service, text) for text in texts]
+        results[kind] = {
+            "calls": (model.calls - calls_before) / len(texts),
+            "p50": percentile(latencies, 50),
+        }
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--latency", type=float, default=0.02, help="Firestore RPC latency in seconds")
+    parser.add_argument("--model-latency", type=float, default=0.3, help="stub model latency per call")
+    args = parser.parse_args()
+    # ADK warns about tool schema defaults on every model request
+    logging.getLogger("google_adk").setLevel(logging.ERROR)
+
+    client = FakeFirestoreClient()
+    user_ref = client.seed("users", "u1", {"FirstName": "Ada", "Locale": "en"})
+    client.seed("settings", "u1", {"Location": "Kyiv", "SecondsFromUTC": 7200})
+    for i in range(20):
+        client.seed("notes", f"n{i}", {"text": f"note {i}", "timestamp": f"2025-01-{i + 1:02d}T08:00:00Z", "user": user_ref})
+    async_client = FakeAsyncFirestoreClient(client, latency=args.latency)
+
+    messages = {"data": DATA_MESSAGES, "chat": CHAT_MESSAGES}
+    rows = []
+    with mock.patch.object(firestore_data, "_get_async_firestore_client", return_value=async_client), \
+            mock.patch.object(firestore_data, "document_cache", DocumentCache(ttl_seconds=0)):
+        results = {
+            name: asyncio.run(run_variant(router, args.model_latency, messages))
+            for name, router in (("agents", False), ("router", True))
+        }
+    for kind in messages:
+        for name, result in results.items():
+            rows.append([kind, name, result[kind]["calls"], result[kind]["p50"]])
+
+    print(f"Model latency {args.model_latency * 1000:.0f} ms/call, Firestore latency {args.latency * 1000:.0f} ms/RPC")
+    print_table(["messages", "variant", "model calls/turn", "p50 turn s"], rows)
+    saved = results["agents"]["data"]["calls"] - results["router"]["data"]["calls"]
+    share = len(DATA_MESSAGES) / (len(DATA_MESSAGES) + len(CHAT_MESSAGES))
+    print()
+    print(f"Router saves {saved:.1f} model calls per data request "
+          f"({saved * share:.1f} per turn at this {share:.0%} data mix)")
+
+
+if __name__ == "__main__":
+    main()
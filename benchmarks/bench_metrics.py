@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+"""
+Overhead of the /metrics instrumentation.
+
+- micro: cost of one Counter.inc / Histogram.observe and of rendering the
+  registry for a scrape;
+- end to end: data turns ("show my last 5 notes") through the real agent tree
+  with StubLlm (benchmarks/stub_model.py) and the in-memory Firestore fake,
+  with and without MetricsPlugin. Model and Firestore latency default to 0 so
+  the difference is the instrumentation itself (two tool calls, three agent
+  turns and the read counters per data turn).
+
+    python benchmarks/bench_metrics.py [--turns 400] [--repeat 20000]
+"""
+
+import os
+import sys
+import time
+import asyncio
+import logging
+import argparse
+from unittest import mock
+
+# Add the project root to the path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from google.adk.agents import Agent
+from google.adk.runners import Runner
+from google.adk.sessions import InMemorySessionService
+from google.genai import types
+
+from benchmarks.common import percentile, print_table, time_calls
+from benchmarks.stub_model import StubLlm
+from capymind_agent.tools import firestore_data, metrics
+from capymind_agent.tools.doc_cache import DocumentCache
+from capymind_agent.tools.format_data import format_data_tool
+from capymind_agent.tools.metrics import MetricsPlugin
+from tests.fake_firestore import FakeAsyncFirestoreClient, FakeFirestoreClient
+
+ROUND = 20
+
+
+def build_root(model: StubLlm) -> Agent:
+    data_fetcher = Agent(
+        model=model,
+        name="data_fetcher",
+        description="Fetches Firestore data (user, notes, settings) and formats it",
+        instruction="",
+        tools=[firestore_data.firestore_data_tool, format_data_tool],
+    )
+    return Agent(
+        model=model,
+        name="capymind_agent",
+        description="An AI agent that handles therapy session requests",
+        instruction="",
+        sub_agents=[data_fetcher],
+    )
+
+
+async def run_turns(plugins, turns: int, model_latency: float) -> list:
+    session_service = InMemorySessionService()
+    runner = Runner(
+        app_name="bench",
+        agent=build_root(StubLlm(latency=model_latency)),
+        session_service=session_service,
+        plugins=plugins,
+    )
+    latencies = []
+    for _ in range(turns):
+        session = await session_service.create_session(app_name="bench", user_id="u1")
+        started = time.perf_counter()
+        async for _event in runner.run_async(
+            user_id="u1",
+            session_id=session.id,
+            new_message=types.Content(role="user", parts=[types.Part(text="show my last 5 notes")]),
+        ):
+            pass
+        latencies.append(time.perf_counter() - started)
+    return latencies
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--turns", type=int, default=400, help="data turns per variant")
+    parser.add_argument("--repeat", type=int, default=20000, help="micro benchmark iterations")
+    parser.add_argument("--latency", type=float, default=0.0, help="Firestore RPC latency in seconds")
+    parser.add_argument("--model-latency", type=float, default=0.0, help="stub model latency per call")
+    args = parser.parse_args()
+    # ADK warns about tool schema defaults on every model request
+    logging.getLogger("google_adk").setLevel(logging.ERROR)
+
+    labels = {"tool": "capy_firestore_data_async", "operation": "get_notes", "agent": "data_fetcher"}
+    micro = {
+        "Counter.inc": lambda: metrics.tool_calls.inc(outcome="ok", **labels),
+        "Histogram.observe": lambda: metrics.tool_latency.observe(0.012, **labels),
+    }
+    rows = []
+    for name, call in micro.items():
+        durations = time_calls(call, args.repeat)
+        rows.append([name, percentile(durations, 50) * 1e6, percentile(durations, 99) * 1e6])
+    durations = time_calls(metrics.registry.render, 200)
+    rows.append([f"render ({len(metrics.registry.render())} bytes)",
+                 percentile(durations, 50) * 1e6, percentile(durations, 99) * 1e6])
+    print_table(["operation", "p50 us", "p99 us"], rows)
+
+    client = FakeFirestoreClient()
+    user_ref = client.seed("users", "u1", {"FirstName": "Ada", "Locale": "en"})
+    for i in range(20):
+        client.seed("notes", f"n{i}", {"text": f"note {i}", "timestamp": f"2025-01-{i + 1:02d}T08:00:00Z", "user": user_ref})
+    async_client = FakeAsyncFirestoreClient(client, latency=args.latency)
+
+    with mock.patch.object(firestore_data, "_get_async_firestore_client", return_value=async_client), \
+            mock.patch.object(firestore_data, "document_cache", DocumentCache(ttl_seconds=0)):
+        asyncio.run(run_turns([], 10, 0.0))  # warm up imports and schema caches
+        # Alternate the variants in rounds so drift (GC, CPU boost) hits both
+        results = {"no metrics": [], "metrics": []}
+        plugin = MetricsPlugin()
+        for _ in range(max(1, args.turns // ROUND)):
+            results["no metrics"] += asyncio.run(run_turns([], ROUND, args.model_latency))
+            results["metrics"] += asyncio.run(run_turns([plugin], ROUND, args.model_latency))
+
+    print()
+    print_table(
+        ["variant", "p50 turn ms", "p99 turn ms"],
+        [[name, percentile(latencies, 50) * 1e3, percentile(latencies, 99) * 1e3] for name, latencies in results.items()],
+    )
+    overhead = percentile(results["metrics"], 50) - percentile(results["no metrics"], 50)
+    print()
+    print(f"Instrumentation overhead: {overhead * 1e6:.0f} us per data turn "
+          f"({overhead / percentile(results['no metrics'], 50):.1%} of a turn with instant model and Firestore)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+"""
+get_digest: first build, incremental update and payload vs reading notes.
+
+Seeds the Firestore fake (per-RPC ``--latency``) with users of different
+journal sizes and runs capy_firestore_data_async get_digest for them:
+
+- first call: no digest yet, every note is read and folded, the digest
+  document is written next to settings;
+- update: one new note written, then a call that reads the digest and only
+  the notes from its watermark on;
+- repeat: nothing new, digest served from the document cache;
+- payload: the digest vs the last ``--notes`` notes (get_notes with text and
+  timestamp) the agent would otherwise pull for context (estimated tokens,
+  ~4 chars per token), and the stored digest document's size.
+
+    python benchmarks/bench_notes_digest.py [--sizes 50,500,2000] [--users 20] [--notes 20] [--latency 0.005]
+"""
+
+import os
+import sys
+import json
+import time
+import random
+import asyncio
+import argparse
+from datetime import timedelta
+from typing import List
+from unittest import mock
+
+# Add the project root to the path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.common import percentile, print_table
+from benchmarks.bench_notes_search import seed
+from capymind_agent.tools import firestore_data
+from capymind_agent.tools.doc_cache import DocumentCache
+from capymind_agent.tools.history_compactor import estimate_tokens
+from tests.fake_firestore import SYNTHETIC_EPOCH, FakeAsyncFirestoreClient, FakeCallbackContext, FakeFirestoreClient
+
+
+def tokens(value: object) -> int:
+    return estimate_tokens(json.dumps(value, ensure_ascii=False, separators=(",", ":"), default=str))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", default="50,500,2000", help="comma-separated notes per user")
+    parser.add_argument("--users", type=int, default=20, help="users per size")
+    parser.add_argument("--notes", type=int, default=20, help="notes pulled for context without the digest")
+    parser.add_argument("--latency", type=float, default=0.005, help="Firestore fake latency per RPC")
+    args = parser.parse_args()
+    sizes = [int(size) for size in args.sizes.split(",")]
+
+    rng = random.Random(0)
+    client = FakeFirestoreClient(latency=args.latency)
+    for size in sizes:
+        for u in range(args.users):
+            seed(client, f"s{size}-u{u}", size, rng)
+
+    async def timed(context: FakeCallbackContext, operation: str, **kwargs) -> tuple:
+        reads = client.reads
+        started = time.perf_counter()
+        result = await firestore_data.capy_firestore_data_async(operation, context, **kwargs)
+        return result, time.perf_counter() - started, client.reads - reads
+
+    async def run(size: int) -> List[object]:
+        first, first_reads, update, update_reads, repeat, repeat_reads = [], [], [], [], [], []
+        digest_tokens, notes_tokens, notes_reads, stored = [], [], [], []
+        for u in range(args.users):
+            user_id = f"s{size}-u{u}"
+            context = FakeCallbackContext(user_id)
+            _, seconds, reads = await timed(context, "get_digest")
+            first.append(seconds)
+            first_reads.append(reads)
+
+            client.seed("notes", f"{user_id}-new", {
+                "text": "could not sleep before the exam, tried breathing",
+                "timestamp": SYNTHETIC_EPOCH + timedelta(hours=size * 7 + 1),
+                "user": client.collection("users").document(user_id),
+            })
+            _, seconds, reads = await timed(context, "get_digest")
+            update.append(seconds)
+            update_reads.append(reads)
+
+            result, seconds, reads = await timed(context, "get_digest")
+            repeat.append(seconds)
+            repeat_reads.append(reads)
+            digest_tokens.append(tokens(result))
+            stored.append(tokens(client.document(f"settings/{user_id}/agent/digest").get().to_dict()) * 4)
+
+            notes, _, reads = await timed(context, "get_notes", limit=args.notes, fields=["text", "timestamp"])
+            notes_tokens.append(tokens(notes))
+            notes_reads.append(reads)
+
+        def mean(values: List[float]) -> float:
+            return sum(values) / len(values)
+
+        return [
+            size,
+            percentile(first, 50) * 1e3, mean(first_reads),
+            percentile(update, 50) * 1e3, mean(update_reads),
+            percentile(repeat, 50) * 1e3, mean(repeat_reads),
+            mean(digest_tokens), mean(notes_tokens), mean(notes_reads),
+            mean(stored) / 1e3,
+        ]
+
+    rows = []
+    with mock.patch.object(firestore_data, "_get_async_firestore_client", return_value=FakeAsyncFirestoreClient(client)), \
+            mock.patch.object(firestore_data, "document_cache", DocumentCache()):
+        for size in sizes:
+            rows.append(asyncio.run(run(size)))
+
+    print(f"{args.users} users per size, {args.latency * 1000:.0f} ms per Firestore RPC; "
+          f"baseline: last {args.notes} notes (text, timestamp)")
+    print_table(
+        ["notes/user", "first ms", "first reads", "update ms", "update reads", "repeat ms", "repeat reads",
+         "digest tokens", f"{args.notes} notes tokens", "notes reads", "stored KB"],
+        rows,
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+"""
+search_notes: index build, warm search and payload vs pulling every note.
+
+Seeds the Firestore fake (per-RPC ``--latency``) with users of different
+journal sizes and runs capy_firestore_data_async search_notes for them:
+
+- first search: builds the user's index from all notes (one query);
+- warm search: one new note written, then a search that reads only notes
+  from the watermark on;
+- payload: top-``--k`` snippets returned vs every note the model would
+  otherwise have to read (estimated tokens, ~4 chars per token);
+- memory: traced allocation of the built indexes per user.
+
+    python benchmarks/bench_notes_search.py [--sizes 50,500,2000] [--users 20] [--k 5] [--latency 0.005]
+"""
+
+import os
+import sys
+import json
+import time
+import random
+import asyncio
+import argparse
+import tracemalloc
+from datetime import timedelta
+from typing import List
+from unittest import mock
+
+# Add the project root to the path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.common import percentile, print_table
+from capymind_agent.tools import firestore_data
+from capymind_agent.tools.doc_cache import DocumentCache
+from capymind_agent.tools.history_compactor import estimate_tokens
+from capymind_agent.tools.notes_search import NotesSearchIndex
+from tests.fake_firestore import SYNTHETIC_EPOCH, FakeAsyncFirestoreClient, FakeCallbackContext, FakeFirestoreClient
+
+_WORDS = (
+    "today felt calm anxious tired hopeful work sleep family friend walk talk breathing worry "
+    "meeting exam morning evening better worse grateful angry quiet busy slow heavy light long "
+    "short again finally still maybe coffee river mom sister therapy panic gym run book music"
+).split()
+QUERIES = ["sleep", "exam worry", "mom", "panic attack", "river walk", "grateful"]
+
+
+def seed(client: FakeFirestoreClient, user_id: str, notes: int, rng: random.Random) -> None:
+    ref = client.seed("users", user_id, {"FirstName": user_id})
+    for n in range(notes):
+        client.seed("notes", f"{user_id}-{n}", {
+            "text": " ".join(rng.choices(_WORDS, k=rng.randint(10, 120))),
+            "timestamp": SYNTHETIC_EPOCH + timedelta(hours=n * 7),
+            "user": ref,
+        })
+
+
+def tokens(value: object) -> int:
+    return estimate_tokens(json.dumps(value, ensure_ascii=False, separators=(",", ":"), default=str))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", default="50,500,2000", help="comma-separated notes per user")
+    parser.add_argument("--users", type=int, default=20, help="users per size")
+    parser.add_argument("--k", type=int, default=5, help="results per search")
+    parser.add_argument("--latency", type=float, default=0.005, help="Firestore fake latency per RPC")
+    args = parser.parse_args()
+    sizes = [int(size) for size in args.sizes.split(",")]
+
+    rng = random.Random(0)
+    client = FakeFirestoreClient(latency=args.latency)
+    for size in sizes:
+        for u in range(args.users):
+            seed(client, f"s{size}-u{u}", size, rng)
+
+    rows = []
+
+    async def run(size: int) -> List[object]:
+        index = NotesSearchIndex(max_users=args.users)
+        cold, warm, warm_reads, payload, full = [], [], [], [], []
+        with mock.patch.object(firestore_data, "notes_index", index):
+            tracemalloc.start()
+            for u in range(args.users):
+                user_id = f"s{size}-u{u}"
+                context = FakeCallbackContext(user_id)
+                started = time.perf_counter()
+                await firestore_data.capy_firestore_data_async("search_notes", context, query=QUERIES[u % len(QUERIES)])
+                cold.append(time.perf_counter() - started)
+            memory = tracemalloc.get_traced_memory()[0] / args.users
+            tracemalloc.stop()
+
+            for u in range(args.users):
+                user_id = f"s{size}-u{u}"
+                context = FakeCallbackContext(user_id)
+                client.seed("notes", f"{user_id}-new", {
+                    "text": "could not sleep before the exam, tried breathing",
+                    "timestamp": SYNTHETIC_EPOCH + timedelta(hours=size * 7 + 1),
+                    "user": client.collection("users").document(user_id),
+                })
+                for query in QUERIES:
+                    reads = client.reads
+                    started = time.perf_counter()
+                    result = await firestore_data.capy_firestore_data_async(
+                        "search_notes", context, query=query, limit=args.k
+                    )
+                    warm.append(time.perf_counter() - started)
+                    warm_reads.append(client.reads - reads)
+                    payload.append(tokens(result))
+                everything = await firestore_data.capy_firestore_data_async(
+                    "get_notes", context, limit=size + 1, fields=["text", "timestamp"]
+                )
+                full.append(tokens(everything))
+        return [
+            size,
+            percentile(cold, 50) * 1e3,
+            percentile(warm, 50) * 1e3,
+            percentile(warm, 99) * 1e3,
+            sum(warm_reads) / len(warm_reads),
+            sum(payload) / len(payload),
+            sum(full) / len(full),
+            memory / 1e6,
+        ]
+
+    with mock.patch.object(firestore_data, "_get_async_firestore_client", return_value=FakeAsyncFirestoreClient(client)), \
+            mock.patch.object(firestore_data, "document_cache", DocumentCache(ttl_seconds=0)):
+        for size in sizes:
+            rows.append(asyncio.run(run(size)))
+
+    print(f"{args.users} users per size, top {args.k} snippets, {args.latency * 1000:.0f} ms per Firestore RPC")
+    print_table(
+        ["notes/user", "first search ms", "warm p50 ms", "warm p99 ms", "warm reads", "result tokens",
+         "all-notes tokens", "index MB/user"],
+        rows,
+    )
+
+
+if __name__ == "__main__":
+    main()
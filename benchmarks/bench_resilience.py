@@ -0,0 +1,141 @@
+#!/usr/bin/env python3
+"""
+Tail latency and failures of Firestore tool calls against a flaky backend, with and without the guard.
+
+Runs ``--calls`` asyncio capy_firestore_data calls (a mix of get_settings,
+get_user and get_notes over ``--users`` users) against the Firestore fake,
+where every RPC fails with ``ServiceUnavailable`` at ``--error-rate`` and
+stalls for ``--slow-delay`` seconds at ``--slow-rate``. Modes:
+
+- off: the tool as before, each error or stall reaches the caller
+- guard: deadlines, jittered retries and the circuit breaker
+- guard+hedge: the same plus hedged reads past the p95
+
+A second table replays an outage: after a warm-up with a healthy backend,
+every RPC fails and the calls made during it are timed.
+
+    python benchmarks/bench_resilience.py [--calls 600] [--error-rate 0.05] [--slow-rate 0.02]
+"""
+
+import os
+import sys
+import time
+import asyncio
+import logging
+import argparse
+from typing import Any, Dict, List, Tuple
+from unittest import mock
+
+# Add the project root to the path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.common import percentile, print_table
+from capymind_agent.tools import firestore_data
+from capymind_agent.tools.doc_cache import DocumentCache
+from capymind_agent.tools.resilience import TRANSIENT_ERRORS, FirestoreGuard
+from capymind_agent.tools.single_flight import SingleFlight
+from tests.fake_firestore import FakeAsyncFirestoreClient, FakeFirestoreClient, FakeToolContext, seed_synthetic
+
+OPERATIONS = [
+    ("get_settings", {}),
+    ("get_user", {}),
+    ("get_notes", {"limit": 10, "fields": ["text", "timestamp"]}),
+]
+
+
+class Unguarded:
+    """The tool without the guard: transient errors surface as plain tool errors."""
+
+    async def call_async(self, operation, key, breaker_key, fn):
+        try:
+            return await fn()
+        except TRANSIENT_ERRORS as e:
+            return {"ok": False, "error": f"{type(e).__name__}: {e}"}
+
+
+def run(calls: List[Tuple[str, str, Dict[str, Any]]]) -> Tuple[List[float], int, int]:
+    """(latencies, failed calls, stale answers) of ``calls`` made one after another."""
+    async def main() -> Tuple[List[float], int, int]:
+        latencies, failed, stale = [], 0, 0
+        for operation, user_id, kwargs in calls:
+            started = time.perf_counter()
+            result = await firestore_data.capy_firestore_data_async(operation, FakeToolContext(user_id), **kwargs)
+            latencies.append(time.perf_counter() - started)
+            failed += not result.get("ok", True)
+            stale += bool(result.get("stale"))
+        return latencies, failed, stale
+    return asyncio.run(main())
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--calls", type=int, default=600, help="tool calls per mode")
+    parser.add_argument("--users", type=int, default=20, help="users the calls are spread over")
+    parser.add_argument("--latency", type=float, default=0.01, help="Firestore fake latency per RPC")
+    parser.add_argument("--jitter", type=float, default=0.003, help="mean exponential jitter per RPC")
+    parser.add_argument("--error-rate", type=float, default=0.05, help="share of RPCs failing with ServiceUnavailable")
+    parser.add_argument("--slow-rate", type=float, default=0.02, help="share of RPCs stalling")
+    parser.add_argument("--slow-delay", type=float, default=1.0, help="seconds a stalled RPC takes")
+    args = parser.parse_args()
+    # One warning per failed or stale call otherwise
+    logging.getLogger("capymind.firestore").setLevel(logging.CRITICAL)
+
+    client = FakeFirestoreClient(latency=args.latency, jitter=args.jitter, seed=7)
+    user_ids = seed_synthetic(client, users=args.users, notes_per_user=20)
+    async_client = FakeAsyncFirestoreClient(client)
+    calls = [
+        (OPERATIONS[i % len(OPERATIONS)][0], user_ids[i % len(user_ids)], OPERATIONS[i % len(OPERATIONS)][1])
+        for i in range(args.calls)
+    ]
+    modes = {
+        "off": lambda: Unguarded(),
+        "guard": lambda: FirestoreGuard(),
+        "guard+hedge": lambda: FirestoreGuard(hedge=True),
+    }
+
+    flaky_rows, outage_rows = [], []
+    with mock.patch.object(firestore_data, "_get_firestore_client", return_value=client), \
+            mock.patch.object(firestore_data, "_get_async_firestore_client", return_value=async_client), \
+            mock.patch.object(firestore_data, "document_cache", DocumentCache(ttl_seconds=0)), \
+            mock.patch.object(firestore_data, "single_flight", SingleFlight()):
+        for mode, make_guard in modes.items():
+            guard = make_guard()
+            with mock.patch.object(firestore_data, "firestore_guard", guard):
+                client.error_rate, client.slow_rate, client.slow_delay = args.error_rate, args.slow_rate, args.slow_delay
+                rpcs = client.rpcs
+                latencies, failed, _ = run(calls)
+                flaky_rows.append([
+                    mode,
+                    percentile(latencies, 50) * 1e3,
+                    percentile(latencies, 99) * 1e3,
+                    max(latencies) * 1e3,
+                    100.0 * failed / len(calls),
+                    (client.rpcs - rpcs) / len(calls),
+                ])
+
+                # Outage: one pass on a healthy backend, then every RPC fails
+                client.error_rate, client.slow_rate = 0.0, 0.0
+                run(calls[:len(OPERATIONS) * len(user_ids)])
+                client.error_rate = 1.0
+                rpcs = client.rpcs
+                latencies, failed, stale = run(calls)
+                outage_rows.append([
+                    mode,
+                    percentile(latencies, 50) * 1e3,
+                    sum(latencies),
+                    100.0 * (failed + stale) / len(calls),
+                    100.0 * stale / len(calls),
+                    (client.rpcs - rpcs) / len(calls),
+                ])
+                client.error_rate = 0.0
+
+    print(f"{args.calls} calls per mode; {args.latency * 1000:.0f} ms + {args.jitter * 1000:.0f} ms jitter per RPC, "
+          f"{args.error_rate:.0%} errors, {args.slow_rate:.0%} stalls of {args.slow_delay:.1f} s")
+    print_table(["mode", "p50 ms", "p99 ms", "max ms", "failed %", "RPCs/call"], flaky_rows)
+    print()
+    print("Outage (every RPC fails) after one healthy pass")
+    print_table(["mode", "p50 ms", "total s", "not fresh %", "stale %", "RPCs/call"], outage_rows)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,137 @@
+#!/usr/bin/env python3
+"""
+Model calls and latency of the first turn of a session, with and without the session prefetch.
+
+Each message starts a new session and runs through the agent tree (root,
+data_fetcher and crisis_line with their real prompts and tools) with every
+model replaced by StubLlm (benchmarks/stub_model.py), which answers from
+the instruction when the prefetched settings or crisis lines are in it.
+Firestore is the in-memory fake with per-RPC latency and no document cache,
+so every turn pays its own reads.
+
+    python benchmarks/bench_session_prefetch.py [--model-latency 0.3] [--latency 0.02] [--sessions 10]
+"""
+
+import os
+import sys
+import time
+import asyncio
+import logging
+import argparse
+from typing import Dict, List
+from unittest import mock
+
+# Add the project root to the path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from google.adk.agents import Agent
+from google.adk.runners import Runner
+from google.adk.sessions import InMemorySessionService
+from google.genai import types
+
+from benchmarks.common import percentile, print_table
+from benchmarks.stub_model import StubLlm
+from capymind_agent.prompt import prompt
+from capymind_agent.sug_agents.crysis_line.prompt import CRISIS_LINE_PROMPT
+from capymind_agent.sug_agents.data_fetcher.prompt import DATA_FETCHER_PROMPT
+from capymind_agent.tools import firestore_data
+from capymind_agent.tools.crisis_lines import crisis_lines_tool
+from capymind_agent.tools.doc_cache import DocumentCache
+from capymind_agent.tools.format_data import format_data_tool
+from capymind_agent.tools.session_prefetch import prefetch_user_context
+from tests.fake_firestore import FakeAsyncFirestoreClient, FakeFirestoreClient
+
+MESSAGES = {
+    "crisis": "Can you give me a crisis line number?",
+    "settings": "What timezone is in my settings?",
+    "chat": "I slept badly and feel anxious",
+}
+
+
+def build_root(model: StubLlm, prefetch: bool) -> Agent:
+    """The capymind agent tree with ``model`` behind every agent."""
+    callback = prefetch_user_context if prefetch else None
+    data_fetcher = Agent(
+        model=model,
+        name="data_fetcher",
+        description="Fetches Firestore data (user, notes, settings) and formats it",
+        instruction=DATA_FETCHER_PROMPT,
+        tools=[firestore_data.firestore_data_tool, format_data_tool],
+        before_agent_callback=callback,
+    )
+    crisis_line = Agent(
+        model=model,
+        name="crisis_line",
+        description="Finds crisis line phone numbers for users in critical situations",
+        instruction=CRISIS_LINE_PROMPT,
+        tools=[crisis_lines_tool],
+        before_agent_callback=callback,
+    )
+    return Agent(
+        model=model,
+        name="capymind_agent",
+        description="An AI agent that handles therapy session requests",
+        instruction=prompt,
+        sub_agents=[data_fetcher, crisis_line],
+        before_agent_callback=callback,
+    )
+
+
+async def run_variant(prefetch: bool, model_latency: float, sessions: int, client: FakeFirestoreClient) -> Dict[str, dict]:
+    model = StubLlm(latency=model_latency)
+    session_service = InMemorySessionService()
+    runner = Runner(app_name="bench", agent=build_root(model, prefetch), session_service=session_service)
+    results = {}
+    for kind, text in MESSAGES.items():
+        calls, rpcs = model.calls, client.rpcs
+        latencies: List[float] = []
+        for _ in range(sessions):
+            session = await session_service.create_session(app_name="bench", user_id="u1")
+            started = time.perf_counter()
+            async for _ in runner.run_async(
+                user_id="u1",
+                session_id=session.id,
+                new_message=types.Content(role="user", parts=[types.Part(text=text)]),
+            ):
+                pass
+            latencies.append(time.perf_counter() - started)
+        results[kind] = {
+            "calls": (model.calls - calls) / sessions,
+            "rpcs": (client.rpcs - rpcs) / sessions,
+            "p50": percentile(latencies, 50),
+        }
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--latency", type=float, default=0.02, help="Firestore RPC latency in seconds")
+    parser.add_argument("--model-latency", type=float, default=0.3, help="stub model latency per call")
+    parser.add_argument("--sessions", type=int, default=10, help="new sessions per message")
+    args = parser.parse_args()
+    # ADK warns about tool schema defaults on every model request
+    logging.getLogger("google_adk").setLevel(logging.ERROR)
+
+    client = FakeFirestoreClient()
+    client.seed("users", "u1", {"FirstName": "Ada", "Locale": "en", "ChatID": 42, "IsTyping": False})
+    client.seed("settings", "u1", {"Location": "Kyiv", "SecondsFromUTC": 7200, "HasMorningReminder": True})
+    async_client = FakeAsyncFirestoreClient(client, latency=args.latency)
+
+    with mock.patch.object(firestore_data, "_get_async_firestore_client", return_value=async_client), \
+            mock.patch.object(firestore_data, "document_cache", DocumentCache(ttl_seconds=0)):
+        results = {
+            name: asyncio.run(run_variant(prefetch, args.model_latency, args.sessions, client))
+            for name, prefetch in (("tool calls", False), ("prefetch", True))
+        }
+
+    rows = []
+    for kind in MESSAGES:
+        for name, result in results.items():
+            rows.append([kind, name, result[kind]["calls"], result[kind]["rpcs"], result[kind]["p50"]])
+    print(f"First turn of {args.sessions} new sessions per message; model latency "
+          f"{args.model_latency * 1000:.0f} ms/call, Firestore latency {args.latency * 1000:.0f} ms/RPC")
+    print_table(["message", "variant", "model calls/turn", "Firestore RPCs/turn", "p50 turn s"], rows)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,206 @@
+#!/usr/bin/env python3
+"""
+Concurrent session writes: ADK's default SQLite store vs sqlite+wal.
+
+Each simulated session runs ``--turns`` turns on one event loop (one uvicorn
+worker) the way the runner drives a session store: get_session, then the
+user message, a tool call, its response and the final reply appended as
+events, with an awaited "model call" between them. Compared:
+
+- ``adk sqlite``: DatabaseSessionService on ``sqlite:///`` as main.py
+  configures it by default (rollback journal, one commit per event, on the
+  event loop);
+- ``sqlite+wal``: capymind_agent.tools.session_sqlite.SqliteSessionService
+  (WAL, pooled reader threads, group commit, per-turn batching).
+
+Reported per concurrency level: turns/s, p50/p99 of the store time per turn,
+event loop lag p99 (how long other requests on the worker wait) and commits
+per turn. A retention section then fills a file with sessions idle for
+``--idle-days``, prunes them and shows the file size and lookup time
+before and after.
+
+    python benchmarks/bench_session_store.py [--levels 1,10,50,100,200] [--turns 5]
+        [--model-latency 0.05] [--sessions 5000]
+"""
+
+import os
+import sys
+import time
+import asyncio
+import logging
+import argparse
+import tempfile
+from typing import Dict, List
+
+# Add the project root to the path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from google.adk.events import Event, EventActions
+from google.adk.sessions.database_session_service import DatabaseSessionService
+from google.genai import types
+from sqlalchemy import event as sqlalchemy_event
+
+from benchmarks.common import percentile, print_table
+from capymind_agent.tools.session_sqlite import SqliteSessionService
+
+APP = "capymind_agent"
+
+
+def turn_events(invocation_id: str, turn: int) -> List[Event]:
+    def content(role: str, part: types.Part) -> types.Content:
+        return types.Content(role=role, parts=[part])
+
+    call = types.FunctionCall(id=f"call-{invocation_id}", name="capy_firestore_data_async", args={"operation": "get_notes"})
+    response = types.FunctionResponse(
+        id=call.id, name=call.name, response={"ok": True, "data": [{"text": f"note {i}"} for i in range(5)]}
+    )
+    return [
+        Event(author="user", invocation_id=invocation_id, content=content("user", types.Part(text=f"message {turn}"))),
+        Event(author=APP, invocation_id=invocation_id, content=content("model", types.Part(function_call=call))),
+        Event(author=APP, invocation_id=invocation_id, content=content("user", types.Part(function_response=response))),
+        Event(
+            author=APP,
+            invocation_id=invocation_id,
+            content=content("model", types.Part(text="Here is what you wrote recently.")),
+            actions=EventActions(state_delta={"turns": turn + 1}),
+        ),
+    ]
+
+
+async def monitor_loop_lag(samples: List[float], interval: float = 0.005) -> None:
+    while True:
+        started = time.perf_counter()
+        await asyncio.sleep(interval)
+        samples.append(max(0.0, time.perf_counter() - started - interval))
+
+
+async def run_session(service, index: int, turns: int, model_latency: float, store_times: List[float]) -> None:
+    session = await service.create_session(app_name=APP, user_id=f"u{index}")
+    for turn in range(turns):
+        spent = 0.0
+        started = time.perf_counter()
+        session = await service.get_session(app_name=APP, user_id=session.user_id, session_id=session.id)
+        spent += time.perf_counter() - started
+        for event in turn_events(f"{session.id}-{turn}", turn):
+            started = time.perf_counter()
+            await service.append_event(session, event)
+            spent += time.perf_counter() - started
+            if event.author != "user" and event.is_final_response():
+                break
+            await asyncio.sleep(model_latency)
+        store_times.append(spent)
+
+
+async def run_level(service, sessions: int, turns: int, model_latency: float) -> Dict[str, float]:
+    store_times: List[float] = []
+    lag: List[float] = []
+    monitor = asyncio.create_task(monitor_loop_lag(lag))
+    commits_before = commits(service)
+    started = time.perf_counter()
+    await asyncio.gather(*(run_session(service, i, turns, model_latency, store_times) for i in range(sessions)))
+    wall = time.perf_counter() - started
+    monitor.cancel()
+    return {
+        "turns_per_s": len(store_times) / wall,
+        "p50_ms": percentile(store_times, 50) * 1e3,
+        "p99_ms": percentile(store_times, 99) * 1e3,
+        "lag_p99_ms": percentile(lag, 99) * 1e3,
+        "commits_per_turn": (commits(service) - commits_before) / len(store_times),
+    }
+
+
+def commits(service) -> int:
+    if isinstance(service, SqliteSessionService):
+        return service.stats()["commits"]
+    return service.commits
+
+
+def build(kind: str, path: str):
+    if kind == "adk sqlite":
+        service = DatabaseSessionService(db_url=f"sqlite:///{path}")
+        service.commits = 0
+
+        def count_commit(connection) -> None:
+            service.commits += 1
+
+        sqlalchemy_event.listen(service.db_engine, "commit", count_commit)
+        return service
+    return SqliteSessionService(path, retention_days=0)
+
+
+async def retention(path: str, sessions: int, idle_days: int) -> List[List[object]]:
+    """Fill the file with idle sessions, then prune; returns table rows."""
+    service = SqliteSessionService(path, retention_days=idle_days)
+    rows = []
+
+    async def lookup_ms() -> float:
+        started = time.perf_counter()
+        for i in range(200):
+            await service.get_session(app_name=APP, user_id="active", session_id="active")
+        return (time.perf_counter() - started) / 200 * 1e3
+
+    await service.create_session(app_name=APP, user_id="active", session_id="active")
+    for start in range(0, sessions, 500):
+        created = await asyncio.gather(*(
+            service.create_session(app_name=APP, user_id=f"idle{i}") for i in range(start, min(sessions, start + 500))
+        ))
+        for session in created:
+            for event in turn_events(session.id, 0):
+                await service.append_event(session, event)
+    rows.append(["before prune", os.path.getsize(path) / 1e6, await lookup_ms(), 0, 0.0])
+
+    started = time.perf_counter()
+    pruned = await service.prune(now=time.time() + idle_days * 86400 + 60)
+    elapsed = time.perf_counter() - started
+    # The active session was used "today"; it was pruned along with the idle ones
+    await service.create_session(app_name=APP, user_id="active", session_id="active")
+    rows.append(["after prune", os.path.getsize(path) / 1e6, await lookup_ms(), pruned, elapsed])
+    await service.close()
+    return rows
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--levels", default="1,10,50,100,200", help="comma-separated concurrent sessions")
+    parser.add_argument("--turns", type=int, default=5, help="turns per session")
+    parser.add_argument("--model-latency", type=float, default=0.05, help="awaited model time between events")
+    parser.add_argument("--sessions", type=int, default=5000, help="idle sessions for the retention run")
+    parser.add_argument("--idle-days", type=int, default=30, help="retention window")
+    args = parser.parse_args()
+    levels = [int(level) for level in args.levels.split(",")]
+    logging.getLogger("google_adk").setLevel(logging.ERROR)
+
+    workdir = tempfile.mkdtemp(prefix="capymind-sessions-")
+    print(f"{args.turns} turns per session, 4 events per turn, {args.model_latency * 1000:.0f} ms per model call")
+    rows = []
+    for level in levels:
+        for kind in ("adk sqlite", "sqlite+wal"):
+            path = os.path.join(workdir, f"{kind.replace(' ', '-').replace('+', '-')}-{level}.db")
+            service = build(kind, path)
+
+            async def measure():
+                result = await run_level(service, level, args.turns, args.model_latency)
+                if isinstance(service, SqliteSessionService):
+                    await service.close()
+                return result
+
+            result = asyncio.run(measure())
+            rows.append([
+                level, kind, result["turns_per_s"], result["p50_ms"], result["p99_ms"],
+                result["lag_p99_ms"], result["commits_per_turn"],
+            ])
+    print_table(
+        ["sessions", "store", "turns/s", "store p50 ms/turn", "store p99 ms/turn", "loop lag p99 ms", "commits/turn"],
+        rows,
+    )
+
+    print()
+    print(f"Retention: {args.sessions} sessions idle for more than {args.idle_days} days")
+    print_table(
+        ["", "file MB", "get_session ms", "pruned", "prune s"],
+        asyncio.run(retention(os.path.join(workdir, "retention.db"), args.sessions, args.idle_days)),
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+"""
+Firestore reads and latency of bursts of identical tool calls, with and without single-flight.
+
+Models a user sending several quick messages (or several agents asking for
+the same document at once): ``--burst`` identical capy_firestore_data calls
+start together, on the asyncio tool and on the thread-based sync tool, for
+``--users`` users against the Firestore fake (``--latency`` per RPC plus
+exponential ``--jitter``). The document cache is disabled so only calls
+that overlap in time can be merged.
+
+    python benchmarks/bench_single_flight.py [--bursts 1,5,20] [--users 20] [--latency 0.02]
+"""
+
+import os
+import sys
+import time
+import asyncio
+import argparse
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List
+from unittest import mock
+
+# Add the project root to the path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.common import percentile, print_table
+from capymind_agent.tools import firestore_data
+from capymind_agent.tools.doc_cache import DocumentCache
+from capymind_agent.tools.single_flight import SingleFlight
+from tests.fake_firestore import FakeAsyncFirestoreClient, FakeFirestoreClient, FakeToolContext, seed_synthetic
+
+OPERATIONS = [
+    ("get_settings", {}),
+    ("get_user", {}),
+    ("get_notes", {"limit": 10, "fields": ["text", "timestamp"]}),
+]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--bursts", default="1,5,20", help="comma-separated identical calls per burst")
+    parser.add_argument("--users", type=int, default=20, help="users (one burst per user and operation)")
+    parser.add_argument("--latency", type=float, default=0.02, help="Firestore fake latency per RPC")
+    parser.add_argument("--jitter", type=float, default=0.005, help="mean exponential jitter per RPC")
+    args = parser.parse_args()
+    bursts = [int(burst) for burst in args.bursts.split(",")]
+
+    client = FakeFirestoreClient(latency=args.latency, jitter=args.jitter)
+    user_ids = seed_synthetic(client, users=args.users, notes_per_user=20)
+    async_client = FakeAsyncFirestoreClient(client)
+
+    async def async_burst(operation: str, kwargs: Dict[str, Any], user_id: str, size: int) -> List[float]:
+        async def one() -> float:
+            started = time.perf_counter()
+            await firestore_data.capy_firestore_data_async(operation, FakeToolContext(user_id), **kwargs)
+            return time.perf_counter() - started
+        return list(await asyncio.gather(*(one() for _ in range(size))))
+
+    def thread_burst(pool: ThreadPoolExecutor, operation: str, kwargs: Dict[str, Any], user_id: str, size: int) -> List[float]:
+        def one(_: int) -> float:
+            started = time.perf_counter()
+            firestore_data.capy_firestore_data(operation, FakeToolContext(user_id), **kwargs)
+            return time.perf_counter() - started
+        return list(pool.map(one, range(size)))
+
+    rows = []
+    with mock.patch.object(firestore_data, "_get_firestore_client", return_value=client), \
+            mock.patch.object(firestore_data, "_get_async_firestore_client", return_value=async_client), \
+            mock.patch.object(firestore_data, "document_cache", DocumentCache(ttl_seconds=0)):
+        for size in bursts:
+            for mode in ("asyncio", "threads"):
+                for enabled in (False, True):
+                    flight = SingleFlight(enabled=enabled)
+                    latencies: List[float] = []
+                    reads = client.reads
+                    with mock.patch.object(firestore_data, "single_flight", flight), \
+                            ThreadPoolExecutor(max_workers=size) as pool:
+                        for operation, kwargs in OPERATIONS:
+                            for user_id in user_ids:
+                                if mode == "asyncio":
+                                    latencies += asyncio.run(async_burst(operation, kwargs, user_id, size))
+                                else:
+                                    latencies += thread_burst(pool, operation, kwargs, user_id, size)
+                    bursts_run = len(OPERATIONS) * len(user_ids)
+                    rows.append([
+                        size,
+                        mode,
+                        "on" if enabled else "off",
+                        (client.reads - reads) / bursts_run,
+                        percentile(latencies, 50) * 1e3,
+                        percentile(latencies, 99) * 1e3,
+                        flight.stats()["shared"] / (bursts_run * size) if enabled else 0.0,
+                    ])
+
+    print(f"{args.users} users x {len(OPERATIONS)} operations per cell; "
+          f"{args.latency * 1000:.0f} ms + {args.jitter * 1000:.0f} ms jitter per RPC, document cache off")
+    print_table(
+        ["burst", "caller", "single-flight", "reads/burst", "p50 ms", "p99 ms", "shared calls"],
+        rows,
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmark for _to_jsonable over synthetic pages of notes.
+
+Compares the table-dispatch converter in firestore_data with the previous
+recursive implementation (kept below as ``legacy_to_jsonable``) on note
+payloads shaped like get_notes results: text, Firestore timestamp, user
+reference, id and a couple of nested fields.
+
+    python benchmarks/bench_to_jsonable.py [--repeat 50]
+"""
+
+import os
+import sys
+import argparse
+from datetime import timedelta, timezone
+from typing import Any, Dict, List
+
+# Add the project root to the path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from google.api_core.datetime_helpers import DatetimeWithNanoseconds
+from google.cloud.firestore_v1.document import DocumentReference
+
+from benchmarks.common import percentile, print_table, time_calls
+from capymind_agent.tools.firestore_data import _to_jsonable
+
+PAGE_SIZES = [10, 100, 1000]
+
+
+def legacy_to_jsonable(value: Any) -> Any:
+    """The converter as it was before the type-dispatch rewrite."""
+    try:
+        from google.cloud.firestore_v1 import DocumentReference  # type: ignore
+    except ImportError:
+        try:
+            from google.cloud.firestore import DocumentReference  # type: ignore
+        except ImportError:
+            DocumentReference = ()  # type: ignore
+    except Exception:
+        DocumentReference = ()  # type: ignore
+
+    if hasattr(value, "isoformat"):
+        try:
+            return value.isoformat()
+        except Exception:
+            pass
+
+    if isinstance(value, DocumentReference):
+        return value.path
+
+    if isinstance(value, dict):
+        return {k: legacy_to_jsonable(v) for k, v in value.items()}
+    if isinstance(value, list):
+        return [legacy_to_jsonable(v) for v in value]
+    return value
+
+
+def synthetic_notes(count: int) -> List[Dict[str, Any]]:
+    base = DatetimeWithNanoseconds(2025, 1, 1, tzinfo=timezone.utc)
+    user_ref = DocumentReference("users", "u1")
+    return [
+        {
+            "id": f"n{i}",
+            "text": "Slept badly again, anxious about the presentation tomorrow. " * 3,
+            "timestamp": base + timedelta(minutes=37 * i),
+            "user": user_ref,
+            "mood": {"score": i % 10, "labels": ["tired", "anxious"]},
+            "edited": i % 3 == 0,
+        }
+        for i in range(count)
+    ]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=50, help="timed runs per page size")
+    args = parser.parse_args()
+
+    converters = {"legacy": legacy_to_jsonable, "dispatch": _to_jsonable}
+    rows = []
+    for size in PAGE_SIZES:
+        page = synthetic_notes(size)
+        assert legacy_to_jsonable(page) == _to_jsonable(page)
+        medians = {}
+        for name, convert in converters.items():
+            convert(page)  # warm up
+            durations = time_calls(lambda: convert(page), args.repeat)
+            medians[name] = percentile(durations, 50)
+            rows.append([size, name, medians[name] * 1e3, percentile(durations, 99) * 1e3, size / medians[name]])
+        rows.append([size, "speedup", "", "", f"{medians['legacy'] / medians['dispatch']:.1f}x"])
+
+    print_table(["notes", "converter", "p50 ms", "p99 ms", "notes/s"], rows)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,158 @@
+#!/usr/bin/env python3
+"""
+Tool payload size reaching data_fetcher_agent with and without the tool budget.
+
+Seeds the Firestore fake with journallers whose note lengths range from a
+line to a few pages, runs the real capy_firestore_data_async operations the
+data_fetcher prompt uses, and measures each result as the model receives it:
+raw, and after compact_tool_result (CAPY_TOOL_BUDGET_TOKENS /
+CAPY_TOOL_NOTE_CHARS, or --budget / --note-chars). The data_fetcher turn
+then re-sends the notes as format_data arguments (model output tokens) and
+receives the rendered Markdown back, so both are reported too.
+
+Token counts are the same ~4 characters per token estimate the compactors
+use. Compaction time is the callback's own CPU time per call.
+
+    python benchmarks/bench_tool_budget.py [--users 200] [--budget 1500] [--note-chars 600]
+"""
+
+import os
+import sys
+import json
+import time
+import random
+import asyncio
+import argparse
+from datetime import timedelta
+from typing import Dict, List
+from unittest import mock
+
+# Add the project root to the path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.common import percentile, print_table
+from capymind_agent.tools import firestore_data
+from capymind_agent.tools.doc_cache import DocumentCache
+from capymind_agent.tools.format_data import format_data
+from capymind_agent.tools.history_compactor import estimate_tokens
+from capymind_agent.tools.tool_budget import ToolBudget
+from tests.fake_firestore import (
+    SYNTHETIC_EPOCH,
+    FakeAsyncFirestoreClient,
+    FakeCallbackContext,
+    FakeFirestoreClient,
+    seed_synthetic,
+)
+
+OPERATIONS = [
+    ("get_notes limit=10", {"operation": "get_notes", "limit": 10, "fields": ["text", "timestamp"]}),
+    ("get_notes limit=20", {"operation": "get_notes", "limit": 20}),
+    ("get_context", {"operation": "get_context"}),
+    ("get_user", {"operation": "get_user"}),
+]
+
+_WORDS = (
+    "today i felt anxious about work again and could not sleep well my sister called "
+    "we talked for an hour about mom and the move i tried the breathing exercise it helped "
+    "a little tomorrow i want to go for a walk before the meeting"
+).split()
+
+
+def tokens(value: object) -> int:
+    if isinstance(value, str):
+        return estimate_tokens(value)
+    return estimate_tokens(json.dumps(value, ensure_ascii=False, separators=(",", ":"), default=str))
+
+
+def seed_long_notes(client: FakeFirestoreClient, user_ids: List[str], seed: int = 1) -> None:
+    """Replace each user's notes with 30 notes of 10 to ~1,500 words (log-uniform)."""
+    rng = random.Random(seed)
+    for user_id in user_ids:
+        ref = client.collection("users").document(user_id)
+        for n in range(30):
+            words = int(10 * 150 ** rng.random())
+            client.seed("notes", f"{user_id}-long{n}", {
+                "text": " ".join(rng.choices(_WORDS, k=words)),
+                "timestamp": SYNTHETIC_EPOCH + timedelta(days=400, hours=n * 20),
+                "user": ref,
+            })
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=200, help="users sampled")
+    parser.add_argument("--budget", type=int, default=1500, help="budget in estimated tokens per call")
+    parser.add_argument("--note-chars", type=int, default=600, help="per-note cap before the budget applies")
+    args = parser.parse_args()
+
+    client = FakeFirestoreClient()
+    user_ids = seed_synthetic(client, users=args.users, notes_per_user=0)
+    seed_long_notes(client, user_ids)
+    budget = ToolBudget(budget_tokens=args.budget, note_chars=args.note_chars)
+
+    results: Dict[str, Dict[str, List[float]]] = {
+        label: {"raw": [], "compacted": [], "seconds": [], "echo_raw": [], "echo": [], "md_raw": [], "md": []}
+        for label, _ in OPERATIONS
+    }
+
+    async def run() -> None:
+        for user_id in user_ids:
+            context = FakeCallbackContext(user_id, agent_name="data_fetcher")
+            for label, call in OPERATIONS:
+                raw = await firestore_data.capy_firestore_data_async(tool_context=context, **call)
+                started = time.perf_counter()
+                compacted = budget.compact_result(call["operation"], raw, call.get("fields"))
+                elapsed = time.perf_counter() - started
+                row = results[label]
+                row["raw"].append(tokens(raw))
+                row["compacted"].append(tokens(compacted))
+                row["seconds"].append(elapsed)
+                if call["operation"] == "get_notes":
+                    # data_fetcher passes the notes back as format_data arguments
+                    row["echo_raw"].append(tokens(raw["data"]))
+                    row["echo"].append(tokens(compacted["data"]))
+                    row["md_raw"].append(tokens(format_data("notes", raw["data"], None)))
+                    row["md"].append(tokens(budget.compact_text(format_data("notes", compacted["data"], None))))
+
+    with mock.patch.object(firestore_data, "_get_async_firestore_client", return_value=FakeAsyncFirestoreClient(client)), \
+            mock.patch.object(firestore_data, "document_cache", DocumentCache(ttl_seconds=0)):
+        asyncio.run(run())
+
+    def mean(values: List[float]) -> float:
+        return sum(values) / len(values) if values else 0.0
+
+    print(f"{args.users} users, 30 notes each (10 to ~1,500 words); budget {args.budget} tokens, note cap {args.note_chars} chars")
+    rows = []
+    for label, row in results.items():
+        rows.append([
+            label,
+            mean(row["raw"]), percentile(row["raw"], 99),
+            mean(row["compacted"]), percentile(row["compacted"], 99),
+            f"{1 - mean(row['compacted']) / mean(row['raw']):.0%}",
+            percentile(row["seconds"], 50) * 1e6,
+        ])
+    print_table(
+        ["tool result", "raw tokens", "raw p99", "budgeted tokens", "budgeted p99", "saved", "compaction p50 us"],
+        rows,
+    )
+
+    print()
+    print("Rest of a notes turn (format_data arguments written by the model, Markdown read back):")
+    turn_rows = []
+    for label, row in results.items():
+        if row["echo_raw"]:
+            turn_rows.append([
+                label,
+                mean(row["echo_raw"]), mean(row["echo"]),
+                mean(row["md_raw"]), mean(row["md"]),
+                mean(row["raw"]) + mean(row["echo_raw"]) + mean(row["md_raw"]),
+                mean(row["compacted"]) + mean(row["echo"]) + mean(row["md"]),
+            ])
+    print_table(
+        ["", "args raw", "args budgeted", "markdown raw", "markdown budgeted", "turn total raw", "turn total budgeted"],
+        turn_rows,
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,162 @@
+"""
+Scripted stand-in for Gemini, for benchmarks that run the real agent tree.
+
+StubLlm plays each agent the way the prompts ask the real model to:
+
+- capymind_agent transfers requests for crisis lines to crisis_line and data
+  questions (settings / profile / notes) to data_fetcher, and answers
+  everything else with a short text reply;
+- data_fetcher calls capy_firestore_data, then format_data, then replies,
+  unless the settings or profile asked for are already in its instruction
+  (session prefetch), which it then answers from;
+- crisis_line calls capy_crisis_lines, then replies with what it found,
+  unless its instruction already lists crisis lines for the user;
+- any other agent replies with text.
+
+Every call sleeps ``latency`` seconds (awaited, like a network call) and is
+counted in ``calls``, so benchmarks can report model calls saved and latency.
+serve_stub() puts the stub behind the string model names of the real agent
+tree, e.g. for load-testing main.app.
+"""
+
+import re
+import asyncio
+from typing import AsyncGenerator, ClassVar, Optional, Type
+
+from google.adk.models import BaseLlm, LlmRequest, LlmResponse
+from google.adk.models.registry import LLMRegistry
+from google.genai import types
+
+_DATA_WORDS = re.compile(r"\b(settings|profile|account|notes|entries|journal)\b", re.IGNORECASE)
+_CRISIS_WORDS = re.compile(r"\b(hotline|helpline|crisis line|crisis number|emergency number)s?\b", re.IGNORECASE)
+_COUNT = re.compile(r"\b(\d{1,3})\b")
+
+
+def _text(content: types.Content) -> str:
+    return " ".join(part.text for part in content.parts or [] if part.text)
+
+
+def _latest_user_text(request: LlmRequest) -> str:
+    for content in reversed(request.contents):
+        if content.role == "user" and not content.parts[0].function_response:
+            text = _text(content)
+            if text and not text.startswith("For context:"):
+                return text
+    return ""
+
+
+def _instruction(request: LlmRequest) -> str:
+    instruction = request.config.system_instruction if request.config else None
+    return instruction if isinstance(instruction, str) else ""
+
+
+def _last_function_response(request: LlmRequest) -> Optional[types.FunctionResponse]:
+    if not request.contents:
+        return None
+    part = request.contents[-1].parts[0] if request.contents[-1].parts else None
+    return part.function_response if part else None
+
+
+def _call(name: str, args: dict) -> LlmResponse:
+    return LlmResponse(content=types.Content(
+        role="model",
+        parts=[types.Part(function_call=types.FunctionCall(name=name, args=args))],
+    ))
+
+
+def _reply(text: str) -> LlmResponse:
+    return LlmResponse(content=types.Content(role="model", parts=[types.Part(text=text)]))
+
+
+class StubLlm(BaseLlm):
+    """Deterministic model with a fixed per-call latency and a call counter."""
+
+    model: str = "stub-model"
+    latency: float = 0.0
+    calls: int = 0
+
+    def _respond(self, request: LlmRequest) -> LlmResponse:
+        tools = request.tools_dict
+        response = _last_function_response(request)
+        user_text = _latest_user_text(request)
+        instruction = _instruction(request)
+
+        if "format_data" in tools:  # data_fetcher
+            if response is None or response.name == "transfer_to_agent":
+                lowered = user_text.lower()
+                if "setting" in lowered and "- Location:" in instruction:
+                    return _reply(instruction[instruction.index("- Location:"):].split("\n")[0])
+                if ("profile" in lowered or "account" in lowered) and "- First Name:" in instruction:
+                    return _reply(instruction[instruction.index("- First Name:"):].split("\n")[0])
+                if "setting" in lowered:
+                    return _call("capy_firestore_data_async", {"operation": "get_settings"})
+                if "profile" in lowered or "account" in lowered:
+                    return _call("capy_firestore_data_async", {"operation": "get_user"})
+                count = _COUNT.search(user_text)
+                return _call("capy_firestore_data_async", {
+                    "operation": "get_notes",
+                    "limit": int(count.group(1)) if count else 10,
+                    "fields": ["text", "timestamp"],
+                })
+            if response.name == "capy_firestore_data_async":
+                args = response.response or {}
+                data_type = "notes" if isinstance(args.get("data"), list) else (
+                    "settings" if "Location" in str(args.get("data")) else "user"
+                )
+                return _call("format_data", {"data_type": data_type, "data": args.get("data") or []})
+            return _reply(str((response.response or {}).get("result", "Here you go.")))
+
+        if "capy_crisis_lines" in tools:  # crisis_line
+            if response is None or response.name == "transfer_to_agent":
+                if "Crisis lines for" in instruction:
+                    return _reply(instruction[instruction.index("Crisis lines for"):])
+                return _call("capy_crisis_lines", {})
+            lines = ((response.response or {}).get("data") or {}).get("lines") or []
+            numbers = ", ".join(f"{line.get('name')}: {line.get('phone')}" for line in lines[:2])
+            return _reply(f"You can reach {numbers}." if numbers else "Please call your local emergency number.")
+
+        if "transfer_to_agent" in tools and response is None:
+            if _CRISIS_WORDS.search(user_text):
+                return _call("transfer_to_agent", {"agent_name": "crisis_line"})
+            if _DATA_WORDS.search(user_text):
+                return _call("transfer_to_agent", {"agent_name": "data_fetcher"})
+        return _reply("That sounds hard. Would a short breathing exercise help right now?")
+
+    async def generate_content_async(
+        self, llm_request: LlmRequest, stream: bool = False
+    ) -> AsyncGenerator[LlmResponse, None]:
+        self.calls += 1
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        yield self._respond(llm_request)
+
+
+def serve_stub(latency: float = 0.0, pattern: str = "gemini-.*") -> Type[StubLlm]:
+    """
+    Resolve every model name matching ``pattern`` to a StubLlm with ``latency``.
+
+    Agents declared with ``model="gemini-2.5-flash"`` build a new model object
+    per request through the LLM registry, so call counts are kept on the
+    returned class (``total_calls``) rather than per instance.
+    """
+
+    stub_latency = latency
+
+    class ServedStubLlm(StubLlm):
+        latency: float = stub_latency
+        total_calls: ClassVar[int] = 0
+
+        @classmethod
+        def supported_models(cls) -> list:
+            return [pattern]
+
+        async def generate_content_async(
+            self, llm_request: LlmRequest, stream: bool = False
+        ) -> AsyncGenerator[LlmResponse, None]:
+            ServedStubLlm.total_calls += 1
+            async for response in super().generate_content_async(llm_request, stream):
+                yield response
+
+    LLMRegistry.register(ServedStubLlm)
+    LLMRegistry.resolve.cache_clear()
+    return ServedStubLlm
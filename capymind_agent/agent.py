@@ -1,6 +1,10 @@
 from google.adk.agents import Agent
 from capymind_agent.sug_agents.data_fetcher import data_fetcher_agent
 from capymind_agent.sug_agents.crysis_line import crisis_line_agent
+from capymind_agent.tools.crisis_detector import crisis_guard
+from capymind_agent.tools.intent_router import route_data_intent
+from capymind_agent.tools.history_compactor import compact_history
+from capymind_agent.tools.session_prefetch import prefetch_user_context
 
 from capymind_agent.prompt import prompt
 
@@ -10,4 +14,10 @@ root_agent = Agent(
     description='An AI agent that handles therapy session requests',
     instruction=prompt,
     sub_agents=[data_fetcher_agent, crisis_line_agent],
+    # Puts the user's profile and settings into session state for the instructions
+    before_agent_callback=prefetch_user_context,
+    # Answers high-risk messages with crisis numbers, then plain "show my
+    # settings/profile/notes" requests, before any model call; long sessions
+    # then have their old turns folded into a summary
+    before_model_callback=[crisis_guard, route_data_intent, compact_history],
 )
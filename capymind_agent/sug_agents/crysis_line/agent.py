@@ -1,7 +1,10 @@
 from google.adk.agents import Agent
-from google.adk.tools import google_search
 
-from capymind_agent.tools.firestore_data import firestore_data_tool
+from capymind_agent.tools.crisis_lines import crisis_lines_tool
+from capymind_agent.tools.crisis_search import crisis_search_tool
+from capymind_agent.tools.crisis_detector import crisis_guard
+from capymind_agent.tools.history_compactor import compact_history
+from capymind_agent.tools.session_prefetch import prefetch_user_context
 from capymind_agent.sug_agents.crysis_line.prompt import CRISIS_LINE_PROMPT
 
 
@@ -10,5 +13,9 @@ crisis_line_agent = Agent(
     name="crisis_line",
     description="Finds crisis line phone numbers for users in critical situations based on their location",
     instruction=CRISIS_LINE_PROMPT,
-    tools=[firestore_data_tool, google_search],
+    # Web search, for places the directory lacks, runs behind a per-location cache
+    tools=[crisis_lines_tool, crisis_search_tool],
+    # Follow-up turns can start here rather than at the root agent
+    before_agent_callback=prefetch_user_context,
+    before_model_callback=[crisis_guard, compact_history],
 )
\ No newline at end of file
@@ -4,9 +4,13 @@ CRISIS_LINE_PROMPT = (
     "Keep responses very brief - 1-2 sentences maximum. "
     "\n\n"
     "Process (be brief):\n"
-    "1. Get user location from settings\n"
-    "2. Search for local crisis lines\n"
-    "3. Provide 2-3 most relevant numbers\n"
+    "1. If crisis lines for the user's saved location are listed below and the user "
+    "has not named another place, give them right away without calling tools\n"
+    "2. Otherwise call capy_crisis_lines (it reads the user's location from settings; "
+    "pass location if the user just told you where they are)\n"
+    "3. Only if it returns found: false, call capy_search_crisis_lines "
+    "(with the same location if you passed one)\n"
+    "4. Provide 2-3 most relevant numbers plus the emergency number\n"
     "\n"
     "Key numbers:\n"
     "- US: 988 (Suicide & Crisis Lifeline)\n"
@@ -14,4 +18,6 @@ CRISIS_LINE_PROMPT = (
     "- Emergency: 911\n"
     "\n"
     "Be compassionate but brief. If immediate danger, say 'Call 911 now.'"
+    "\n\n"
+    "{crisis_lines_text?}"
 )
\ No newline at end of file
@@ -2,6 +2,11 @@ from google.adk.agents import Agent
 
 from capymind_agent.tools.firestore_data import firestore_data_tool
 from capymind_agent.tools.format_data import format_data_tool
+from capymind_agent.tools.crisis_detector import crisis_guard
+from capymind_agent.tools.intent_router import route_data_intent
+from capymind_agent.tools.history_compactor import compact_history
+from capymind_agent.tools.tool_budget import compact_tool_result
+from capymind_agent.tools.session_prefetch import prefetch_user_context
 from capymind_agent.sug_agents.data_fetcher.prompt import DATA_FETCHER_PROMPT
 
 
@@ -11,4 +16,9 @@ data_fetcher_agent = Agent(
     description="Fetches Firestore data (user, notes, settings) for a given user_id and formats it into human-readable responses",
     instruction=DATA_FETCHER_PROMPT,
     tools=[firestore_data_tool, format_data_tool],
+    # Follow-up turns can start here rather than at the root agent
+    before_agent_callback=prefetch_user_context,
+    before_model_callback=[crisis_guard, route_data_intent, compact_history],
+    # Trims tool results to CAPY_TOOL_BUDGET_TOKENS before the model reads them
+    after_tool_callback=compact_tool_result,
 )
@@ -0,0 +1,214 @@
+import os
+import logging
+import threading
+from typing import Any, Callable, Dict, Optional, Tuple
+
+logger = logging.getLogger("capymind.firestore")
+
+DEFAULT_PROJECT = "capymind"
+DEFAULT_DATABASE = "(default)"
+
+# (project, database, kind) where kind is "sync" or "async"
+PoolKey = Tuple[str, str, str]
+
+
+def resolve_project(override_project_id: Optional[str] = None) -> str:
+    """Project used for a call: explicit override, then environment, then default."""
+    return (
+        override_project_id
+        or os.getenv("GOOGLE_CLOUD_PROJECT")
+        or os.getenv("GCP_PROJECT")
+        or DEFAULT_PROJECT
+    )
+
+
+def resolve_database(override_database: Optional[str] = None) -> str:
+    """Database used for a call: explicit override, then environment, then default."""
+    return override_database or os.getenv("GOOGLE_CLOUD_DATABASE") or DEFAULT_DATABASE
+
+
+def _load_credentials() -> Tuple[Any, Optional[str]]:
+    """Return (credentials, auth_project), falling back to anonymous credentials."""
+    from google.auth import default
+    from google.auth.exceptions import DefaultCredentialsError
+    from google.auth.credentials import AnonymousCredentials
+
+    try:
+        return default()
+    except DefaultCredentialsError:
+        # No credentials available, use anonymous credentials as fallback
+        # This allows the client to be created but will fail on actual operations
+        logger.warning(
+            "No default credentials found. For local development, set GOOGLE_APPLICATION_CREDENTIALS "
+            "to point to a service account key file, or run 'gcloud auth application-default login'. "
+            "Using anonymous credentials (operations will fail with permission errors)."
+        )
+    except Exception as e:
+        logger.warning(f"Unexpected error getting credentials: {e}, using anonymous credentials")
+    return AnonymousCredentials(), None
+
+
+def _build_client(project: str, database: str, credentials: Any) -> Any:
+    """Create a synchronous Firestore client for the given project and database."""
+    from google.cloud.firestore import Client as FirestoreClient
+
+    # Pass database only if provided and supported by the installed library.
+    if database:
+        try:
+            return FirestoreClient(project=project, credentials=credentials, database=database)
+        except TypeError:
+            # Older firestore clients may not support the 'database' argument.
+            pass
+    return FirestoreClient(project=project, credentials=credentials)
+
+
+def _build_async_client(project: str, database: str, credentials: Any) -> Any:
+    """Create an asyncio Firestore client for the given project and database."""
+    from google.cloud.firestore import AsyncClient
+
+    if database:
+        try:
+            return AsyncClient(project=project, credentials=credentials, database=database)
+        except TypeError:
+            pass
+    return AsyncClient(project=project, credentials=credentials)
+
+
+def _refresh_credentials(credentials: Any) -> None:
+    from google.auth.transport.requests import Request
+
+    credentials.refresh(Request())
+
+
+class FirestoreClientPool:
+    """
+    Thread-safe registry of Firestore clients keyed by (project, database).
+
+    Each client (and its gRPC channel) is built once and reused by every tool
+    call; synchronous and asyncio clients are pooled side by side. Expired
+    credentials are refreshed in place; if a refresh fails the client is
+    rebuilt on the next lookup. A slow build or refresh only holds up
+    lookups of the same key.
+    """
+
+    def __init__(
+        self,
+        client_factory: Callable[[str, str, Any], Any] = _build_client,
+        async_client_factory: Callable[[str, str, Any], Any] = _build_async_client,
+        credentials_loader: Callable[[], Tuple[Any, Optional[str]]] = _load_credentials,
+        credentials_refresher: Callable[[Any], None] = _refresh_credentials,
+    ):
+        self._factories = {"sync": client_factory, "async": async_client_factory}
+        self._credentials_loader = credentials_loader
+        self._credentials_refresher = credentials_refresher
+        # Guards the registry and counters only; building or refreshing a
+        # client holds that key's lock instead
+        self._lock = threading.Lock()
+        self._key_locks: Dict[PoolKey, threading.Lock] = {}
+        self._entries: Dict[PoolKey, Tuple[Any, Any]] = {}
+        self._hits = 0
+        self._misses = 0
+        self._refreshes = 0
+
+    def get(
+        self,
+        override_project_id: Optional[str] = None,
+        override_database: Optional[str] = None,
+    ) -> Any:
+        """Return the pooled client for (project, database), creating it on first use."""
+        return self._get("sync", override_project_id, override_database)
+
+    def get_async(
+        self,
+        override_project_id: Optional[str] = None,
+        override_database: Optional[str] = None,
+    ) -> Any:
+        """Return the pooled ``AsyncClient`` for (project, database)."""
+        return self._get("async", override_project_id, override_database)
+
+    def _get(self, kind: str, override_project_id: Optional[str], override_database: Optional[str]) -> Any:
+        key = (resolve_project(override_project_id), resolve_database(override_database), kind)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and not getattr(entry[1], "expired", False):
+                self._hits += 1
+                return entry[0]
+            key_lock = self._key_locks.setdefault(key, threading.Lock())
+
+        # Credentials, client construction and refresh are network I/O: only
+        # callers of this key wait for them, never the whole pool
+        with key_lock:
+            with self._lock:
+                entry = self._entries.get(key)
+            if entry is not None and self._ensure_fresh(key, entry):
+                with self._lock:
+                    self._hits += 1
+                return entry[0]
+
+            credentials, auth_project = self._credentials_loader()
+            # Use project from credentials if no override provided
+            project = key[0]
+            if not override_project_id and auth_project:
+                project = auth_project
+            client = self._factories[kind](project, key[1], credentials)
+            with self._lock:
+                self._misses += 1
+                self._entries[key] = (client, credentials)
+                size = len(self._entries)
+            logger.debug(
+                "client_pool:miss project=%s database=%s kind=%s size=%d",
+                project,
+                key[1],
+                kind,
+                size,
+            )
+            return client
+
+    def _ensure_fresh(self, key: PoolKey, entry: Tuple[Any, Any]) -> bool:
+        """Refresh expired credentials; drop the entry if that fails. Caller holds the key's lock."""
+        client, credentials = entry
+        if not getattr(credentials, "expired", False):
+            return True
+        try:
+            self._credentials_refresher(credentials)
+        except Exception as e:
+            logger.warning("client_pool:refresh_failed project=%s database=%s error=%s", key[0], key[1], e)
+            with self._lock:
+                self._entries.pop(key, None)
+            _close_quietly(client)
+            return False
+        with self._lock:
+            self._refreshes += 1
+        return True
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "size": len(self._entries),
+                "hits": self._hits,
+                "misses": self._misses,
+                "refreshes": self._refreshes,
+            }
+
+    def close_all(self) -> None:
+        """Close every pooled client. Safe to call more than once."""
+        with self._lock:
+            entries = list(self._entries.values())
+            self._entries.clear()
+        for client, _ in entries:
+            _close_quietly(client)
+        logger.info("client_pool:closed clients=%d", len(entries))
+
+
+def _close_quietly(client: Any) -> None:
+    close = getattr(client, "close", None)
+    if close is None:
+        return
+    try:
+        close()
+    except Exception:  # pragma: no cover - best effort on shutdown
+        logger.exception("client_pool:close_failed")
+
+
+# Process-wide pool shared by all tools and agents
+client_pool = FirestoreClientPool()
@@ -0,0 +1,23 @@
+"""Settings read from CAPY_* environment variables."""
+
+import os
+import logging
+
+logger = logging.getLogger("capymind.config")
+
+
+def env_int(name: str, default: int) -> int:
+    """Integer setting ``name``; ``default`` when unset or not a number."""
+    try:
+        return int(os.getenv(name, default))
+    except ValueError:
+        logger.warning("invalid %s=%r, using %d", name, os.getenv(name), default)
+        return default
+
+
+def env_flag(name: str, default: bool = False) -> bool:
+    """Boolean setting ``name``: 1, true, yes or on; ``default`` when unset."""
+    value = os.getenv(name)
+    if value is None:
+        return default
+    return value.strip().lower() in ("1", "true", "yes", "on")
@@ -0,0 +1,265 @@
+import os
+import json
+import asyncio
+import logging
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple
+from google.adk.agents.callback_context import CallbackContext
+from google.adk.models import LlmRequest, LlmResponse
+from google.genai import types
+
+from capymind_agent.tools.crisis_lines import crisis_lines_for_user
+from capymind_agent.tools.text import fold, normalize
+
+logger = logging.getLogger("capymind.crisis_detector")
+
+DEFAULT_PHRASES_PATH = os.path.join(os.path.dirname(__file__), "data", "crisis_phrases.json")
+
+HIGH, MEDIUM, GUARD = "high", "medium", "guard"
+
+# Upper bound on the settings read behind the crisis reply; past it we answer
+# with generic numbers rather than keep a user in crisis waiting
+_LOOKUP_TIMEOUT = float(os.getenv("CAPY_CRISIS_LOOKUP_TIMEOUT", "0.5"))
+
+_MEDIUM_RISK_INSTRUCTION = (
+    "Risk signal: the user's latest message contains distress language. "
+    "Follow the safety and crisis protocol: check gently whether they are safe right now "
+    "and delegate to crisis_line if there is any risk."
+)
+
+
+# Matched phrase patterns support a small regex subset: literal words,
+# groups with alternatives "(a|b)", "?" after a character or group, and a
+# trailing "\w*" for a word prefix. Each pattern expands to literal phrases.
+_WORD_PREFIX = "\\w*"
+
+
+def _expand(pattern: str) -> List[str]:
+    """All literal strings a phrase pattern matches ("\\w*" kept as a marker)."""
+    alternatives, end = _expand_alternatives(pattern, 0)
+    if end != len(pattern):
+        raise ValueError(f"unbalanced ')' in crisis phrase {pattern!r}")
+    return alternatives
+
+
+def _expand_alternatives(pattern: str, pos: int) -> Tuple[List[str], int]:
+    results: List[str] = []
+    while True:
+        sequence, pos = _expand_sequence(pattern, pos)
+        results.extend(sequence)
+        if pos < len(pattern) and pattern[pos] == "|":
+            pos += 1
+            continue
+        return results, pos
+
+
+def _expand_sequence(pattern: str, pos: int) -> Tuple[List[str], int]:
+    results = [""]
+    while pos < len(pattern) and pattern[pos] not in "|)":
+        if pattern.startswith(_WORD_PREFIX, pos):
+            if pos + len(_WORD_PREFIX) != len(pattern):
+                raise ValueError(f"'\\w*' must end the crisis phrase {pattern!r}")
+            item, pos = [_WORD_PREFIX], pos + len(_WORD_PREFIX)
+        elif pattern[pos] == "(":
+            item, pos = _expand_alternatives(pattern, pos + 1)
+            if pos >= len(pattern) or pattern[pos] != ")":
+                raise ValueError(f"unbalanced '(' in crisis phrase {pattern!r}")
+            pos += 1
+        elif pattern[pos] in "\\[]{}*+.^$":
+            raise ValueError(f"unsupported syntax in crisis phrase {pattern!r}")
+        else:
+            item, pos = [pattern[pos]], pos + 1
+        if pos < len(pattern) and pattern[pos] == "?":
+            item, pos = item + [""], pos + 1
+        results = [prefix + suffix for prefix in results for suffix in item]
+    return results, pos
+
+
+class Detection(NamedTuple):
+    level: str  # HIGH or MEDIUM
+    language: str
+    phrase: str
+
+
+class _Node:
+    __slots__ = ("children", "prefixes", "detection")
+
+    def __init__(self):
+        self.children: Dict[str, "_Node"] = {}
+        # (word prefix, node) for phrase words ending in "\w*"
+        self.prefixes: List[Tuple[str, "_Node"]] = []
+        self.detection: Optional[Detection] = None
+
+
+class CrisisDetector:
+    """
+    Deterministic risk classifier run before the model on every message.
+
+    The multilingual phrase lists are expanded once into literal word
+    sequences and loaded into a single word trie, so detection is one pass
+    over the words of the normalized message taking the longest phrase at
+    each position. Guard phrases ("killing myself laughing") are part of the
+    trie and win over the shorter risk phrase they contain.
+    """
+
+    def __init__(self, phrases: Dict[str, Any]):
+        self.version = phrases.get("version", "unknown")
+        self._root = _Node()
+        for level in (HIGH, MEDIUM, GUARD):
+            key = "guards" if level == GUARD else level
+            for language, patterns in phrases.get(key, {}).items():
+                for pattern in patterns:
+                    for phrase in _expand(fold(pattern)):
+                        self._add(phrase, Detection(level, language, phrase))
+        self._first_prefixes = tuple(prefix for prefix, _ in self._root.prefixes)
+
+    @classmethod
+    def load(cls, path: str = DEFAULT_PHRASES_PATH) -> "CrisisDetector":
+        with open(path, encoding="utf-8") as f:
+            return cls(json.load(f))
+
+    def _add(self, phrase: str, detection: Detection) -> None:
+        node = self._root
+        for word in phrase.split():
+            if word.endswith(_WORD_PREFIX):
+                prefix = word[:-len(_WORD_PREFIX)]
+                child = next((n for p, n in node.prefixes if p == prefix), None)
+                if child is None:
+                    child = _Node()
+                    node.prefixes.append((prefix, child))
+            else:
+                child = node.children.get(word)
+                if child is None:
+                    child = node.children[word] = _Node()
+            node = child
+        # Keep the first, strongest (HIGH before MEDIUM before GUARD) entry
+        if node.detection is None:
+            node.detection = detection
+
+    def _longest(self, words: List[str], start: int) -> Tuple[Optional[Detection], int]:
+        """Longest phrase starting at ``words[start]`` as (detection, words used)."""
+        best: Tuple[Optional[Detection], int] = (None, 0)
+        frontier = [self._root]
+        index = start
+        while frontier and index < len(words):
+            word = words[index]
+            index += 1
+            following = []
+            for node in frontier:
+                child = node.children.get(word)
+                if child is not None:
+                    following.append(child)
+                following.extend(n for prefix, n in node.prefixes if word.startswith(prefix))
+            for node in following:
+                if node.detection is not None:
+                    best = (node.detection, index - start)
+            frontier = following
+        return best
+
+    def detect(self, text: str) -> Optional[Detection]:
+        """Return the highest-risk phrase in ``text``, or None."""
+        words = normalize(text).split()
+        children, prefixes = self._root.children, self._first_prefixes
+        found: Optional[Detection] = None
+        start = 0
+        while start < len(words):
+            word = words[start]
+            # Cheap rejection: most words start no phrase at all
+            if word not in children and not (prefixes and word.startswith(prefixes)):
+                start += 1
+                continue
+            detection, used = self._longest(words, start)
+            if detection is None:
+                start += 1
+                continue
+            if detection.level == HIGH:
+                return detection
+            if detection.level == MEDIUM and found is None:
+                found = detection
+            start += used
+        return found
+
+
+crisis_detector = CrisisDetector.load()
+
+
+def latest_user_text(llm_request: LlmRequest) -> Optional[str]:
+    """Text of the user's message when it is the last content (first model call of a turn)."""
+    if not llm_request.contents:
+        return None
+    content = llm_request.contents[-1]
+    if content.role != "user" or not content.parts:
+        return None
+    if any(part.function_response for part in content.parts):
+        return None
+    text = " ".join(part.text for part in content.parts if part.text)
+    return text or None
+
+
+def crisis_message(resources: Optional[Dict[str, Any]]) -> str:
+    """Immediate reply with crisis numbers, local when the user's location is known."""
+    lines = ["I'm really glad you told me. You don't have to go through this alone."]
+    data = (resources or {}).get("data")
+    if data:
+        lines.append("")
+        for line in data["lines"][:3]:
+            contacts = []
+            if line.get("phone"):
+                contacts.append(f"call {line['phone']}")
+            if line.get("sms"):
+                keyword = f"{line['keyword']} to " if line.get("keyword") else ""
+                contacts.append(f"text {keyword}{line['sms']}")
+            lines.append(f"📞 {line.get('name', 'Crisis line')}: {' or '.join(contacts)}")
+        lines.append(f"🚨 If you're in immediate danger, call {data['emergency']} now.")
+    else:
+        lines.append(
+            "🚨 If you're in immediate danger, call your local emergency number "
+            "(911 in North America, 112 in Europe) now."
+        )
+        lines.append("Tell me which country you're in and I'll find a crisis line near you.")
+    lines.append("")
+    lines.append("Are you safe right now?")
+    return "\n".join(lines)
+
+
+async def _crisis_resources(user_id: Optional[str]) -> Optional[Dict[str, Any]]:
+    if user_id is None:
+        return None
+    try:
+        return await asyncio.wait_for(crisis_lines_for_user(user_id), timeout=_LOOKUP_TIMEOUT)
+    except Exception:
+        logger.warning("crisis_guard:lookup_failed user_id=%s", user_id, exc_info=True)
+        return None
+
+
+async def crisis_guard(
+    callback_context: CallbackContext,
+    llm_request: LlmRequest,
+) -> Optional[LlmResponse]:
+    """
+    before_model_callback: on a high-risk message, answer with crisis
+    resources directly instead of calling the model; on a medium-risk one,
+    remind the model of the safety protocol.
+    """
+    text = latest_user_text(llm_request)
+    if text is None:
+        return None
+    detection = crisis_detector.detect(text)
+    if detection is None:
+        return None
+
+    user_id = getattr(callback_context._invocation_context, "user_id", None)
+    logger.warning(
+        "crisis_guard:detected level=%s language=%s agent=%s user_id=%s",
+        detection.level,
+        detection.language,
+        callback_context.agent_name,
+        user_id,
+    )
+    if detection.level == MEDIUM:
+        llm_request.append_instructions([_MEDIUM_RISK_INSTRUCTION])
+        return None
+
+    resources = await _crisis_resources(user_id)
+    return LlmResponse(
+        content=types.Content(role="model", parts=[types.Part(text=crisis_message(resources))])
+    )
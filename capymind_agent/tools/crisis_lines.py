@@ -0,0 +1,293 @@
+import os
+import re
+import json
+import difflib
+import logging
+from functools import lru_cache
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple
+from google.adk.tools import FunctionTool, ToolContext
+
+from capymind_agent.tools import firestore_data
+from capymind_agent.tools.text import normalize
+
+logger = logging.getLogger("capymind.crisis_lines")
+
+DEFAULT_DIRECTORY_PATH = os.path.join(os.path.dirname(__file__), "data", "crisis_lines.json")
+
+# Alias kinds. Names are scanned for inside every location part; region
+# codes ("TX", "QC") and names shared with places the directory does not
+# cover ("Georgia") only count as a whole part and only when a name or the
+# UTC offset agrees: "in Lagos" is not Indiana and "Paris, TX" is not France.
+_NAME, _CODE = 2, 1
+# Longest alias, in words, tried when scanning a location
+_MAX_ALIAS_WORDS = 4
+_FUZZY_CUTOFF = 0.8
+_FUZZY_MIN_LENGTH = 4
+
+_SEPARATORS = re.compile(r"[,;/|()\n]+")
+# Postal codes next to a region code: 'TX 78701', 'NSW 2000'
+_NUMBERS = re.compile(r"\b\d+\b")
+
+
+class Candidate(NamedTuple):
+    country: str
+    region: Optional[str]
+    weight: int
+
+
+class Match(NamedTuple):
+    country: str
+    region: Optional[str]
+    method: str  # "exact", "fuzzy" or "timezone"
+
+
+class CrisisLineDirectory:
+    """
+    Offline, versioned directory of crisis lines with an alias index.
+
+    Countries and regions are indexed by normalized name, aliases (native
+    spellings, major cities); lookup() resolves a free-form settings
+    ``Location`` with a greedy longest-alias scan, falls back to fuzzy
+    matching for typos and uses ``SecondsFromUTC`` to break ties or, without
+    a location, when a single country has that UTC offset. Region codes and
+    ambiguous region names are kept apart: they match whole location parts
+    only, and never decide the country against a name or without the offset.
+    Conflicting evidence resolves to no match, so the caller searches the web
+    rather than handing out another country's numbers.
+    """
+
+    def __init__(self, directory: Dict[str, Any]):
+        self.version = directory.get("version", "unknown")
+        self.countries: Dict[str, Dict[str, Any]] = directory["countries"]
+        self._index: Dict[str, List[Candidate]] = {}
+        self._codes: Dict[str, List[Candidate]] = {}
+        self._offsets: Dict[int, List[str]] = {}
+        for code, country in self.countries.items():
+            self._add(country["name"], Candidate(code, None, _NAME))
+            for alias in country.get("aliases", ()):
+                self._add(alias, Candidate(code, None, _NAME))
+            for region_code, region in country.get("regions", {}).items():
+                if region.get("ambiguous_name"):
+                    self._add(region["name"], Candidate(code, region_code, _CODE), self._codes)
+                else:
+                    self._add(region["name"], Candidate(code, region_code, _NAME))
+                for alias in region.get("aliases", ()):
+                    self._add(alias, Candidate(code, region_code, _NAME))
+                self._add(region_code, Candidate(code, region_code, _CODE), self._codes)
+            for hours in country.get("utc_offsets", ()):
+                self._offsets.setdefault(int(hours * 3600), []).append(code)
+        self._fuzzy_keys = [key for key in self._index if len(key) >= _FUZZY_MIN_LENGTH]
+        self.lookup = lru_cache(maxsize=4096)(self._lookup)
+
+    @classmethod
+    def load(cls, path: str = DEFAULT_DIRECTORY_PATH) -> "CrisisLineDirectory":
+        with open(path, encoding="utf-8") as f:
+            return cls(json.load(f))
+
+    def _add(self, alias: str, candidate: Candidate, index: Optional[Dict[str, List[Candidate]]] = None) -> None:
+        key = normalize(alias)
+        if key:
+            candidates = (self._index if index is None else index).setdefault(key, [])
+            if candidate not in candidates:
+                candidates.append(candidate)
+
+    def _scan(self, part: str) -> List[Candidate]:
+        """Greedy longest-alias scan over the words of one location part."""
+        words = part.split()
+        hits: List[Candidate] = []
+        start = 0
+        while start < len(words):
+            for size in range(min(_MAX_ALIAS_WORDS, len(words) - start), 0, -1):
+                candidates = self._index.get(" ".join(words[start:start + size]))
+                if candidates:
+                    hits.extend(candidates)
+                    start += size
+                    break
+            else:
+                start += 1
+        return hits
+
+    def _fuzzy(self, part: str) -> List[Candidate]:
+        if len(part) < _FUZZY_MIN_LENGTH:
+            return []
+        hits: List[Candidate] = []
+        for key in difflib.get_close_matches(part, self._fuzzy_keys, n=3, cutoff=_FUZZY_CUTOFF):
+            hits.extend(self._index[key])
+        return hits
+
+    def _code_parts(self, parts: List[str]) -> List[Tuple[str, List[Candidate]]]:
+        """(part, candidates) for the parts that are a region code, postal codes aside."""
+        found = []
+        for part in parts:
+            key = " ".join(_NUMBERS.sub(" ", part).split())
+            if key in self._codes:
+                found.append((key, self._codes[key]))
+        return found
+
+    def _matches_offset(self, country: str, seconds_from_utc: Optional[int]) -> bool:
+        return seconds_from_utc is not None and country in self._offsets.get(seconds_from_utc, ())
+
+    def _pick(self, hits: List[Candidate], seconds_from_utc: Optional[int]) -> Tuple[str, Optional[str]]:
+        votes: Dict[str, int] = {}
+        for hit in hits:
+            votes[hit.country] = votes.get(hit.country, 0) + hit.weight
+        # Most supported country, then the user's UTC offset, then first mentioned
+        order = {country: i for i, country in reversed(list(enumerate(h.country for h in hits)))}
+        country = max(
+            votes,
+            key=lambda c: (votes[c], self._matches_offset(c, seconds_from_utc), -order[c]),
+        )
+        regions = [h for h in hits if h.country == country and h.region]
+        region = max(regions, key=lambda h: h.weight).region if regions else None
+        return country, region
+
+    def _lookup(self, location: Optional[str], seconds_from_utc: Optional[int] = None) -> Optional[Match]:
+        parts = [normalize(part) for part in _SEPARATORS.split(location or "")]
+        parts = [part for part in parts if part]
+        codes = self._code_parts(parts)
+
+        method = "exact"
+        hits = [hit for part in parts for hit in self._scan(part)]
+        if not hits:
+            method = "fuzzy"
+            hits = [hit for part in parts for hit in self._fuzzy(part)]
+        if hits or codes:
+            resolved = self._resolve(hits, codes, seconds_from_utc)
+            return Match(*resolved, method if hits else "exact") if resolved else None
+
+        if not parts and seconds_from_utc is not None:
+            countries = self._offsets.get(seconds_from_utc, [])
+            if len(countries) == 1:
+                return Match(countries[0], None, "timezone")
+        return None
+
+    def _resolve(
+        self,
+        hits: List[Candidate],
+        codes: List[Tuple[str, List[Candidate]]],
+        seconds_from_utc: Optional[int],
+    ) -> Optional[Tuple[str, Optional[str]]]:
+        """Country and region from name hits, checked against the code parts."""
+        country: Optional[str] = None
+        region: Optional[str] = None
+        if hits:
+            country, region = self._pick(hits, seconds_from_utc)
+            # 'Mumbai, IN' names India by its own code; 'Paris, TX' disagrees
+            agrees = all(
+                key == country.casefold() or any(c.country == country for c in candidates)
+                for key, candidates in codes
+            )
+            if not (agrees or self._matches_offset(country, seconds_from_utc)):
+                country = None
+        if country is None:
+            # Codes alone, or a code against a name: only the UTC offset can
+            # settle it, and only when it leaves a single country
+            fitting = {c.country for _, candidates in codes for c in candidates
+                       if self._matches_offset(c.country, seconds_from_utc)}
+            if len(fitting) != 1:
+                return None
+            country, region = fitting.pop(), None
+
+        for _, candidates in codes:
+            agreeing = [c for c in candidates if c.country == country]
+            if agreeing and region is None:
+                region = agreeing[0].region
+        return country, region
+
+    def entry(self, match: Match) -> Dict[str, Any]:
+        """Numbers for a match: region-specific lines first, then national ones."""
+        country = self.countries[match.country]
+        region = country.get("regions", {}).get(match.region) if match.region else None
+        lines: List[Dict[str, Any]] = []
+        for line in (region or {}).get("lines", []) + country["lines"]:
+            if line not in lines:
+                lines.append(line)
+        return {
+            "country": match.country,
+            "country_name": country["name"],
+            "region": region["name"] if region else None,
+            "emergency": country["emergency"],
+            "lines": lines,
+            "match": match.method,
+        }
+
+
+crisis_directory = CrisisLineDirectory.load()
+
+
+def location_settings(settings: Optional[Dict[str, Any]]) -> Tuple[Optional[str], Optional[int]]:
+    """(Location, SecondsFromUTC) of a settings document, either as None when missing."""
+    if not settings:
+        return None, None
+    # Handle nested settings structure
+    settings = settings.get("settings", settings)
+    seconds = settings.get("SecondsFromUTC")
+    return settings.get("Location"), int(seconds) if isinstance(seconds, (int, float)) else None
+
+
+async def saved_location(
+    user_id: str,
+    project_id: Optional[str] = None,
+    database: Optional[str] = None,
+) -> Tuple[Optional[str], Optional[int]]:
+    """(Location, SecondsFromUTC) from the user's settings; (None, None) if they cannot be read."""
+    # Guarded like the data tools: a slow or failing Firestore gives up at the
+    # get_settings deadline (or at once with the breaker open) instead of
+    # holding up the crisis answer.
+    result = await firestore_data.user_data_async("get_settings", user_id, project_id=project_id, database=database)
+    if not result["ok"]:
+        return None, None
+    return location_settings(result["data"])
+
+
+async def crisis_lines_for_user(
+    user_id: str,
+    location: Optional[str] = None,
+    seconds_from_utc: Optional[int] = None,
+    project_id: Optional[str] = None,
+    database: Optional[str] = None,
+) -> Dict[str, Any]:
+    """Directory lookup for a user, reading their settings unless a location or offset is given."""
+    if location is None and seconds_from_utc is None:
+        location, seconds_from_utc = await saved_location(user_id, project_id, database)
+
+    match = crisis_directory.lookup(location, seconds_from_utc)
+    result: Dict[str, Any] = {
+        "ok": True,
+        "found": match is not None,
+        "location": location,
+        "directory_version": crisis_directory.version,
+    }
+    if match is None:
+        logger.info("crisis_lines:not_found location=%r seconds_from_utc=%s", location, seconds_from_utc)
+        return result
+    result["data"] = crisis_directory.entry(match)
+    return result
+
+
+async def capy_crisis_lines(
+    tool_context: ToolContext,
+    location: Optional[str] = None,
+    seconds_from_utc: Optional[int] = None,
+    project_id: Optional[str] = None,
+    database: Optional[str] = None,
+) -> Dict[str, Any]:
+    """
+    Crisis line lookup from CapyMind's bundled directory.
+    Returns crisis line numbers and the emergency number for the user's
+    location. Without arguments it reads Location and SecondsFromUTC from the
+    user's settings; pass location (e.g. 'Toronto, Canada') when the user
+    tells you where they are. If "found" is false, search the web instead.
+    """
+    user_id = firestore_data.user_id_from_context(tool_context)
+    if user_id is None:
+        return {"ok": False, "error": "Unable to extract user_id from tool context"}
+    try:
+        return await crisis_lines_for_user(user_id, location, seconds_from_utc, project_id, database)
+    except Exception as e:  # pragma: no cover - runtime failures surface as tool errors
+        logger.exception("capy_crisis_lines:error user_id=%s", user_id)
+        return {"ok": False, "error": str(e)}
+
+
+# Expose as ADK FunctionTool instance for agent.tools
+crisis_lines_tool = FunctionTool(capy_crisis_lines)
@@ -0,0 +1,347 @@
+import os
+import json
+import fcntl
+import time
+import asyncio
+import logging
+import argparse
+import threading
+from collections import Counter, OrderedDict
+from contextlib import contextmanager
+from typing import Any, Awaitable, Callable, Dict, Hashable, Iterable, List, Optional, Tuple
+from google.adk.agents import Agent
+from google.adk.runners import InMemoryRunner
+from google.adk.tools import FunctionTool, ToolContext, google_search
+from google.genai import types
+
+from capymind_agent.tools import firestore_data
+from capymind_agent.tools.client_pool import client_pool
+from capymind_agent.tools.config import env_int
+from capymind_agent.tools.crisis_lines import location_settings, crisis_directory, saved_location
+from capymind_agent.tools.session_prefetch import STATE_KEY as PREFETCH_STATE_KEY
+from capymind_agent.tools.single_flight import single_flight
+from capymind_agent.tools.text import normalize
+
+logger = logging.getLogger("capymind.crisis_search")
+
+SEARCH_INSTRUCTION = (
+    "Search the web for crisis and suicide prevention lines serving the given location. "
+    "Reply with up to three services as '- name: phone or text number', then the local "
+    "emergency number, and nothing else. Only include numbers you found in the results."
+)
+
+Search = Callable[[str], Awaitable[str]]
+
+# Built-in google_search cannot share an agent with function tools, so the
+# web search runs in an agent of its own
+crisis_search_agent = Agent(
+    model="gemini-2.5-flash",
+    name="crisis_search",
+    description="Searches the web for crisis line numbers in a location",
+    instruction=SEARCH_INSTRUCTION,
+    tools=[google_search],
+)
+
+
+async def agent_search(location: str) -> str:
+    """Run crisis_search_agent for ``location`` and return its answer."""
+    runner = InMemoryRunner(agent=crisis_search_agent, app_name="crisis_search")
+    session = await runner.session_service.create_session(app_name="crisis_search", user_id="crisis_search")
+    message = types.Content(role="user", parts=[types.Part(text=f"Crisis line phone numbers in {location}")])
+    texts: List[str] = []
+    async for event in runner.run_async(user_id="crisis_search", session_id=session.id, new_message=message):
+        if event.is_final_response() and event.content:
+            texts.extend(part.text for part in event.content.parts or [] if part.text)
+    answer = "".join(texts).strip()
+    if not answer:
+        raise ValueError(f"empty search answer for {location!r}")
+    return answer
+
+
+def location_key(location: str) -> str:
+    """Cache key of a free-form location: 'Lagos, Nigeria ' and 'lagos nigeria' share one."""
+    return normalize(location)
+
+
+class SearchCache:
+    """
+    Crisis line search answers by normalized location.
+
+    Entries live for ``ttl_seconds`` (crisis numbers rarely change, so the
+    default is a week) and at most ``max_entries`` are kept, least recently
+    used evicted first. With ``path`` the cache is loaded from a JSON file,
+    and save() merges it back under a lock on ``<path>.lock``: the file is
+    re-read, the newest answer per location wins and only the newest
+    ``max_entries`` are written, so instances sharing a mounted volume (and
+    the warm job) add to each other's entries instead of overwriting them. Timestamps are wall-clock for that
+    reason. put() only changes memory; save() does file I/O, so async callers
+    run it in a thread.
+    """
+
+    def __init__(
+        self,
+        max_entries: int = 512,
+        ttl_seconds: float = 7 * 86400,
+        path: Optional[str] = None,
+        clock: Callable[[], float] = time.time,
+    ):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.path = path
+        self._clock = clock
+        self._lock = threading.Lock()
+        # One save at a time per instance; other instances may save concurrently
+        self._save_lock = threading.Lock()
+        # key -> (stored_at, location as given, answer)
+        self._entries: "OrderedDict[Hashable, Tuple[float, str, str]]" = OrderedDict()
+        self._dirty = False
+        self._stats = {"hits": 0, "misses": 0, "evictions": 0, "expirations": 0}
+        if path:
+            self.load()
+
+    def get(self, location: str) -> Optional[str]:
+        key = location_key(location)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and self._clock() - entry[0] >= self.ttl_seconds:
+                del self._entries[key]
+                self._stats["expirations"] += 1
+                entry = None
+            if entry is None:
+                self._stats["misses"] += 1
+                return None
+            self._entries.move_to_end(key)
+            self._stats["hits"] += 1
+            return entry[2]
+
+    def put(self, location: str, answer: str) -> None:
+        with self._lock:
+            self._store(location_key(location), (self._clock(), location, answer))
+            self._dirty = True
+
+    def _store(self, key: Hashable, entry: Tuple[float, str, str]) -> None:
+        self._entries[key] = entry
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self._stats["evictions"] += 1
+
+    def _merge(self, rows: List[Tuple[float, str, str]], now: float) -> None:
+        """Take unexpired ``rows`` newer than ours; new locations only fill free room (lock held)."""
+        # Newest first, each placed as least recently used, so older rows end up evicted first
+        for stored_at, location, answer in sorted(rows, key=lambda row: row[0], reverse=True):
+            if now - stored_at >= self.ttl_seconds:
+                continue
+            key = location_key(location)
+            entry = self._entries.get(key)
+            if entry is not None:
+                if entry[0] < stored_at:
+                    self._entries[key] = (stored_at, location, answer)
+            elif len(self._entries) < self.max_entries:
+                self._entries[key] = (stored_at, location, answer)
+                self._entries.move_to_end(key, last=False)
+
+    def _read(self) -> List[Tuple[float, str, str]]:
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                return [tuple(row) for row in json.load(f)["entries"]]
+        except FileNotFoundError:
+            return []
+        except (OSError, ValueError, KeyError, TypeError):
+            logger.warning("crisis_search:cache_unreadable path=%s", self.path, exc_info=True)
+            return []
+
+    def load(self) -> int:
+        """Read unexpired entries from ``path``; returns how many entries the cache holds."""
+        rows = self._read()
+        with self._lock:
+            self._merge(rows, self._clock())
+            return len(self._entries)
+
+    def save(self) -> None:
+        """
+        Merge the entries into ``path`` and replace it atomically; no-op
+        without one or without changes since the last save. Entries other
+        instances saved meanwhile are loaded too. Saves from other instances
+        wait on the lock file, so none drops another's entries.
+        """
+        if not self.path:
+            return
+        with self._save_lock:
+            with self._lock:
+                if not self._dirty:
+                    return
+                self._dirty = False
+            try:
+                with self._file_lock():
+                    self._merge_into_file()
+            except OSError:
+                logger.warning("crisis_search:cache_not_saved path=%s", self.path, exc_info=True)
+                with self._lock:
+                    self._dirty = True
+
+    @contextmanager
+    def _file_lock(self):
+        """Exclusive flock on ``<path>.lock``, across processes and instances."""
+        with open(f"{self.path}.lock", "a") as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock, fcntl.LOCK_UN)
+
+    def _merge_into_file(self) -> None:
+        """Re-read ``path``, merge it with ours and replace it (file lock held)."""
+        rows = self._read()
+        now = self._clock()
+        with self._lock:
+            self._merge(rows, now)
+            mine = list(self._entries.values())
+        newest: Dict[Hashable, Tuple[float, str, str]] = {}
+        for row in rows + mine:
+            key = location_key(row[1])
+            if now - row[0] < self.ttl_seconds and (key not in newest or newest[key][0] < row[0]):
+                newest[key] = row
+        rows = sorted(newest.values(), key=lambda row: row[0])[-self.max_entries:]
+        tmp = f"{self.path}.{os.getpid()}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({"entries": rows}, f, ensure_ascii=False)
+        os.replace(tmp, self.path)
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._entries)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            stats: Dict[str, Any] = dict(self._stats, entries=len(self._entries))
+        lookups = stats["hits"] + stats["misses"]
+        stats["hit_rate"] = stats["hits"] / lookups if lookups else 0.0
+        return stats
+
+
+# Shared by every instance of the crisis agent. CAPY_CRISIS_SEARCH_CACHE_PATH
+# persists it (point it at a mounted volume on Cloud Run);
+# CAPY_CRISIS_SEARCH_CACHE_ENTRIES (512) and CAPY_CRISIS_SEARCH_CACHE_TTL_S
+# (one week) bound it. `python -m capymind_agent.tools.crisis_search --top 50
+# --path <file>` pre-warms the file for the most common user locations.
+search_cache = SearchCache(
+    max_entries=env_int("CAPY_CRISIS_SEARCH_CACHE_ENTRIES", 512),
+    ttl_seconds=env_int("CAPY_CRISIS_SEARCH_CACHE_TTL_S", 7 * 86400),
+    path=os.getenv("CAPY_CRISIS_SEARCH_CACHE_PATH") or None,
+)
+
+
+async def search_crisis_lines(location: str, cache: SearchCache, search: Search) -> Tuple[str, bool]:
+    """(answer, from cache) for ``location``; concurrent misses for one location share a search."""
+    answer = cache.get(location)
+    if answer is not None:
+        return answer, True
+
+    async def run() -> str:
+        answer = await search(location)
+        cache.put(location, answer)
+        # Re-reads and rewrites the shared file: keep it off the event loop
+        await asyncio.to_thread(cache.save)
+        return answer
+
+    return await single_flight.do_async(("crisis_search", location_key(location)), run), False
+
+
+def _prefetched_location(tool_context: ToolContext) -> Optional[str]:
+    # Settings read by the session prefetch, when it ran
+    state = getattr(tool_context, "state", None) or {}
+    return ((state.get(PREFETCH_STATE_KEY) or {}).get("settings") or {}).get("Location")
+
+
+async def capy_search_crisis_lines(
+    tool_context: ToolContext,
+    location: Optional[str] = None,
+    project_id: Optional[str] = None,
+    database: Optional[str] = None,
+) -> Dict[str, Any]:
+    """
+    Web search for crisis line numbers, for locations capy_crisis_lines does
+    not cover. Without location it uses the user's Location setting; pass
+    location when the user told you where they are. Answers are shared
+    across users in the same place for a while ("cached": true).
+    """
+    user_id = firestore_data.user_id_from_context(tool_context)
+    if user_id is None:
+        return {"ok": False, "error": "Unable to extract user_id from tool context"}
+    try:
+        if not location:
+            location = _prefetched_location(tool_context)
+        if not location:
+            location, _ = await saved_location(user_id, project_id, database)
+        if not location or not location_key(location):
+            return {"ok": False, "error": "No location known; ask the user where they are"}
+        answer, cached = await search_crisis_lines(location, search_cache, agent_search)
+        logger.info("crisis_search:answered location=%r cached=%s", location, cached)
+        return {"ok": True, "location": location, "result": answer, "cached": cached}
+    except Exception as e:  # pragma: no cover - runtime failures surface as tool errors
+        logger.exception("capy_search_crisis_lines:error user_id=%s", user_id)
+        return {"ok": False, "error": str(e)}
+
+
+# Expose as ADK FunctionTool instance for agent.tools
+crisis_search_tool = FunctionTool(capy_search_crisis_lines)
+
+
+def top_locations(db: Any, n: int, uncovered_only: bool = True) -> List[Tuple[str, int]]:
+    """
+    The ``n`` most common settings Locations as (location, users), one
+    spelling per normalized location; with ``uncovered_only`` only those the
+    bundled directory cannot answer, i.e. the ones that would be searched.
+    """
+    users: Counter = Counter()
+    spellings: Dict[str, Counter] = {}
+    for snapshot in db.collection("settings").select(["Location", "SecondsFromUTC"]).stream():
+        location, seconds_from_utc = location_settings(snapshot.to_dict())
+        key = location_key(location or "")
+        if not key or (uncovered_only and crisis_directory.lookup(location, seconds_from_utc) is not None):
+            continue
+        users[key] += 1
+        spellings.setdefault(key, Counter())[location.strip()] += 1
+    return [(spellings[key].most_common(1)[0][0], count) for key, count in users.most_common(n)]
+
+
+async def warm(cache: SearchCache, locations: Iterable[str], search: Search, concurrency: int = 4) -> int:
+    """Search every location not cached yet; returns how many were searched."""
+    semaphore = asyncio.Semaphore(concurrency)
+    searched = 0
+
+    async def one(location: str) -> None:
+        nonlocal searched
+        async with semaphore:
+            try:
+                _, cached = await search_crisis_lines(location, cache, search)
+            except Exception:
+                logger.warning("crisis_search:warm_failed location=%r", location, exc_info=True)
+                return
+            searched += not cached
+
+    await asyncio.gather(*(one(location) for location in locations))
+    return searched
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Pre-warm the crisis line search cache for the most common user locations.")
+    parser.add_argument("--top", type=int, default=50, help="number of locations to warm")
+    parser.add_argument("--path", default=os.getenv("CAPY_CRISIS_SEARCH_CACHE_PATH"), help="cache file to update")
+    parser.add_argument("--project", default=None, help="Firestore project (default: GOOGLE_CLOUD_PROJECT)")
+    parser.add_argument("--database", default=None, help="Firestore database (default: GOOGLE_CLOUD_DATABASE)")
+    args = parser.parse_args()
+    if not args.path:
+        parser.error("--path or CAPY_CRISIS_SEARCH_CACHE_PATH is required")
+    logging.basicConfig(level=logging.INFO)
+
+    cache = SearchCache(path=args.path)
+    db = client_pool.get(override_project_id=args.project, override_database=args.database)
+    locations = top_locations(db, args.top)
+    searched = asyncio.run(warm(cache, [location for location, _ in locations], agent_search))
+    logger.info("crisis_search:warmed locations=%d searched=%d entries=%d", len(locations), searched, len(cache))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,163 @@
+import os
+import copy
+import time
+import logging
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Optional
+
+from capymind_agent.tools.config import env_flag, env_int
+
+logger = logging.getLogger("capymind.firestore")
+
+
+class _Entry:
+    __slots__ = ("value", "expires_at", "watch")
+
+    def __init__(self, value: Any, expires_at: float, watch: Any = None):
+        self.value = value
+        self.expires_at = expires_at
+        self.watch = watch
+
+
+class DocumentCache:
+    """
+    Bounded read-through cache for small per-user documents (users/settings).
+
+    Entries expire after ``ttl_seconds`` and the least recently used entry is
+    evicted once ``max_entries`` is reached. When ``watch`` is enabled every
+    cached document also holds a Firestore ``on_snapshot`` listener that drops
+    the entry as soon as the document changes; the listener is released when
+    the entry leaves the cache.
+    """
+
+    def __init__(
+        self,
+        max_entries: int = 1024,
+        ttl_seconds: float = 60.0,
+        watch: bool = False,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.watch = watch
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[Hashable, _Entry]" = OrderedDict()
+        self._stats = {"hits": 0, "misses": 0, "evictions": 0, "expirations": 0, "invalidations": 0}
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_entries > 0 and self.ttl_seconds > 0
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        """Return a copy of the cached value, or None on a miss or expired entry."""
+        if not self.enabled:
+            return None
+        expired = None
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self._stats["misses"] += 1
+                return None
+            if entry.expires_at <= self._clock():
+                expired = self._entries.pop(key)
+                self._stats["expirations"] += 1
+                self._stats["misses"] += 1
+            else:
+                self._entries.move_to_end(key)
+                self._stats["hits"] += 1
+                value = entry.value
+        if expired is not None:
+            _unsubscribe(expired.watch)
+            return None
+        return copy.deepcopy(value)
+
+    def put(self, key: Hashable, value: Any, doc_ref: Any = None) -> None:
+        """Store ``value``; with watching enabled, subscribe to ``doc_ref`` changes."""
+        if not self.enabled:
+            return
+        watch = self._subscribe(key, doc_ref) if self.watch and doc_ref is not None else None
+        released = []
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                released.append(previous.watch)
+            self._entries[key] = _Entry(copy.deepcopy(value), self._clock() + self.ttl_seconds, watch)
+            while len(self._entries) > self.max_entries:
+                _, evicted = self._entries.popitem(last=False)
+                self._stats["evictions"] += 1
+                released.append(evicted.watch)
+        for stale_watch in released:
+            _unsubscribe(stale_watch)
+
+    def invalidate(self, key: Hashable) -> bool:
+        with self._lock:
+            entry = self._entries.pop(key, None)
+            if entry is not None:
+                self._stats["invalidations"] += 1
+        if entry is None:
+            return False
+        _unsubscribe(entry.watch)
+        return True
+
+    def clear(self) -> None:
+        """Drop every entry and release all snapshot listeners."""
+        with self._lock:
+            entries = list(self._entries.values())
+            self._entries.clear()
+        for entry in entries:
+            _unsubscribe(entry.watch)
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return dict(self._stats, size=len(self._entries))
+
+    def _subscribe(self, key: Hashable, doc_ref: Any) -> Any:
+        initial = [True]
+
+        def on_snapshot(doc_snapshots, changes, read_time):
+            # The first callback carries the state we just cached
+            if initial[0]:
+                initial[0] = False
+                return
+            logger.debug("doc_cache:invalidate key=%s", key)
+            self._invalidate_watched(key, watch_holder)
+
+        watch_holder: Dict[str, Any] = {}
+        try:
+            watch_holder["watch"] = doc_ref.on_snapshot(on_snapshot)
+        except Exception as e:
+            logger.warning("doc_cache:watch_failed key=%s error=%s", key, e)
+            return None
+        return watch_holder["watch"]
+
+    def _invalidate_watched(self, key: Hashable, watch_holder: Dict[str, Any]) -> None:
+        # Only drop the entry owned by this listener; a newer put may have replaced it
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry.watch is not watch_holder.get("watch"):
+                return
+            del self._entries[key]
+            self._stats["invalidations"] += 1
+        # Watch.unsubscribe joins the listener thread, so it cannot run on it
+        threading.Thread(target=_unsubscribe, args=(entry.watch,), daemon=True).start()
+
+
+def _unsubscribe(watch: Any) -> None:
+    if watch is None:
+        return
+    try:
+        watch.unsubscribe()
+    except Exception:  # pragma: no cover - listener teardown is best effort
+        logger.exception("doc_cache:unsubscribe_failed")
+
+
+# Shared cache for get_user / get_settings. Configure with CAPY_DOC_CACHE_SIZE,
+# CAPY_DOC_CACHE_TTL (seconds, 0 disables) and CAPY_DOC_CACHE_WATCH (1 to keep
+# entries fresh with on_snapshot listeners).
+document_cache = DocumentCache(
+    max_entries=env_int("CAPY_DOC_CACHE_SIZE", 1024),
+    ttl_seconds=env_int("CAPY_DOC_CACHE_TTL", 60),
+    watch=env_flag("CAPY_DOC_CACHE_WATCH"),
+)
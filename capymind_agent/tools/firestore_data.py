@@ -1,8 +1,31 @@
 import os
+import json
+import base64
+import asyncio
 import logging
-from typing import Any, Dict, List, Optional
+import functools
+import contextvars
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, List, Optional, Tuple
 from google.adk.tools import FunctionTool, ToolContext
 
+from capymind_agent.tools.client_pool import client_pool, resolve_database, resolve_project
+from capymind_agent.tools.doc_cache import document_cache
+from capymind_agent.tools.metrics import record_reads
+from capymind_agent.tools.tracing import FIRESTORE_DOCUMENTS, firestore_span
+from capymind_agent.tools.notes_digest import DIGEST_COLLECTION, DIGEST_DOCUMENT, notes_digest
+from capymind_agent.tools.notes_search import MAX_RESULTS, notes_index
+from capymind_agent.tools.resilience import TRANSIENT_ERRORS, firestore_guard, rpc_options
+from capymind_agent.tools.single_flight import single_flight
+from capymind_agent.tools.notes_stats import (
+    Bucket,
+    count_buckets,
+    count_buckets_async,
+    stats_buckets,
+    stats_payload,
+)
+
 # Module-level logger for Firestore tool
 logger = logging.getLogger("capymind.firestore")
 
@@ -26,92 +49,452 @@ if not logger.handlers:
     logger.propagate = False
 
 
-def _to_jsonable(value: Any) -> Any:
-    """Best-effort conversion of Firestore values to JSON-serializable types."""
-    # Lazy import to avoid heavy deps at import time for unrelated runs
+# Document references (sync and async) are resolved once at import time; both
+# client flavours derive from BaseDocumentReference.
+try:
+    from google.cloud.firestore_v1.base_document import BaseDocumentReference as _DocumentReferenceType  # type: ignore
+except ImportError:  # pragma: no cover - older client layouts
     try:
-        from google.cloud.firestore_v1 import DocumentReference  # type: ignore
+        from google.cloud.firestore import DocumentReference as _DocumentReferenceType  # type: ignore
     except ImportError:
-        try:
-            from google.cloud.firestore import DocumentReference  # type: ignore
-        except ImportError:
-            # Fallback if neither import works
-            DocumentReference = ()  # type: ignore
-    except Exception:  # pragma: no cover - optional import safety
-        DocumentReference = ()  # type: ignore
+        _DocumentReferenceType = None  # type: ignore
+
+
+def _leave(value: Any) -> Any:
+    return value
+
 
+def _isoformat(value: Any) -> Any:
     # Firestore timestamp -> datetime
-    if hasattr(value, "isoformat"):
-        try:
-            return value.isoformat()
-        except Exception:
-            pass
+    try:
+        return value.isoformat()
+    except Exception:
+        return value
+
 
+def _reference_path(value: Any) -> Any:
     # Firestore document reference -> path string
-    if isinstance(value, DocumentReference):
-        return value.path
+    return value.path
+
+
+# Marker handler for dicts/lists, which are walked by _convert_container
+def _container(value: Any) -> Any:  # pragma: no cover - never called directly
+    raise AssertionError("containers are converted iteratively")
+
+
+# Exact type -> handler. Subclasses (e.g. DatetimeWithNanoseconds) are resolved
+# on first sight by _resolve_handler and cached here.
+_HANDLERS: Dict[type, Callable[[Any], Any]] = {
+    str: _leave,
+    int: _leave,
+    float: _leave,
+    bool: _leave,
+    type(None): _leave,
+    dict: _container,
+    list: _container,
+}
+
+
+def _resolve_handler(value_type: type) -> Callable[[Any], Any]:
+    if hasattr(value_type, "isoformat"):
+        handler = _isoformat
+    elif _DocumentReferenceType is not None and issubclass(value_type, _DocumentReferenceType):
+        handler = _reference_path
+    elif issubclass(value_type, (dict, list)):
+        handler = _container
+    else:
+        handler = _leave
+    _HANDLERS[value_type] = handler
+    return handler
+
+
+class _Frame:
+    """One dict/list being converted; ``out`` is only allocated once a child changes."""
+
+    __slots__ = ("source", "keys", "values", "index", "out")
+
+    def __init__(self, source: Any):
+        self.source = source
+        if isinstance(source, dict):
+            self.keys: Optional[List[Any]] = list(source.keys())
+            self.values = list(source.values())
+        else:
+            self.keys = None
+            self.values = source
+        self.index = 0
+        self.out: Optional[List[Any]] = None
+
+    def set(self, converted: Any) -> None:
+        if self.out is None:
+            if converted is self.values[self.index]:
+                return
+            self.out = list(self.values)
+        self.out[self.index] = converted
+
+    def result(self) -> Any:
+        if self.out is None:
+            return self.source
+        if self.keys is not None:
+            return dict(zip(self.keys, self.out))
+        return self.out
+
+
+_PENDING = object()
 
+# Nesting depth handled by the recursive fast path before switching to the
+# explicit-stack walker, far below the interpreter recursion limit.
+_MAX_RECURSIVE_DEPTH = 48
+
+
+def _convert_container(root: Any) -> Any:
+    # Explicit stack instead of recursion so deeply nested values cannot hit
+    # the interpreter recursion limit.
+    stack = [_Frame(root)]
+    returned: Any = _PENDING
+    while stack:
+        frame = stack[-1]
+        if returned is not _PENDING:
+            frame.set(returned)
+            frame.index += 1
+            returned = _PENDING
+        values = frame.values
+        while frame.index < len(values):
+            child = values[frame.index]
+            handler = _HANDLERS.get(type(child)) or _resolve_handler(type(child))
+            if handler is _container:
+                stack.append(_Frame(child))
+                break
+            if handler is not _leave:
+                frame.set(handler(child))
+            frame.index += 1
+        else:
+            stack.pop()
+            returned = frame.result()
+    return returned
+
+
+def _convert_nested(value: Any, depth: int) -> Any:
+    """Copy-on-write conversion of one dict/list; hands deep values to _convert_container."""
+    if depth >= _MAX_RECURSIVE_DEPTH:
+        return _convert_container(value)
+    handlers = _HANDLERS
+    out: Any = None
     if isinstance(value, dict):
-        return {k: _to_jsonable(v) for k, v in value.items()}
-    if isinstance(value, list):
-        return [_to_jsonable(v) for v in value]
-    return value
+        for key, child in value.items():
+            handler = handlers.get(type(child)) or _resolve_handler(type(child))
+            if handler is _leave:
+                continue
+            converted = _convert_nested(child, depth + 1) if handler is _container else handler(child)
+            if converted is not child:
+                if out is None:
+                    out = dict(value)
+                out[key] = converted
+    else:
+        for index, child in enumerate(value):
+            handler = handlers.get(type(child)) or _resolve_handler(type(child))
+            if handler is _leave:
+                continue
+            converted = _convert_nested(child, depth + 1) if handler is _container else handler(child)
+            if converted is not child:
+                if out is None:
+                    out = list(value)
+                out[index] = converted
+    if out is None:
+        return value
+    return out
+
+
+def _to_jsonable(value: Any) -> Any:
+    """
+    Best-effort conversion of Firestore values to JSON-serializable types.
+
+    Values that are already JSON-safe are returned as-is; dicts and lists are
+    only rebuilt when something inside them had to be converted.
+    """
+    handler = _HANDLERS.get(type(value)) or _resolve_handler(type(value))
+    if handler is _container:
+        return _convert_nested(value, 0)
+    return handler(value)
 
 
 def _get_firestore_client(
     override_project_id: Optional[str] = None,
     override_database: Optional[str] = None,
 ):
-    # Lazy import inside the tool to keep module import light
-    from google.cloud.firestore import Client as FirestoreClient
-    from google.auth import default
-    from google.auth.exceptions import DefaultCredentialsError
-    from google.auth.credentials import AnonymousCredentials
-
-    # Determine project from explicit override or common environment variables.
-    final_project = (
-        override_project_id
-        or os.getenv("GOOGLE_CLOUD_PROJECT")
-        or os.getenv("GCP_PROJECT")
-        or "capymind"
+    # Clients are pooled per (project, database) so credentials and the gRPC
+    # channel are set up once per process rather than on every tool call.
+    return client_pool.get(
+        override_project_id=override_project_id,
+        override_database=override_database,
     )
 
-    client_kwargs: Dict[str, Any] = {
-        "project": final_project,
-    }
 
-    # Try to get default credentials, but provide fallback if they're not available
+# Point reads of 'users/{user_id}' and 'settings/{user_id}', served read-through
+# from the shared document cache: operation -> (collection, not-found message)
+_DOCUMENT_OPERATIONS = {
+    "get_user": ("users", "user '{user_id}' not found"),
+    "get_settings": ("settings", "settings for user '{user_id}' not found"),
+}
+
+
+# Sections returned by get_context, in payload order
+_CONTEXT_SECTIONS = ("user", "settings", "notes")
+_SECTION_COLLECTIONS = {"user": "users", "settings": "settings"}
+
+# Shared worker pool for queries that run alongside other reads in one call
+_executor = ThreadPoolExecutor(max_workers=8, thread_name_prefix="capy-firestore")
+
+
+def _snapshot_data(doc: Any) -> Dict[str, Any]:
+    data = doc.to_dict() or {}
+    data["id"] = doc.id
+    return _to_jsonable(data)
+
+
+def _read_document(
+    db: Any,
+    collection: str,
+    user_id: str,
+    project: str,
+    database: str,
+) -> Optional[Dict[str, Any]]:
+    """Return '{collection}/{user_id}' as JSON-safe data (cached), or None if missing."""
+    cache_key = (project, database, collection, user_id)
+    cached = document_cache.get(cache_key)
+    if cached is not None:
+        return cached
+    # Shared with other operations reading the same document at the same time
+    return single_flight.do(
+        ("document",) + cache_key,
+        functools.partial(_fetch_document, db, collection, user_id, cache_key),
+    )
+
+
+def _fetch_document(db: Any, collection: str, user_id: str, cache_key: Tuple[str, ...]) -> Optional[Dict[str, Any]]:
+    doc_ref = db.collection(collection).document(user_id)
+    with firestore_span("get", collection):
+        doc = doc_ref.get(**rpc_options())
+    record_reads(collection, 1)
+    if not doc.exists:
+        return None
+    data = _snapshot_data(doc)
+    document_cache.put(cache_key, data, doc_ref=doc_ref)
+    return data
+
+
+def _read_documents(
+    db: Any,
+    collections: List[str],
+    user_id: str,
+    project: str,
+    database: str,
+) -> Dict[str, Optional[Dict[str, Any]]]:
+    """Like _read_document for several collections, fetching cache misses in one get_all()."""
+    results: Dict[str, Optional[Dict[str, Any]]] = {}
+    pending: Dict[str, Tuple[str, Any]] = {}
+    for collection in collections:
+        cached = document_cache.get((project, database, collection, user_id))
+        if cached is not None:
+            results[collection] = cached
+        else:
+            doc_ref = db.collection(collection).document(user_id)
+            pending[doc_ref.path] = (collection, doc_ref)
+
+    if pending:
+        refs = [doc_ref for _, doc_ref in pending.values()]
+        with firestore_span("get_all", ",".join(collection for collection, _ in pending.values())):
+            snapshots = list(db.get_all(refs, **rpc_options()))
+        for doc in snapshots:
+            collection, doc_ref = pending[doc.reference.path]
+            record_reads(collection, 1)
+            if not doc.exists:
+                results[collection] = None
+                continue
+            data = _snapshot_data(doc)
+            document_cache.put((project, database, collection, user_id), data, doc_ref=doc_ref)
+            results[collection] = data
+    return results
+
+
+def _parse_timestamp(value: str) -> datetime:
+    """Parse an ISO 8601 timestamp; naive values are taken as UTC."""
+    parsed = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed
+
+
+def encode_cursor(note: Dict[str, Any]) -> str:
+    """Opaque get_notes cursor pointing just past ``note``."""
+    payload = json.dumps({"ts": note["timestamp"], "id": note["id"]}, separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, str]:
+    padded = cursor + "=" * (-len(cursor) % 4)
+    payload = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+    return _parse_timestamp(payload["ts"]), payload["id"]
+
+
+def _notes_filters(
+    since: Optional[str],
+    until: Optional[str],
+    start_after: Optional[str],
+) -> Tuple[Dict[str, Any], Optional[str]]:
+    """Parse get_notes window arguments into _notes_query kwargs, or return an error."""
     try:
-        credentials, auth_project = default()
-        client_kwargs["credentials"] = credentials
-        # Use project from credentials if no override provided
-        if not override_project_id and auth_project:
-            client_kwargs["project"] = auth_project
-            final_project = auth_project
-        
-            
-    except DefaultCredentialsError:
-        # No credentials available, use anonymous credentials as fallback
-        # This allows the client to be created but will fail on actual operations
-        client_kwargs["credentials"] = AnonymousCredentials()
-        logger.warning(
-            "No default credentials found. For local development, set GOOGLE_APPLICATION_CREDENTIALS "
-            "to point to a service account key file, or run 'gcloud auth application-default login'. "
-            "Using anonymous credentials (operations will fail with permission errors)."
+        return {
+            "since": _parse_timestamp(since) if since else None,
+            "until": _parse_timestamp(until) if until else None,
+            "cursor": decode_cursor(start_after) if start_after else None,
+        }, None
+    except (ValueError, KeyError, TypeError) as e:
+        return {}, f"invalid notes filter: {e}"
+
+
+def _notes_range_query(
+    db: Any,
+    user_id: str,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+) -> Any:
+    """Notes of one user with since <= timestamp < until, newest first."""
+    # Query notes by user reference
+    user_ref = db.collection("users").document(user_id)
+    from google.cloud.firestore import Query  # type: ignore
+    query = db.collection("notes").where("user", "==", user_ref)
+    if since is not None:
+        query = query.where("timestamp", ">=", since)
+    if until is not None:
+        query = query.where("timestamp", "<", until)
+    return query.order_by("timestamp", direction=Query.DESCENDING)
+
+
+def _notes_query(
+    db: Any,
+    user_id: str,
+    limit: int,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    cursor: Optional[Tuple[datetime, str]] = None,
+    fields: Optional[List[str]] = None,
+) -> Any:
+    """Build the recent-notes query; works for both Client and AsyncClient."""
+    query = _notes_range_query(db, user_id, since, until)
+    if cursor is not None:
+        from google.cloud.firestore import Query  # type: ignore
+        timestamp, note_id = cursor
+        # Tie-break on the document id (Firestore's implicit final ordering) so
+        # notes sharing a timestamp are neither repeated nor skipped
+        query = query.order_by("__name__", direction=Query.DESCENDING).start_after(
+            {"timestamp": timestamp, "__name__": note_id}
         )
-    except Exception as e:
-        logger.warning(f"Unexpected error getting credentials: {e}, using anonymous credentials")
-        client_kwargs["credentials"] = AnonymousCredentials()
+    if fields:
+        # The timestamp is always needed to build the next cursor
+        query = query.select(sorted(set(fields) | {"timestamp"}))
+    return query.limit(limit)
+
+
+def _query_notes(db: Any, user_id: str, limit: int, **filters: Any) -> List[Dict[str, Any]]:
+    """Return the user's most recent notes, newest first."""
+    query = _notes_query(db, user_id, limit, **filters)
+    with firestore_span("query", "notes") as span:
+        notes = [_snapshot_data(snap) for snap in query.stream(**rpc_options())]
+        span.set_attribute(FIRESTORE_DOCUMENTS, len(notes))
+    record_reads("notes", len(notes))
+    return notes
+
+
+def _get_context(
+    db: Any,
+    user_id: str,
+    sections: List[str],
+    limit: int,
+    project: str,
+    database: str,
+) -> Dict[str, Any]:
+    """Fetch the requested sections together; missing documents come back as None."""
+    # Start the notes query first so it overlaps with the batched point reads
+    notes_future = (
+        # Copy the context so the query span stays under the tool span
+        _executor.submit(contextvars.copy_context().run, _query_notes, db, user_id, limit)
+        if "notes" in sections
+        else None
+    )
+    collections = [_SECTION_COLLECTIONS[section] for section in sections if section in _SECTION_COLLECTIONS]
+    documents = _read_documents(db, collections, user_id, project, database) if collections else {}
+
+    context: Dict[str, Any] = {}
+    for section in sections:
+        if section == "notes":
+            context["notes"] = notes_future.result()
+        else:
+            context[section] = documents.get(_SECTION_COLLECTIONS[section])
+    return context
 
-    # Pass database only if provided and supported by the installed library.
-    if override_database:
-        try:
-            return FirestoreClient(database=override_database, **client_kwargs)
-        except TypeError:
-            # Older firestore clients may not support the 'database' argument.
-            pass
 
-    return FirestoreClient(**client_kwargs)
+def _stats_buckets(
+    since: Optional[str],
+    until: Optional[str],
+    bucket: str,
+) -> Tuple[List[Bucket], Optional[str]]:
+    filters, error = _notes_filters(since, until, None)
+    if error:
+        return [], error
+    return stats_buckets(filters["since"], filters["until"], bucket)
+
+
+def _notes_result(notes: List[Dict[str, Any]], limit: int) -> Dict[str, Any]:
+    """Build the get_notes response from a query run with ``limit + 1``."""
+    # The extra row only signals that another page exists
+    page = notes[:limit]
+    result: Dict[str, Any] = {"ok": True, "data": page}
+    if len(notes) > limit and page and "timestamp" in page[-1]:
+        result["next_cursor"] = encode_cursor(page[-1])
+    return result
+
+
+def _search_args(
+    query: Optional[str],
+    since: Optional[str],
+    until: Optional[str],
+    limit: int,
+) -> Tuple[Dict[str, Any], Optional[str]]:
+    """Parse search_notes arguments into NotesSearchIndex.search kwargs, or return an error."""
+    if not query or not query.strip():
+        return {}, "search_notes requires a query"
+    filters, error = _notes_filters(since, until, None)
+    if error:
+        return {}, error
+    return {"query": query, "k": max(1, min(limit, MAX_RESULTS)), "since": filters["since"], "until": filters["until"]}, None
+
+
+def _digest_ref(db: Any, user_id: str) -> Any:
+    """'settings/{user_id}/agent/digest'; works for both Client and AsyncClient."""
+    return db.collection("settings").document(user_id).collection(DIGEST_COLLECTION).document(DIGEST_DOCUMENT)
+
+
+def _flight_key(args: Tuple[Any, ...]) -> Tuple[Any, ...]:
+    """Hashable single-flight key from tool call arguments (lists become tuples)."""
+    return tuple(tuple(arg) if isinstance(arg, list) else arg for arg in args)
+
+
+def user_id_from_context(tool_context: ToolContext) -> Optional[str]:
+    # Extract user_id from tool context
+    try:
+        return tool_context._invocation_context.user_id
+    except AttributeError:
+        logger.error("ToolContext does not have _invocation_context.user_id")
+        return None
+
+
+def _context_sections(sections: Optional[List[str]]) -> Tuple[List[str], Optional[str]]:
+    """Return (requested sections, error message) for get_context."""
+    requested = list(sections or _CONTEXT_SECTIONS)
+    unknown = [section for section in requested if section not in _CONTEXT_SECTIONS]
+    if unknown:
+        return requested, f"unsupported sections {unknown}"
+    return requested, None
 
 
 def capy_firestore_data(
@@ -120,80 +503,129 @@ def capy_firestore_data(
     limit: int = 10,
     project_id: Optional[str] = None,
     database: Optional[str] = None,
+    sections: Optional[List[str]] = None,
+    start_after: Optional[str] = None,
+    since: Optional[str] = None,
+    until: Optional[str] = None,
+    fields: Optional[List[str]] = None,
+    bucket: str = "day",
+    query: Optional[str] = None,
 ) -> Dict[str, Any]:
     """
     Firestore data access tool for CapyMind:
     - get_user: returns the user document from 'users/{user_id}'
-    - get_notes: returns recent notes for user, ordered by timestamp desc
+    - get_notes: returns recent notes for user, ordered by timestamp desc.
+      Optional: since/until (ISO 8601, since inclusive, until exclusive),
+      fields (e.g. ['text', 'timestamp']) to return only those fields, and
+      start_after set to a previous response's next_cursor to get the next page.
+    - notes_stats: counts notes per UTC 'day' or 'week' (bucket) between
+      since and until (default: last 30 days) without returning note text.
+    - search_notes: finds the user's notes about query (e.g. 'sleep') across
+      all their notes and returns the best `limit` matches (at most 20) as
+      dated snippets, best first; since/until narrow the dates.
+    - get_digest: returns a small precomputed summary of the user's journaling
+      (notes per week for the last 8 weeks, recent themes and keywords, notes
+      by local time of day and weekday, first note and last activity) without
+      note text. Prefer it to get_notes for general background.
     - get_settings: returns the settings document from 'settings/{user_id}'
+    - get_context: returns {"user", "settings", "notes"} in one call; pass
+      sections (any of 'user', 'settings', 'notes') to fetch only those.
+      Missing documents are null.
     """
-    # Extract user_id from tool context
-    try:
-        user_id = tool_context._invocation_context.user_id
-    except AttributeError:
-        logger.error("ToolContext does not have _invocation_context.user_id")
+    user_id = user_id_from_context(tool_context)
+    if user_id is None:
         return {"ok": False, "error": "Unable to extract user_id from tool context"}
-    
-    # Determine the actual project that will be used
-    actual_project = (
-        project_id
-        or os.getenv("GOOGLE_CLOUD_PROJECT")
-        or os.getenv("GCP_PROJECT")
-        or "capymind"
-    )
-    
-    # Determine the actual database that will be used
-    actual_database = (
-        database
-        or os.getenv("GOOGLE_CLOUD_DATABASE")
-        or "(default)"
+
+    # Determine the actual project and database that will be used
+    actual_project = resolve_project(project_id)
+    actual_database = resolve_database(database)
+
+    call = functools.partial(
+        _firestore_data, operation, user_id, project_id, actual_project, actual_database,
+        limit, sections, start_after, since, until, fields, bucket, query,
     )
-    
+    key = _flight_key(call.args)
+    guarded = functools.partial(firestore_guard.call, operation, key, (actual_project, actual_database), call)
+    # Identical calls already in flight (quick messages, several agents) share one read
+    return single_flight.do(key, guarded)
+
 
+def _firestore_data(
+    operation: str,
+    user_id: str,
+    project_id: Optional[str],
+    actual_project: str,
+    actual_database: str,
+    limit: int,
+    sections: Optional[List[str]],
+    start_after: Optional[str],
+    since: Optional[str],
+    until: Optional[str],
+    fields: Optional[List[str]],
+    bucket: str,
+    query: Optional[str],
+) -> Dict[str, Any]:
     try:
         db = _get_firestore_client(
             override_project_id=project_id,
             override_database=actual_database,
         )
 
-        if operation == "get_user":
-            doc = db.collection("users").document(user_id).get()
-            if not doc.exists:
-                return {"ok": False, "error": f"user '{user_id}' not found"}
-            data = doc.to_dict() or {}
-            data["id"] = doc.id
-            result = {"ok": True, "data": _to_jsonable(data)}
-            return result
+        if operation in _DOCUMENT_OPERATIONS:
+            collection, not_found = _DOCUMENT_OPERATIONS[operation]
+            data = _read_document(db, collection, user_id, actual_project, actual_database)
+            if data is None:
+                return {"ok": False, "error": not_found.format(user_id=user_id)}
+            return {"ok": True, "data": data}
 
         if operation == "get_notes":
-            # Query notes by user reference
-            user_ref = db.collection("users").document(user_id)
-            from google.cloud.firestore import Query  # type: ignore
-            query = (
-                db.collection("notes")
-                .where("user", "==", user_ref)
-                .order_by("timestamp", direction=Query.DESCENDING)
-                .limit(limit)
+            filters, error = _notes_filters(since, until, start_after)
+            if error:
+                return {"ok": False, "error": error}
+            notes = _query_notes(db, user_id, limit + 1, fields=fields, **filters)
+            return _notes_result(notes, limit)
+
+        if operation == "get_context":
+            requested_sections, error = _context_sections(sections)
+            if error:
+                return {"ok": False, "error": error}
+            return {
+                "ok": True,
+                "data": _get_context(db, user_id, requested_sections, limit, actual_project, actual_database),
+            }
+
+        if operation == "notes_stats":
+            buckets, error = _stats_buckets(since, until, bucket)
+            if error:
+                return {"ok": False, "error": error}
+            window_query = functools.partial(_notes_range_query, db, user_id)
+            counts, method = count_buckets(window_query, buckets, _executor)
+            return {"ok": True, "data": stats_payload(buckets, counts, bucket, method)}
+
+        if operation == "search_notes":
+            search, error = _search_args(query, since, until, limit)
+            if error:
+                return {"ok": False, "error": error}
+            since_query = functools.partial(_notes_range_query, db, user_id)
+            key = (actual_project, actual_database, user_id)
+            return {"ok": True, "data": notes_index.search(key, since_query, **search)}
+
+        if operation == "get_digest":
+            data = notes_digest.get(
+                document_cache,
+                (actual_project, actual_database, "digest", user_id),
+                _digest_ref(db, user_id),
+                functools.partial(_notes_range_query, db, user_id),
+                lambda: _read_document(db, "settings", user_id, actual_project, actual_database),
             )
-            results: List[Dict[str, Any]] = []
-            for snap in query.stream():
-                note = snap.to_dict() or {}
-                note["id"] = snap.id
-                results.append(_to_jsonable(note))
-            return {"ok": True, "data": results}
-
-        if operation == "get_settings":
-            doc = db.collection("settings").document(user_id).get()
-            if not doc.exists:
-                return {"ok": False, "error": f"settings for user '{user_id}' not found"}
-            data = doc.to_dict() or {}
-            data["id"] = doc.id
-            result = {"ok": True, "data": _to_jsonable(data)}
-            return result
+            return {"ok": True, "data": data}
 
         logger.warning("unsupported_operation op=%s user_id=%s", operation, user_id)
         return {"ok": False, "error": f"unsupported operation '{operation}'"}
 
+    except TRANSIENT_ERRORS:
+        # Retried, or answered from stale results, by firestore_guard
+        raise
     except Exception as e:  # pragma: no cover - runtime failures surface as tool errors
         # Emit full stack trace to aid debugging
         logger.exception(
@@ -208,5 +640,285 @@ def capy_firestore_data(
         pass
 
 
-# Expose as ADK FunctionTool instance for agent.tools
-firestore_data_tool = FunctionTool(capy_firestore_data)
+# ---------------------------------------------------------------------------
+# asyncio variant
+#
+# Same operations and {"ok", "data"} contract as capy_firestore_data, built on
+# the pooled google.cloud.firestore.AsyncClient so a slow read never blocks the
+# event loop serving other sessions. Query construction and the document cache
+# are shared with the synchronous path; only execution is awaited.
+# ---------------------------------------------------------------------------
+
+
+def _get_async_firestore_client(
+    override_project_id: Optional[str] = None,
+    override_database: Optional[str] = None,
+):
+    # Async clients are bound to the event loop that first uses them, which in
+    # the served app is the single uvicorn loop.
+    return client_pool.get_async(
+        override_project_id=override_project_id,
+        override_database=override_database,
+    )
+
+
+def _watch_ref(collection: str, user_id: str, project_id: Optional[str], database: str) -> Any:
+    """Sync reference for on_snapshot listeners; AsyncClient cannot watch documents."""
+    if not document_cache.watch:
+        return None
+    return _get_firestore_client(project_id, database).collection(collection).document(user_id)
+
+
+async def _read_document_async(
+    db: Any,
+    collection: str,
+    user_id: str,
+    project_id: Optional[str],
+    project: str,
+    database: str,
+) -> Optional[Dict[str, Any]]:
+    cache_key = (project, database, collection, user_id)
+    cached = document_cache.get(cache_key)
+    if cached is not None:
+        return cached
+    return await single_flight.do_async(
+        ("document",) + cache_key,
+        functools.partial(_fetch_document_async, db, collection, user_id, project_id, cache_key),
+    )
+
+
+async def _fetch_document_async(
+    db: Any,
+    collection: str,
+    user_id: str,
+    project_id: Optional[str],
+    cache_key: Tuple[str, ...],
+) -> Optional[Dict[str, Any]]:
+    with firestore_span("get", collection):
+        doc = await db.collection(collection).document(user_id).get(**rpc_options())
+    record_reads(collection, 1)
+    if not doc.exists:
+        return None
+    data = _snapshot_data(doc)
+    document_cache.put(cache_key, data, doc_ref=_watch_ref(collection, user_id, project_id, cache_key[1]))
+    return data
+
+
+async def _read_documents_async(
+    db: Any,
+    collections: List[str],
+    user_id: str,
+    project_id: Optional[str],
+    project: str,
+    database: str,
+) -> Dict[str, Optional[Dict[str, Any]]]:
+    results: Dict[str, Optional[Dict[str, Any]]] = {}
+    pending: Dict[str, Tuple[str, Any]] = {}
+    for collection in collections:
+        cached = document_cache.get((project, database, collection, user_id))
+        if cached is not None:
+            results[collection] = cached
+        else:
+            doc_ref = db.collection(collection).document(user_id)
+            pending[doc_ref.path] = (collection, doc_ref)
+
+    if pending:
+        refs = [doc_ref for _, doc_ref in pending.values()]
+        with firestore_span("get_all", ",".join(collection for collection, _ in pending.values())):
+            snapshots = [doc async for doc in db.get_all(refs, **rpc_options())]
+        for doc in snapshots:
+            collection, _ = pending[doc.reference.path]
+            record_reads(collection, 1)
+            if not doc.exists:
+                results[collection] = None
+                continue
+            data = _snapshot_data(doc)
+            document_cache.put(
+                (project, database, collection, user_id),
+                data,
+                doc_ref=_watch_ref(collection, user_id, project_id, database),
+            )
+            results[collection] = data
+    return results
+
+
+async def _query_notes_async(db: Any, user_id: str, limit: int, **filters: Any) -> List[Dict[str, Any]]:
+    query = _notes_query(db, user_id, limit, **filters)
+    with firestore_span("query", "notes") as span:
+        notes = [_snapshot_data(snap) async for snap in query.stream(**rpc_options())]
+        span.set_attribute(FIRESTORE_DOCUMENTS, len(notes))
+    record_reads("notes", len(notes))
+    return notes
+
+
+async def _get_context_async(
+    db: Any,
+    user_id: str,
+    sections: List[str],
+    limit: int,
+    project_id: Optional[str],
+    project: str,
+    database: str,
+) -> Dict[str, Any]:
+    collections = [_SECTION_COLLECTIONS[section] for section in sections if section in _SECTION_COLLECTIONS]
+    notes, documents = await asyncio.gather(
+        _query_notes_async(db, user_id, limit) if "notes" in sections else _none(),
+        _read_documents_async(db, collections, user_id, project_id, project, database) if collections else _none(),
+    )
+
+    context: Dict[str, Any] = {}
+    for section in sections:
+        if section == "notes":
+            context["notes"] = notes
+        else:
+            context[section] = documents.get(_SECTION_COLLECTIONS[section])
+    return context
+
+
+async def _none() -> None:
+    return None
+
+
+async def capy_firestore_data_async(
+    operation: str,
+    tool_context: ToolContext,
+    limit: int = 10,
+    project_id: Optional[str] = None,
+    database: Optional[str] = None,
+    sections: Optional[List[str]] = None,
+    start_after: Optional[str] = None,
+    since: Optional[str] = None,
+    until: Optional[str] = None,
+    fields: Optional[List[str]] = None,
+    bucket: str = "day",
+    query: Optional[str] = None,
+) -> Dict[str, Any]:
+    user_id = user_id_from_context(tool_context)
+    if user_id is None:
+        return {"ok": False, "error": "Unable to extract user_id from tool context"}
+    return await user_data_async(
+        operation, user_id, limit, project_id, database, sections, start_after, since, until, fields, bucket, query,
+    )
+
+
+async def user_data_async(
+    operation: str,
+    user_id: str,
+    limit: int = 10,
+    project_id: Optional[str] = None,
+    database: Optional[str] = None,
+    sections: Optional[List[str]] = None,
+    start_after: Optional[str] = None,
+    since: Optional[str] = None,
+    until: Optional[str] = None,
+    fields: Optional[List[str]] = None,
+    bucket: str = "day",
+    query: Optional[str] = None,
+) -> Dict[str, Any]:
+    """capy_firestore_data_async for a known user_id, for other tools that read the user's data."""
+    actual_project = resolve_project(project_id)
+    actual_database = resolve_database(database)
+
+    call = functools.partial(
+        _firestore_data_async, operation, user_id, project_id, actual_project, actual_database,
+        limit, sections, start_after, since, until, fields, bucket, query,
+    )
+    key = _flight_key(call.args)
+    guarded = functools.partial(firestore_guard.call_async, operation, key, (actual_project, actual_database), call)
+    return await single_flight.do_async(key, guarded)
+
+
+async def _firestore_data_async(
+    operation: str,
+    user_id: str,
+    project_id: Optional[str],
+    actual_project: str,
+    actual_database: str,
+    limit: int,
+    sections: Optional[List[str]],
+    start_after: Optional[str],
+    since: Optional[str],
+    until: Optional[str],
+    fields: Optional[List[str]],
+    bucket: str,
+    query: Optional[str],
+) -> Dict[str, Any]:
+    try:
+        db = _get_async_firestore_client(
+            override_project_id=project_id,
+            override_database=actual_database,
+        )
+
+        if operation in _DOCUMENT_OPERATIONS:
+            collection, not_found = _DOCUMENT_OPERATIONS[operation]
+            data = await _read_document_async(
+                db, collection, user_id, project_id, actual_project, actual_database
+            )
+            if data is None:
+                return {"ok": False, "error": not_found.format(user_id=user_id)}
+            return {"ok": True, "data": data}
+
+        if operation == "get_notes":
+            filters, error = _notes_filters(since, until, start_after)
+            if error:
+                return {"ok": False, "error": error}
+            notes = await _query_notes_async(db, user_id, limit + 1, fields=fields, **filters)
+            return _notes_result(notes, limit)
+
+        if operation == "get_context":
+            requested_sections, error = _context_sections(sections)
+            if error:
+                return {"ok": False, "error": error}
+            data = await _get_context_async(
+                db, user_id, requested_sections, limit, project_id, actual_project, actual_database
+            )
+            return {"ok": True, "data": data}
+
+        if operation == "notes_stats":
+            buckets, error = _stats_buckets(since, until, bucket)
+            if error:
+                return {"ok": False, "error": error}
+            window_query = functools.partial(_notes_range_query, db, user_id)
+            counts, method = await count_buckets_async(window_query, buckets)
+            return {"ok": True, "data": stats_payload(buckets, counts, bucket, method)}
+
+        if operation == "search_notes":
+            search, error = _search_args(query, since, until, limit)
+            if error:
+                return {"ok": False, "error": error}
+            since_query = functools.partial(_notes_range_query, db, user_id)
+            key = (actual_project, actual_database, user_id)
+            return {"ok": True, "data": await notes_index.search_async(key, since_query, **search)}
+
+        if operation == "get_digest":
+            data = await notes_digest.get_async(
+                document_cache,
+                (actual_project, actual_database, "digest", user_id),
+                _digest_ref(db, user_id),
+                functools.partial(_notes_range_query, db, user_id),
+                lambda: _read_document_async(db, "settings", user_id, project_id, actual_project, actual_database),
+            )
+            return {"ok": True, "data": data}
+
+        logger.warning("unsupported_operation op=%s user_id=%s", operation, user_id)
+        return {"ok": False, "error": f"unsupported operation '{operation}'"}
+
+    except TRANSIENT_ERRORS:
+        raise
+    except Exception as e:  # pragma: no cover - runtime failures surface as tool errors
+        logger.exception(
+            "capy_firestore_data_async:error op=%s user_id=%s project_id=%s database=%s",
+            operation,
+            user_id,
+            actual_project,
+            actual_database,
+        )
+        return {"ok": False, "error": str(e)}
+
+
+# The model sees the same description for both variants
+capy_firestore_data_async.__doc__ = capy_firestore_data.__doc__
+
+# Expose as ADK FunctionTool instance for agent.tools. ADK awaits the async
+# variant directly on the serving event loop.
+firestore_data_tool = FunctionTool(capy_firestore_data_async)
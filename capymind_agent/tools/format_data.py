@@ -1,7 +1,190 @@
-from typing import Any, Dict, List
+from functools import lru_cache
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple, Union
 from datetime import datetime
 from google.adk.tools import FunctionTool, ToolContext
 
+# Display format shared by note and profile timestamps
+_TIME_FORMAT = "%B %d, %Y at %I:%M %p"
+
+# Labels for known settings fields
+SETTING_LABELS = {
+    "EveningReminderOffset": "Evening Reminder Time (hours from midnight)",
+    "HasEveningReminder": "Evening Reminder Enabled",
+    "HasMorningReminder": "Morning Reminder Enabled",
+    "Location": "Location",
+    "MorningReminderOffset": "Morning Reminder Time (hours from midnight)",
+    "SecondsFromUTC": "Timezone Offset (seconds from UTC)"
+}
+
+# Labels for known user profile fields
+USER_LABELS = {
+    "ChatID": "Chat ID",
+    "FirstName": "First Name",
+    "ID": "User ID",
+    "IsDeleted": "Account Status",
+    "IsOnboarded": "Onboarding Complete",
+    "IsTyping": "Currently Typing",
+    "LastCommand": "Last Command Used",
+    "LastName": "Last Name",
+    "Locale": "Language/Locale",
+    "Role": "User Role",
+    "SecondsFromUTC": "Timezone Offset (seconds from UTC)",
+    "TherapySessionEndAt": "Therapy Session Ends At",
+    "TherapySessionId": "Current Therapy Session ID",
+    "Timestamp": "Last Updated",
+    "UserName": "Username"
+}
+
+# User fields rendered as dates
+_USER_TIMESTAMP_FIELDS = ("TherapySessionEndAt", "Timestamp")
+
+_UNPARSED = object()
+
+
+def _parse_display_time(value: Any) -> Any:
+    """Format an ISO timestamp for display, or return _UNPARSED if it is not one."""
+    try:
+        dt = datetime.fromisoformat(value.replace('Z', '+00:00'))
+        return dt.strftime(_TIME_FORMAT)
+    except Exception:
+        return _UNPARSED
+
+
+_parse_display_time_cached = lru_cache(maxsize=4096)(_parse_display_time)
+
+
+def _display_time(value: Any) -> Any:
+    # Timestamps repeat across calls (same notes, same profile), so memoise them
+    try:
+        return _parse_display_time_cached(value)
+    except TypeError:
+        # Unhashable values cannot be cached
+        return _parse_display_time(value)
+
+
+def _yes_no(value: bool) -> str:
+    return "Yes" if value else "No"
+
+
+def _account_status(value: bool) -> str:
+    return "Deleted" if value else "Active"
+
+
+def _user_time(value: Any) -> str:
+    if not value:
+        return str(value)
+    formatted = _display_time(value)
+    return str(value) if formatted is _UNPARSED else formatted
+
+
+# A compiled field renderer: (label, bool formatter, value formatter or None for str)
+_FieldRenderer = Tuple[str, Callable[[bool], str], Optional[Callable[[Any], str]]]
+
+
+def _compile_field(data_type: str, key: str) -> _FieldRenderer:
+    labels = SETTING_LABELS if data_type == "settings" else USER_LABELS
+    # Use custom label if available, otherwise format the key
+    label = labels[key] if key in labels else key.replace("_", " ").title()
+    bool_format = _yes_no
+    value_format = None
+    if data_type == "user":
+        if key == "IsDeleted":
+            bool_format = _account_status
+        elif key in _USER_TIMESTAMP_FIELDS:
+            value_format = _user_time
+    return label, bool_format, value_format
+
+
+# (data_type, field) -> renderer, filled lazily as new fields are seen
+_FIELD_RENDERERS: Dict[Tuple[str, str], _FieldRenderer] = {}
+
+
+def _field_renderer(data_type: str, key: str) -> _FieldRenderer:
+    renderer = _FIELD_RENDERERS.get((data_type, key))
+    if renderer is None:
+        renderer = _FIELD_RENDERERS[(data_type, key)] = _compile_field(data_type, key)
+    return renderer
+
+
+def _iter_fields(data_type: str, header: str, fields: Dict[str, Any]) -> Iterator[str]:
+    yield header
+    for key, value in fields.items():
+        if key == "id":
+            continue
+        label, bool_format, value_format = _field_renderer(data_type, key)
+        # Format boolean values
+        if isinstance(value, bool):
+            value_str = bool_format(value)
+        elif value_format is not None:
+            value_str = value_format(value)
+        else:
+            value_str = str(value)
+        yield f"\n• **{label}**: {value_str}"
+
+
+def _iter_notes(data: List[Dict[str, Any]]) -> Iterator[str]:
+    separator = ""
+    for note in data:
+        # Parse timestamp for better formatting
+        timestamp_str = note.get("timestamp", "")
+        if not timestamp_str:
+            formatted_time = "Unknown date"
+        else:
+            formatted_time = _display_time(timestamp_str)
+            if formatted_time is _UNPARSED:
+                formatted_time = timestamp_str
+        yield (
+            f"{separator}📝 **Note from {formatted_time}**\n"
+            f"{note.get('text', 'No content')}\n"
+        )
+        separator = "\n"
+
+
+def _iter_settings(data: List[Dict[str, Any]]) -> Iterator[str]:
+    settings_doc = data[0]  # Settings should be a single document
+    # Handle nested settings structure
+    settings = settings_doc["settings"] if "settings" in settings_doc else settings_doc
+    return _iter_fields("settings", "⚙️ **Your Settings:**\n", settings)
+
+
+def _iter_user(data: List[Dict[str, Any]]) -> Iterator[str]:
+    user_doc = data[0]  # User should be a single document
+    # Handle nested user_data structure
+    user = user_doc["user_data"] if "user_data" in user_doc else user_doc
+    return _iter_fields("user", "👤 **Your Profile:**\n", user)
+
+
+# data_type -> chunk generator
+_FORMATTERS: Dict[str, Callable[[List[Dict[str, Any]]], Iterator[str]]] = {
+    "notes": _iter_notes,
+    "settings": _iter_settings,
+    "user": _iter_user,
+}
+
+
+def iter_format_data(
+    data_type: str,
+    data: Union[List[Dict[str, Any]], Dict[str, Any]],
+) -> Iterator[str]:
+    """
+    Stream the format_data output in chunks (one per note, or one per field
+    for settings/user). ``"".join(...)`` of the chunks equals format_data().
+    """
+    if not data:
+        yield f"No {data_type} found."
+        return
+
+    # Handle case where data might be a single dict instead of list
+    if isinstance(data, dict):
+        data = [data]
+
+    formatter = _FORMATTERS.get(data_type)
+    if formatter is None:
+        yield f"Unknown data type: {data_type}"
+        return
+    yield from formatter(data)
+
+
 def format_data(
     data_type: str,
     data: List[Dict[str, Any]],
@@ -12,143 +195,8 @@ def format_data(
     - data_type: 'notes', 'settings', or 'user'
     - data: List of dictionaries containing the data to format
     """
-    if not data:
-        return f"No {data_type} found."
-    
-    # Handle case where data might be a single dict instead of list
-    if isinstance(data, dict):
-        data = [data]
-    
-    if data_type == "notes":
-        formatted_notes = []
-        for note in data:
-            # Parse timestamp for better formatting
-            timestamp_str = note.get("timestamp", "")
-            try:
-                if timestamp_str:
-                    dt = datetime.fromisoformat(timestamp_str.replace('Z', '+00:00'))
-                    formatted_time = dt.strftime("%B %d, %Y at %I:%M %p")
-                else:
-                    formatted_time = "Unknown date"
-            except:
-                formatted_time = timestamp_str
-            
-            formatted_notes.append(
-                f"📝 **Note from {formatted_time}**\n"
-                f"{note.get('text', 'No content')}\n"
-            )
-        return "\n".join(formatted_notes)
-    
-    elif data_type == "settings":
-        if not data:
-            return "No settings found."
-        
-        settings_doc = data[0]  # Settings should be a single document
-        
-        # Handle nested settings structure
-        if "settings" in settings_doc:
-            settings = settings_doc["settings"]
-        else:
-            settings = settings_doc
-            
-        formatted_settings = ["⚙️ **Your Settings:**\n"]
-        
-        # Format specific settings with better labels
-        setting_labels = {
-            "EveningReminderOffset": "Evening Reminder Time (hours from midnight)",
-            "HasEveningReminder": "Evening Reminder Enabled",
-            "HasMorningReminder": "Morning Reminder Enabled", 
-            "Location": "Location",
-            "MorningReminderOffset": "Morning Reminder Time (hours from midnight)",
-            "SecondsFromUTC": "Timezone Offset (seconds from UTC)"
-        }
-        
-        for key, value in settings.items():
-            if key == "id":
-                continue
-                
-            # Use custom label if available, otherwise format the key
-            if key in setting_labels:
-                label = setting_labels[key]
-            else:
-                label = key.replace("_", " ").title()
-            
-            # Format boolean values
-            if isinstance(value, bool):
-                value_str = "Yes" if value else "No"
-            else:
-                value_str = str(value)
-                
-            formatted_settings.append(f"• **{label}**: {value_str}")
-        
-        return "\n".join(formatted_settings)
-    
-    elif data_type == "user":
-        if not data:
-            return "No user profile found."
-        
-        user_doc = data[0]  # User should be a single document
-        
-        # Handle nested user_data structure
-        if "user_data" in user_doc:
-            user = user_doc["user_data"]
-        else:
-            user = user_doc
-            
-        formatted_user = ["👤 **Your Profile:**\n"]
-        
-        # Format specific user fields with better labels
-        user_labels = {
-            "ChatID": "Chat ID",
-            "FirstName": "First Name",
-            "ID": "User ID",
-            "IsDeleted": "Account Status",
-            "IsOnboarded": "Onboarding Complete",
-            "IsTyping": "Currently Typing",
-            "LastCommand": "Last Command Used",
-            "LastName": "Last Name",
-            "Locale": "Language/Locale",
-            "Role": "User Role",
-            "SecondsFromUTC": "Timezone Offset (seconds from UTC)",
-            "TherapySessionEndAt": "Therapy Session Ends At",
-            "TherapySessionId": "Current Therapy Session ID",
-            "Timestamp": "Last Updated",
-            "UserName": "Username"
-        }
-        
-        for key, value in user.items():
-            if key == "id":
-                continue
-                
-            # Use custom label if available, otherwise format the key
-            if key in user_labels:
-                label = user_labels[key]
-            else:
-                label = key.replace("_", " ").title()
-            
-            # Format specific value types
-            if isinstance(value, bool):
-                if key == "IsDeleted":
-                    value_str = "Deleted" if value else "Active"
-                else:
-                    value_str = "Yes" if value else "No"
-            elif key in ["TherapySessionEndAt", "Timestamp"] and value:
-                # Format timestamps
-                try:
-                    dt = datetime.fromisoformat(value.replace('Z', '+00:00'))
-                    value_str = dt.strftime("%B %d, %Y at %I:%M %p")
-                except:
-                    value_str = str(value)
-            else:
-                value_str = str(value)
-                
-            formatted_user.append(f"• **{label}**: {value_str}")
-        
-        return "\n".join(formatted_user)
-    
-    else:
-        return f"Unknown data type: {data_type}"
+    return "".join(iter_format_data(data_type, data))
 
 
 # Expose as ADK FunctionTool instance for agent.tools
-format_data_tool = FunctionTool(format_data)
\ No newline at end of file
+format_data_tool = FunctionTool(format_data)
@@ -0,0 +1,253 @@
+import os
+import json
+import logging
+from typing import Awaitable, Callable, List, Optional, Tuple
+from google.adk.agents.callback_context import CallbackContext
+from google.adk.models import LlmRequest, LlmResponse
+from google.adk.models.registry import LLMRegistry
+from google.genai import types
+
+from capymind_agent.tools.config import env_int
+from capymind_agent.tools.crisis_detector import crisis_detector
+
+logger = logging.getLogger("capymind.history")
+
+# Session state key holding {"summary", "turns", "pinned"}: the rolling
+# summary of the first ``turns`` user turns, and the indices of the folded
+# turns still sent verbatim because they are safety-relevant
+STATE_KEY = "history_summary"
+
+# Rough size of a prompt without a tokenizer round trip: Gemini averages
+# about four characters per token on English text
+CHARS_PER_TOKEN = 4
+
+_CONTEXT_PREFIX = "For context:"
+_SAFETY_AGENT = "crisis_line"
+_SAFETY_TOOL = "capy_crisis_lines"
+_RENDERED_RESPONSE_CHARS = 600
+
+SUMMARY_INSTRUCTION = (
+    "You maintain the running summary of a supportive therapy conversation between a user and "
+    "CapyMind. Merge the previous summary with the new part of the conversation into one summary "
+    "of at most 250 words, written in the third person. Keep what the user shared about feelings, "
+    "events, people and goals, techniques already suggested and how they landed, commitments "
+    "made, and any risk or safety disclosures with the resources given. Drop greetings and "
+    "small talk. Reply with the summary only."
+)
+
+Summarizer = Callable[[str, List[types.Content]], Awaitable[str]]
+
+
+def estimate_tokens(text: str) -> int:
+    return _tokens(len(text))
+
+
+def _tokens(chars: int) -> int:
+    return (chars + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+
+
+def content_tokens(content: types.Content) -> int:
+    """Estimated tokens of one message, tool calls and results included."""
+    chars = 0
+    for part in content.parts or []:
+        if part.text:
+            chars += len(part.text)
+        elif part.function_call:
+            chars += len(part.function_call.name or "") + len(json.dumps(part.function_call.args or {}, default=str))
+        elif part.function_response:
+            chars += len(part.function_response.name or "") + len(
+                json.dumps(part.function_response.response or {}, default=str)
+            )
+    return _tokens(chars)
+
+
+def instruction_tokens(llm_request: LlmRequest) -> int:
+    instruction = llm_request.config.system_instruction if llm_request.config else None
+    return estimate_tokens(instruction) if isinstance(instruction, str) else 0
+
+
+def request_tokens(llm_request: LlmRequest) -> int:
+    """Estimated prompt tokens: system instruction plus every message."""
+    return instruction_tokens(llm_request) + sum(content_tokens(content) for content in llm_request.contents)
+
+
+def _user_text(content: types.Content) -> Optional[str]:
+    """The user's own message text; None for tool results and other agents' replies."""
+    if content.role != "user" or not content.parts:
+        return None
+    if any(part.function_response for part in content.parts):
+        return None
+    text = " ".join(part.text for part in content.parts if part.text)
+    if not text or text.startswith(_CONTEXT_PREFIX):
+        return None
+    return text
+
+
+def split_turns(contents: List[types.Content]) -> Tuple[List[types.Content], List[List[types.Content]]]:
+    """Split contents into (anything before the first user message, user turns)."""
+    preamble: List[types.Content] = []
+    turns: List[List[types.Content]] = []
+    for content in contents:
+        if _user_text(content) is not None:
+            turns.append([content])
+        elif turns:
+            turns[-1].append(content)
+        else:
+            preamble.append(content)
+    return preamble, turns
+
+
+def is_safety_turn(turn: List[types.Content]) -> bool:
+    """A turn with a risk signal in the user's message or a crisis-line answer."""
+    if crisis_detector.detect(_user_text(turn[0]) or "") is not None:
+        return True
+    for content in turn[1:]:
+        for part in content.parts or []:
+            call = part.function_call
+            if call and (call.name == _SAFETY_TOOL or (call.args or {}).get("agent_name") == _SAFETY_AGENT):
+                return True
+            if part.text and f"[{_SAFETY_AGENT}] said:" in part.text:
+                return True
+    return False
+
+
+def render_transcript(contents: List[types.Content]) -> str:
+    """Plain-text transcript of ``contents`` for the summariser."""
+    lines = []
+    for content in contents:
+        speaker = "User" if _user_text(content) is not None else "CapyMind"
+        for part in content.parts or []:
+            if part.text:
+                text = part.text
+                if text == _CONTEXT_PREFIX:
+                    continue
+                lines.append(f"{speaker}: {text}")
+            elif part.function_call:
+                lines.append(f"[tool call {part.function_call.name} {json.dumps(part.function_call.args or {}, default=str)}]")
+            elif part.function_response:
+                result = json.dumps(part.function_response.response or {}, default=str, ensure_ascii=False)
+                if len(result) > _RENDERED_RESPONSE_CHARS:
+                    result = result[:_RENDERED_RESPONSE_CHARS] + "..."
+                lines.append(f"[tool result {part.function_response.name} {result}]")
+    return "\n".join(lines)
+
+
+class ModelSummarizer:
+    """Summariser backed by a (small) Gemini model from ADK's registry."""
+
+    def __init__(self, model: str):
+        self.model = model
+
+    async def __call__(self, previous: str, contents: List[types.Content]) -> str:
+        prompt = f"Previous summary:\n{previous or '(none)'}\n\nNew part of the conversation:\n{render_transcript(contents)}"
+        request = LlmRequest(
+            model=self.model,
+            contents=[types.Content(role="user", parts=[types.Part(text=prompt)])],
+            config=types.GenerateContentConfig(system_instruction=SUMMARY_INSTRUCTION),
+        )
+        llm = LLMRegistry.new_llm(self.model)
+        texts = []
+        async for response in llm.generate_content_async(request):
+            if response.content and not response.partial:
+                texts.extend(part.text for part in response.content.parts or [] if part.text)
+        summary = "".join(texts).strip()
+        if not summary:
+            raise ValueError(f"empty summary from {self.model}")
+        return summary
+
+
+class HistoryCompactor:
+    """
+    Bounds the prompt of long sessions by folding old turns into a summary.
+
+    Runs as the last before_model_callback, so only on requests that really
+    go to the model. While the estimated prompt (system instruction plus
+    history) fits in ``budget_tokens`` the request is left alone. Past it,
+    every turn but the last ``keep_turns`` is merged into a rolling summary
+    by one summariser call and the summary is saved in session state. From
+    then on each request carries the summary as an instruction, every folded
+    safety-relevant turn verbatim (a crisis disclosure is never reduced to a
+    summary line, however old), and the unfolded turns; the next fold
+    happens when those outgrow the budget again.
+    """
+
+    def __init__(
+        self,
+        summarizer: Summarizer,
+        budget_tokens: int = 8000,
+        keep_turns: int = 4,
+    ):
+        self.summarizer = summarizer
+        self.budget_tokens = budget_tokens
+        self.keep_turns = max(1, keep_turns)
+        self.folds = 0
+
+    async def compact(self, callback_context: CallbackContext, llm_request: LlmRequest) -> None:
+        preamble, turns = split_turns(llm_request.contents)
+        state = dict(callback_context.state.get(STATE_KEY) or {})
+        folded = min(state.get("turns", 0), len(turns))
+        pinned = [index for index in state.get("pinned", []) if index < folded]
+        summary = state.get("summary", "")
+
+        unfolded = len(turns) - folded
+        if unfolded > self.keep_turns:
+            view = self._view(preamble, turns, folded, pinned)
+            size = instruction_tokens(llm_request) + estimate_tokens(summary)
+            size += sum(content_tokens(content) for content in view)
+            if size > self.budget_tokens:
+                fold_to = len(turns) - self.keep_turns
+                new_turns = turns[folded:fold_to]
+                try:
+                    summary = await self.summarizer(summary, [c for turn in new_turns for c in turn])
+                except Exception:
+                    # Keep answering with the longer prompt; retried on the next request
+                    logger.warning("history:summarize_failed turns=%d", fold_to - folded, exc_info=True)
+                else:
+                    pinned += [index for index in range(folded, fold_to) if is_safety_turn(turns[index])]
+                    self.folds += 1
+                    logger.info(
+                        "history:folded turns=%d..%d pinned=%d tokens_before=%d agent=%s",
+                        folded, fold_to, len(pinned), size, callback_context.agent_name,
+                    )
+                    folded = fold_to
+                    callback_context.state[STATE_KEY] = {"summary": summary, "turns": folded, "pinned": pinned}
+
+        if folded:
+            llm_request.contents = self._view(preamble, turns, folded, pinned)
+            llm_request.append_instructions([f"Summary of the earlier part of this session:\n{summary}"])
+        return None
+
+    @staticmethod
+    def _view(
+        preamble: List[types.Content],
+        turns: List[List[types.Content]],
+        folded: int,
+        pinned: List[int],
+    ) -> List[types.Content]:
+        contents = list(preamble)
+        for index in pinned:
+            contents.extend(turns[index])
+        for turn in turns[folded:]:
+            contents.extend(turn)
+        return contents
+
+
+# Shared by every agent. CAPY_HISTORY_BUDGET_TOKENS (8000, estimated) is the
+# prompt size that triggers folding, CAPY_HISTORY_KEEP_TURNS (4) the recent
+# turns kept verbatim and CAPY_HISTORY_SUMMARY_MODEL the model writing the summary.
+history_compactor = HistoryCompactor(
+    summarizer=ModelSummarizer(os.getenv("CAPY_HISTORY_SUMMARY_MODEL", "gemini-2.5-flash-lite")),
+    budget_tokens=env_int("CAPY_HISTORY_BUDGET_TOKENS", 8000),
+    keep_turns=env_int("CAPY_HISTORY_KEEP_TURNS", 4),
+)
+
+
+async def compact_history(
+    callback_context: CallbackContext,
+    llm_request: LlmRequest,
+) -> Optional[LlmResponse]:
+    """
+    before_model_callback: once the prompt outgrows CAPY_HISTORY_BUDGET_TOKENS,
+    replace old turns with a rolling summary kept in session state.
+    """
+    return await history_compactor.compact(callback_context, llm_request)
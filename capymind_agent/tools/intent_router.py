@@ -0,0 +1,119 @@
+import re
+import logging
+from typing import Any, Dict, NamedTuple, Optional
+from google.adk.agents.callback_context import CallbackContext
+from google.adk.models import LlmRequest, LlmResponse
+from google.genai import types
+
+from capymind_agent.tools import firestore_data
+from capymind_agent.tools.crisis_detector import latest_user_text
+from capymind_agent.tools.format_data import format_data
+from capymind_agent.tools.session_prefetch import grant_consent
+from capymind_agent.tools.text import normalize, strip_accents
+
+logger = logging.getLogger("capymind.intent_router")
+
+DEFAULT_NOTES = 10
+MAX_NOTES = 20
+
+_NUMBER_WORDS = {
+    "one": 1, "two": 2, "three": 3, "four": 4, "five": 5,
+    "six": 6, "seven": 7, "eight": 8, "nine": 9, "ten": 10,
+    "fifteen": 15, "twenty": 20,
+}
+
+# Fillers allowed around a request: "could you please show me my settings"
+_LEAD = r"(?:(?:hey|hi|please|pls|can you|could you|would you|will you|can i|could i|" \
+        r"i want to|i d like to|i would like to|let me)\s+)*"
+_VERB = r"(?:(?:show|see|view|display|get|give|fetch|list|pull up|open|check|what are|what s|tell me)\s+)?"
+_TAIL = r"(?:\s+please)?"
+_COUNT = r"(?:(?P<count>\d{1,3}|" + "|".join(_NUMBER_WORDS) + r")\s+)?"
+_RECENT = r"(?:(?:last|latest|recent|most recent)\s+)?"
+
+# Whole-message patterns over normalize()d text; anything else goes to the agents
+_INTENT_PATTERNS = {
+    "settings": [
+        _LEAD + _VERB + r"(?:me\s+)?my\s+(?:current\s+)?settings" + _TAIL,
+        r"(?:покажи\s+)?(?:мої|мои)\s+(?:налаштування|настройки)",
+    ],
+    "user": [
+        _LEAD + _VERB + r"(?:me\s+)?my\s+(?:profile|account|account details|profile info)" + _TAIL,
+        r"(?:покажи\s+)?(?:мій\s+профіль|мой\s+профиль)",
+    ],
+    "notes": [
+        _LEAD + _VERB + r"(?:me\s+)?(?:my|the)\s+" + _RECENT + _COUNT + _RECENT
+        + r"(?:notes|journal entries|entries|journal)" + _TAIL,
+        r"(?:покажи\s+)?(?:мої\s+)?(?:останні\s+)?" + _COUNT + r"(?:нотатки|записи)",
+        r"(?:покажи\s+)?(?:мои\s+)?(?:последние\s+)?" + _COUNT + r"(?:заметки|записи)",
+    ],
+}
+
+# Patterns are lowercase already; only the Cyrillic ones need accent folding
+_INTENTS = [
+    (intent, re.compile(strip_accents(pattern)))
+    for intent, patterns in _INTENT_PATTERNS.items()
+    for pattern in patterns
+]
+
+_OPERATIONS = {"settings": "get_settings", "user": "get_user", "notes": "get_notes"}
+
+
+class Intent(NamedTuple):
+    data_type: str  # 'notes', 'settings' or 'user', as format_data expects
+    limit: int
+
+
+def classify(text: str) -> Optional[Intent]:
+    """Return the plain data-retrieval intent the whole message asks for, or None."""
+    normalized = normalize(text)
+    for data_type, pattern in _INTENTS:
+        match = pattern.fullmatch(normalized)
+        if match:
+            count = match.groupdict().get("count")
+            if count is None:
+                limit = DEFAULT_NOTES
+            else:
+                limit = int(count) if count.isdigit() else _NUMBER_WORDS[count]
+            return Intent(data_type, max(1, min(limit, MAX_NOTES)))
+    return None
+
+
+async def _fetch(callback_context: CallbackContext, intent: Intent) -> Dict[str, Any]:
+    kwargs: Dict[str, Any] = {}
+    if intent.data_type == "notes":
+        kwargs = {"limit": intent.limit, "fields": ["text", "timestamp"]}
+    return await firestore_data.capy_firestore_data_async(
+        _OPERATIONS[intent.data_type], callback_context, **kwargs
+    )
+
+
+async def route_data_intent(
+    callback_context: CallbackContext,
+    llm_request: LlmRequest,
+) -> Optional[LlmResponse]:
+    """
+    before_model_callback: answer "show my settings / profile / last N notes"
+    by running get_* and format_data directly, skipping the data_fetcher
+    model turns. Anything else, and any failed fetch, goes to the model.
+    """
+    text = latest_user_text(llm_request)
+    if text is None:
+        return None
+    intent = classify(text)
+    if intent is None:
+        return None
+
+    result = await _fetch(callback_context, intent)
+    if not result.get("ok"):
+        # Missing document or error: let the agent explain it
+        return None
+    logger.info(
+        "intent_router:routed intent=%s limit=%s agent=%s",
+        intent.data_type,
+        intent.limit,
+        callback_context.agent_name,
+    )
+    # Asking for their data is consent to it being used
+    grant_consent(callback_context)
+    reply = format_data(intent.data_type, result["data"], None)
+    return LlmResponse(content=types.Content(role="model", parts=[types.Part(text=reply)]))
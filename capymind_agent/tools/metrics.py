@@ -0,0 +1,324 @@
+import json
+import time
+import bisect
+import logging
+import threading
+import contextvars
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+from google.adk.agents.base_agent import BaseAgent
+from google.adk.agents.callback_context import CallbackContext
+from google.adk.agents.invocation_context import InvocationContext
+from google.adk.plugins.base_plugin import BasePlugin
+from google.adk.tools import BaseTool, ToolContext
+
+logger = logging.getLogger("capymind.metrics")
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# Timers of runs that never reached after_run_callback (cancelled requests)
+# are dropped oldest first beyond this many
+MAX_PENDING_TIMERS = 4096
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576)
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: Sequence[Any], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(str(value))}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if value != int(value) else str(int(value))
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, Any]) -> Tuple[Any, ...]:
+        # Values are stringified at render time, keeping the hot path to one tuple
+        return tuple([labels.get(name, "") for name in self.labelnames])
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        lines.extend(self._samples())
+        return lines
+
+    def _samples(self) -> List[str]:  # pragma: no cover - overridden
+        raise NotImplementedError
+
+
+class Counter(_Metric):
+    """Monotonic counter with labels, e.g. calls_total{tool,outcome}."""
+
+    kind = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, amount: float = 1.0, **labels: Any) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def value(self, **labels: Any) -> float:
+        return self._values.get(self._key(labels), 0.0)
+
+    def _samples(self) -> List[str]:
+        with self._lock:
+            values = list(self._values.items())
+        return [
+            f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}"
+            for key, value in values
+        ]
+
+
+class Histogram(_Metric):
+    """Fixed-bucket histogram; observe() is one bisect and a few additions."""
+
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = LATENCY_BUCKETS,
+    ):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # key -> [per-bucket counts (last one is +Inf), sum, count]
+        self._values: Dict[Tuple[str, ...], List[Any]] = {}
+
+    def observe(self, value: float, **labels: Any) -> None:
+        key = self._key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._values.get(key)
+            if series is None:
+                series = self._values[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    def count(self, **labels: Any) -> int:
+        series = self._values.get(self._key(labels))
+        return series[2] if series else 0
+
+    def _samples(self) -> List[str]:
+        with self._lock:
+            values = [(key, list(series[0]), series[1], series[2]) for key, series in self._values.items()]
+        lines = []
+        for key, counts, total, count in values:
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += bucket_count
+                le = f'le="{_format_value(bound)}"'
+                lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, key, le)} {cumulative}")
+            labels = _format_labels(self.labelnames, key)
+            lines.append(f"{self.name}_sum{labels} {_format_value(total)}")
+            lines.append(f"{self.name}_count{labels} {count}")
+        return lines
+
+
+class MetricsRegistry:
+    """In-process metrics rendered in the Prometheus text exposition format."""
+
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+
+    def register(self, metric: _Metric) -> Any:
+        self._metrics[metric.name] = metric
+        return metric
+
+    def render(self) -> str:
+        lines: List[str] = []
+        for metric in self._metrics.values():
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+registry = MetricsRegistry()
+
+tool_calls = registry.register(Counter(
+    "capymind_tool_calls_total",
+    "Tool calls by tool, operation, agent and outcome (ok or error).",
+    ("tool", "operation", "agent", "outcome"),
+))
+tool_latency = registry.register(Histogram(
+    "capymind_tool_duration_seconds",
+    "Tool call latency.",
+    ("tool", "operation", "agent"),
+))
+tool_payload = registry.register(Histogram(
+    "capymind_tool_payload_bytes",
+    "Size of the JSON tool result as the tool returned it, before any after_tool_callback compaction.",
+    ("tool", "operation"),
+    buckets=SIZE_BUCKETS,
+))
+agent_latency = registry.register(Histogram(
+    "capymind_agent_turn_duration_seconds",
+    "Time spent in an agent per invocation, including sub-agent and tool time.",
+    ("agent",),
+))
+firestore_reads = registry.register(Counter(
+    "capymind_firestore_document_reads_total",
+    "Firestore documents read (billed reads), by collection and the operation and agent of the tool call.",
+    ("collection", "operation", "agent"),
+))
+
+firestore_call_events = registry.register(Counter(
+    "capymind_firestore_call_events_total",
+    "Firestore tool calls and their retries, deadline misses, hedged reads, "
+    "breaker rejections, failures and stale results, by operation.",
+    ("operation", "event"),
+))
+
+
+# (operation, agent) of the tool call running in this context. Set by
+# MetricsPlugin.before_tool_callback; ADK runs each call in its own task and
+# Firestore worker threads run in a copy of the caller's context, so reads
+# are labelled with the call that made them (empty outside tool calls).
+_tool_call: contextvars.ContextVar[Tuple[str, str]] = contextvars.ContextVar(
+    "capymind_metrics_tool_call", default=("", "")
+)
+
+
+def record_reads(collection: str, count: int) -> None:
+    """Count Firestore reads; empty queries and missing documents still bill one read."""
+    operation, agent = _tool_call.get()
+    firestore_reads.inc(max(1, count), collection=collection, operation=operation, agent=agent)
+
+
+# Last tool result measured in this context and its size: MetricsPlugin and
+# TracingPlugin both report it, and each result is serialized only once
+_measured: contextvars.ContextVar[Tuple[Any, int]] = contextvars.ContextVar(
+    "capymind_metrics_measured", default=(None, 0)
+)
+
+
+def tool_operation(tool_args: Dict[str, Any]) -> str:
+    """The operation label of a tool call: its ``operation`` or ``data_type`` argument."""
+    return str(tool_args.get("operation") or tool_args.get("data_type") or "")
+
+
+def payload_size(result: Any) -> int:
+    """Length of ``result`` as JSON (0 if it cannot be serialized)."""
+    measured, size = _measured.get()
+    if measured is result:
+        return size
+    try:
+        size = len(json.dumps(result, default=str))
+    except (TypeError, ValueError):
+        size = 0
+    _measured.set((result, size))
+    return size
+
+
+class MetricsPlugin(BasePlugin):
+    """
+    ADK plugin timing every tool call and agent turn.
+
+    Registered on the served app through ``extra_plugins``; tool calls are
+    keyed by (invocation_id, function_call_id) and agent turns by
+    (invocation_id, agent), so parallel calls and nested agents are timed
+    independently and whatever a run leaves unfinished is dropped when it
+    ends.
+    """
+
+    def __init__(self, name: str = "capymind_metrics", max_pending: int = MAX_PENDING_TIMERS):
+        super().__init__(name=name)
+        self.max_pending = max_pending
+        self._started: "OrderedDict[Tuple[Any, Any], float]" = OrderedDict()
+
+    def _start(self, key: Tuple[Any, Any]) -> None:
+        self._started[key] = time.perf_counter()
+        while len(self._started) > self.max_pending:
+            self._started.popitem(last=False)
+
+    async def before_agent_callback(
+        self, *, agent: BaseAgent, callback_context: CallbackContext
+    ) -> None:
+        self._start((callback_context.invocation_id, agent.name))
+        return None
+
+    async def after_agent_callback(
+        self, *, agent: BaseAgent, callback_context: CallbackContext
+    ) -> None:
+        started = self._started.pop((callback_context.invocation_id, agent.name), None)
+        if started is not None:
+            agent_latency.observe(time.perf_counter() - started, agent=agent.name)
+        return None
+
+    async def after_run_callback(self, *, invocation_context: InvocationContext) -> None:
+        # Drop timers of agents and tools that never finished (errors, short-circuits)
+        invocation_id = invocation_context.invocation_id
+        for key in [key for key in self._started if key[0] == invocation_id]:
+            self._started.pop(key, None)
+
+    async def before_tool_callback(
+        self, *, tool: BaseTool, tool_args: Dict[str, Any], tool_context: ToolContext
+    ) -> Optional[dict]:
+        self._start(_tool_key(tool_context))
+        _tool_call.set((tool_operation(tool_args), tool_context.agent_name))
+        return None
+
+    async def after_tool_callback(
+        self,
+        *,
+        tool: BaseTool,
+        tool_args: Dict[str, Any],
+        tool_context: ToolContext,
+        result: dict,
+    ) -> Optional[dict]:
+        ok = not (isinstance(result, dict) and result.get("ok") is False)
+        self._record(tool, tool_args, tool_context, "ok" if ok else "error")
+        tool_payload.observe(payload_size(result), tool=tool.name, operation=tool_operation(tool_args))
+        return None
+
+    async def on_tool_error_callback(
+        self,
+        *,
+        tool: BaseTool,
+        tool_args: Dict[str, Any],
+        tool_context: ToolContext,
+        error: Exception,
+    ) -> Optional[dict]:
+        self._record(tool, tool_args, tool_context, "error")
+        return None
+
+    def _record(self, tool: BaseTool, tool_args: Dict[str, Any], tool_context: ToolContext, outcome: str) -> None:
+        started = self._started.pop(_tool_key(tool_context), None)
+        operation = tool_operation(tool_args)
+        tool_calls.inc(tool=tool.name, operation=operation, agent=tool_context.agent_name, outcome=outcome)
+        if started is not None:
+            tool_latency.observe(
+                time.perf_counter() - started,
+                tool=tool.name,
+                operation=operation,
+                agent=tool_context.agent_name,
+            )
+
+
+def _tool_key(tool_context: ToolContext) -> Tuple[Any, Any]:
+    return getattr(tool_context, "invocation_id", None), tool_context.function_call_id
+
+
+# Instance referenced by main.py's extra_plugins
+metrics_plugin = MetricsPlugin()
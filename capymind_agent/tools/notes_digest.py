@@ -0,0 +1,295 @@
+import logging
+from datetime import datetime, timedelta, timezone
+from typing import Any, Awaitable, Callable, Dict, Hashable, List, Optional, Tuple
+
+from capymind_agent.tools.config import env_int
+from capymind_agent.tools.doc_cache import DocumentCache
+from capymind_agent.tools.metrics import record_reads
+from capymind_agent.tools.notes_search import STOPWORDS, SinceQuery, note_fields, stem
+from capymind_agent.tools.notes_stats import bucket_start
+from capymind_agent.tools.resilience import rpc_options
+from capymind_agent.tools.text import WORD, fold
+from capymind_agent.tools.tracing import FIRESTORE_DOCUMENTS, firestore_span
+
+logger = logging.getLogger("capymind.notes_digest")
+
+# Bump when the stored layout or the folding rules change; older digests are rebuilt
+DIGEST_VERSION = 2
+
+# Stored next to the bot's settings as settings/{user_id}/agent/digest, so the
+# settings document itself (and get_settings) stays as the bot wrote it
+DIGEST_COLLECTION = "agent"
+DIGEST_DOCUMENT = "digest"
+
+# Weeks of note counts kept in the document and returned by get_digest
+WEEKS_KEPT = 12
+WEEKS_SHOWN = 8
+# Keyword candidates kept (by recency-weighted note count) and returned
+KEYWORDS_KEPT = 100
+KEYWORDS_SHOWN = 10
+THEMES_SHOWN = 5
+
+# Local hour // 6 -> part of the day
+DAYPARTS = ("night", "morning", "afternoon", "evening")
+WEEKDAYS = ("Mon", "Tue", "Wed", "Thu", "Fri", "Sat", "Sun")
+
+# Journal filler that says nothing about what a note is about
+_FILLER = frozenset(
+    "today yesterday tomorrow day night feel feeling felt just really like got get also about after "
+    "again all am any been before being can could did didn't don't even going how know little lot "
+    "more much not now one only over some still than thing think through time very want way went "
+    "would".split()
+)
+
+# Theme -> words that point at it; matched on stems like the search index
+THEMES = {
+    "sleep": "sleep slept tired insomnia nap bed awake exhausted rest dream nightmare",
+    "work": "work job boss meeting deadline office colleague career project",
+    "study": "exam school study class university homework grade lecture",
+    "family": "mom mother dad father sister brother family parent son daughter kid child",
+    "relationships": "partner boyfriend girlfriend husband wife friend relationship breakup",
+    "anxiety": "anxious anxiety worry panic nervous stress scared fear overwhelmed",
+    "low mood": "sad depressed cry hopeless empty numb lonely",
+    "anger": "angry anger frustrated annoyed irritated mad",
+    "health": "sick pain doctor health headache ill medication",
+    "exercise": "run gym walk exercise yoga workout swim",
+    "gratitude": "grateful thankful happy proud calm hopeful joy",
+    "self-care": "therapy therapist breathing meditation journal mindfulness",
+}
+_THEME_OF = {stem(word): theme for theme, words in THEMES.items() for word in words.split()}
+
+State = Dict[str, Any]
+# () -> the user's settings document (or None)
+SettingsReader = Callable[[], Optional[Dict[str, Any]]]
+AsyncSettingsReader = Callable[[], Awaitable[Optional[Dict[str, Any]]]]
+
+
+def _utc(moment: datetime) -> datetime:
+    return moment if moment.tzinfo else moment.replace(tzinfo=timezone.utc)
+
+
+def _seconds_from_utc(settings: Optional[Dict[str, Any]]) -> int:
+    if not settings:
+        return 0
+    # Handle nested settings structure
+    seconds = settings.get("settings", settings).get("SecondsFromUTC")
+    return int(seconds) if isinstance(seconds, (int, float)) else 0
+
+
+def _keywords(text: str) -> Dict[str, str]:
+    """Stem -> first surface form of the words that could describe a note."""
+    found: Dict[str, str] = {}
+    for word in WORD.findall(fold(text)):
+        if len(word) < 3 or word.isdigit() or word in STOPWORDS or word in _FILLER:
+            continue
+        found.setdefault(stem(word), word)
+    return found
+
+
+class NotesDigest:
+    """
+    Materialized per-user journaling digest behind get_digest.
+
+    The digest document holds note counts per UTC week, counts per local part
+    of the day and weekday (``SecondsFromUTC`` from settings), keyword and
+    theme weights that halve every ``half_life_days``, and a watermark: the
+    newest folded note's timestamp plus the ids of the notes at it. Each call
+    reads the document (through the document cache) and the notes
+    from the watermark on, folds in only the ones not seen yet and writes the
+    document back when something changed. Deleted or edited notes are picked
+    up by a full rebuild once the digest is older than ``rebuild_days``.
+    """
+
+    def __init__(
+        self,
+        half_life_days: float = 14.0,
+        rebuild_days: float = 30.0,
+        clock: Callable[[], datetime] = lambda: datetime.now(timezone.utc),
+    ):
+        self.half_life_days = half_life_days
+        self.rebuild_days = rebuild_days
+        self._clock = clock
+
+    def _decay(self, newer: datetime, older: datetime) -> float:
+        days = (newer - older).total_seconds() / 86400
+        return 0.5 ** (max(0.0, days) / self.half_life_days)
+
+    def _stale(self, state: Optional[State]) -> bool:
+        if not state or state.get("version") != DIGEST_VERSION or "built_at" not in state:
+            return True
+        return self._clock() - _utc(state["built_at"]) >= timedelta(days=self.rebuild_days)
+
+    @staticmethod
+    def fresh(state: State, rows: List[Tuple[str, datetime, str]]) -> List[Tuple[str, datetime, str]]:
+        """Rows not folded into ``state`` yet, oldest first."""
+        watermark = state.get("last_note_at")
+        seen = set(state.get("watermark_ids", ()))
+        rows = [
+            (note_id, _utc(timestamp), text) for note_id, timestamp, text in rows
+            if watermark is None
+            or _utc(timestamp) > _utc(watermark)
+            or (_utc(timestamp) == _utc(watermark) and note_id not in seen)
+        ]
+        return sorted(rows, key=lambda row: (row[1], row[0]))
+
+    def fold(self, state: State, rows: List[Tuple[str, datetime, str]], seconds_from_utc: int = 0) -> State:
+        """Return ``state`` with ``rows`` (from ``fresh``, oldest first) added."""
+        if not rows:
+            return state
+        watermark = state.get("last_note_at")
+        newest = rows[-1][1]
+        # Keyword and theme weights are kept decayed to the newest note
+        scale = self._decay(newest, _utc(watermark)) if watermark is not None else 1.0
+        keywords = {
+            term: {"word": entry["word"], "score": entry["score"] * scale}
+            for term, entry in state.get("keywords", {}).items()
+        }
+        themes = {theme: weight * scale for theme, weight in state.get("themes", {}).items()}
+        weeks = dict(state.get("weeks", {}))
+        dayparts = dict.fromkeys(DAYPARTS, 0)
+        dayparts.update(state.get("dayparts", {}))
+        weekdays = list(state.get("weekdays", [0] * 7))
+        offset = timedelta(seconds=seconds_from_utc)
+
+        for _, timestamp, text in rows:
+            weight = self._decay(newest, timestamp)
+            week = bucket_start(timestamp, "week").date().isoformat()
+            weeks[week] = weeks.get(week, 0) + 1
+            local = timestamp + offset
+            dayparts[DAYPARTS[local.hour // 6]] += 1
+            weekdays[local.weekday()] += 1
+            found = _keywords(text)
+            for term, word in found.items():
+                entry = keywords.setdefault(term, {"word": word, "score": 0.0})
+                entry["score"] += weight
+            for theme in {_THEME_OF[term] for term in found if term in _THEME_OF}:
+                themes[theme] = themes.get(theme, 0.0) + weight
+
+        # Bounded document: recent weeks and the strongest keywords only
+        weeks = {week: weeks[week] for week in sorted(weeks)[-WEEKS_KEPT:]}
+        kept = sorted(keywords, key=lambda term: keywords[term]["score"], reverse=True)[:KEYWORDS_KEPT]
+        watermark_ids = [note_id for note_id, timestamp, _ in rows if timestamp == newest]
+        if watermark is not None and _utc(watermark) == newest:
+            watermark_ids = list(state.get("watermark_ids", ())) + watermark_ids
+        first = state.get("first_note_at")
+        return {
+            "version": DIGEST_VERSION,
+            "built_at": state.get("built_at") or self._clock(),
+            "total": state.get("total", 0) + len(rows),
+            "first_note_at": min(_utc(first), rows[0][1]) if first is not None else rows[0][1],
+            "last_note_at": newest,
+            "watermark_ids": watermark_ids,
+            "weeks": weeks,
+            "dayparts": dayparts,
+            "weekdays": weekdays,
+            "keywords": {term: keywords[term] for term in kept},
+            "themes": themes,
+        }
+
+    def payload(self, state: State, new_notes: int) -> Dict[str, Any]:
+        """What get_digest returns: counts, patterns and recent themes, no note text."""
+        now = self._clock()
+        weeks = state.get("weeks", {})
+        current = bucket_start(now, "week")
+        per_week = [
+            {"start": start.date().isoformat(), "count": weeks.get(start.date().isoformat(), 0)}
+            for start in (current - timedelta(weeks=n) for n in range(WEEKS_SHOWN - 1, -1, -1))
+        ]
+        last = state.get("last_note_at")
+        # Weights as "recent notes" at the time of the call
+        scale = self._decay(now, _utc(last)) if last is not None else 0.0
+        themes = sorted(state.get("themes", {}).items(), key=lambda item: item[1], reverse=True)
+        keywords = sorted(state.get("keywords", {}).values(), key=lambda entry: entry["score"], reverse=True)
+        dayparts = state.get("dayparts", {})
+        return {
+            "total_notes": state.get("total", 0),
+            "first_note": _utc(state["first_note_at"]).isoformat() if state.get("first_note_at") else None,
+            "last_activity": _utc(last).isoformat() if last is not None else None,
+            "notes_per_week": per_week,
+            "time_of_day": {part: dayparts.get(part, 0) for part in DAYPARTS},
+            "weekdays": dict(zip(WEEKDAYS, state.get("weekdays", [0] * 7))),
+            "themes": [
+                {"theme": theme, "weight": round(weight * scale, 1)}
+                for theme, weight in themes[:THEMES_SHOWN]
+                if round(weight * scale, 1) > 0
+            ],
+            "keywords": [entry["word"] for entry in keywords[:KEYWORDS_SHOWN]],
+            "new_notes": new_notes,
+        }
+
+    def _start(self, snapshot: Any) -> Tuple[State, bool]:
+        """(state to fold into, full rebuild) from a cached or freshly read digest."""
+        state = snapshot if isinstance(snapshot, dict) else (snapshot.to_dict() if snapshot.exists else None)
+        if self._stale(state):
+            return {}, True
+        return state, False
+
+    def get(
+        self,
+        cache: DocumentCache,
+        cache_key: Hashable,
+        digest_ref: Any,
+        since_query: SinceQuery,
+        read_settings: SettingsReader,
+    ) -> Dict[str, Any]:
+        cached = cache.get(cache_key)
+        if cached is None:
+            with firestore_span("get", DIGEST_COLLECTION):
+                cached = digest_ref.get(**rpc_options())
+            record_reads(DIGEST_COLLECTION, 1)
+        state, rebuild = self._start(cached)
+        query = since_query(state.get("last_note_at")).select(["text", "timestamp"])
+        with firestore_span("query", "notes") as span:
+            snaps = list(query.stream(**rpc_options()))
+            span.set_attribute(FIRESTORE_DOCUMENTS, len(snaps))
+        record_reads("notes", len(snaps))
+        rows = self.fresh(state, [row for row in map(note_fields, snaps) if row])
+        if rows:
+            state = self.fold(state, rows, _seconds_from_utc(read_settings()))
+            with firestore_span("set", DIGEST_COLLECTION):
+                digest_ref.set(state)
+            self._log(cache_key, rows, rebuild)
+        if state:
+            cache.put(cache_key, state)
+        return self.payload(state, len(rows))
+
+    async def get_async(
+        self,
+        cache: DocumentCache,
+        cache_key: Hashable,
+        digest_ref: Any,
+        since_query: SinceQuery,
+        read_settings: AsyncSettingsReader,
+    ) -> Dict[str, Any]:
+        cached = cache.get(cache_key)
+        if cached is None:
+            with firestore_span("get", DIGEST_COLLECTION):
+                cached = await digest_ref.get(**rpc_options())
+            record_reads(DIGEST_COLLECTION, 1)
+        state, rebuild = self._start(cached)
+        query = since_query(state.get("last_note_at")).select(["text", "timestamp"])
+        with firestore_span("query", "notes") as span:
+            snaps = [snap async for snap in query.stream(**rpc_options())]
+            span.set_attribute(FIRESTORE_DOCUMENTS, len(snaps))
+        record_reads("notes", len(snaps))
+        rows = self.fresh(state, [row for row in map(note_fields, snaps) if row])
+        if rows:
+            state = self.fold(state, rows, _seconds_from_utc(await read_settings()))
+            with firestore_span("set", DIGEST_COLLECTION):
+                await digest_ref.set(state)
+            self._log(cache_key, rows, rebuild)
+        if state:
+            cache.put(cache_key, state)
+        return self.payload(state, len(rows))
+
+    @staticmethod
+    def _log(cache_key: Hashable, rows: List[Tuple[str, datetime, str]], rebuild: bool) -> None:
+        logger.info("notes_digest:%s key=%s notes=%d", "rebuilt" if rebuild else "updated", cache_key, len(rows))
+
+
+# Shared by both tool variants. Configure with CAPY_DIGEST_HALF_LIFE_DAYS
+# (theme/keyword recency) and CAPY_DIGEST_REBUILD_DAYS (full rebuild interval).
+notes_digest = NotesDigest(
+    half_life_days=env_int("CAPY_DIGEST_HALF_LIFE_DAYS", 14),
+    rebuild_days=env_int("CAPY_DIGEST_REBUILD_DAYS", 30),
+)
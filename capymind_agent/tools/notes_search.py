@@ -0,0 +1,310 @@
+import math
+import time
+import heapq
+import asyncio
+import logging
+import threading
+from collections import OrderedDict
+from functools import lru_cache
+from datetime import datetime
+from typing import Any, Callable, Dict, Hashable, Iterable, List, Optional, Tuple
+
+import snowballstemmer
+
+from capymind_agent.tools.config import env_int
+from capymind_agent.tools.metrics import record_reads
+from capymind_agent.tools.resilience import rpc_options
+from capymind_agent.tools.single_flight import single_flight
+from capymind_agent.tools.text import WORD, fold
+from capymind_agent.tools.tracing import FIRESTORE_DOCUMENTS, firestore_span
+
+logger = logging.getLogger("capymind.notes_search")
+
+# BM25 parameters (the usual Okapi defaults)
+K1 = 1.2
+B = 0.75
+
+SNIPPET_CHARS = 200
+MAX_RESULTS = 20
+
+# Words too common in journal entries to rank on
+STOPWORDS = frozenset(
+    "a an and are as at be but by did do for from had has have he her him his i if in is it its "
+    "me my of on or our she so that the their them then there they this to too was we were what "
+    "when which who will with you your".split()
+)
+
+# (since) -> notes query with timestamp >= since (None: all notes)
+SinceQuery = Callable[[Optional[datetime]], Any]
+
+
+# Snowball stemmers keep per-word state, so one thread at a time
+_stemmer = snowballstemmer.stemmer("english")
+_stemmer_lock = threading.Lock()
+
+
+# Journal vocabulary is small; cached stems make indexing mostly dict lookups
+@lru_cache(maxsize=65536)
+def stem(word: str) -> str:
+    """English (Porter2) stem, so 'times' and 'time' or 'feelings' and 'feeling' share a term."""
+    with _stemmer_lock:
+        return _stemmer.stemWord(word)
+
+
+def terms(text: str) -> List[str]:
+    """Index terms of ``text``: folded, stemmed words without stopwords."""
+    return [stem(word) for word in WORD.findall(fold(text)) if word not in STOPWORDS]
+
+
+def snippet(text: str, query_terms: Iterable[str], width: int = SNIPPET_CHARS) -> str:
+    """About ``width`` characters of ``text`` around the first query term."""
+    if len(text) <= width:
+        return text
+    wanted = set(query_terms)
+    center = 0
+    for match in WORD.finditer(text):
+        if stem(fold(match.group())) in wanted:
+            center = match.start()
+            break
+    start = max(0, min(center - width // 3, len(text) - width))
+    # Snap to word boundaries
+    if start > 0:
+        space = text.find(" ", start)
+        start = space + 1 if 0 <= space < center else start
+    end = start + width
+    if end < len(text):
+        space = text.rfind(" ", start, end)
+        end = space if space > start else end
+    return ("…" if start > 0 else "") + text[start:end].strip() + ("…" if end < len(text) else "")
+
+
+class UserNotesIndex:
+    """Inverted index with BM25 ranking over one user's notes."""
+
+    def __init__(self, built_at: float = 0.0):
+        self.postings: Dict[str, Dict[str, int]] = {}
+        self.lengths: Dict[str, int] = {}
+        self.notes: Dict[str, Tuple[datetime, str]] = {}
+        self.total_length = 0
+        # Newest indexed timestamp; refreshes read notes from here on
+        self.watermark: Optional[datetime] = None
+        self.built_at = built_at
+        self.lock = threading.Lock()
+
+    def add(self, note_id: str, timestamp: datetime, text: str) -> None:
+        if note_id in self.notes:
+            if self.notes[note_id] == (timestamp, text):
+                return
+            self._remove(note_id)
+        counts: Dict[str, int] = {}
+        for term in terms(text):
+            counts[term] = counts.get(term, 0) + 1
+        for term, count in counts.items():
+            self.postings.setdefault(term, {})[note_id] = count
+        length = sum(counts.values())
+        self.lengths[note_id] = length
+        self.total_length += length
+        self.notes[note_id] = (timestamp, text)
+        if self.watermark is None or timestamp > self.watermark:
+            self.watermark = timestamp
+
+    def _remove(self, note_id: str) -> None:
+        _, text = self.notes.pop(note_id)
+        for term in set(terms(text)):
+            postings = self.postings.get(term)
+            if postings is not None:
+                postings.pop(note_id, None)
+                if not postings:
+                    del self.postings[term]
+        self.total_length -= self.lengths.pop(note_id)
+
+    def search(
+        self,
+        query_terms: List[str],
+        k: int,
+        since: Optional[datetime] = None,
+        until: Optional[datetime] = None,
+    ) -> Tuple[List[Tuple[float, str]], int]:
+        """Return (top ``k`` (score, note id) pairs, number of matching notes)."""
+        count = len(self.notes)
+        if not count:
+            return [], 0
+        average = self.total_length / count or 1.0
+        scores: Dict[str, float] = {}
+        for term in set(query_terms):
+            postings = self.postings.get(term)
+            if not postings:
+                continue
+            idf = math.log(1 + (count - len(postings) + 0.5) / (len(postings) + 0.5))
+            for note_id, tf in postings.items():
+                norm = tf * (K1 + 1) / (tf + K1 * (1 - B + B * self.lengths[note_id] / average))
+                scores[note_id] = scores.get(note_id, 0.0) + idf * norm
+        if since is not None or until is not None:
+            scores = {
+                note_id: score for note_id, score in scores.items()
+                if (since is None or self.notes[note_id][0] >= since)
+                and (until is None or self.notes[note_id][0] < until)
+            }
+        # Ties go to the newer note
+        top = heapq.nlargest(k, scores.items(), key=lambda item: (item[1], self.notes[item[0]][0]))
+        return [(score, note_id) for note_id, score in top], len(scores)
+
+
+def note_fields(snap: Any) -> Optional[Tuple[str, datetime, str]]:
+    """(id, timestamp, text) of a note snapshot; None if it has no timestamp or text."""
+    data = snap.to_dict() or {}
+    timestamp, text = data.get("timestamp"), data.get("text")
+    if not isinstance(timestamp, datetime) or not isinstance(text, str):
+        return None
+    return snap.id, timestamp, text
+
+
+class NotesSearchIndex:
+    """
+    Per-user note indexes kept in process for search_notes.
+
+    A user's index is built from all of their notes on the first search and
+    then, before each search, brought up to date by reading only notes at or
+    after its timestamp watermark; concurrent searches of one user share
+    that read. The asyncio variant indexes and ranks in a worker thread.
+    Edits that keep the timestamp and deletions are picked up by a full
+    rebuild once the index is older than ``rebuild_seconds``. At most
+    ``max_users`` indexes are kept; the least recently searched one is
+    dropped first.
+    """
+
+    def __init__(
+        self,
+        max_users: int = 256,
+        rebuild_seconds: float = 3600.0,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.max_users = max_users
+        self.rebuild_seconds = rebuild_seconds
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._indexes: "OrderedDict[Hashable, UserNotesIndex]" = OrderedDict()
+        self._stats = {"builds": 0, "refreshes": 0, "indexed": 0, "evictions": 0}
+
+    def _index_for(self, key: Hashable) -> Tuple[UserNotesIndex, bool]:
+        """Return (index, needs a full build)."""
+        with self._lock:
+            index = self._indexes.get(key)
+            if index is not None and self._clock() - index.built_at < self.rebuild_seconds:
+                self._indexes.move_to_end(key)
+                return index, False
+            # Concurrent first searches share the new index and its build
+            index = self._indexes[key] = UserNotesIndex(built_at=self._clock())
+            self._indexes.move_to_end(key)
+            while len(self._indexes) > self.max_users:
+                self._indexes.popitem(last=False)
+                self._stats["evictions"] += 1
+            return index, True
+
+    def _apply(self, index: UserNotesIndex, snaps: List[Any], build: bool) -> None:
+        rows = [row for row in map(note_fields, snaps) if row]
+        with index.lock:
+            for note_id, timestamp, text in rows:
+                index.add(note_id, timestamp, text)
+        with self._lock:
+            self._stats["builds" if build else "refreshes"] += 1
+            self._stats["indexed"] += len(rows)
+
+    def search(
+        self,
+        key: Hashable,
+        since_query: SinceQuery,
+        query: str,
+        k: int,
+        since: Optional[datetime] = None,
+        until: Optional[datetime] = None,
+    ) -> Dict[str, Any]:
+        index, build = self._index_for(key)
+
+        def refresh() -> None:
+            notes_query = self._refresh_query(index, since_query, build)
+            with firestore_span("query", "notes") as span:
+                snaps = list(notes_query.stream(**rpc_options()))
+                span.set_attribute(FIRESTORE_DOCUMENTS, len(snaps))
+            record_reads("notes", len(snaps))
+            self._apply(index, snaps, build)
+
+        single_flight.do(self._flight_key(key, index), refresh)
+        return self._results(index, query, k, since, until)
+
+    async def search_async(
+        self,
+        key: Hashable,
+        since_query: SinceQuery,
+        query: str,
+        k: int,
+        since: Optional[datetime] = None,
+        until: Optional[datetime] = None,
+    ) -> Dict[str, Any]:
+        index, build = self._index_for(key)
+
+        async def refresh() -> None:
+            notes_query = self._refresh_query(index, since_query, build)
+            with firestore_span("query", "notes") as span:
+                snaps = [snap async for snap in notes_query.stream(**rpc_options())]
+                span.set_attribute(FIRESTORE_DOCUMENTS, len(snaps))
+            record_reads("notes", len(snaps))
+            # Indexing thousands of notes would stall every other session on the loop
+            await asyncio.to_thread(self._apply, index, snaps, build)
+
+        await single_flight.do_async(self._flight_key(key, index), refresh)
+        return await asyncio.to_thread(self._results, index, query, k, since, until)
+
+    @staticmethod
+    def _flight_key(key: Hashable, index: UserNotesIndex) -> Hashable:
+        # Concurrent searches of one user share a read of their notes (all of
+        # them on a build); a rebuilt index gets flights of its own
+        return ("notes_index", key, id(index))
+
+    @staticmethod
+    def _refresh_query(index: UserNotesIndex, since_query: SinceQuery, build: bool) -> Any:
+        # The watermark note itself comes back too; add() ignores unchanged notes
+        return since_query(None if build else index.watermark).select(["text", "timestamp"])
+
+    @staticmethod
+    def _results(
+        index: UserNotesIndex,
+        query: str,
+        k: int,
+        since: Optional[datetime],
+        until: Optional[datetime],
+    ) -> Dict[str, Any]:
+        query_terms = terms(query)
+        with index.lock:
+            top, matches = index.search(query_terms, k, since, until)
+            found = [(score, index.notes[note_id]) for score, note_id in top]
+            searched = len(index.notes)
+        return {
+            "query": query,
+            "matches": matches,
+            "searched": searched,
+            "results": [
+                {"timestamp": timestamp.isoformat(), "score": round(score, 3), "snippet": snippet(text, query_terms)}
+                for score, (timestamp, text) in found
+            ],
+        }
+
+    def invalidate(self, key: Hashable) -> bool:
+        with self._lock:
+            return self._indexes.pop(key, None) is not None
+
+    def clear(self) -> None:
+        with self._lock:
+            self._indexes.clear()
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return dict(self._stats, users=len(self._indexes))
+
+
+# Shared by both tool variants. Configure with CAPY_SEARCH_INDEX_USERS (users
+# kept indexed) and CAPY_SEARCH_REBUILD_S (full rebuild interval, seconds).
+notes_index = NotesSearchIndex(
+    max_users=env_int("CAPY_SEARCH_INDEX_USERS", 256),
+    rebuild_seconds=env_int("CAPY_SEARCH_REBUILD_S", 3600),
+)
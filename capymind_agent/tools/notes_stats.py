@@ -0,0 +1,166 @@
+import asyncio
+import bisect
+import logging
+import contextvars
+from concurrent.futures import Executor
+from datetime import datetime, timedelta, timezone
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from google.api_core.exceptions import MethodNotImplemented
+
+from capymind_agent.tools.metrics import record_reads
+from capymind_agent.tools.resilience import rpc_options
+from capymind_agent.tools.tracing import FIRESTORE_DOCUMENTS, firestore_span
+
+logger = logging.getLogger("capymind.firestore")
+
+BUCKET_SIZES = {"day": timedelta(days=1), "week": timedelta(weeks=1)}
+DEFAULT_WINDOW = timedelta(days=30)
+# Aggregation queries bill one read per batch of up to this many index entries
+AGGREGATION_ENTRIES_PER_READ = 1000
+# One aggregation query runs per bucket; keep a single call bounded
+MAX_BUCKETS = 92
+
+# Raised when the backend (e.g. an emulator) cannot run aggregation queries;
+# we then count a projection-only stream instead, as with a client library
+# whose queries have no count(). Other errors (deadlines, unavailable, quota,
+# bugs) propagate to the retries and circuit breaker: a full stream is the
+# last thing an overloaded backend needs
+AGGREGATION_UNAVAILABLE = (NotImplementedError, MethodNotImplemented)
+
+Bucket = Tuple[datetime, datetime]
+# (start, end) -> notes query restricted to start <= timestamp < end
+WindowQuery = Callable[[datetime, datetime], Any]
+
+
+def bucket_start(moment: datetime, bucket: str) -> datetime:
+    """Start (UTC midnight, Monday for weeks) of the 'day' or 'week' bucket holding ``moment``."""
+    start = moment.astimezone(timezone.utc).replace(hour=0, minute=0, second=0, microsecond=0)
+    if bucket == "week":
+        start -= timedelta(days=start.weekday())
+    return start
+
+
+def stats_buckets(
+    since: Optional[datetime],
+    until: Optional[datetime],
+    bucket: str,
+) -> Tuple[List[Bucket], Optional[str]]:
+    """
+    Split [since, until) into UTC day or week (Monday-based) buckets.
+
+    Defaults to the 30 days up to now. The first bucket starts at the bucket
+    boundary on or before ``since``; the last one is clipped to ``until``.
+    """
+    if bucket not in BUCKET_SIZES:
+        return [], f"unsupported bucket '{bucket}', expected one of {sorted(BUCKET_SIZES)}"
+    until = until or datetime.now(timezone.utc)
+    since = since or until - DEFAULT_WINDOW
+    if since >= until:
+        return [], "since must be earlier than until"
+
+    step = BUCKET_SIZES[bucket]
+    buckets: List[Bucket] = []
+    start = bucket_start(since, bucket)
+    while start < until:
+        buckets.append((start, min(start + step, until)))
+        start += step
+    if len(buckets) > MAX_BUCKETS:
+        return [], f"window spans {len(buckets)} {bucket} buckets, at most {MAX_BUCKETS} allowed"
+    return buckets, None
+
+
+def _aggregate_count(query: Any) -> int:
+    with firestore_span("aggregate", "notes"):
+        result = query.count(alias="count").get(**rpc_options())
+    count = int(result[0][0].value)
+    record_reads("notes", -(-count // AGGREGATION_ENTRIES_PER_READ))
+    return count
+
+
+async def _aggregate_count_async(query: Any) -> int:
+    with firestore_span("aggregate", "notes"):
+        result = await query.count(alias="count").get(**rpc_options())
+    count = int(result[0][0].value)
+    record_reads("notes", -(-count // AGGREGATION_ENTRIES_PER_READ))
+    return count
+
+
+def _can_aggregate(window_query: WindowQuery, buckets: List[Bucket]) -> bool:
+    if hasattr(window_query(*buckets[0]), "count"):
+        return True
+    logger.info("notes_stats:aggregation_unavailable error=query has no count(), streaming timestamps")
+    return False
+
+
+def _bucket_counts(timestamps: List[datetime], buckets: List[Bucket]) -> List[int]:
+    starts = [start for start, _ in buckets]
+    counts = [0] * len(buckets)
+    for timestamp in timestamps:
+        index = bisect.bisect_right(starts, timestamp) - 1
+        if 0 <= index < len(buckets) and timestamp < buckets[index][1]:
+            counts[index] += 1
+    return counts
+
+
+def _stream_query(window_query: WindowQuery, buckets: List[Bucket]) -> Any:
+    return window_query(buckets[0][0], buckets[-1][1]).select(["timestamp"])
+
+
+def count_buckets(
+    window_query: WindowQuery,
+    buckets: List[Bucket],
+    executor: Executor,
+) -> Tuple[List[int], str]:
+    """Return (per-bucket counts, method), preferring server-side count() aggregation."""
+    if _can_aggregate(window_query, buckets):
+        try:
+            # One context copy per worker call keeps the aggregation spans under the tool span
+            contexts = [contextvars.copy_context() for _ in buckets]
+            counts = list(executor.map(
+                lambda context, b: context.run(_aggregate_count, window_query(*b)), contexts, buckets
+            ))
+            return counts, "aggregation"
+        except AGGREGATION_UNAVAILABLE as e:
+            logger.info("notes_stats:aggregation_unavailable error=%s, streaming timestamps", e)
+
+    query = _stream_query(window_query, buckets)
+    with firestore_span("query", "notes") as span:
+        timestamps = [snap.get("timestamp") for snap in query.stream(**rpc_options())]
+        span.set_attribute(FIRESTORE_DOCUMENTS, len(timestamps))
+    record_reads("notes", len(timestamps))
+    return _bucket_counts(timestamps, buckets), "stream"
+
+
+async def count_buckets_async(
+    window_query: WindowQuery,
+    buckets: List[Bucket],
+) -> Tuple[List[int], str]:
+    if _can_aggregate(window_query, buckets):
+        try:
+            counts = await asyncio.gather(*(_aggregate_count_async(window_query(*b)) for b in buckets))
+            return list(counts), "aggregation"
+        except AGGREGATION_UNAVAILABLE as e:
+            logger.info("notes_stats:aggregation_unavailable error=%s, streaming timestamps", e)
+
+    query = _stream_query(window_query, buckets)
+    with firestore_span("query", "notes") as span:
+        timestamps = [snap.get("timestamp") async for snap in query.stream(**rpc_options())]
+        span.set_attribute(FIRESTORE_DOCUMENTS, len(timestamps))
+    record_reads("notes", len(timestamps))
+    return _bucket_counts(timestamps, buckets), "stream"
+
+
+def stats_payload(buckets: List[Bucket], counts: List[int], bucket: str, method: str) -> Dict[str, Any]:
+    """Compact histogram: bucket start dates with their note counts."""
+    return {
+        "total": sum(counts),
+        "bucket": bucket,
+        "since": buckets[0][0].isoformat(),
+        "until": buckets[-1][1].isoformat(),
+        "histogram": [
+            {"start": start.date().isoformat(), "count": count}
+            for (start, _), count in zip(buckets, counts)
+        ],
+        "method": method,
+    }
@@ -0,0 +1,544 @@
+import os
+import time
+import pickle
+import random
+import asyncio
+import logging
+import threading
+import contextvars
+import concurrent.futures
+from collections import OrderedDict, deque
+from typing import Any, Awaitable, Callable, Deque, Dict, Hashable, List, Optional, Tuple
+
+from google.api_core.exceptions import (
+    Aborted,
+    DeadlineExceeded,
+    InternalServerError,
+    ResourceExhausted,
+    ServiceUnavailable,
+)
+
+from capymind_agent.tools.config import env_flag, env_int
+from capymind_agent.tools.metrics import firestore_call_events
+from capymind_agent.tools.single_flight import fresh_context
+
+logger = logging.getLogger("capymind.firestore")
+
+# Failures worth another attempt: the backend or the network, not the request.
+# TimeoutError also covers asyncio and concurrent.futures timeouts (our deadlines).
+TRANSIENT_ERRORS = (
+    ServiceUnavailable,
+    DeadlineExceeded,
+    InternalServerError,
+    ResourceExhausted,
+    Aborted,
+    ConnectionError,
+    TimeoutError,
+)
+
+# Whole-call budget per operation in seconds, retries included
+DEFAULT_DEADLINES = {
+    "get_user": 2.0,
+    "get_settings": 2.0,
+    "get_notes": 4.0,
+    "get_context": 4.0,
+    "notes_stats": 5.0,
+    "search_notes": 8.0,
+    "get_digest": 8.0,
+}
+DEFAULT_DEADLINE = 4.0
+
+# Only pure reads are duplicated; get_digest writes the digest back
+HEDGED_OPERATIONS = frozenset({"get_user", "get_settings", "get_notes", "get_context", "notes_stats", "search_notes"})
+
+Result = Dict[str, Any]
+
+# time.monotonic() deadline of the guarded attempt running in this context;
+# Firestore RPCs made under it pass what is left as their timeout
+_rpc_deadline: contextvars.ContextVar[Optional[float]] = contextvars.ContextVar(
+    "capymind_rpc_deadline", default=None
+)
+
+
+def rpc_options() -> Dict[str, Any]:
+    """
+    ``timeout=`` and ``retry=`` for a Firestore RPC: the time left before the
+    guarded call's deadline and no client-side retries, so an RPC the guard
+    stopped waiting for ends with it instead of holding a worker thread for
+    the client's default minute. The guard does the retrying itself, with
+    backoff and the breaker. Empty outside a guarded call.
+    """
+    deadline = _rpc_deadline.get()
+    if deadline is None:
+        return {}
+    return {"timeout": max(0.001, deadline - time.monotonic()), "retry": None}
+
+
+def parse_deadlines(value: Optional[str]) -> Dict[str, float]:
+    """'get_notes=3,search_notes=10' -> {'get_notes': 3.0, 'search_notes': 10.0}; bad entries are skipped."""
+    deadlines: Dict[str, float] = {}
+    for item in (value or "").split(","):
+        operation, _, seconds = item.partition("=")
+        try:
+            deadlines[operation.strip()] = float(seconds)
+        except ValueError:
+            if item.strip():
+                logger.warning("invalid CAPY_FIRESTORE_DEADLINES entry %r", item)
+    return deadlines
+
+
+class CircuitBreaker:
+    """
+    Consecutive-failure breaker for one Firestore database.
+
+    Closed until ``failure_threshold`` calls in a row fail, then open: calls
+    are refused for ``reset_seconds``. After that one trial call is let
+    through (half-open); its success closes the breaker, its failure opens
+    it again.
+    """
+
+    def __init__(self, failure_threshold: int = 5, reset_seconds: float = 30.0, clock: Callable[[], float] = time.monotonic):
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._failures = 0
+        self._opened_at: Optional[float] = None
+        # Start of the half-open trial call; a trial that never reports back
+        # (e.g. cancelled) is replaced after another reset_seconds
+        self._trial: Optional[float] = None
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            if self._opened_at is None:
+                return "closed"
+            return "half_open" if self._clock() - self._opened_at >= self.reset_seconds else "open"
+
+    def allow(self) -> bool:
+        with self._lock:
+            if self._opened_at is None:
+                return True
+            now = self._clock()
+            if now - self._opened_at < self.reset_seconds:
+                return False
+            if self._trial is not None and now - self._trial < self.reset_seconds:
+                return False
+            self._trial = now
+            return True
+
+    def success(self) -> None:
+        with self._lock:
+            if self._opened_at is not None:
+                logger.info("firestore:circuit_closed")
+            self._failures = 0
+            self._opened_at = None
+            self._trial = None
+
+    def failure(self) -> None:
+        with self._lock:
+            self._failures += 1
+            if self._trial is not None or (self._opened_at is None and self._failures >= self.failure_threshold):
+                logger.warning("firestore:circuit_open failures=%d reset_s=%s", self._failures, self.reset_seconds)
+                self._opened_at = self._clock()
+            self._trial = None
+
+
+class LatencyTracker:
+    """Recent successful attempt latencies per operation, for the hedging threshold."""
+
+    def __init__(self, window: int = 256, min_samples: int = 20):
+        self.min_samples = min_samples
+        self._window = window
+        self._lock = threading.Lock()
+        self._samples: Dict[str, Deque[float]] = {}
+
+    def record(self, operation: str, seconds: float) -> None:
+        with self._lock:
+            self._samples.setdefault(operation, deque(maxlen=self._window)).append(seconds)
+
+    def percentile(self, operation: str, pct: float) -> Optional[float]:
+        with self._lock:
+            samples = sorted(self._samples.get(operation, ()))
+        if len(samples) < self.min_samples:
+            return None
+        return samples[min(len(samples) - 1, int(len(samples) * pct / 100))]
+
+
+class StaleResults:
+    """
+    Last successful result per tool call, served while Firestore is unavailable.
+
+    Results are kept pickled: each entry is one bytes object the garbage
+    collector never scans, and callers can change what they put or got
+    without touching the stored copy. At most ``max_entries`` results and
+    ``max_bytes`` in total are kept, least recently stored dropped first; a
+    result bigger than an eighth of ``max_bytes`` is not kept at all.
+    """
+
+    def __init__(
+        self,
+        max_entries: int = 1024,
+        max_age_seconds: float = 86400.0,
+        clock: Callable[[], float] = time.monotonic,
+        max_bytes: int = 16 << 20,
+    ):
+        self.max_entries = max_entries
+        self.max_age_seconds = max_age_seconds
+        self.max_bytes = max_bytes
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[Hashable, Tuple[float, bytes]]" = OrderedDict()
+        self._bytes = 0
+
+    def put(self, key: Hashable, result: Result) -> None:
+        if self.max_entries <= 0:
+            return
+        data = pickle.dumps(result, pickle.HIGHEST_PROTOCOL)
+        with self._lock:
+            self._drop(key)
+            if len(data) > self.max_bytes // 8:
+                return
+            self._entries[key] = (self._clock(), data)
+            self._bytes += len(data)
+            while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                self._drop(next(iter(self._entries)))
+
+    def _drop(self, key: Hashable) -> None:
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self._bytes -= len(entry[1])
+
+    def get(self, key: Hashable) -> Optional[Tuple[float, Result]]:
+        """Return (age in seconds, a copy of the result), or None."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            age = self._clock() - entry[0]
+            if age > self.max_age_seconds:
+                self._drop(key)
+                return None
+        return age, pickle.loads(entry[1])
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {"entries": len(self._entries), "bytes": self._bytes}
+
+
+class CallsSaturated(Exception):
+    """Every worker thread is busy, most likely with reads abandoned at their deadline."""
+
+
+class FirestoreGuard:
+    """
+    Tail-latency controls around one Firestore tool call.
+
+    - Deadline: each operation gets ``deadlines[operation]`` seconds in
+      total (DEFAULT_DEADLINES), retries included; a call still running at
+      the deadline is abandoned (cancelled on asyncio). Its Firestore RPCs
+      get the time left as ``timeout=`` (``rpc_options``), so they end then.
+    - Retries: TRANSIENT_ERRORS (unavailable, server-side deadline exceeded,
+      quota, connection errors) are retried up to ``retries`` times after a
+      full-jitter exponential backoff (``backoff`` doubling up to
+      ``max_backoff``) while time remains.
+    - Hedging (``hedge``): when an attempt at a pure read runs past the
+      operation's recent ``hedge_percentile`` latency, a duplicate is
+      started and the first result wins.
+    - Circuit breaker per (project, database): after
+      ``failure_threshold`` failed calls in a row, calls fail fast for
+      ``reset_seconds``.
+    - Worker threads: blocking calls run on ``max_workers`` threads, and an
+      abandoned attempt holds its thread until its RPC times out. A call
+      finding every thread busy fails at once (counted by the breaker)
+      instead of queueing behind stalled reads, and hedges are skipped.
+
+    When a call fails for good or is refused by the breaker, the last good
+    result of the same call (at most ``stale_max_age`` seconds old) is
+    returned with ``stale: true`` and its age; without one, a retryable
+    error. Responses from Firestore, errors like "not found" included, count
+    as successes.
+    """
+
+    def __init__(
+        self,
+        deadlines: Optional[Dict[str, float]] = None,
+        retries: int = 2,
+        backoff: float = 0.05,
+        max_backoff: float = 1.0,
+        hedge: bool = False,
+        hedge_percentile: float = 95.0,
+        hedge_floor: float = 0.01,
+        failure_threshold: int = 5,
+        reset_seconds: float = 30.0,
+        stale_entries: int = 1024,
+        stale_max_age: float = 86400.0,
+        stale_bytes: int = 16 << 20,
+        clock: Callable[[], float] = time.monotonic,
+        rng: Optional[random.Random] = None,
+        max_workers: int = 32,
+    ):
+        self.deadlines = {**DEFAULT_DEADLINES, **(deadlines or {})}
+        self.retries = retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.hedge = hedge
+        self.hedge_percentile = hedge_percentile
+        self.hedge_floor = hedge_floor
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self.latency = LatencyTracker()
+        self.stale = StaleResults(stale_entries, stale_max_age, clock, stale_bytes)
+        self._clock = clock
+        self._random = rng or random.Random()
+        self._lock = threading.Lock()
+        self._breakers: Dict[Hashable, CircuitBreaker] = {}
+        self._stats = {"calls": 0, "retries": 0, "timeouts": 0, "hedges": 0, "hedge_wins": 0, "rejected": 0, "failures": 0, "stale": 0, "saturated": 0}
+        # Sync calls run here so the caller can stop waiting at the deadline;
+        # _running counts submitted attempts, abandoned ones included
+        self.max_workers = max_workers
+        self._running = 0
+        self._executor = concurrent.futures.ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="capy-firestore-call")
+
+    def deadline(self, operation: str) -> float:
+        return self.deadlines.get(operation, DEFAULT_DEADLINE)
+
+    def breaker(self, key: Hashable) -> CircuitBreaker:
+        with self._lock:
+            breaker = self._breakers.get(key)
+            if breaker is None:
+                breaker = self._breakers[key] = CircuitBreaker(self.failure_threshold, self.reset_seconds, self._clock)
+            return breaker
+
+    def _count(self, operation: str, event: str, amount: int = 1) -> None:
+        with self._lock:
+            self._stats[event] += amount
+        firestore_call_events.inc(amount, operation=operation, event=event)
+
+    def _pause(self, attempt: int) -> float:
+        return self._random.uniform(0, min(self.max_backoff, self.backoff * 2 ** (attempt - 1)))
+
+    def _hedge_after(self, operation: str) -> Optional[float]:
+        if not self.hedge or operation not in HEDGED_OPERATIONS:
+            return None
+        threshold = self.latency.percentile(operation, self.hedge_percentile)
+        return None if threshold is None else max(threshold, self.hedge_floor)
+
+    def _fallback(self, operation: str, key: Hashable, reason: str) -> Result:
+        stale = self.stale.get(key)
+        if stale is None:
+            return {"ok": False, "error": f"Firestore is unavailable ({reason}); try again shortly", "retryable": True}
+        age, result = stale
+        self._count(operation, "stale")
+        logger.warning("firestore:serving_stale op=%s age_s=%.0f reason=%s", operation, age, reason)
+        result["stale"] = True
+        result["stale_seconds"] = round(age)
+        return result
+
+    def _succeeded(self, key: Hashable, breaker: CircuitBreaker, result: Result) -> Result:
+        breaker.success()
+        if isinstance(result, dict) and result.get("ok"):
+            self.stale.put(key, result)
+        return result
+
+    def _failed(self, operation: str, key: Hashable, breaker: CircuitBreaker, error: BaseException) -> Result:
+        breaker.failure()
+        self._count(operation, "failures")
+        logger.warning("firestore:call_failed op=%s error=%s: %s", operation, type(error).__name__, error)
+        return self._fallback(operation, key, type(error).__name__)
+
+    def _timed_out(self, operation: str) -> TimeoutError:
+        self._count(operation, "timeouts")
+        return TimeoutError(f"{operation} exceeded its deadline")
+
+    # Threads ---------------------------------------------------------------
+
+    def call(self, operation: str, key: Hashable, breaker_key: Hashable, fn: Callable[[], Result]) -> Result:
+        """Run ``fn`` (a blocking tool call) under the deadline, retry, hedge and breaker rules."""
+        breaker = self.breaker(breaker_key)
+        if not breaker.allow():
+            self._count(operation, "rejected")
+            return self._fallback(operation, key, "circuit open")
+        self._count(operation, "calls")
+        deadline = self._clock() + self.deadline(operation)
+        attempt = 0
+        while True:
+            try:
+                result = self._attempt(operation, fn, deadline, retry=attempt > 0)
+                return self._succeeded(key, breaker, result)
+            except CallsSaturated as e:
+                self._count(operation, "saturated")
+                return self._failed(operation, key, breaker, e)
+            except TRANSIENT_ERRORS as e:
+                attempt += 1
+                pause = self._pause(attempt)
+                if attempt > self.retries or self._clock() + pause >= deadline:
+                    return self._failed(operation, key, breaker, e)
+                self._count(operation, "retries")
+                time.sleep(pause)
+
+    def _attempt(self, operation: str, fn: Callable[[], Result], deadline: float, retry: bool) -> Result:
+        started = self._clock()
+        # Retries and hedges start their own reads instead of joining the one being replaced
+        first = self._submit(self._context(deadline, fresh=retry), fn)
+        if first is None:
+            raise CallsSaturated(f"all {self.max_workers} Firestore worker threads are busy")
+        futures = [first]
+        hedge_after = self._hedge_after(operation)
+        if hedge_after is not None and started + hedge_after < deadline:
+            done, _ = concurrent.futures.wait(futures, timeout=hedge_after)
+            if not done:
+                hedge = self._submit(self._context(deadline, fresh=True), fn)
+                if hedge is not None:
+                    self._count(operation, "hedges")
+                    futures.append(hedge)
+        pending = set(futures)
+        error: Optional[BaseException] = None
+        while pending:
+            done, pending = concurrent.futures.wait(
+                pending, timeout=max(0.0, deadline - self._clock()), return_when=concurrent.futures.FIRST_COMPLETED
+            )
+            if not done:
+                break
+            for future in done:
+                if future.exception() is None:
+                    self._won(operation, future is not futures[0], started)
+                    return future.result()
+                error = future.exception()
+        # Threads cannot be interrupted; abandoned attempts end with their RPC timeouts
+        if error is not None and not pending:
+            raise error
+        raise self._timed_out(operation)
+
+    def _context(self, deadline: float, fresh: bool) -> contextvars.Context:
+        """Context for one attempt, carrying its deadline to the RPCs it makes."""
+        context = fresh_context() if fresh else contextvars.copy_context()
+        context.run(_rpc_deadline.set, time.monotonic() + deadline - self._clock())
+        return context
+
+    def _submit(self, context: contextvars.Context, fn: Callable[[], Result]) -> Optional["concurrent.futures.Future"]:
+        """Start ``fn`` on a worker thread, or return None when none is free."""
+        with self._lock:
+            if self._running >= self.max_workers:
+                return None
+            self._running += 1
+        try:
+            future = self._executor.submit(context.run, fn)
+        except BaseException:
+            self._release()
+            raise
+        future.add_done_callback(lambda _: self._release())
+        return future
+
+    def _release(self) -> None:
+        with self._lock:
+            self._running -= 1
+
+    def close(self, wait: bool = True) -> None:
+        """Stop the worker threads, by default after abandoned attempts finish."""
+        self._executor.shutdown(wait=wait)
+
+    # asyncio ---------------------------------------------------------------
+
+    async def call_async(
+        self,
+        operation: str,
+        key: Hashable,
+        breaker_key: Hashable,
+        fn: Callable[[], Awaitable[Result]],
+    ) -> Result:
+        """Await ``fn`` under the deadline, retry, hedge and breaker rules."""
+        breaker = self.breaker(breaker_key)
+        if not breaker.allow():
+            self._count(operation, "rejected")
+            return self._fallback(operation, key, "circuit open")
+        self._count(operation, "calls")
+        deadline = self._clock() + self.deadline(operation)
+        attempt = 0
+        while True:
+            try:
+                result = await self._attempt_async(operation, fn, deadline, retry=attempt > 0)
+                return self._succeeded(key, breaker, result)
+            except TRANSIENT_ERRORS as e:
+                attempt += 1
+                pause = self._pause(attempt)
+                if attempt > self.retries or self._clock() + pause >= deadline:
+                    return self._failed(operation, key, breaker, e)
+                self._count(operation, "retries")
+                await asyncio.sleep(pause)
+
+    async def _attempt_async(
+        self,
+        operation: str,
+        fn: Callable[[], Awaitable[Result]],
+        deadline: float,
+        retry: bool,
+    ) -> Result:
+        started = self._clock()
+        loop = asyncio.get_running_loop()
+        tasks: List[asyncio.Task] = [loop.create_task(fn(), context=self._context(deadline, fresh=retry))]
+        try:
+            hedge_after = self._hedge_after(operation)
+            if hedge_after is not None and started + hedge_after < deadline:
+                done, _ = await asyncio.wait(tasks, timeout=hedge_after)
+                if not done:
+                    self._count(operation, "hedges")
+                    tasks.append(loop.create_task(fn(), context=self._context(deadline, fresh=True)))
+            pending = set(tasks)
+            error: Optional[BaseException] = None
+            while pending:
+                done, pending = await asyncio.wait(
+                    pending, timeout=max(0.0, deadline - self._clock()), return_when=asyncio.FIRST_COMPLETED
+                )
+                if not done:
+                    break
+                for task in done:
+                    if task.exception() is None:
+                        self._won(operation, task is not tasks[0], started)
+                        return task.result()
+                    error = task.exception()
+            if error is not None and not pending:
+                raise error
+            raise self._timed_out(operation)
+        finally:
+            # Losing and timed-out attempts are cancelled
+            for task in tasks:
+                task.cancel()
+
+    def _won(self, operation: str, hedged: bool, started: float) -> None:
+        if hedged:
+            self._count(operation, "hedge_wins")
+        else:
+            self.latency.record(operation, self._clock() - started)
+
+    def breaker_states(self) -> Dict[str, str]:
+        with self._lock:
+            breakers = list(self._breakers.items())
+        return {"/".join(map(str, key)) if isinstance(key, tuple) else str(key): breaker.state for key, breaker in breakers}
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            stats: Dict[str, Any] = dict(self._stats, running=self._running)
+        stats["breakers"] = self.breaker_states()
+        stats["stale_results"] = self.stale.stats()
+        return stats
+
+
+# Shared by both Firestore tool variants. CAPY_FIRESTORE_DEADLINES overrides
+# per-operation deadlines ('get_notes=3,search_notes=10'), CAPY_FIRESTORE_RETRIES
+# caps retries, CAPY_FIRESTORE_HEDGE=1 turns on hedged reads, and
+# CAPY_FIRESTORE_BREAKER_FAILURES / CAPY_FIRESTORE_BREAKER_RESET_S tune the
+# breaker; CAPY_FIRESTORE_STALE_MAX_AGE_S bounds how old served results may be,
+# CAPY_FIRESTORE_STALE_ENTRIES / CAPY_FIRESTORE_STALE_MB how many are kept, and
+# CAPY_FIRESTORE_WORKERS the threads running blocking calls.
+firestore_guard = FirestoreGuard(
+    deadlines=parse_deadlines(os.getenv("CAPY_FIRESTORE_DEADLINES")),
+    retries=env_int("CAPY_FIRESTORE_RETRIES", 2),
+    hedge=env_flag("CAPY_FIRESTORE_HEDGE"),
+    failure_threshold=env_int("CAPY_FIRESTORE_BREAKER_FAILURES", 5),
+    reset_seconds=env_int("CAPY_FIRESTORE_BREAKER_RESET_S", 30),
+    stale_entries=env_int("CAPY_FIRESTORE_STALE_ENTRIES", 1024),
+    stale_max_age=env_int("CAPY_FIRESTORE_STALE_MAX_AGE_S", 86400),
+    stale_bytes=env_int("CAPY_FIRESTORE_STALE_MB", 16) << 20,
+    max_workers=env_int("CAPY_FIRESTORE_WORKERS", 32),
+)
@@ -0,0 +1,262 @@
+import time
+import asyncio
+import logging
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+from google.adk.agents.callback_context import CallbackContext
+from google.genai import types
+
+from capymind_agent.tools import firestore_data
+from capymind_agent.tools.config import env_flag, env_int
+from capymind_agent.tools.crisis_lines import location_settings, crisis_directory
+from capymind_agent.tools.format_data import SETTING_LABELS, USER_LABELS
+
+logger = logging.getLogger("capymind.prefetch")
+
+# Session state key holding {"profile", "settings", "fetched_at"}: compact
+# copies of users/{id} and settings/{id} and when they were read (0 while a
+# read is still owed after a failure, with "retry_at" saying when to try again)
+STATE_KEY = "user_context"
+# Rendered for instruction templating: {user_context_text?} and {crisis_lines_text?}
+CONTEXT_TEXT_KEY = "user_context_text"
+CRISIS_TEXT_KEY = "crisis_lines_text"
+# User-scoped flag (kept across the user's sessions): they agreed to their
+# profile and settings being used. Until then {user_context_text?} is empty;
+# the saved location still picks crisis lines
+CONSENT_KEY = "user:data_consent"
+# Agents only transferred to once the user asked for or agreed to a look at their data
+CONSENT_AGENTS = frozenset({"data_fetcher"})
+
+# Fields the agents use; the rest of the documents is bot bookkeeping
+PROFILE_FIELDS = ("FirstName", "LastName", "UserName", "Locale")
+SETTINGS_FIELDS = (
+    "Location",
+    "SecondsFromUTC",
+    "HasMorningReminder",
+    "MorningReminderOffset",
+    "HasEveningReminder",
+    "EveningReminderOffset",
+)
+
+# section -> (operation, fields, labels)
+_SECTIONS: Dict[str, Tuple[str, Tuple[str, ...], Dict[str, str]]] = {
+    "profile": ("get_user", PROFILE_FIELDS, USER_LABELS),
+    "settings": ("get_settings", SETTINGS_FIELDS, SETTING_LABELS),
+}
+
+
+def compact(section: str, data: Dict[str, Any]) -> Dict[str, Any]:
+    """The ``section`` fields the agents use, empty values left out."""
+    _, fields, _ = _SECTIONS[section]
+    # Handle nested settings structure
+    data = data.get("settings", data) if section == "settings" else data
+    return {field: data[field] for field in fields if data.get(field) not in (None, "")}
+
+
+def _display(value: Any) -> str:
+    if isinstance(value, bool):
+        return "Yes" if value else "No"
+    return str(value)
+
+
+def render_context(context: Dict[str, Any]) -> str:
+    """One "- Label: value" line per known profile and settings field."""
+    lines = []
+    for section, (_, fields, labels) in _SECTIONS.items():
+        data = context.get(section) or {}
+        lines.extend(f"- {labels.get(field, field)}: {_display(data[field])}" for field in fields if field in data)
+    return "\n".join(lines)
+
+
+def render_crisis_lines(settings: Optional[Dict[str, Any]]) -> str:
+    """Directory numbers for the saved location, or "" when it matches nothing."""
+    location, seconds_from_utc = location_settings(settings)
+    match = crisis_directory.lookup(location, seconds_from_utc)
+    if match is None:
+        return ""
+    entry = crisis_directory.entry(match)
+    place = ", ".join(part for part in (entry["region"], entry["country_name"]) if part)
+    lines = [f"Crisis lines for {place} (saved location: {location or 'timezone only'}):"]
+    for line in entry["lines"][:3]:
+        contacts = []
+        if line.get("phone"):
+            contacts.append(f"call {line['phone']}")
+        if line.get("sms"):
+            keyword = f"{line['keyword']} to " if line.get("keyword") else ""
+            contacts.append(f"text {keyword}{line['sms']}")
+        lines.append(f"- {line.get('name', 'Crisis line')}: {' or '.join(contacts)}")
+    lines.append(f"- Emergency: {entry['emergency']}")
+    return "\n".join(lines)
+
+
+def _set_if_changed(state: Any, key: str, value: str) -> None:
+    if value != state.get(key):
+        state[key] = value
+
+
+def grant_consent(callback_context: CallbackContext) -> None:
+    """Record that the user agreed to their profile and settings being used, and show them to the agents."""
+    state = callback_context.state
+    if not state.get(CONSENT_KEY):
+        state[CONSENT_KEY] = True
+    _set_if_changed(state, CONTEXT_TEXT_KEY, render_context(state.get(STATE_KEY) or {}))
+
+
+class SessionPrefetcher:
+    """
+    Keeps a compact profile and settings of the user in session state.
+
+    Runs as a before_agent_callback. At the start of a session's first
+    invocation, and whenever the copy is older than ``ttl_seconds``, starts
+    a background read of users/{id} and settings/{id} through the Firestore
+    tool (document cache, single-flight and the guard included) and waits
+    for it at most ``wait_seconds``, kept below the crisis lookup timeout so
+    crisis screening is never held up. A read that finishes in time is
+    stored right away; a slower one is stored by the next callback of the
+    user (the next agent or turn), since state only persists through a
+    callback's context. Compact copies plus their renderings for
+    ``{user_context_text?}`` and ``{crisis_lines_text?}`` go to the agents'
+    instructions. The profile and settings are only rendered once the user
+    has consented (CONSENT_KEY, set by grant_consent or by invoking one of
+    ``consent_agents``); the crisis lines for the saved location always are.
+    Missing documents are stored as empty; a failed read keeps the previous
+    copy and is retried after ``retry_seconds``. At most ``max_pending``
+    reads are kept waiting to be stored.
+    """
+
+    def __init__(
+        self,
+        ttl_seconds: float = 900.0,
+        enabled: bool = True,
+        clock=time.time,
+        consent_agents=CONSENT_AGENTS,
+        wait_seconds: float = 0.2,
+        retry_seconds: float = 60.0,
+        max_pending: int = 1024,
+    ):
+        self.ttl_seconds = ttl_seconds
+        self.enabled = enabled
+        self.consent_agents = consent_agents
+        self.wait_seconds = wait_seconds
+        self.retry_seconds = retry_seconds
+        self.max_pending = max_pending
+        self._clock = clock
+        self._pending: "OrderedDict[str, asyncio.Task]" = OrderedDict()
+        self._stats = {"fresh": 0, "fetches": 0, "deferred": 0, "failures": 0}
+
+    def _due(self, context: Optional[Dict[str, Any]]) -> bool:
+        """Whether the copy in state should be read again."""
+        context = context or {}
+        fetched_at = context.get("fetched_at") or 0
+        if fetched_at:
+            return self._clock() - fetched_at >= self.ttl_seconds
+        return self._clock() >= (context.get("retry_at") or 0)
+
+    async def _read(self, user_id: str) -> Tuple[float, List[Dict[str, Any]]]:
+        results = await asyncio.gather(*(
+            firestore_data.user_data_async(operation, user_id)
+            for operation, _, _ in _SECTIONS.values()
+        ))
+        return self._clock(), results
+
+    def _pending_read(self, user_id: str) -> Optional[asyncio.Task]:
+        task = self._pending.get(user_id)
+        if task is not None and task.get_loop() is not asyncio.get_running_loop():
+            # Left behind by a closed event loop
+            del self._pending[user_id]
+            return None
+        return task
+
+    def _start_read(self, user_id: str) -> asyncio.Task:
+        self._stats["fetches"] += 1
+        task = asyncio.ensure_future(self._read(user_id))
+        self._pending[user_id] = task
+        while len(self._pending) > self.max_pending:
+            self._pending.popitem(last=False)
+        return task
+
+    async def prefetch(self, callback_context: CallbackContext) -> None:
+        user_id = firestore_data.user_id_from_context(callback_context)
+        if not self.enabled or user_id is None:
+            return
+        if callback_context.agent_name in self.consent_agents:
+            grant_consent(callback_context)
+        task = self._pending_read(user_id)
+        if task is None:
+            if not self._due(callback_context.state.get(STATE_KEY)):
+                self._stats["fresh"] += 1
+                return
+            task = self._start_read(user_id)
+        if not task.done():
+            await asyncio.wait({task}, timeout=self.wait_seconds)
+            if not task.done():
+                # Stored by a later callback; the agents can fetch the data themselves meanwhile
+                self._stats["deferred"] += 1
+                return
+        if self._pending.get(user_id) is task:
+            del self._pending[user_id]
+        if task.cancelled():
+            return
+        fetched_at, results = task.result()
+        self._store(callback_context, fetched_at, results)
+
+    def _store(self, callback_context: CallbackContext, fetched_at: float, results: List[Dict[str, Any]]) -> None:
+        previous = callback_context.state.get(STATE_KEY)
+        context: Dict[str, Any] = {"fetched_at": fetched_at}
+        for section, result in zip(_SECTIONS, results):
+            if result.get("ok") and not result.get("stale"):
+                context[section] = compact(section, result["data"])
+            elif not result.get("ok") and str(result.get("error", "")).endswith("not found"):
+                context[section] = {}
+            else:
+                # Unavailable, or only a stale copy: use the best we have and read again later
+                if result.get("ok"):
+                    context[section] = compact(section, result["data"])
+                else:
+                    context[section] = (previous or {}).get(section, {})
+                context["fetched_at"] = 0
+                context["retry_at"] = self._clock() + self.retry_seconds
+                self._stats["failures"] += 1
+                logger.warning(
+                    "prefetch:failed section=%s agent=%s error=%s",
+                    section, callback_context.agent_name, result.get("error", "stale"),
+                )
+
+        state = callback_context.state
+        state[STATE_KEY] = context
+        _set_if_changed(state, CONTEXT_TEXT_KEY, render_context(context) if state.get(CONSENT_KEY) else "")
+        _set_if_changed(state, CRISIS_TEXT_KEY, render_crisis_lines(context["settings"]))
+        logger.info(
+            "prefetch:stored agent=%s profile_fields=%d settings_fields=%d fresh=%s",
+            callback_context.agent_name, len(context["profile"]), len(context["settings"]), bool(context["fetched_at"]),
+        )
+
+    def stats(self) -> Dict[str, int]:
+        return dict(self._stats)
+
+
+# Shared by every agent. CAPY_PREFETCH_TTL_S (900) sets how long the copy in
+# session state is used before being read again, CAPY_PREFETCH_WAIT_MS (200)
+# how long a callback waits for the read (keep it below
+# CAPY_CRISIS_LOOKUP_TIMEOUT) and CAPY_PREFETCH_RETRY_S (60) how long after a
+# failure to read again; CAPY_PREFETCH=0 turns it off.
+session_prefetcher = SessionPrefetcher(
+    ttl_seconds=env_int("CAPY_PREFETCH_TTL_S", 900),
+    enabled=env_flag("CAPY_PREFETCH", True),
+    wait_seconds=env_int("CAPY_PREFETCH_WAIT_MS", 200) / 1000,
+    retry_seconds=env_int("CAPY_PREFETCH_RETRY_S", 60),
+)
+
+
+async def prefetch_user_context(callback_context: CallbackContext) -> Optional[types.Content]:
+    """
+    before_agent_callback: keep a compact profile and settings of the user in
+    session state so instructions can use them, once the user consents,
+    without a tool call.
+    """
+    try:
+        await session_prefetcher.prefetch(callback_context)
+    except Exception:
+        # The agents can still fetch the data themselves
+        logger.warning("prefetch:error agent=%s", callback_context.agent_name, exc_info=True)
+    return None
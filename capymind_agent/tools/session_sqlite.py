@@ -0,0 +1,352 @@
+"""
+Tuned SQLite session store for single-node deployments.
+
+ADK's DatabaseSessionService (``sqlite:///./sessions.db``) runs synchronous
+SQLAlchemy calls on the event loop, commits once per event with the default
+rollback journal and keeps every session forever. ``SqliteSessionService``
+(``sqlite+wal:///./sessions.db``) is a CachedSessionService over a SQLite file
+with:
+
+- WAL journaling, so readers never wait for the writer, and
+  ``synchronous=NORMAL`` (no fsync per commit; a power loss can drop the last
+  commits but never corrupts the file);
+- a pool of reader connections used from worker threads, so queries do not
+  block the event loop;
+- one writer connection that commits everything queued since its previous
+  commit in a single transaction (group commit), on top of the per-turn
+  batching of CachedSessionService;
+- a retention job that deletes sessions idle for longer than
+  ``retention_days``, or moves them to an archive database, and hands the
+  freed pages back to the file system.
+
+The tables are its own (``sessions``, ``events``, ``app_states``,
+``user_states``); sessions stored by DatabaseSessionService are not migrated.
+"""
+
+import json
+import time
+import queue
+import sqlite3
+import asyncio
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+from google.adk.events import Event
+
+from .session_store import CachedSessionService, SessionKey, StoredSession
+
+logger = logging.getLogger("capymind.sessions")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS sessions (
+    app_name TEXT NOT NULL,
+    user_id TEXT NOT NULL,
+    id TEXT NOT NULL,
+    state TEXT NOT NULL,
+    update_time REAL NOT NULL,
+    event_count INTEGER NOT NULL,
+    PRIMARY KEY (app_name, user_id, id)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS sessions_by_update_time ON sessions (update_time);
+CREATE TABLE IF NOT EXISTS events (
+    app_name TEXT NOT NULL,
+    user_id TEXT NOT NULL,
+    session_id TEXT NOT NULL,
+    seq INTEGER NOT NULL,
+    event TEXT NOT NULL,
+    PRIMARY KEY (app_name, user_id, session_id, seq)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS app_states (
+    app_name TEXT PRIMARY KEY,
+    state TEXT NOT NULL
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS user_states (
+    app_name TEXT NOT NULL,
+    user_id TEXT NOT NULL,
+    state TEXT NOT NULL,
+    PRIMARY KEY (app_name, user_id)
+) WITHOUT ROWID;
+"""
+
+# Sessions pruned per transaction, so pruning never holds the writer for long
+_PRUNE_CHUNK = 500
+
+
+def _connect(path: str) -> sqlite3.Connection:
+    # Autocommit mode: transactions are opened explicitly
+    conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.execute("PRAGMA busy_timeout=5000")
+    conn.execute("PRAGMA temp_store=MEMORY")
+    return conn
+
+
+def _load_state(row: Optional[Tuple[str]]) -> Dict[str, Any]:
+    return json.loads(row[0]) if row else {}
+
+
+def _merge_state_row(conn: sqlite3.Connection, table: str, columns: Sequence[str], values: Sequence[str], delta: Dict[str, Any]) -> None:
+    where = " AND ".join(f"{column} = ?" for column in columns)
+    state = _load_state(conn.execute(f"SELECT state FROM {table} WHERE {where}", values).fetchone())
+    state.update(delta)
+    placeholders = ", ".join("?" * (len(columns) + 1))
+    conn.execute(
+        f"INSERT OR REPLACE INTO {table} ({', '.join(columns)}, state) VALUES ({placeholders})",
+        (*values, json.dumps(state)),
+    )
+
+
+class SqliteSessionService(CachedSessionService):
+    """
+    Sessions in a local SQLite file tuned for concurrent turns; see the module
+    docstring. Call ``start()`` from the app's lifespan to run the retention
+    job every ``prune_interval`` seconds (``retention_days=0`` keeps sessions
+    forever).
+    """
+
+    def __init__(
+        self,
+        path: str,
+        readers: int = 4,
+        retention_days: float = 30.0,
+        archive_path: Optional[str] = None,
+        prune_interval: float = 3600.0,
+        **kwargs: Any,
+    ):
+        super().__init__(**kwargs)
+        self.path = path
+        self.retention_days = retention_days
+        self.archive_path = archive_path
+        self.prune_interval = prune_interval
+        self._writer = self._open_writer()
+        self._connections = [_connect(path) for _ in range(max(1, readers))]
+        self._readers: "queue.SimpleQueue[sqlite3.Connection]" = queue.SimpleQueue()
+        for conn in self._connections:
+            self._readers.put(conn)
+        self._read_executor = ThreadPoolExecutor(len(self._connections), thread_name_prefix="capymind-sqlite-read")
+        self._write_executor = ThreadPoolExecutor(1, thread_name_prefix="capymind-sqlite-write")
+        # (function, args, future) waiting for the writer's next transaction
+        self._queued: List[Tuple[Callable[..., Any], tuple, asyncio.Future]] = []
+        self._committer: Optional[asyncio.Task] = None
+        self._retention_task: Optional[asyncio.Task] = None
+        self._stats.update(reads=0, commits=0, writes=0, pruned=0)
+
+    def _open_writer(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+        # Only takes effect on a new file: lets prune() return freed pages
+        conn.execute("PRAGMA auto_vacuum=INCREMENTAL")
+        conn.close()
+        conn = _connect(self.path)
+        conn.executescript(_SCHEMA)
+        if self.archive_path:
+            archive = sqlite3.connect(self.archive_path)
+            archive.executescript(_SCHEMA)
+            archive.close()
+            conn.execute("ATTACH DATABASE ? AS archive", (self.archive_path,))
+        return conn
+
+    # Connections -------------------------------------------------------------
+
+    async def _read(self, function: Callable[..., Any], *args: Any) -> Any:
+        """Run ``function(conn, *args)`` on a pooled reader connection in a worker thread."""
+
+        def run() -> Any:
+            conn = self._readers.get()
+            try:
+                return function(conn, *args)
+            finally:
+                self._readers.put(conn)
+
+        self._stats["reads"] += 1
+        return await asyncio.get_running_loop().run_in_executor(self._read_executor, run)
+
+    async def _transact(self, function: Callable[..., Any], *args: Any) -> Any:
+        """Run ``function(conn, *args)`` in the writer's next transaction."""
+        future = asyncio.get_running_loop().create_future()
+        self._queued.append((function, args, future))
+        if self._committer is None or self._committer.done():
+            self._committer = asyncio.ensure_future(self._commit_queued())
+        return await future
+
+    async def _commit_queued(self) -> None:
+        loop = asyncio.get_running_loop()
+        while self._queued:
+            batch, self._queued = self._queued, []
+            try:
+                results = await loop.run_in_executor(self._write_executor, self._commit, batch)
+            except Exception as e:
+                results = [(False, e)] * len(batch)
+            for (_, _, future), (ok, result) in zip(batch, results):
+                if future.done():
+                    continue
+                if ok:
+                    future.set_result(result)
+                else:
+                    future.set_exception(result)
+
+    def _commit(self, batch: List[Tuple[Callable[..., Any], tuple, asyncio.Future]]) -> List[Tuple[bool, Any]]:
+        """Writer thread: one transaction for the batch; a failing item only rolls back its savepoint."""
+        conn = self._writer
+        results: List[Tuple[bool, Any]] = []
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            for function, args, _ in batch:
+                conn.execute("SAVEPOINT item")
+                try:
+                    results.append((True, function(conn, *args)))
+                except Exception as e:
+                    conn.execute("ROLLBACK TO item")
+                    results.append((False, e))
+                conn.execute("RELEASE item")
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        self._stats["commits"] += 1
+        self._stats["writes"] += len(batch)
+        return results
+
+    # Storage primitives ------------------------------------------------------
+
+    async def _read_meta(self, key: SessionKey) -> Tuple[Optional[StoredSession], Dict[str, Any], Dict[str, Any]]:
+        def read(conn: sqlite3.Connection):
+            row = conn.execute(
+                "SELECT state, update_time, event_count FROM sessions WHERE app_name = ? AND user_id = ? AND id = ?", key
+            ).fetchone()
+            app_state = conn.execute("SELECT state FROM app_states WHERE app_name = ?", key[:1]).fetchone()
+            user_state = conn.execute(
+                "SELECT state FROM user_states WHERE app_name = ? AND user_id = ?", key[:2]
+            ).fetchone()
+            return row, app_state, user_state
+
+        row, app_state, user_state = await self._read(read)
+        stored = StoredSession(json.loads(row[0]), row[1], row[2]) if row else None
+        return stored, _load_state(app_state), _load_state(user_state)
+
+    async def _read_events(self, key: SessionKey, start: int) -> List[Event]:
+        def read(conn: sqlite3.Connection):
+            return conn.execute(
+                "SELECT event FROM events WHERE app_name = ? AND user_id = ? AND session_id = ? AND seq >= ? ORDER BY seq",
+                (*key, start),
+            ).fetchall()
+
+        return [Event.model_validate_json(row[0]) for row in await self._read(read)]
+
+    async def _write(
+        self,
+        key: SessionKey,
+        stored: StoredSession,
+        events: List[Event],
+        app_delta: Dict[str, Any],
+        user_delta: Dict[str, Any],
+        created: bool = False,
+    ) -> None:
+        # Serialised here, so the writer thread only runs SQL
+        first = stored.event_count - len(events)
+        event_rows = [(*key, seq, event.model_dump_json(exclude_none=True)) for seq, event in enumerate(events, first)]
+        session_row = (*key, json.dumps(stored.state), stored.update_time, stored.event_count)
+
+        def write(conn: sqlite3.Connection) -> None:
+            conn.executemany("INSERT INTO events VALUES (?, ?, ?, ?, ?)", event_rows)
+            if app_delta:
+                _merge_state_row(conn, "app_states", ("app_name",), key[:1], app_delta)
+            if user_delta:
+                _merge_state_row(conn, "user_states", ("app_name", "user_id"), key[:2], user_delta)
+            conn.execute("INSERT OR REPLACE INTO sessions VALUES (?, ?, ?, ?, ?, ?)", session_row)
+
+        await self._transact(write)
+
+    async def _list(self, app_name: str, user_id: str) -> Tuple[List[Tuple[str, StoredSession]], Dict[str, Any], Dict[str, Any]]:
+        def read(conn: sqlite3.Connection):
+            rows = conn.execute(
+                "SELECT id, state, update_time FROM sessions WHERE app_name = ? AND user_id = ?", (app_name, user_id)
+            ).fetchall()
+            app_state = conn.execute("SELECT state FROM app_states WHERE app_name = ?", (app_name,)).fetchone()
+            user_state = conn.execute(
+                "SELECT state FROM user_states WHERE app_name = ? AND user_id = ?", (app_name, user_id)
+            ).fetchone()
+            return rows, app_state, user_state
+
+        rows, app_state, user_state = await self._read(read)
+        records = [(session_id, StoredSession(json.loads(state), update_time, 0)) for session_id, state, update_time in rows]
+        return records, _load_state(app_state), _load_state(user_state)
+
+    async def _delete(self, key: SessionKey) -> None:
+        def delete(conn: sqlite3.Connection) -> None:
+            conn.execute("DELETE FROM events WHERE app_name = ? AND user_id = ? AND session_id = ?", key)
+            conn.execute("DELETE FROM sessions WHERE app_name = ? AND user_id = ? AND id = ?", key)
+
+        await self._transact(delete)
+
+    async def _close_store(self) -> None:
+        if self._retention_task is not None:
+            self._retention_task.cancel()
+            self._retention_task = None
+        self._read_executor.shutdown(wait=True)
+        self._write_executor.shutdown(wait=True)
+        for conn in [self._writer, *self._connections]:
+            conn.close()
+
+    # Retention ---------------------------------------------------------------
+
+    def start(self) -> None:
+        if self.retention_days > 0 and self._retention_task is None:
+            self._retention_task = asyncio.get_running_loop().create_task(self._retention_loop())
+
+    async def _retention_loop(self) -> None:
+        while True:
+            try:
+                await self.prune()
+            except Exception:
+                logger.exception("sessions:prune_failed")
+            await asyncio.sleep(self.prune_interval)
+
+    async def prune(self, now: Optional[float] = None) -> int:
+        """
+        Delete (or archive) sessions not updated for ``retention_days``, in
+        chunks of one transaction each, then compact the file; returns the
+        number of sessions removed.
+        """
+        cutoff = (now if now is not None else time.time()) - self.retention_days * 86400
+        archive = bool(self.archive_path)
+
+        def prune_chunk(conn: sqlite3.Connection) -> int:
+            keys = conn.execute(
+                "SELECT app_name, user_id, id FROM sessions WHERE update_time < ? LIMIT ?", (cutoff, _PRUNE_CHUNK)
+            ).fetchall()
+            if archive:
+                conn.executemany(
+                    "INSERT OR REPLACE INTO archive.events SELECT * FROM events"
+                    " WHERE app_name = ? AND user_id = ? AND session_id = ?", keys,
+                )
+                conn.executemany(
+                    "INSERT OR REPLACE INTO archive.sessions SELECT * FROM sessions"
+                    " WHERE app_name = ? AND user_id = ? AND id = ?", keys,
+                )
+            conn.executemany("DELETE FROM events WHERE app_name = ? AND user_id = ? AND session_id = ?", keys)
+            conn.executemany("DELETE FROM sessions WHERE app_name = ? AND user_id = ? AND id = ?", keys)
+            return len(keys)
+
+        pruned = 0
+        while True:
+            count = await self._transact(prune_chunk)
+            pruned += count
+            if count < _PRUNE_CHUNK:
+                break
+        if pruned:
+            for key, entry in list(self._entries.items()):
+                if not entry.dirty and entry.session.last_update_time < cutoff:
+                    del self._entries[key]
+            await asyncio.get_running_loop().run_in_executor(self._write_executor, self._compact)
+            self._stats["pruned"] += pruned
+            logger.info("sessions:pruned %d sessions idle since %s", pruned, time.strftime("%Y-%m-%d", time.gmtime(cutoff)))
+        return pruned
+
+    def _compact(self) -> None:
+        """Writer thread: return free pages to the file system and truncate the WAL."""
+        # incremental_vacuum frees one page per step and returns no rows, so a
+        # plain execute() would stop after the first page
+        self._writer.executescript("PRAGMA main.incremental_vacuum;")
+        self._writer.execute("PRAGMA wal_checkpoint(TRUNCATE)")
@@ -0,0 +1,753 @@
+"""
+Shared session storage so the served app scales out without sticky sessions.
+
+ADK's DatabaseSessionService keeps sessions in one SQLite file per Cloud Run
+instance: a conversation breaks as soon as a request lands on another
+instance, and every write on an instance serialises on the file lock. The
+services here keep sessions in storage every instance shares:
+
+- ``FirestoreSessionService`` (``firestore://[database]``) stores a session in
+  ``adk_apps/{app}/users/{user}/sessions/{session_id}`` with its events in an
+  ``events`` subcollection; ``app:`` and ``user:`` state live on the app and
+  user documents.
+- ``KeyValueSessionService`` (``redis://host:port/db``, ``rediss://`` for TLS)
+  stores hashes, lists and sets in a Redis-compatible store;
+  ``tests.fake_kv.FakeKeyValueStore`` stands in for it locally.
+
+Both cache active sessions in memory and batch event appends. ``get_session``
+costs one small read that checks the cached copy is still current (another
+instance may have served the previous turn) and reads only events it has not
+seen. Appends are buffered and written together when an agent produces the
+turn's final response or ``max_batch`` events are pending. Events not
+followed by either (a turn that failed midway) are written before the HTTP
+response ends (``FlushSessionsMiddleware``): Cloud Run throttles the CPU
+between requests, so nothing may wait for a later timer. The ``flush_delay``
+timer remains for callers outside a request, and ``close()`` writes whatever
+is left on shutdown.
+
+Concurrent turns on one session from different instances keep all events;
+session state is last-writer-wins, as with ADK's own services.
+"""
+
+import os
+import abc
+import copy
+import json
+import time
+import uuid
+import asyncio
+import logging
+import contextvars
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+from urllib.parse import quote, urlparse
+
+from google.adk.events import Event
+from google.adk.sessions import BaseSessionService, Session
+from google.adk.sessions.base_session_service import GetSessionConfig, ListSessionsResponse
+from google.adk.sessions.state import State
+
+from .client_pool import client_pool
+from .config import env_int
+from .metrics import record_reads
+from .tracing import firestore_span
+
+logger = logging.getLogger("capymind.sessions")
+
+# (app_name, user_id, session_id)
+SessionKey = Tuple[str, str, str]
+
+# Firestore allows 500 writes per batch
+_MAX_BATCH_WRITES = 500
+
+# Sessions the current HTTP request appended events to, collected by
+# FlushSessionsMiddleware (None outside a request)
+_request_sessions: contextvars.ContextVar[Optional[Set[SessionKey]]] = contextvars.ContextVar(
+    "capymind_request_sessions", default=None
+)
+
+
+class StoredSession:
+    """Session record as persisted: session-scoped state, last update time and event count."""
+
+    __slots__ = ("state", "update_time", "event_count")
+
+    def __init__(self, state: Dict[str, Any], update_time: float, event_count: int):
+        self.state = state
+        self.update_time = update_time
+        self.event_count = event_count
+
+
+class _Entry:
+    __slots__ = ("session", "event_count", "update_time", "app_state", "user_state",
+                 "app_delta", "user_delta", "lock", "timer")
+
+    def __init__(self, session: Session, stored: StoredSession, app_state: Dict[str, Any], user_state: Dict[str, Any]):
+        # session.state holds session-scoped keys only; events past event_count are unwritten
+        self.session = session
+        self.event_count = stored.event_count
+        self.update_time = stored.update_time
+        self.app_state = app_state
+        self.user_state = user_state
+        self.app_delta: Dict[str, Any] = {}
+        self.user_delta: Dict[str, Any] = {}
+        self.lock = asyncio.Lock()
+        self.timer: Optional[asyncio.TimerHandle] = None
+
+    @property
+    def dirty(self) -> bool:
+        return len(self.session.events) > self.event_count
+
+
+def _split_state(state: Optional[Dict[str, Any]]) -> Tuple[Dict[str, Any], Dict[str, Any], Dict[str, Any]]:
+    """(app, user, session) parts of a state dict; app/user keys lose their prefix, temp keys are dropped."""
+    app_state: Dict[str, Any] = {}
+    user_state: Dict[str, Any] = {}
+    session_state: Dict[str, Any] = {}
+    for key, value in (state or {}).items():
+        if key.startswith(State.APP_PREFIX):
+            app_state[key[len(State.APP_PREFIX):]] = value
+        elif key.startswith(State.USER_PREFIX):
+            user_state[key[len(State.USER_PREFIX):]] = value
+        elif not key.startswith(State.TEMP_PREFIX):
+            session_state[key] = value
+    return app_state, user_state, session_state
+
+
+def _merge_state(session_state: Dict[str, Any], app_state: Dict[str, Any], user_state: Dict[str, Any]) -> Dict[str, Any]:
+    merged = dict(session_state)
+    merged.update((State.APP_PREFIX + key, value) for key, value in app_state.items())
+    merged.update((State.USER_PREFIX + key, value) for key, value in user_state.items())
+    return copy.deepcopy(merged)
+
+
+class CachedSessionService(BaseSessionService):
+    """
+    ADK session service over shared storage, with an in-memory LRU cache of
+    active sessions and batched event writes.
+
+    Subclasses implement the storage primitives (``_read_meta``,
+    ``_read_events``, ``_write``, ``_list``, ``_delete``); each should be a
+    single round trip where the store allows it.
+    """
+
+    def __init__(self, max_sessions: int = 1024, max_batch: int = 20, flush_delay: float = 1.0):
+        self.max_sessions = max_sessions
+        self.max_batch = max_batch
+        self.flush_delay = flush_delay
+        self._entries: "OrderedDict[SessionKey, _Entry]" = OrderedDict()
+        self._tasks: Set[asyncio.Task] = set()
+        self._stats = {"hits": 0, "refreshes": 0, "misses": 0, "evictions": 0, "flushes": 0, "events_written": 0}
+
+    # Storage primitives ----------------------------------------------------
+
+    @abc.abstractmethod
+    async def _read_meta(self, key: SessionKey) -> Tuple[Optional[StoredSession], Dict[str, Any], Dict[str, Any]]:
+        """The stored session (None if missing), app state and user state."""
+
+    @abc.abstractmethod
+    async def _read_events(self, key: SessionKey, start: int) -> List[Event]:
+        """Stored events from position ``start`` on, oldest first."""
+
+    @abc.abstractmethod
+    async def _write(
+        self,
+        key: SessionKey,
+        stored: StoredSession,
+        events: List[Event],
+        app_delta: Dict[str, Any],
+        user_delta: Dict[str, Any],
+        created: bool = False,
+    ) -> None:
+        """
+        Replace the session record, append ``events`` and merge the state
+        deltas. Stores write the record last (or in one transaction), so a
+        reader never sees an event count ahead of the stored events, and a
+        retried write rewrites the same events.
+        """
+
+    @abc.abstractmethod
+    async def _list(self, app_name: str, user_id: str) -> Tuple[List[Tuple[str, StoredSession]], Dict[str, Any], Dict[str, Any]]:
+        """(session id, stored session) pairs of a user, plus app and user state."""
+
+    @abc.abstractmethod
+    async def _delete(self, key: SessionKey) -> None:
+        """Remove the session record and its events."""
+
+    async def _close_store(self) -> None:
+        """Release the store's connections; nothing by default."""
+
+    # BaseSessionService ----------------------------------------------------
+
+    async def create_session(
+        self,
+        *,
+        app_name: str,
+        user_id: str,
+        state: Optional[Dict[str, Any]] = None,
+        session_id: Optional[str] = None,
+    ) -> Session:
+        session_id = session_id.strip() if session_id and session_id.strip() else str(uuid.uuid4())
+        key = (app_name, user_id, session_id)
+        existing, app_state, user_state = await self._read_meta(key)
+        if existing is not None:
+            raise ValueError(f"Session {session_id} already exists")
+
+        app_delta, user_delta, session_state = _split_state(state)
+        stored = StoredSession(session_state, time.time(), 0)
+        await self._write(key, stored, [], app_delta, user_delta, created=True)
+        app_state.update(app_delta)
+        user_state.update(user_delta)
+        session = Session(
+            id=session_id,
+            app_name=app_name,
+            user_id=user_id,
+            state=dict(session_state),
+            last_update_time=stored.update_time,
+        )
+        entry = _Entry(session, stored, app_state, user_state)
+        self._remember(key, entry)
+        return self._copy(entry)
+
+    async def get_session(
+        self,
+        *,
+        app_name: str,
+        user_id: str,
+        session_id: str,
+        config: Optional[GetSessionConfig] = None,
+    ) -> Optional[Session]:
+        entry = await self._load((app_name, user_id, session_id))
+        if entry is None:
+            return None
+        return self._copy(entry, config)
+
+    async def list_sessions(self, *, app_name: str, user_id: str) -> ListSessionsResponse:
+        records, app_state, user_state = await self._list(app_name, user_id)
+        return ListSessionsResponse(sessions=[
+            Session(
+                id=session_id,
+                app_name=app_name,
+                user_id=user_id,
+                state=_merge_state(stored.state, app_state, user_state),
+                last_update_time=stored.update_time,
+            )
+            for session_id, stored in records
+        ])
+
+    async def delete_session(self, *, app_name: str, user_id: str, session_id: str) -> None:
+        key = (app_name, user_id, session_id)
+        entry = self._entries.pop(key, None)
+        if entry is not None and entry.timer is not None:
+            entry.timer.cancel()
+        await self._delete(key)
+
+    async def append_event(self, session: Session, event: Event) -> Event:
+        if event.partial:
+            return event
+        key = (session.app_name, session.user_id, session.id)
+        entry = self._entries.get(key) or await self._load(key)
+        if entry is None:
+            raise ValueError(f"Session {session.id} not found")
+        touched = _request_sessions.get()
+        if touched is not None:
+            touched.add(key)
+        if entry.session.last_update_time > session.last_update_time:
+            # Same check as ADK's DatabaseSessionService
+            raise ValueError(
+                f"Session {session.id} was updated at {entry.session.last_update_time:.3f}, after the"
+                f" caller's copy ({session.last_update_time:.3f}). Please check if it is a stale session."
+            )
+
+        await super().append_event(session=session, event=event)
+        session.last_update_time = event.timestamp
+
+        state_delta = event.actions.state_delta if event.actions else None
+        app_delta, user_delta, session_delta = _split_state(state_delta)
+        entry.session.state.update(session_delta)
+        entry.session.events.append(event)
+        entry.session.last_update_time = event.timestamp
+        entry.app_state.update(app_delta)
+        entry.app_delta.update(app_delta)
+        entry.user_state.update(user_delta)
+        entry.user_delta.update(user_delta)
+
+        if (event.author != "user" and event.is_final_response()) or len(entry.session.events) - entry.event_count >= self.max_batch:
+            await self._flush(key, entry)
+        else:
+            if entry.timer is not None:
+                entry.timer.cancel()
+            entry.timer = asyncio.get_running_loop().call_later(self.flush_delay, self._flush_later, key, entry)
+        return event
+
+    # Cache and write buffer -------------------------------------------------
+
+    async def flush(self, keys: Optional[Iterable[SessionKey]] = None) -> None:
+        """Write buffered events now: those of the sessions in ``keys``, or of every session."""
+        if keys is not None:
+            entries = [(key, self._entries.get(key)) for key in keys]
+            await asyncio.gather(*(self._flush(key, entry) for key, entry in entries if entry is not None and entry.dirty))
+            return
+        await asyncio.gather(*(self._flush(key, entry) for key, entry in list(self._entries.items()) if entry.dirty))
+        if self._tasks:
+            await asyncio.gather(*self._tasks, return_exceptions=True)
+
+    def start(self) -> None:
+        """Start background maintenance, if the store has any; call from the app's lifespan."""
+
+    async def close(self) -> None:
+        """Flush buffered events and release the store; call on shutdown."""
+        await self.flush()
+        await self._close_store()
+
+    def stats(self) -> Dict[str, int]:
+        stats = dict(self._stats)
+        stats["size"] = len(self._entries)
+        return stats
+
+    async def _load(self, key: SessionKey) -> Optional[_Entry]:
+        """Cached entry brought up to date with storage, or loaded from it."""
+        entry = self._entries.get(key)
+        if entry is not None and entry.dirty:
+            # Our own writes must land before comparing with storage
+            await self._flush(key, entry)
+
+        stored, app_state, user_state = await self._read_meta(key)
+        if stored is None:
+            self._entries.pop(key, None)
+            return None
+
+        if entry is not None and (stored.event_count, stored.update_time) == (entry.event_count, entry.update_time):
+            self._stats["hits"] += 1
+        elif entry is not None and stored.event_count > entry.event_count:
+            # Another instance served the latest turns; fetch only those
+            self._stats["refreshes"] += 1
+            entry.session.events.extend(await self._read_events(key, entry.event_count))
+        else:
+            self._stats["misses"] += 1
+            session = Session(
+                id=key[2],
+                app_name=key[0],
+                user_id=key[1],
+                events=await self._read_events(key, 0),
+            )
+            entry = _Entry(session, stored, {}, {})
+        entry.session.state = stored.state
+        entry.session.last_update_time = stored.update_time
+        entry.event_count = len(entry.session.events)
+        entry.update_time = stored.update_time
+        entry.app_state = app_state
+        entry.user_state = user_state
+        self._remember(key, entry)
+        return entry
+
+    def _remember(self, key: SessionKey, entry: _Entry) -> None:
+        self._entries[key] = entry
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_sessions:
+            oldest_key, oldest = next(iter(self._entries.items()))
+            if oldest.dirty:
+                # Kept until its scheduled flush; evicted on a later insert
+                break
+            del self._entries[oldest_key]
+            self._stats["evictions"] += 1
+
+    def _copy(self, entry: _Entry, config: Optional[GetSessionConfig] = None) -> Session:
+        # Events are shared with the cache: ADK does not modify an event once appended
+        events = entry.session.events
+        if config and config.num_recent_events:
+            events = events[-config.num_recent_events:]
+        if config and config.after_timestamp:
+            events = [event for event in events if event.timestamp >= config.after_timestamp]
+        return Session(
+            id=entry.session.id,
+            app_name=entry.session.app_name,
+            user_id=entry.session.user_id,
+            state=_merge_state(entry.session.state, entry.app_state, entry.user_state),
+            events=list(events),
+            last_update_time=entry.session.last_update_time,
+        )
+
+    async def _flush(self, key: SessionKey, entry: _Entry) -> None:
+        async with entry.lock:
+            if entry.timer is not None:
+                entry.timer.cancel()
+                entry.timer = None
+            count = len(entry.session.events)
+            if count == entry.event_count:
+                return
+            events = entry.session.events[entry.event_count:count]
+            stored = StoredSession(dict(entry.session.state), events[-1].timestamp, count)
+            app_delta, entry.app_delta = entry.app_delta, {}
+            user_delta, entry.user_delta = entry.user_delta, {}
+            try:
+                await self._write(key, stored, events, app_delta, user_delta)
+            except Exception:
+                # Keep the deltas for the next attempt; newer values win
+                entry.app_delta = {**app_delta, **entry.app_delta}
+                entry.user_delta = {**user_delta, **entry.user_delta}
+                raise
+            entry.event_count = count
+            entry.update_time = stored.update_time
+            self._stats["flushes"] += 1
+            self._stats["events_written"] += len(events)
+
+    def _flush_later(self, key: SessionKey, entry: _Entry) -> None:
+        entry.timer = None
+        task = asyncio.ensure_future(self._flush_quietly(key, entry))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _flush_quietly(self, key: SessionKey, entry: _Entry) -> None:
+        try:
+            await self._flush(key, entry)
+        except Exception:
+            logger.exception("sessions:flush_failed session=%s", key[2])
+
+
+SESSIONS_COLLECTION = "adk_apps"
+
+
+class FirestoreSessionService(CachedSessionService):
+    """
+    Sessions in Firestore. ``get_session`` reads the session, app and user
+    documents in one ``get_all``; a flush is one batched write.
+    """
+
+    def __init__(
+        self,
+        client: Any = None,
+        project_id: Optional[str] = None,
+        database: Optional[str] = None,
+        root_collection: str = SESSIONS_COLLECTION,
+        **kwargs: Any,
+    ):
+        super().__init__(**kwargs)
+        self._client = client
+        self._project_id = project_id
+        self._database = database
+        self.root_collection = root_collection
+
+    def _db(self) -> Any:
+        # The pooled async client binds to the serving event loop on first use
+        return self._client or client_pool.get_async(self._project_id, self._database)
+
+    def _app_ref(self, app_name: str) -> Any:
+        return self._db().collection(self.root_collection).document(app_name)
+
+    def _user_ref(self, app_name: str, user_id: str) -> Any:
+        return self._app_ref(app_name).collection("users").document(user_id)
+
+    def _session_ref(self, key: SessionKey) -> Any:
+        return self._user_ref(key[0], key[1]).collection("sessions").document(key[2])
+
+    async def _get_all(self, refs: List[Any]) -> List[Optional[Dict[str, Any]]]:
+        """Documents for ``refs`` in order (None when missing); get_all may answer out of order."""
+        with firestore_span("get_all", self.root_collection):
+            found = {snap.reference.path: snap.to_dict() async for snap in self._db().get_all(refs) if snap.exists}
+        record_reads(self.root_collection, len(refs))
+        return [found.get(ref.path) for ref in refs]
+
+    async def _read_meta(self, key: SessionKey) -> Tuple[Optional[StoredSession], Dict[str, Any], Dict[str, Any]]:
+        session, app_state, user_state = await self._get_all(
+            [self._session_ref(key), self._app_ref(key[0]), self._user_ref(key[0], key[1])]
+        )
+        stored = None
+        if session is not None:
+            stored = StoredSession(session.get("state") or {}, session["update_time"], session["event_count"])
+        return stored, app_state or {}, user_state or {}
+
+    async def _read_events(self, key: SessionKey, start: int) -> List[Event]:
+        query = self._session_ref(key).collection("events")
+        if start:
+            query = query.where("seq", ">=", start)
+        with firestore_span("query", "events"):
+            documents = [snap.to_dict() async for snap in query.order_by("seq").stream()]
+        record_reads("events", len(documents))
+        return [Event.model_validate(document["event"]) for document in documents]
+
+    async def _write(
+        self,
+        key: SessionKey,
+        stored: StoredSession,
+        events: List[Event],
+        app_delta: Dict[str, Any],
+        user_delta: Dict[str, Any],
+        created: bool = False,
+    ) -> None:
+        session_ref = self._session_ref(key)
+        events_ref = session_ref.collection("events")
+        writes: List[Tuple[Any, Dict[str, Any], bool]] = [
+            (events_ref.document(event.id), {"seq": seq, "event": event.model_dump(mode="json", exclude_none=True)}, False)
+            for seq, event in enumerate(events, stored.event_count - len(events))
+        ]
+        # State keys are top-level fields of the app and user documents
+        if app_delta:
+            writes.append((self._app_ref(key[0]), app_delta, True))
+        if user_delta:
+            writes.append((self._user_ref(key[0], key[1]), user_delta, True))
+        # The session record goes last so readers never see a count ahead of the
+        # events. Past 500 writes the commit is split; a failure part-way leaves
+        # events the record does not count yet, and the retried flush rewrites
+        # them under the same ids
+        writes.append((session_ref, {"state": stored.state, "update_time": stored.update_time, "event_count": stored.event_count}, False))
+
+        with firestore_span("commit", self.root_collection):
+            for start in range(0, len(writes), _MAX_BATCH_WRITES):
+                batch = self._db().batch()
+                for ref, data, merge in writes[start:start + _MAX_BATCH_WRITES]:
+                    batch.set(ref, data, merge=merge)
+                await batch.commit()
+
+    async def _list(self, app_name: str, user_id: str) -> Tuple[List[Tuple[str, StoredSession]], Dict[str, Any], Dict[str, Any]]:
+        query = self._user_ref(app_name, user_id).collection("sessions").select(["state", "update_time"])
+        with firestore_span("query", "sessions"):
+            snapshots = [snap async for snap in query.stream()]
+        record_reads("sessions", len(snapshots))
+        app_state, user_state = await self._get_all([self._app_ref(app_name), self._user_ref(app_name, user_id)])
+        records = [(snap.id, StoredSession(snap.get("state") or {}, snap.get("update_time"), 0)) for snap in snapshots]
+        return records, app_state or {}, user_state or {}
+
+    async def _delete(self, key: SessionKey) -> None:
+        session_ref = self._session_ref(key)
+        with firestore_span("query", "events"):
+            refs = [snap.reference async for snap in session_ref.collection("events").select([]).stream()]
+        refs.append(session_ref)
+        with firestore_span("commit", self.root_collection):
+            for start in range(0, len(refs), _MAX_BATCH_WRITES):
+                batch = self._db().batch()
+                for ref in refs[start:start + _MAX_BATCH_WRITES]:
+                    batch.delete(ref)
+                await batch.commit()
+
+
+class KeyValueSessionService(CachedSessionService):
+    """
+    Sessions in a Redis-compatible key-value store. ``client`` is a
+    ``redis.asyncio.Redis`` created with ``decode_responses=True`` or anything
+    with the same hash, list, set and pipeline commands. Keys:
+
+    - ``{prefix}:session:{app}:{user}:{id}`` hash of ``state`` (JSON) and ``update_time``
+    - ``{prefix}:events:{app}:{user}:{id}`` list of events (JSON)
+    - ``{prefix}:sessions:{app}:{user}`` set of session ids
+    - ``{prefix}:app_state:{app}`` / ``{prefix}:user_state:{app}:{user}`` hashes of JSON values
+
+    Reads and flushes are each one pipelined round trip; flushes run in
+    MULTI/EXEC.
+    """
+
+    def __init__(self, client: Any, prefix: str = "capymind", **kwargs: Any):
+        super().__init__(**kwargs)
+        self.client = client
+        self.prefix = prefix
+
+    def _key(self, kind: str, *parts: str) -> str:
+        return ":".join([self.prefix, kind] + [quote(part, safe="") for part in parts])
+
+    @staticmethod
+    def _decode_hash(values: Dict[str, str]) -> Dict[str, Any]:
+        return {field: json.loads(value) for field, value in values.items()}
+
+    async def _read_meta(self, key: SessionKey) -> Tuple[Optional[StoredSession], Dict[str, Any], Dict[str, Any]]:
+        async with self.client.pipeline(transaction=False) as pipe:
+            pipe.hgetall(self._key("session", *key))
+            pipe.llen(self._key("events", *key))
+            pipe.hgetall(self._key("app_state", key[0]))
+            pipe.hgetall(self._key("user_state", key[0], key[1]))
+            meta, event_count, app_state, user_state = await pipe.execute()
+        stored = None
+        if meta:
+            stored = StoredSession(json.loads(meta["state"]), float(meta["update_time"]), int(event_count))
+        return stored, self._decode_hash(app_state), self._decode_hash(user_state)
+
+    async def _read_events(self, key: SessionKey, start: int) -> List[Event]:
+        values = await self.client.lrange(self._key("events", *key), start, -1)
+        return [Event.model_validate_json(value) for value in values]
+
+    async def _write(
+        self,
+        key: SessionKey,
+        stored: StoredSession,
+        events: List[Event],
+        app_delta: Dict[str, Any],
+        user_delta: Dict[str, Any],
+        created: bool = False,
+    ) -> None:
+        async with self.client.pipeline(transaction=True) as pipe:
+            pipe.hset(self._key("session", *key), mapping={
+                "state": json.dumps(stored.state),
+                "update_time": repr(stored.update_time),
+            })
+            if created:
+                pipe.sadd(self._key("sessions", key[0], key[1]), key[2])
+            if events:
+                pipe.rpush(self._key("events", *key), *(event.model_dump_json(exclude_none=True) for event in events))
+            if app_delta:
+                pipe.hset(self._key("app_state", key[0]),
+                          mapping={field: json.dumps(value) for field, value in app_delta.items()})
+            if user_delta:
+                pipe.hset(self._key("user_state", key[0], key[1]),
+                          mapping={field: json.dumps(value) for field, value in user_delta.items()})
+            await pipe.execute()
+
+    async def _list(self, app_name: str, user_id: str) -> Tuple[List[Tuple[str, StoredSession]], Dict[str, Any], Dict[str, Any]]:
+        session_ids = sorted(await self.client.smembers(self._key("sessions", app_name, user_id)))
+        async with self.client.pipeline(transaction=False) as pipe:
+            for session_id in session_ids:
+                pipe.hgetall(self._key("session", app_name, user_id, session_id))
+            pipe.hgetall(self._key("app_state", app_name))
+            pipe.hgetall(self._key("user_state", app_name, user_id))
+            *metas, app_state, user_state = await pipe.execute()
+        records = [
+            (session_id, StoredSession(json.loads(meta["state"]), float(meta["update_time"]), 0))
+            for session_id, meta in zip(session_ids, metas)
+            if meta
+        ]
+        return records, self._decode_hash(app_state), self._decode_hash(user_state)
+
+    async def _delete(self, key: SessionKey) -> None:
+        async with self.client.pipeline(transaction=True) as pipe:
+            pipe.delete(self._key("session", *key), self._key("events", *key))
+            pipe.srem(self._key("sessions", key[0], key[1]), key[2])
+            await pipe.execute()
+
+    async def _close_store(self) -> None:
+        close = getattr(self.client, "aclose", None) or self.client.close
+        await close()
+
+
+def create_session_service(uri: Optional[str]) -> Optional[CachedSessionService]:
+    """
+    Shared session service for ``firestore://[database]`` and
+    ``redis://``/``rediss://`` URIs, or the tuned single-node SQLite store
+    for ``sqlite+wal:///path``; None for URIs ADK serves itself
+    (``sqlite://``, ``agentengine://``, or none for in-memory).
+
+    The cache and batching are tuned with CAPY_SESSION_CACHE_SIZE (sessions),
+    CAPY_SESSION_BATCH (events per write) and CAPY_SESSION_FLUSH_MS; the
+    SQLite store also reads CAPY_SESSION_READERS (pooled connections),
+    CAPY_SESSION_RETENTION_DAYS (0 keeps sessions forever) and
+    CAPY_SESSION_ARCHIVE (database file that receives pruned sessions).
+    """
+    if not uri:
+        return None
+    parsed = urlparse(uri)
+    options = {
+        "max_sessions": env_int("CAPY_SESSION_CACHE_SIZE", 1024),
+        "max_batch": env_int("CAPY_SESSION_BATCH", 20),
+        "flush_delay": env_int("CAPY_SESSION_FLUSH_MS", 1000) / 1000,
+    }
+    if parsed.scheme == "sqlite+wal":
+        from .session_sqlite import SqliteSessionService
+
+        # Same path rules as SQLAlchemy: sqlite+wal:///relative.db, sqlite+wal:////absolute.db
+        return SqliteSessionService(
+            uri.split(":///", 1)[1],
+            readers=env_int("CAPY_SESSION_READERS", 4),
+            retention_days=env_int("CAPY_SESSION_RETENTION_DAYS", 30),
+            archive_path=os.getenv("CAPY_SESSION_ARCHIVE") or None,
+            **options,
+        )
+    if parsed.scheme == "firestore":
+        return FirestoreSessionService(database=parsed.netloc or None, **options)
+    if parsed.scheme in ("redis", "rediss"):
+        try:
+            from redis import asyncio as redis_asyncio
+        except ImportError as e:
+            raise RuntimeError(f"{parsed.scheme}:// session storage needs the redis package (pip install redis)") from e
+        return KeyValueSessionService(redis_asyncio.from_url(uri, decode_responses=True), **options)
+    return None
+
+
+class FlushSessionsMiddleware:
+    """
+    ASGI middleware writing a request's buffered session events before its
+    response ends.
+
+    The last body message is held back until the sessions the request
+    appended events to are flushed, so a turn's events are stored before
+    Cloud Run considers the request done and throttles the instance.
+    Requests that touched no session (/metrics, /list-apps, static files)
+    are not held back, and no request waits on other users' writes.
+    """
+
+    def __init__(self, app: Any, session_service: CachedSessionService):
+        self.app = app
+        self.session_service = session_service
+
+    async def __call__(self, scope: Dict[str, Any], receive: Any, send: Any) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        # Shared with the tasks the app starts, which copy this context
+        touched: Set[SessionKey] = set()
+        token = _request_sessions.set(touched)
+        flushed = False
+
+        async def flush() -> None:
+            nonlocal flushed
+            flushed = True
+            if not touched:
+                return
+            try:
+                await self.session_service.flush(touched)
+            except Exception:
+                logger.exception("sessions:flush_failed path=%s", scope.get("path"))
+
+        async def send_after_flush(message: Dict[str, Any]) -> None:
+            if message["type"] == "http.response.body" and not message.get("more_body", False):
+                await flush()
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_after_flush)
+        finally:
+            if not flushed:
+                # The app failed before finishing its response
+                await flush()
+            _request_sessions.reset(token)
+
+
+def build_fast_api_app(
+    *,
+    agents_dir: str,
+    session_service: CachedSessionService,
+    allow_origins: Optional[List[str]] = None,
+    web: bool = False,
+    lifespan: Any = None,
+    extra_plugins: Optional[List[str]] = None,
+) -> Any:
+    """
+    ADK's FastAPI app serving ``session_service``. ADK 1.16's
+    ``get_fast_api_app`` only builds session services from its own URI
+    schemes, so this assembles the same ``AdkWebServer`` around our service
+    (in-memory artifacts, memory and credentials, local eval sets, as ADK
+    defaults to) and adds ``FlushSessionsMiddleware``.
+    """
+    from pathlib import Path
+
+    from google.adk.artifacts import InMemoryArtifactService
+    from google.adk.auth.credential_service.in_memory_credential_service import InMemoryCredentialService
+    from google.adk.cli import fast_api
+    from google.adk.cli.adk_web_server import AdkWebServer
+    from google.adk.cli.utils.agent_loader import AgentLoader
+    from google.adk.evaluation.local_eval_set_results_manager import LocalEvalSetResultsManager
+    from google.adk.evaluation.local_eval_sets_manager import LocalEvalSetsManager
+    from google.adk.memory import InMemoryMemoryService
+
+    web_server = AdkWebServer(
+        agent_loader=AgentLoader(agents_dir),
+        session_service=session_service,
+        artifact_service=InMemoryArtifactService(),
+        memory_service=InMemoryMemoryService(),
+        credential_service=InMemoryCredentialService(),
+        eval_sets_manager=LocalEvalSetsManager(agents_dir=agents_dir),
+        eval_set_results_manager=LocalEvalSetResultsManager(agents_dir=agents_dir),
+        agents_dir=agents_dir,
+        extra_plugins=extra_plugins,
+    )
+    # The web UI bundled with ADK, as get_fast_api_app(web=True) serves it
+    web_assets_dir = Path(fast_api.__file__).parent / "browser" if web else None
+    app = web_server.get_fast_api_app(lifespan=lifespan, allow_origins=allow_origins, web_assets_dir=web_assets_dir)
+    app.add_middleware(FlushSessionsMiddleware, session_service=session_service)
+    return app
@@ -0,0 +1,142 @@
+import copy
+import asyncio
+import contextvars
+import logging
+import threading
+import weakref
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional, Tuple
+
+from capymind_agent.tools.config import env_flag
+
+logger = logging.getLogger("capymind.firestore")
+
+# Set for retries and hedged duplicates of a slow call, which must not wait on
+# the very read they are meant to replace
+_fresh: contextvars.ContextVar[bool] = contextvars.ContextVar("capymind_single_flight_fresh", default=False)
+
+
+def fresh_context() -> contextvars.Context:
+    """Copy of the current context in which calls neither join nor lead a flight."""
+    context = contextvars.copy_context()
+    context.run(_fresh.set, True)
+    return context
+
+
+class _Call:
+    __slots__ = ("done", "result", "error", "waiters", "task")
+
+    def __init__(self):
+        self.done = threading.Event()
+        # The waiters' copy of the leader's result, taken before they wake
+        self.result: Any = None
+        self.error: Optional[BaseException] = None
+        self.waiters = 0
+        self.task: Optional["asyncio.Task"] = None
+
+
+class SingleFlight:
+    """
+    Merges concurrent identical reads into one backend call.
+
+    The first caller for a key (the leader) runs the call; callers arriving
+    with the same key while it is in flight wait for it and get a deep copy
+    of its result, or its exception. The leader keeps the object it got and,
+    when anyone waited, takes one deep copy of it before they wake, so it
+    can change its result while they are still copying. Nothing is
+    remembered once the call finishes, so this only ever saves work that
+    overlaps in time; the document cache covers repeats. Threads (``do``)
+    and asyncio tasks (``do_async``, per event loop) are tracked separately.
+    """
+
+    def __init__(self, enabled: bool = True):
+        self.enabled = enabled
+        self._lock = threading.Lock()
+        self._calls: Dict[Hashable, _Call] = {}
+        self._tasks: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Dict[Hashable, _Call]]" = (
+            weakref.WeakKeyDictionary()
+        )
+        self._stats = {"calls": 0, "shared": 0}
+
+    def do(self, key: Hashable, fn: Callable[[], Any]) -> Any:
+        """Return ``fn()``, sharing one run among threads calling with the same key."""
+        if not self.enabled or _fresh.get():
+            return fn()
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+                self._stats["calls"] += 1
+            else:
+                call.waiters += 1
+                self._stats["shared"] += 1
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return copy.deepcopy(call.result)
+
+        try:
+            result = fn()
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                if self._calls.get(key) is call:
+                    del self._calls[key]
+            try:
+                # Nobody joins once the call is forgotten
+                if call.error is None and call.waiters:
+                    call.result = copy.deepcopy(result)
+            except BaseException as e:
+                call.error = e
+                raise
+            finally:
+                call.done.set()
+        return result
+
+    async def do_async(self, key: Hashable, fn: Callable[[], Awaitable[Any]]) -> Any:
+        """Return ``await fn()``, sharing one run among tasks on this loop with the same key."""
+        if not self.enabled or _fresh.get():
+            return await fn()
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            calls = self._tasks.setdefault(loop, {})
+            call = calls.get(key)
+            leader = call is None
+            if leader:
+                call = calls[key] = _Call()
+                # A task of its own, so cancelling the leader's caller leaves the waiters' call running
+                call.task = loop.create_task(self._lead(calls, key, call, fn))
+                self._stats["calls"] += 1
+            else:
+                call.waiters += 1
+                self._stats["shared"] += 1
+        result, shared = await asyncio.shield(call.task)
+        return result if leader else copy.deepcopy(shared)
+
+    async def _lead(
+        self, calls: Dict[Hashable, _Call], key: Hashable, call: _Call, fn: Callable[[], Awaitable[Any]]
+    ) -> Tuple[Any, Any]:
+        """(result for the leader, copy for the waiters), taken before any of them resumes."""
+        try:
+            result = await fn()
+        finally:
+            with self._lock:
+                if calls.get(key) is call:
+                    del calls[key]
+        return result, copy.deepcopy(result) if call.waiters else None
+
+    def in_flight(self) -> int:
+        with self._lock:
+            return len(self._calls) + sum(len(tasks) for tasks in self._tasks.values())
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return dict(self._stats)
+
+
+# Shared by the Firestore tool (both variants) and its document reads.
+# Disable with CAPY_SINGLE_FLIGHT=0.
+single_flight = SingleFlight(enabled=env_flag("CAPY_SINGLE_FLIGHT", True))
@@ -0,0 +1,28 @@
+"""Text folding shared by the crisis directory, phrase detector and notes search."""
+
+import re
+import unicodedata
+
+# Words as the notes index and digest split them
+WORD = re.compile(r"\w+")
+
+_NON_WORD = re.compile(r"[\W_]+")
+# Combining diacritical marks left by NFKD (accents, breves, ogoneks...)
+_COMBINING_MARKS = re.compile("[\u0300-\u036f]+")
+
+
+def strip_accents(text: str) -> str:
+    """Drop diacritics: 'Київ' -> 'Киів', 'Kraków' -> 'Krakow'."""
+    if text.isascii():
+        return text
+    return _COMBINING_MARKS.sub("", unicodedata.normalize("NFKD", text))
+
+
+def fold(text: str) -> str:
+    """Casefold and strip accents, keeping punctuation."""
+    return strip_accents(text.casefold())
+
+
+def normalize(text: str) -> str:
+    """Fold and turn punctuation into single spaces: 'Montréal, QC' -> 'montreal qc'."""
+    return " ".join(_NON_WORD.sub(" ", fold(text)).split())
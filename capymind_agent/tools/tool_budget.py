@@ -0,0 +1,211 @@
+import json
+import logging
+from typing import Any, Dict, List, Optional, Set
+from google.adk.tools import BaseTool, ToolContext
+
+from capymind_agent.tools.config import env_int
+from capymind_agent.tools.firestore_data import encode_cursor
+from capymind_agent.tools.history_compactor import CHARS_PER_TOKEN
+
+logger = logging.getLogger("capymind.tool_budget")
+
+ELLIPSIS = "…"
+
+# Bot bookkeeping the agents never read or show; dropped unless the model
+# asked for the field by name
+UNUSED_FIELDS = {
+    "user": frozenset({"id", "ID", "ChatID", "IsTyping", "LastCommand", "TherapySessionId"}),
+    "settings": frozenset({"id"}),
+    "notes": frozenset({"id", "user"}),
+}
+
+# Notes are never cut shorter than this; past it whole notes are left out
+MIN_NOTE_CHARS = 80
+
+# Room kept in the budget for the "elided" report and a new next_cursor
+_REPORT_CHARS = 200
+
+_DOCUMENT_SECTIONS = {"get_user": "user", "get_settings": "settings"}
+
+
+def _size(value: Any) -> int:
+    return len(json.dumps(value, ensure_ascii=False, separators=(",", ":"), default=str))
+
+
+def truncate_text(text: str, limit: int) -> str:
+    """Cut ``text`` to at most ``limit`` characters at a word boundary, ending in an ellipsis."""
+    if len(text) <= limit:
+        return text
+    cut = text[:max(1, limit - len(ELLIPSIS))]
+    space = cut.rfind(" ")
+    if space > len(cut) * 0.6:
+        cut = cut[:space]
+    return cut.rstrip(" ,;:.-") + ELLIPSIS
+
+
+class Elisions:
+    """What was left out of one tool result, reported to the model as ``elided``."""
+
+    def __init__(self):
+        self.fields: Set[str] = set()
+        self.truncated_notes = 0
+        self.note_chars = 0
+        self.omitted_notes = 0
+
+    def report(self) -> Dict[str, Any]:
+        report: Dict[str, Any] = {}
+        if self.fields:
+            report["fields"] = sorted(self.fields)
+        if self.truncated_notes:
+            report["truncated_notes"] = self.truncated_notes
+            report["note_chars"] = self.note_chars
+        if self.omitted_notes:
+            report["omitted_notes"] = self.omitted_notes
+        return report
+
+
+class ToolBudget:
+    """
+    Fits Firestore tool results into a per-call budget before the model sees them.
+
+    Applied in order until the result fits ``budget_tokens`` (estimated like
+    the history compactor, ~4 characters per token): fields in
+    UNUSED_FIELDS are dropped, note bodies longer than ``note_chars`` are
+    cut at a word with an ellipsis, the per-note cap is halved down to
+    MIN_NOTE_CHARS, and finally the oldest notes are left out (get_notes
+    then gets a next_cursor pointing at them). Whatever was removed is listed
+    under ``elided`` so the agent can say so or page for more.
+    """
+
+    def __init__(self, budget_tokens: int = 1500, note_chars: int = 600):
+        self.budget_chars = budget_tokens * CHARS_PER_TOKEN
+        self.note_chars = note_chars
+
+    def compact_result(self, operation: str, result: Dict[str, Any], fields: Optional[List[str]] = None) -> Dict[str, Any]:
+        """Return ``result`` trimmed to the budget; ``result`` itself when nothing had to go."""
+        if not result.get("ok") or "data" not in result:
+            return result
+        keep = set(fields or ())
+        elisions = Elisions()
+        data = result["data"]
+        compacted = dict(result)
+
+        if operation in _DOCUMENT_SECTIONS:
+            compacted["data"] = self._drop_fields(_DOCUMENT_SECTIONS[operation], data, keep, elisions)
+        elif operation == "get_notes":
+            notes = [self._drop_fields("notes", note, keep, elisions) for note in data]
+            compacted["data"] = []
+            kept = self._fit_notes(notes, self.budget_chars - _REPORT_CHARS - _size(compacted), elisions)
+            compacted["data"] = notes[:kept]
+            if kept < len(notes) and "timestamp" in data[kept - 1] and "id" in data[kept - 1]:
+                compacted["next_cursor"] = encode_cursor(data[kept - 1])
+        elif operation == "get_context" and isinstance(data, dict):
+            section = {
+                key: self._drop_fields(key, value, keep, elisions) if key in ("user", "settings") else value
+                for key, value in data.items()
+            }
+            compacted["data"] = section
+            if section.get("notes"):
+                notes = [self._drop_fields("notes", note, keep, elisions) for note in section["notes"]]
+                section["notes"] = []
+                kept = self._fit_notes(notes, self.budget_chars - _REPORT_CHARS - _size(compacted), elisions)
+                section["notes"] = notes[:kept]
+        else:
+            return result
+
+        report = elisions.report()
+        if not report:
+            return result
+        compacted["elided"] = report
+        return compacted
+
+    @staticmethod
+    def _drop_fields(section: str, document: Any, keep: Set[str], elisions: Elisions) -> Any:
+        if not isinstance(document, dict):
+            return document
+        unused = UNUSED_FIELDS[section]
+        dropped = [key for key in document if key in unused and key not in keep]
+        if not dropped:
+            return document
+        elisions.fields.update(dropped)
+        return {key: value for key, value in document.items() if key not in dropped}
+
+    def _fit_notes(self, notes: List[Dict[str, Any]], budget: int, elisions: Elisions) -> int:
+        """Truncate ``notes`` in place to fit ``budget`` characters; returns how many to keep."""
+        originals = [note.get("text") for note in notes]
+        cap = self.note_chars
+        while True:
+            for index, text in enumerate(originals):
+                if isinstance(text, str):
+                    notes[index] = {**notes[index], "text": truncate_text(text, cap)}
+            sizes = [_size(note) + 1 for note in notes]
+            if sum(sizes) <= budget or cap <= MIN_NOTE_CHARS:
+                break
+            cap = max(MIN_NOTE_CHARS, cap // 2)
+
+        kept, total = 0, 0
+        for size in sizes:
+            if kept and total + size > budget:
+                break
+            kept += 1
+            total += size
+        # Only count cuts in the notes that are still sent
+        truncated = sum(
+            1 for index in range(kept)
+            if isinstance(originals[index], str) and notes[index]["text"] != originals[index]
+        )
+        if truncated:
+            elisions.truncated_notes += truncated
+            elisions.note_chars = cap
+        elisions.omitted_notes += len(notes) - kept
+        return kept
+
+    def compact_text(self, text: str) -> str:
+        """Cap a rendered (format_data) result at the budget, on a line boundary."""
+        if len(text) <= self.budget_chars:
+            return text
+        cut = text[:self.budget_chars]
+        newline = cut.rfind("\n")
+        if newline > 0:
+            cut = cut[:newline]
+        return f"{cut.rstrip()}\n{ELLIPSIS} ({len(text) - len(cut)} more characters not shown)"
+
+
+# CAPY_TOOL_BUDGET_TOKENS (1500, estimated) caps each result and
+# CAPY_TOOL_NOTE_CHARS (600) each note body.
+tool_budget = ToolBudget(
+    budget_tokens=env_int("CAPY_TOOL_BUDGET_TOKENS", 1500),
+    note_chars=env_int("CAPY_TOOL_NOTE_CHARS", 600),
+)
+
+_FIRESTORE_TOOLS = ("capy_firestore_data", "capy_firestore_data_async")
+
+
+def compact_tool_result(
+    tool: BaseTool,
+    args: Dict[str, Any],
+    tool_context: ToolContext,
+    tool_response: Any,
+) -> Optional[Any]:
+    """
+    after_tool_callback: trim Firestore and format_data results to
+    CAPY_TOOL_BUDGET_TOKENS before they reach the model. Returns None
+    (result unchanged) when nothing had to go.
+    """
+    if tool.name in _FIRESTORE_TOOLS and isinstance(tool_response, dict):
+        compacted = tool_budget.compact_result(args.get("operation", ""), tool_response, args.get("fields"))
+    elif tool.name == "format_data" and isinstance(tool_response, str):
+        compacted = tool_budget.compact_text(tool_response)
+    else:
+        return None
+    if compacted is tool_response:
+        return None
+    logger.info(
+        "tool_budget:compacted tool=%s op=%s bytes=%d->%d agent=%s",
+        tool.name,
+        args.get("operation"),
+        _size(tool_response),
+        _size(compacted),
+        tool_context.agent_name,
+    )
+    return compacted
@@ -0,0 +1,286 @@
+import os
+import hmac
+import json
+import base64
+import hashlib
+import logging
+import threading
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional, Sequence
+from google.adk.agents.callback_context import CallbackContext
+from google.adk.plugins.base_plugin import BasePlugin
+from google.adk.tools import BaseTool, ToolContext
+from opentelemetry import propagate, trace
+from opentelemetry.sdk.trace import ReadableSpan, TracerProvider
+from opentelemetry.sdk.trace.export import (
+    BatchSpanProcessor,
+    SimpleSpanProcessor,
+    SpanExporter,
+    SpanExportResult,
+)
+from opentelemetry.trace import SpanKind, Status, StatusCode
+
+from capymind_agent.tools.metrics import payload_size, tool_operation
+
+logger = logging.getLogger("capymind.tracing")
+
+# Spans from capymind code; ADK's own spans (invocation, invoke_agent,
+# call_llm, execute_tool) come from the "gcp.vertex.agent" tracer
+tracer = trace.get_tracer("capymind")
+
+# Span attributes added on top of ADK's gen_ai.* ones
+OPERATION = "capymind.tool.operation"
+OUTCOME = "capymind.tool.outcome"
+DOCUMENTS = "capymind.tool.documents"
+PAYLOAD_BYTES = "capymind.tool.payload_bytes"
+TRANSFER_FROM = "capymind.transfer.from"
+TRANSFER_TO = "capymind.transfer.to"
+USER_HASH = "capymind.user_hash"
+FIRESTORE_DOCUMENTS = "capymind.firestore.documents"
+
+# Spans carry a keyed hash of the user id, never the id itself: enough to
+# group one user's turns without exporting a personal identifier. Set
+# CAPY_TRACE_USER_KEY to get the same hash on every instance; without it each
+# process uses a random key.
+_USER_HASH_KEY = (os.getenv("CAPY_TRACE_USER_KEY") or os.urandom(16).hex()).encode()
+
+
+def user_hash(user_id: str) -> str:
+    """Short keyed hash of ``user_id`` for span attributes."""
+    return hmac.new(_USER_HASH_KEY, str(user_id).encode(), hashlib.sha256).hexdigest()[:16]
+
+
+@contextmanager
+def firestore_span(operation: str, collection: str) -> Iterator[trace.Span]:
+    """Client span around one Firestore RPC, e.g. ``firestore.get settings``."""
+    with tracer.start_as_current_span(
+        f"firestore.{operation} {collection}",
+        kind=SpanKind.CLIENT,
+        attributes={
+            "db.system.name": "firestore",
+            "db.operation.name": operation,
+            "db.collection.name": collection,
+        },
+    ) as span:
+        yield span
+
+
+def _document_count(operation: str, data: Any) -> int:
+    if isinstance(data, list):
+        return len(data)
+    if isinstance(data, dict):
+        if operation == "get_context":
+            return sum(_document_count("", section) for section in data.values())
+        return 1
+    return 0
+
+
+class TracingPlugin(BasePlugin):
+    """
+    ADK plugin annotating ADK's invoke_agent and execute_tool spans.
+
+    Tool spans get the operation, outcome, number of documents returned and
+    the JSON payload size; transfer_to_agent spans get the source and target
+    agent. Plugin callbacks run inside those spans, so attributes go on the
+    current span.
+    """
+
+    def __init__(self, name: str = "capymind_tracing"):
+        super().__init__(name=name)
+
+    async def before_agent_callback(self, *, agent: Any, callback_context: CallbackContext) -> None:
+        span = trace.get_current_span()
+        if span.is_recording():
+            span.set_attribute(USER_HASH, user_hash(callback_context._invocation_context.user_id))
+        return None
+
+    async def before_tool_callback(
+        self, *, tool: BaseTool, tool_args: Dict[str, Any], tool_context: ToolContext
+    ) -> Optional[dict]:
+        span = trace.get_current_span()
+        if not span.is_recording():
+            return None
+        if tool.name == "transfer_to_agent":
+            span.set_attribute(TRANSFER_FROM, tool_context.agent_name)
+            span.set_attribute(TRANSFER_TO, str(tool_args.get("agent_name", "")))
+        operation = tool_operation(tool_args)
+        if operation:
+            span.set_attribute(OPERATION, operation)
+        return None
+
+    async def after_tool_callback(
+        self,
+        *,
+        tool: BaseTool,
+        tool_args: Dict[str, Any],
+        tool_context: ToolContext,
+        result: dict,
+    ) -> Optional[dict]:
+        span = trace.get_current_span()
+        if not span.is_recording():
+            return None
+        span.set_attribute(PAYLOAD_BYTES, payload_size(result))
+        if isinstance(result, dict) and "ok" in result:
+            span.set_attribute(OUTCOME, "ok" if result["ok"] else "error")
+            if result["ok"]:
+                span.set_attribute(DOCUMENTS, _document_count(tool_operation(tool_args), result.get("data")))
+            else:
+                span.set_status(Status(StatusCode.ERROR, str(result.get("error", ""))))
+        return None
+
+    async def on_tool_error_callback(
+        self,
+        *,
+        tool: BaseTool,
+        tool_args: Dict[str, Any],
+        tool_context: ToolContext,
+        error: Exception,
+    ) -> Optional[dict]:
+        span = trace.get_current_span()
+        if span.is_recording():
+            span.set_attribute(OUTCOME, "error")
+            span.record_exception(error)
+        return None
+
+
+# Instance referenced by main.py's extra_plugins
+tracing_plugin = TracingPlugin()
+
+
+class TraceContextMiddleware:
+    """
+    ASGI middleware opening a server span per HTTP request.
+
+    Continues an incoming W3C ``traceparent`` so the ADK invocation, agent,
+    tool and Firestore spans of a /run or /run_sse call share the caller's
+    trace. The span is renamed to the matched route template once routing ran.
+    """
+
+    def __init__(self, app: Any, excluded_paths: Sequence[str] = ("/metrics",)):
+        self.app = app
+        self.excluded_paths = frozenset(excluded_paths)
+
+    async def __call__(self, scope: Dict[str, Any], receive: Any, send: Any) -> None:
+        if scope["type"] != "http" or scope["path"] in self.excluded_paths:
+            await self.app(scope, receive, send)
+            return
+
+        headers = {
+            key.decode("latin-1"): value.decode("latin-1")
+            for key, value in scope.get("headers") or []
+        }
+        method = scope["method"]
+        with tracer.start_as_current_span(
+            f"{method} {scope['path']}",
+            context=propagate.extract(headers),
+            kind=SpanKind.SERVER,
+            attributes={"http.request.method": method, "url.path": scope["path"]},
+        ) as span:
+
+            async def send_with_status(message: Dict[str, Any]) -> None:
+                if message["type"] == "http.response.start":
+                    span.set_attribute("http.response.status_code", message["status"])
+                    if message["status"] >= 500:
+                        span.set_status(Status(StatusCode.ERROR))
+                await send(message)
+
+            try:
+                await self.app(scope, receive, send_with_status)
+            finally:
+                route = getattr(scope.get("route"), "path", None)
+                if route:
+                    span.set_attribute("http.route", route)
+                    span.update_name(f"{method} {route}")
+
+
+def _hex_ids(value: Any) -> Any:
+    # OTLP/JSON carries trace and span ids as hex, protobuf JSON as base64
+    if isinstance(value, dict):
+        return {
+            key: base64.b64decode(item).hex()
+            if key in ("traceId", "spanId", "parentSpanId") and isinstance(item, str)
+            else _hex_ids(item)
+            for key, item in value.items()
+        }
+    if isinstance(value, list):
+        return [_hex_ids(item) for item in value]
+    return value
+
+
+class OtlpJsonFileExporter(SpanExporter):
+    """
+    Append finished spans to a file in the OTLP/JSON lines format of the
+    OpenTelemetry file exporter: one ExportTraceServiceRequest per line.
+
+    Files can be inspected offline with load_spans() or replayed into any
+    OTLP/HTTP collector.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+
+    def export(self, spans: Sequence[ReadableSpan]) -> SpanExportResult:
+        from google.protobuf.json_format import MessageToDict
+        from opentelemetry.exporter.otlp.proto.common.trace_encoder import encode_spans
+
+        line = json.dumps(_hex_ids(MessageToDict(encode_spans(spans))), separators=(",", ":"))
+        try:
+            with self._lock, open(self.path, "a", encoding="utf-8") as f:
+                f.write(line + "\n")
+        except OSError:
+            logger.exception("tracing:export_failed path=%s", self.path)
+            return SpanExportResult.FAILURE
+        return SpanExportResult.SUCCESS
+
+    def shutdown(self) -> None:
+        return None
+
+
+def load_spans(path: str) -> List[Dict[str, Any]]:
+    """Flatten an OtlpJsonFileExporter file into span dicts (name, ids, attributes, times)."""
+    spans = []
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            if not line.strip():
+                continue
+            for resource_spans in json.loads(line).get("resourceSpans", []):
+                for scope_spans in resource_spans.get("scopeSpans", []):
+                    for span in scope_spans.get("spans", []):
+                        attributes = {}
+                        for attribute in span.get("attributes", []):
+                            value = attribute.get("value", {})
+                            # OTLP/JSON encodes int64 values as strings
+                            attributes[attribute["key"]] = (
+                                int(value["intValue"]) if "intValue" in value else next(iter(value.values()), None)
+                            )
+                        spans.append({**span, "attributes": attributes})
+    return spans
+
+
+def configure_tracing(
+    provider: Optional[TracerProvider] = None,
+    trace_file: Optional[str] = None,
+    exporters: Sequence[SpanExporter] = (),
+) -> TracerProvider:
+    """
+    Attach capymind's exporters to the SDK tracer provider.
+
+    Uses the global provider (get_fast_api_app installs one), creating it if
+    only the API's no-op proxy is present. Spans go to ``trace_file`` (or
+    CAPY_TRACE_FILE) as OTLP/JSON lines through a batch processor, and to each
+    of ``exporters`` synchronously, e.g. an InMemorySpanExporter in tests.
+    """
+    if provider is None:
+        provider = trace.get_tracer_provider()
+        if not isinstance(provider, TracerProvider):
+            provider = TracerProvider()
+            trace.set_tracer_provider(provider)
+
+    trace_file = trace_file or os.getenv("CAPY_TRACE_FILE")
+    if trace_file:
+        provider.add_span_processor(BatchSpanProcessor(OtlpJsonFileExporter(trace_file)))
+        logger.info("tracing:file_exporter path=%s", trace_file)
+    for exporter in exporters:
+        provider.add_span_processor(SimpleSpanProcessor(exporter))
+    return provider
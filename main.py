@@ -1,20 +1,93 @@
 import os
+import logging
+from contextlib import asynccontextmanager
 
 import uvicorn
 from fastapi import FastAPI
+from fastapi.responses import PlainTextResponse
 from google.adk.cli.fast_api import get_fast_api_app
 
+from capymind_agent.tools.client_pool import client_pool
+from capymind_agent.tools.crisis_search import search_cache
+from capymind_agent.tools.doc_cache import document_cache
+from capymind_agent.tools import metrics
+from capymind_agent.tools.resilience import firestore_guard
+from capymind_agent.tools.session_prefetch import session_prefetcher
+from capymind_agent.tools.session_store import build_fast_api_app, create_session_service
+from capymind_agent.tools.tracing import TraceContextMiddleware, configure_tracing
+
 AGENT_DIR = os.path.dirname(os.path.abspath(__file__))
-SESSION_SERVICE_URI = "sqlite:///./sessions.db"
+# CAPY_SESSION_URI overrides the session store; an empty value keeps sessions in
+# memory. firestore:// and redis:// select a store shared by every instance, so
+# a conversation can continue on any of them; sqlite+wal:///./sessions.db is a
+# tuned single-node store with session retention.
+SESSION_SERVICE_URI = os.getenv("CAPY_SESSION_URI", "sqlite:///./sessions.db") or None
+session_service = create_session_service(SESSION_SERVICE_URI)
 ALLOWED_ORIGINS = ["http://localhost", "http://localhost:8080", "*"]
 SERVE_WEB_INTERFACE = True
+# Plugins are resolved by qualified name; metrics_plugin feeds GET /metrics,
+# tracing_plugin annotates ADK's agent and tool spans
+EXTRA_PLUGINS = [
+    "capymind_agent.tools.metrics.metrics_plugin",
+    "capymind_agent.tools.tracing.tracing_plugin",
+]
+
+logger = logging.getLogger("capymind.app")
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    if session_service is not None:
+        # Background maintenance, e.g. pruning old sessions from sqlite+wal
+        session_service.start()
+    yield
+    if session_service is not None:
+        # Write events still buffered for idle sessions before the instance stops
+        logger.info("sessions:stats %s", session_service.stats())
+        await session_service.close()
+    # Release snapshot listeners and pooled Firestore clients (and their gRPC
+    # channels) on shutdown
+    logger.info("doc_cache:stats %s", document_cache.stats())
+    logger.info("firestore_guard:stats %s", firestore_guard.stats())
+    logger.info("prefetch:stats %s", session_prefetcher.stats())
+    logger.info("crisis_search:stats %s", search_cache.stats())
+    document_cache.clear()
+    logger.info("client_pool:stats %s", client_pool.stats())
+    client_pool.close_all()
+
+
+if session_service is None:
+    app: FastAPI = get_fast_api_app(
+        agents_dir=AGENT_DIR,
+        session_service_uri=SESSION_SERVICE_URI,
+        allow_origins=ALLOWED_ORIGINS,
+        web=SERVE_WEB_INTERFACE,
+        lifespan=lifespan,
+        extra_plugins=EXTRA_PLUGINS,
+    )
+else:
+    # Our own session stores: the same app around the service object, writing
+    # buffered events before each response ends
+    app = build_fast_api_app(
+        agents_dir=AGENT_DIR,
+        session_service=session_service,
+        allow_origins=ALLOWED_ORIGINS,
+        web=SERVE_WEB_INTERFACE,
+        lifespan=lifespan,
+        extra_plugins=EXTRA_PLUGINS,
+    )
+
+# get_fast_api_app installed the tracer provider; add the OTLP/JSON file
+# exporter when CAPY_TRACE_FILE is set and root every request's spans in a
+# server span that continues the caller's traceparent
+configure_tracing()
+app.add_middleware(TraceContextMiddleware)
+
 
-app: FastAPI = get_fast_api_app(
-    agents_dir=AGENT_DIR,
-    session_service_uri=SESSION_SERVICE_URI,
-    allow_origins=ALLOWED_ORIGINS,
-    web=SERVE_WEB_INTERFACE,
-)
+@app.get("/metrics", include_in_schema=False)
+def prometheus_metrics() -> PlainTextResponse:
+    """Prometheus scrape endpoint: tool and agent latency, payload sizes, Firestore reads."""
+    return PlainTextResponse(metrics.registry.render(), media_type=metrics.CONTENT_TYPE)
 
 if __name__ == "__main__":
     # Use the PORT environment variable provided by Cloud Run, defaulting to 8080
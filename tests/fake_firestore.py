@@ -0,0 +1,739 @@
+"""
+In-memory stand-in for the subset of the Firestore client used by CapyMind tools.
+
+Document references subclass the real ``DocumentReference`` so values stored in
+fake documents (e.g. the ``user`` field on notes) convert exactly like real ones.
+Every document returned by ``get()``/``stream()`` counts as one billed read in
+``client.reads`` and every round trip in ``client.rpcs``. ``latency`` (seconds)
+is slept once per RPC to model network round trips, plus an exponentially
+distributed ``jitter`` (mean, seconds) for a realistic tail;
+``FakeAsyncFirestoreClient`` exposes the same data through the
+``AsyncClient`` surface and awaits that delay instead of blocking.
+``count()`` aggregations bill one read per 1,000 matches (minimum one); set
+``supports_aggregation = False`` to emulate a backend without them.
+
+Faults: ``inject(error, delay, times)`` makes the next RPCs wait longer and/or
+raise (e.g. ``ServiceUnavailable``); ``error_rate``, ``slow_rate`` and
+``slow_delay`` add random failures and stalls to every RPC. Reads honour
+``timeout=``: one that would take longer raises ``DeadlineExceeded`` then.
+
+Documents are stored per collection and ``==`` / ``in`` filters use
+single-field indexes built on first use, so queries stay fast with millions of
+notes; ``seed_synthetic`` fills a client with users, settings and notes at
+that scale.
+"""
+
+import copy
+import math
+import time
+import random
+import asyncio
+import itertools
+import threading
+from datetime import datetime, timedelta, timezone
+from typing import Any, Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+from google.api_core.exceptions import DeadlineExceeded, MethodNotImplemented, ServiceUnavailable
+from google.cloud.firestore_v1.document import DocumentReference
+
+_OPERATORS: Dict[str, Callable[[Any, Any], bool]] = {
+    "==": lambda a, b: a == b,
+    "!=": lambda a, b: a != b,
+    "<": lambda a, b: a is not None and a < b,
+    "<=": lambda a, b: a is not None and a <= b,
+    ">": lambda a, b: a is not None and a > b,
+    ">=": lambda a, b: a is not None and a >= b,
+    "in": lambda a, b: a in b,
+}
+
+
+class FakeDocumentSnapshot:
+    def __init__(self, reference: "FakeDocumentReference", data: Optional[Dict[str, Any]]):
+        self.reference = reference
+        self._data = data
+
+    @property
+    def id(self) -> str:
+        return self.reference.id
+
+    @property
+    def exists(self) -> bool:
+        return self._data is not None
+
+    def to_dict(self) -> Optional[Dict[str, Any]]:
+        return copy.deepcopy(self._data)
+
+    def get(self, field_path: str) -> Any:
+        value: Any = self._data or {}
+        for part in field_path.split("."):
+            value = value[part]
+        return value
+
+
+class FakeWatch:
+    def __init__(self, listeners: List["FakeWatch"], callback: Callable):
+        self._listeners = listeners
+        self.callback = callback
+
+    def unsubscribe(self) -> None:
+        if self in self._listeners:
+            self._listeners.remove(self)
+
+
+class FakeDocumentReference(DocumentReference):
+    def get(self, field_paths=None, transaction=None, retry=None, timeout=None) -> FakeDocumentSnapshot:
+        self._client._rpc_delay(timeout)
+        return self._client._read_document(self)
+
+    def set(self, document_data: Dict[str, Any], merge: bool = False) -> None:
+        self._client._write(self, document_data, merge=merge)
+
+    def update(self, field_updates: Dict[str, Any]) -> None:
+        self._client._write(self, field_updates, merge=True)
+
+    def delete(self) -> None:
+        self._client._delete(self)
+
+    def collection(self, collection_id: str) -> "FakeCollectionReference":
+        return FakeCollectionReference(self._client, self._path + (collection_id,))
+
+    def on_snapshot(self, callback: Callable) -> FakeWatch:
+        watch = FakeWatch(self._client._listeners.setdefault(self._path, []), callback)
+        watch._listeners.append(watch)
+        # Like the real Watch, deliver the current state immediately
+        callback([self._client._snapshot(self)], [], None)
+        return watch
+
+
+# A stored document inside a query: (full path, data)
+_Row = Tuple[Tuple[str, ...], Dict[str, Any]]
+
+# Index bucket for values that cannot be dict keys (lists, maps); always scanned
+_UNHASHABLE = object()
+
+
+def _field_value(row: _Row, field: str) -> Any:
+    if field == "__name__":
+        return "/".join(row[0])
+    return row[1].get(field)
+
+
+class FakeQuery:
+    def __init__(self, client: "FakeFirestoreClient", path: Tuple[str, ...]):
+        self._client = client
+        self._path = path
+        self._filters: List[Tuple[str, str, Any]] = []
+        self._orders: List[Tuple[str, str]] = []
+        self._limit: Optional[int] = None
+        self._projection: Optional[List[str]] = None
+        self._start_after: Optional[Dict[str, Any]] = None
+
+    def _copy(self) -> "FakeQuery":
+        query = copy.copy(self)
+        query._filters = list(self._filters)
+        query._orders = list(self._orders)
+        return query
+
+    def where(self, field_path: Optional[str] = None, op_string: Optional[str] = None, value: Any = None, *, filter=None) -> "FakeQuery":
+        if filter is not None:
+            field_path, op_string, value = filter.field_path, filter.op_string, filter.value
+        if op_string not in _OPERATORS:
+            raise ValueError(f"unsupported operator {op_string!r}")
+        query = self._copy()
+        query._filters.append((field_path, op_string, value))
+        return query
+
+    def order_by(self, field_path: str, direction: str = "ASCENDING") -> "FakeQuery":
+        query = self._copy()
+        query._orders.append((field_path, direction))
+        return query
+
+    def limit(self, count: int) -> "FakeQuery":
+        query = self._copy()
+        query._limit = count
+        return query
+
+    def select(self, field_paths) -> "FakeQuery":
+        query = self._copy()
+        query._projection = list(field_paths)
+        return query
+
+    def start_after(self, document_fields) -> "FakeQuery":
+        if isinstance(document_fields, FakeDocumentSnapshot):
+            document_fields = dict(document_fields._data, __name__=document_fields.id)
+        query = self._copy()
+        query._start_after = dict(document_fields)
+        return query
+
+    def _effective_orders(self) -> List[Tuple[str, str]]:
+        # Like Firestore, finish with the document name in the last direction
+        orders = list(self._orders)
+        if not any(field == "__name__" for field, _ in orders):
+            orders.append(("__name__", orders[-1][1] if orders else "ASCENDING"))
+        return orders
+
+    def _cursor_values(self, orders: List[Tuple[str, str]]) -> List[Any]:
+        values = []
+        for field, _ in orders[: len(self._start_after)]:
+            value = self._start_after[field]
+            if field == "__name__":
+                value = value.path if isinstance(value, DocumentReference) else "/".join(self._path + (value,))
+            values.append(value)
+        return values
+
+    def _is_after_cursor(self, row: _Row, orders, cursor: List[Any]) -> bool:
+        for (field, direction), cursor_value in zip(orders, cursor):
+            value = _field_value(row, field)
+            if value == cursor_value:
+                continue
+            return value < cursor_value if direction == "DESCENDING" else value > cursor_value
+        return False
+
+    def _matching_rows(self) -> List[_Row]:
+        rows = [
+            row
+            for row in self._client._candidates(self._path, self._filters)
+            if all(_OPERATORS[op](row[1].get(field), value) for field, op, value in self._filters)
+        ]
+        orders = self._effective_orders()
+        # Documents missing an ordered field are excluded, as in Firestore
+        rows = [row for row in rows if all(f == "__name__" or f in row[1] for f, _ in orders)]
+        # Stable multi-key sort: apply keys from last to first
+        for field, direction in reversed(orders):
+            rows.sort(key=lambda row: _field_value(row, field), reverse=direction == "DESCENDING")
+        if self._start_after is not None:
+            cursor = self._cursor_values(orders)
+            rows = [row for row in rows if self._is_after_cursor(row, orders, cursor)]
+        if self._limit is not None:
+            rows = rows[: self._limit]
+        return rows
+
+    def _matching(self) -> List[FakeDocumentSnapshot]:
+        # Only the returned documents are copied (after projection)
+        snapshots = []
+        for path, data in self._matching_rows():
+            if self._projection is not None:
+                data = {k: v for k, v in data.items() if k in self._projection}
+            snapshots.append(FakeDocumentSnapshot(
+                FakeDocumentReference(*path, client=self._client), copy.deepcopy(data)
+            ))
+        return snapshots
+
+    def count(self, alias: Optional[str] = None) -> "FakeAggregationQuery":
+        return FakeAggregationQuery(self, alias or "field_1")
+
+    def stream(self, transaction=None, retry=None, timeout=None):
+        self._client._rpc_delay(timeout)
+        for snap in self._matching():
+            with self._client._lock:
+                self._client.reads += 1
+            yield snap
+
+    def get(self, transaction=None, retry=None, timeout=None) -> List[FakeDocumentSnapshot]:
+        return list(self.stream())
+
+
+class FakeAggregationResult:
+    def __init__(self, alias: str, value: int):
+        self.alias = alias
+        self.value = value
+
+
+class FakeAggregationQuery:
+    def __init__(self, query: FakeQuery, alias: str):
+        self._query = query
+        self._alias = alias
+
+    def _run(self) -> List[List[FakeAggregationResult]]:
+        client = self._query._client
+        if not client.supports_aggregation:
+            raise MethodNotImplemented("aggregation queries are not supported")
+        value = len(self._query._matching_rows())
+        with client._lock:
+            client.reads += max(1, math.ceil(value / 1000))
+        return [[FakeAggregationResult(self._alias, value)]]
+
+    def get(self, transaction=None, retry=None, timeout=None) -> List[List[FakeAggregationResult]]:
+        self._query._client._rpc_delay(timeout)
+        return self._run()
+
+
+class FakeCollectionReference(FakeQuery):
+    @property
+    def id(self) -> str:
+        return self._path[-1]
+
+    def document(self, document_id: Optional[str] = None) -> FakeDocumentReference:
+        if document_id is None:
+            document_id = f"auto-{next(self._client._ids)}"
+        return FakeDocumentReference(*self._path, document_id, client=self._client)
+
+    def add(self, document_data: Dict[str, Any]) -> Tuple[None, FakeDocumentReference]:
+        ref = self.document()
+        ref.set(document_data)
+        return None, ref
+
+
+class FakeFirestoreClient:
+    """Thread-safe in-memory replacement for ``google.cloud.firestore.Client``."""
+
+    def __init__(
+        self,
+        project: str = "capymind",
+        database: str = "(default)",
+        latency: float = 0.0,
+        jitter: float = 0.0,
+        seed: int = 0,
+    ):
+        self.project = project
+        self._database = database
+        self.latency = latency
+        self.jitter = jitter
+        self._random = random.Random(seed)
+        self._lock = threading.RLock()
+        # collection path -> {document id -> data}
+        self._collections: Dict[Tuple[str, ...], Dict[str, Dict[str, Any]]] = {}
+        # (collection path, field) -> {value -> document ids}, built on first query
+        self._indexes: Dict[Tuple[Tuple[str, ...], str], Dict[Any, Set[str]]] = {}
+        self._listeners: Dict[Tuple[str, ...], List[FakeWatch]] = {}
+        self._ids = itertools.count(1)
+        self.reads = 0
+        self.rpcs = 0
+        self.supports_aggregation = True
+        self.closed = False
+        # (extra delay, error) applied to the next RPCs, in order
+        self._faults: List[Tuple[float, Optional[BaseException]]] = []
+        self.error_rate = 0.0
+        self.slow_rate = 0.0
+        self.slow_delay = 0.0
+
+    # Public client surface -------------------------------------------------
+
+    def collection(self, *path: str) -> FakeCollectionReference:
+        return FakeCollectionReference(self, tuple(path))
+
+    def document(self, *path: str) -> FakeDocumentReference:
+        if len(path) == 1:
+            path = tuple(path[0].split("/"))
+        return FakeDocumentReference(*path, client=self)
+
+    def get_all(self, references, field_paths=None, transaction=None, retry=None, timeout=None):
+        self._rpc_delay(timeout)
+        for ref in references:
+            yield self._read_document(ref)
+
+    def close(self) -> None:
+        self.closed = True
+
+    # Test helpers ----------------------------------------------------------
+
+    def seed(self, collection: str, document_id: str, data: Dict[str, Any]) -> FakeDocumentReference:
+        """Write a document without notifying listeners or counting reads."""
+        ref = self.collection(collection).document(document_id)
+        with self._lock:
+            self._put(ref._path, copy.deepcopy(data))
+        return ref
+
+    def seed_many(self, collection: str, documents: Iterable[Tuple[str, Dict[str, Any]]]) -> int:
+        """
+        Bulk ``seed`` of (document id, data) pairs. The dicts are stored as
+        given, not copied, so callers must not reuse them; returns the count.
+        """
+        path = tuple(collection.split("/"))
+        count = 0
+        with self._lock:
+            for document_id, data in documents:
+                self._put(path + (document_id,), data)
+                count += 1
+        return count
+
+    def inject(self, error: Optional[BaseException] = None, delay: float = 0.0, times: int = 1) -> None:
+        """Make the next ``times`` RPCs take ``delay`` seconds longer and then raise ``error`` (if any)."""
+        with self._lock:
+            self._faults.extend([(delay, error)] * times)
+
+    def count(self, collection: str) -> int:
+        """Number of documents stored in ``collection``."""
+        with self._lock:
+            return len(self._collections.get(tuple(collection.split("/")), {}))
+
+    # Internals -------------------------------------------------------------
+
+    def _rpc_delay(self, timeout: Optional[float] = None) -> None:
+        delay = self._delay()
+        extra, error = self._fault()
+        if timeout is not None and delay + extra > timeout:
+            time.sleep(timeout)
+            raise DeadlineExceeded("Deadline Exceeded")
+        if delay + extra:
+            time.sleep(delay + extra)
+        if error is not None:
+            raise error
+
+    def _delay(self) -> float:
+        with self._lock:
+            self.rpcs += 1
+            if not self.jitter:
+                return self.latency
+            return self.latency + self._random.expovariate(1.0 / self.jitter)
+
+    def _fault(self) -> Tuple[float, Optional[BaseException]]:
+        """(extra delay, error to raise) for one RPC: injected faults first, then the random rates."""
+        with self._lock:
+            if self._faults:
+                delay, error = self._faults.pop(0)
+                return delay, copy.copy(error)
+            delay = self.slow_delay if self.slow_rate and self._random.random() < self.slow_rate else 0.0
+            if self.error_rate and self._random.random() < self.error_rate:
+                return delay, ServiceUnavailable("injected fault")
+            return delay, None
+
+    def _get(self, path: Tuple[str, ...]) -> Optional[Dict[str, Any]]:
+        return self._collections.get(path[:-1], {}).get(path[-1])
+
+    def _put(self, path: Tuple[str, ...], data: Optional[Dict[str, Any]]) -> None:
+        collection_path, document_id = path[:-1], path[-1]
+        documents = self._collections.setdefault(collection_path, {})
+        previous = documents.get(document_id)
+        if data is None:
+            documents.pop(document_id, None)
+        else:
+            documents[document_id] = data
+        for (indexed_path, field), index in self._indexes.items():
+            if indexed_path != collection_path:
+                continue
+            if previous is not None:
+                index.get(self._index_key(previous.get(field)), set()).discard(document_id)
+            if data is not None:
+                index.setdefault(self._index_key(data.get(field)), set()).add(document_id)
+
+    @staticmethod
+    def _index_key(value: Any) -> Any:
+        try:
+            hash(value)
+        except TypeError:
+            return _UNHASHABLE
+        return value
+
+    def _index(self, collection_path: Tuple[str, ...], field: str) -> Dict[Any, Set[str]]:
+        key = (collection_path, field)
+        index = self._indexes.get(key)
+        if index is None:
+            index = {}
+            for document_id, data in self._collections.get(collection_path, {}).items():
+                index.setdefault(self._index_key(data.get(field)), set()).add(document_id)
+            self._indexes[key] = index
+        return index
+
+    def _candidates(self, collection_path: Tuple[str, ...], filters: List[Tuple[str, str, Any]]) -> List[_Row]:
+        """Documents that may match ``filters``, narrowed by the first ==/in filter's index."""
+        with self._lock:
+            documents = self._collections.get(collection_path, {})
+            for field, op, value in filters:
+                if op not in ("==", "in"):
+                    continue
+                values = [value] if op == "==" else list(value)
+                if any(self._index_key(item) is _UNHASHABLE for item in values):
+                    continue
+                index = self._index(collection_path, field)
+                ids: Set[str] = set(index.get(_UNHASHABLE, ()))
+                for item in values:
+                    ids |= index.get(item, set())
+                return [(collection_path + (document_id,), documents[document_id]) for document_id in ids]
+            return [(collection_path + (document_id,), data) for document_id, data in documents.items()]
+
+    def _snapshot(self, ref: FakeDocumentReference, count_read: bool = False) -> FakeDocumentSnapshot:
+        with self._lock:
+            data = copy.deepcopy(self._get(ref._path))
+            if count_read:
+                self.reads += 1
+        return FakeDocumentSnapshot(ref, data)
+
+    def _read_document(self, ref: FakeDocumentReference) -> FakeDocumentSnapshot:
+        return self._snapshot(ref, count_read=True)
+
+    def _write(self, ref: FakeDocumentReference, data: Dict[str, Any], merge: bool) -> None:
+        with self._lock:
+            current = self._get(ref._path) if merge else None
+            updated = dict(current or {})
+            updated.update(copy.deepcopy(data))
+            self._put(ref._path, updated)
+        self._notify(ref)
+
+    def _delete(self, ref: FakeDocumentReference) -> None:
+        with self._lock:
+            self._put(ref._path, None)
+        self._notify(ref)
+
+    def _notify(self, ref: FakeDocumentReference) -> None:
+        with self._lock:
+            listeners = list(self._listeners.get(ref._path, []))
+        snapshot = self._snapshot(ref)
+        for watch in listeners:
+            watch.callback([snapshot], [], None)
+
+
+class FakeAsyncDocumentReference:
+    def __init__(self, client: "FakeAsyncFirestoreClient", ref: FakeDocumentReference):
+        self._client = client
+        self._ref = ref
+
+    @property
+    def id(self) -> str:
+        return self._ref.id
+
+    @property
+    def path(self) -> str:
+        return self._ref.path
+
+    async def get(self, field_paths=None, transaction=None, retry=None, timeout=None) -> FakeDocumentSnapshot:
+        await self._client._rpc_delay(timeout)
+        return self._client._sync._read_document(self._ref)
+
+    async def set(self, document_data: Dict[str, Any], merge: bool = False) -> None:
+        await self._client._rpc_delay()
+        self._ref.set(document_data, merge=merge)
+
+    async def update(self, field_updates: Dict[str, Any]) -> None:
+        await self._client._rpc_delay()
+        self._ref.update(field_updates)
+
+    async def delete(self) -> None:
+        await self._client._rpc_delay()
+        self._ref.delete()
+
+    def collection(self, collection_id: str) -> "FakeAsyncCollectionReference":
+        return FakeAsyncCollectionReference(self._client, self._ref.collection(collection_id))
+
+
+class FakeAsyncWriteBatch:
+    """``AsyncWriteBatch``: writes are queued and applied together in one RPC on ``commit()``."""
+
+    def __init__(self, client: "FakeAsyncFirestoreClient"):
+        self._client = client
+        self._writes: List[Tuple[FakeDocumentReference, Optional[Dict[str, Any]], bool]] = []
+
+    def set(self, reference, document_data: Dict[str, Any], merge: bool = False) -> None:
+        self._writes.append((getattr(reference, "_ref", reference), document_data, bool(merge)))
+
+    def update(self, reference, field_updates: Dict[str, Any]) -> None:
+        self._writes.append((getattr(reference, "_ref", reference), field_updates, True))
+
+    def delete(self, reference) -> None:
+        self._writes.append((getattr(reference, "_ref", reference), None, False))
+
+    async def commit(self) -> None:
+        await self._client._rpc_delay()
+        sync = self._client._sync
+        with sync._lock:
+            for ref, data, merge in self._writes:
+                if data is None:
+                    sync._delete(ref)
+                else:
+                    sync._write(ref, data, merge=merge)
+        self._writes = []
+
+
+class FakeAsyncQuery:
+    def __init__(self, client: "FakeAsyncFirestoreClient", query: FakeQuery):
+        self._client = client
+        self._query = query
+
+    def _wrap(self, query: FakeQuery) -> "FakeAsyncQuery":
+        return FakeAsyncQuery(self._client, query)
+
+    def where(self, field_path: Optional[str] = None, op_string: Optional[str] = None, value: Any = None, *, filter=None) -> "FakeAsyncQuery":
+        if filter is not None:
+            field_path, op_string, value = filter.field_path, filter.op_string, filter.value
+        if isinstance(value, FakeAsyncDocumentReference):
+            value = value._ref
+        return self._wrap(self._query.where(field_path, op_string, value))
+
+    def order_by(self, field_path: str, direction: str = "ASCENDING") -> "FakeAsyncQuery":
+        return self._wrap(self._query.order_by(field_path, direction=direction))
+
+    def limit(self, count: int) -> "FakeAsyncQuery":
+        return self._wrap(self._query.limit(count))
+
+    def select(self, field_paths) -> "FakeAsyncQuery":
+        return self._wrap(self._query.select(field_paths))
+
+    def start_after(self, document_fields) -> "FakeAsyncQuery":
+        return self._wrap(self._query.start_after(document_fields))
+
+    def count(self, alias: Optional[str] = None) -> "FakeAsyncAggregationQuery":
+        return FakeAsyncAggregationQuery(self._client, self._query.count(alias))
+
+    async def stream(self, transaction=None, retry=None, timeout=None):
+        await self._client._rpc_delay(timeout)
+        for snap in self._query._matching():
+            with self._client._sync._lock:
+                self._client._sync.reads += 1
+            yield snap
+
+    async def get(self, transaction=None, retry=None, timeout=None) -> List[FakeDocumentSnapshot]:
+        return [snap async for snap in self.stream()]
+
+
+class FakeAsyncAggregationQuery:
+    def __init__(self, client: "FakeAsyncFirestoreClient", aggregation: FakeAggregationQuery):
+        self._client = client
+        self._aggregation = aggregation
+
+    async def get(self, transaction=None, retry=None, timeout=None) -> List[List[FakeAggregationResult]]:
+        await self._client._rpc_delay(timeout)
+        return self._aggregation._run()
+
+
+class FakeAsyncCollectionReference(FakeAsyncQuery):
+    @property
+    def id(self) -> str:
+        return self._query._path[-1]
+
+    def document(self, document_id: Optional[str] = None) -> FakeAsyncDocumentReference:
+        return FakeAsyncDocumentReference(self._client, self._query.document(document_id))
+
+
+class FakeAsyncFirestoreClient:
+    """``AsyncClient`` view over a FakeFirestoreClient's data; latency is awaited."""
+
+    def __init__(
+        self,
+        sync_client: Optional[FakeFirestoreClient] = None,
+        latency: Optional[float] = None,
+        jitter: Optional[float] = None,
+    ):
+        self._sync = sync_client or FakeFirestoreClient()
+        self.latency = self._sync.latency if latency is None else latency
+        self.jitter = self._sync.jitter if jitter is None else jitter
+        self.closed = False
+
+    @property
+    def reads(self) -> int:
+        return self._sync.reads
+
+    @property
+    def rpcs(self) -> int:
+        return self._sync.rpcs
+
+    def collection(self, *path: str) -> FakeAsyncCollectionReference:
+        return FakeAsyncCollectionReference(self, self._sync.collection(*path))
+
+    def document(self, *path: str) -> FakeAsyncDocumentReference:
+        return FakeAsyncDocumentReference(self, self._sync.document(*path))
+
+    def batch(self) -> FakeAsyncWriteBatch:
+        return FakeAsyncWriteBatch(self)
+
+    async def get_all(self, references, field_paths=None, transaction=None, retry=None, timeout=None):
+        await self._rpc_delay(timeout)
+        for ref in references:
+            yield self._sync._read_document(ref._ref)
+
+    def close(self) -> None:
+        self.closed = True
+
+    def inject(self, error: Optional[BaseException] = None, delay: float = 0.0, times: int = 1) -> None:
+        self._sync.inject(error, delay, times)
+
+    async def _rpc_delay(self, timeout: Optional[float] = None) -> None:
+        delay = self.latency
+        with self._sync._lock:
+            self._sync.rpcs += 1
+            if self.jitter:
+                delay += self._sync._random.expovariate(1.0 / self.jitter)
+        extra, error = self._sync._fault()
+        if timeout is not None and delay + extra > timeout:
+            await asyncio.sleep(timeout)
+            raise DeadlineExceeded("Deadline Exceeded")
+        if delay + extra:
+            await asyncio.sleep(delay + extra)
+        if error is not None:
+            raise error
+
+
+class FakeToolContext:
+    """Minimal ToolContext carrying the invocation user_id the tools read."""
+
+    class _InvocationContext:
+        def __init__(self, user_id: str):
+            self.user_id = user_id
+
+    def __init__(self, user_id: str):
+        self._invocation_context = self._InvocationContext(user_id)
+
+
+class FakeCallbackContext(FakeToolContext):
+    """Minimal CallbackContext for agent/model callbacks: user_id, agent name and state."""
+
+    def __init__(self, user_id: str, agent_name: str = "capymind_agent"):
+        super().__init__(user_id)
+        self.agent_name = agent_name
+        self.state = {}
+
+
+_WORDS = (
+    "today felt calm anxious tired hopeful work sleep family friend walk talk "
+    "breathing worry meeting exam morning evening better worse grateful angry "
+    "quiet busy slow heavy light long short again finally still maybe"
+).split()
+_LOCATIONS = ("Kyiv", "Lviv", "Warsaw", "Berlin", "London", "New York", "Toronto", "Madrid", "Lisbon", "Paris")
+_LOCALES = ("en", "uk", "pl", "de", "es", "pt", "fr")
+
+SYNTHETIC_EPOCH = datetime(2025, 1, 1, tzinfo=timezone.utc)
+
+
+def seed_synthetic(
+    client: FakeFirestoreClient,
+    users: int = 10_000,
+    notes_per_user: float = 20,
+    days: int = 365,
+    seed: int = 0,
+) -> List[str]:
+    """
+    Fill ``client`` with ``users`` users (ids ``u0``..), their settings and
+    notes, deterministically for a given ``seed``.
+
+    Notes per user are exponentially distributed with mean ``notes_per_user``
+    (a few heavy journallers, many light users) and timestamped within
+    ``days`` days after SYNTHETIC_EPOCH. Returns the user ids.
+    """
+    rng = random.Random(seed)
+    user_ids = [f"u{i}" for i in range(users)]
+    refs = {user_id: client.collection("users").document(user_id) for user_id in user_ids}
+    window = days * 86400
+
+    def user_docs():
+        for index, user_id in enumerate(user_ids):
+            yield user_id, {
+                "ID": user_id,
+                "ChatID": 100000 + index,
+                "FirstName": f"User{index}",
+                "Locale": rng.choice(_LOCALES),
+                "IsOnboarded": rng.random() < 0.9,
+                "IsDeleted": False,
+                "Timestamp": SYNTHETIC_EPOCH + timedelta(seconds=rng.randrange(window)),
+            }
+
+    def settings_docs():
+        for user_id in user_ids:
+            yield user_id, {
+                "Location": rng.choice(_LOCATIONS),
+                "SecondsFromUTC": rng.choice((-18000, 0, 3600, 7200)),
+                "HasMorningReminder": rng.random() < 0.5,
+                "HasEveningReminder": rng.random() < 0.5,
+            }
+
+    def note_docs():
+        for user_id in user_ids:
+            for n in range(int(rng.expovariate(1.0 / notes_per_user)) if notes_per_user else 0):
+                yield f"{user_id}-n{n}", {
+                    "text": " ".join(rng.choices(_WORDS, k=rng.randint(5, 60))),
+                    "timestamp": SYNTHETIC_EPOCH + timedelta(seconds=rng.randrange(window)),
+                    "user": refs[user_id],
+                }
+
+    client.seed_many("users", user_docs())
+    client.seed_many("settings", settings_docs())
+    client.seed_many("notes", note_docs())
+    return user_ids
@@ -0,0 +1,130 @@
+"""
+In-memory stand-in for the subset of ``redis.asyncio.Redis`` (created with
+``decode_responses=True``) used by KeyValueSessionService.
+
+Hashes, lists and sets live in one dict keyed by name. Every command, and
+every pipeline ``execute()``, is one round trip: counted in ``rpcs`` and
+delayed by ``latency`` seconds. Pipelined commands run back to back under one
+lock, like MULTI/EXEC.
+"""
+
+import asyncio
+import threading
+from typing import Any, Dict, List, Optional, Set
+
+
+class FakePipeline:
+    """Queues commands (returning itself, like redis-py) until ``execute()``."""
+
+    def __init__(self, store: "FakeKeyValueStore"):
+        self._store = store
+        self._commands: List[tuple] = []
+
+    async def __aenter__(self) -> "FakePipeline":
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        self._commands = []
+
+    def __getattr__(self, name: str):
+        if name.startswith("_"):
+            raise AttributeError(name)
+        command = getattr(self._store, f"_{name}")
+
+        def queue(*args: Any, **kwargs: Any) -> "FakePipeline":
+            self._commands.append((command, args, kwargs))
+            return self
+
+        return queue
+
+    async def execute(self) -> List[Any]:
+        await self._store._round_trip()
+        with self._store._lock:
+            results = [command(*args, **kwargs) for command, args, kwargs in self._commands]
+        self._commands = []
+        return results
+
+
+class FakeKeyValueStore:
+    """Thread-safe in-memory key-value store with Redis hash, list and set commands."""
+
+    def __init__(self, latency: float = 0.0):
+        self.latency = latency
+        self.rpcs = 0
+        self.closed = False
+        self._lock = threading.RLock()
+        self._data: Dict[str, Any] = {}
+
+    def pipeline(self, transaction: bool = True) -> FakePipeline:
+        return FakePipeline(self)
+
+    def __getattr__(self, name: str):
+        # hset, hgetall, rpush, lrange, ... as single round-trip coroutines
+        if name.startswith("_"):
+            raise AttributeError(name)
+        command = getattr(self, f"_{name}")
+
+        async def call(*args: Any, **kwargs: Any) -> Any:
+            await self._round_trip()
+            with self._lock:
+                return command(*args, **kwargs)
+
+        return call
+
+    async def aclose(self) -> None:
+        self.closed = True
+
+    def keys_matching(self, prefix: str) -> List[str]:
+        """Stored key names starting with ``prefix`` (test helper)."""
+        with self._lock:
+            return sorted(key for key in self._data if key.startswith(prefix))
+
+    async def _round_trip(self) -> None:
+        with self._lock:
+            self.rpcs += 1
+        if self.latency:
+            await asyncio.sleep(self.latency)
+
+    # Commands ----------------------------------------------------------------
+
+    def _hset(self, name: str, key: Optional[str] = None, value: Any = None, mapping: Optional[Dict[str, Any]] = None) -> int:
+        values = self._data.setdefault(name, {})
+        updates = dict(mapping or {})
+        if key is not None:
+            updates[key] = value
+        added = len(set(updates) - set(values))
+        values.update((field, str(item)) for field, item in updates.items())
+        return added
+
+    def _hgetall(self, name: str) -> Dict[str, str]:
+        return dict(self._data.get(name, {}))
+
+    def _rpush(self, name: str, *values: Any) -> int:
+        items = self._data.setdefault(name, [])
+        items.extend(str(value) for value in values)
+        return len(items)
+
+    def _lrange(self, name: str, start: int, end: int) -> List[str]:
+        items = self._data.get(name, [])
+        return list(items[start:] if end == -1 else items[start:end + 1])
+
+    def _llen(self, name: str) -> int:
+        return len(self._data.get(name, []))
+
+    def _sadd(self, name: str, *values: Any) -> int:
+        members: Set[str] = self._data.setdefault(name, set())
+        added = {str(value) for value in values} - members
+        members |= added
+        return len(added)
+
+    def _srem(self, name: str, *values: Any) -> int:
+        members: Set[str] = self._data.get(name, set())
+        removed = {str(value) for value in values} & members
+        members -= removed
+        return len(removed)
+
+    def _smembers(self, name: str) -> Set[str]:
+        return set(self._data.get(name, set()))
+
+    def _delete(self, *names: str) -> int:
+        return sum(self._data.pop(name, None) is not None for name in names)
@@ -14,14 +14,11 @@ sys.path.insert(0, project_root)
 
 def run_tests():
     """Run all unit tests."""
-    # For now, only run simple tests that don't require external dependencies
-    # The other tests require Google ADK which may not be installed
-    
     loader = unittest.TestLoader()
     start_dir = os.path.dirname(os.path.abspath(__file__))
     
-    # Only run test_simple.py for now
-    suite = loader.loadTestsFromName('test_simple')
+    # Discover every tests/test_*.py module
+    suite = loader.discover(start_dir, pattern='test_*.py', top_level_dir=project_root)
     
     # Run the tests
     runner = unittest.TextTestRunner(verbosity=2)
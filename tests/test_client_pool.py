@@ -0,0 +1,155 @@
+import unittest
+import os
+import sys
+import threading
+
+# Add the project root to the path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from capymind_agent.tools.client_pool import FirestoreClientPool
+
+
+class FakeCredentials:
+    def __init__(self, expired=False):
+        self.expired = expired
+
+
+class FakeClient:
+    def __init__(self, project, database, credentials):
+        self.project = project
+        self.database = database
+        self.credentials = credentials
+        self.closed = False
+
+    def close(self):
+        self.closed = True
+
+
+def make_pool(credentials=None, auth_project=None, refresher=None):
+    built = []
+
+    def factory(project, database, creds):
+        client = FakeClient(project, database, creds)
+        built.append(client)
+        return client
+
+    pool = FirestoreClientPool(
+        client_factory=factory,
+        async_client_factory=factory,
+        credentials_loader=lambda: (credentials or FakeCredentials(), auth_project),
+        credentials_refresher=refresher or (lambda creds: setattr(creds, "expired", False)),
+    )
+    return pool, built
+
+
+class TestFirestoreClientPool(unittest.TestCase):
+    """Tests for the process-wide Firestore client registry."""
+
+    def test_reuses_client_per_project_and_database(self):
+        pool, built = make_pool()
+        first = pool.get("proj", "(default)")
+        second = pool.get("proj", "(default)")
+        other = pool.get("proj", "analytics")
+
+        self.assertIs(first, second)
+        self.assertIsNot(first, other)
+        self.assertEqual(len(built), 2)
+        self.assertEqual(pool.stats(), {"size": 2, "hits": 1, "misses": 2, "refreshes": 0})
+
+    def test_async_clients_pooled_separately(self):
+        pool, built = make_pool()
+        sync_client = pool.get("proj", "(default)")
+        async_client = pool.get_async("proj", "(default)")
+
+        self.assertIsNot(sync_client, async_client)
+        self.assertIs(pool.get_async("proj", "(default)"), async_client)
+        self.assertEqual(len(built), 2)
+
+    def test_auth_project_used_without_override(self):
+        pool, _ = make_pool(auth_project="from-credentials")
+        self.assertEqual(pool.get(None, "(default)").project, "from-credentials")
+        self.assertEqual(pool.get("explicit", "(default)").project, "explicit")
+
+    def test_expired_credentials_are_refreshed(self):
+        credentials = FakeCredentials()
+        pool, built = make_pool(credentials=credentials)
+        client = pool.get("proj", "(default)")
+
+        credentials.expired = True
+        self.assertIs(pool.get("proj", "(default)"), client)
+        self.assertFalse(credentials.expired)
+        self.assertEqual(pool.stats()["refreshes"], 1)
+        self.assertEqual(len(built), 1)
+
+    def test_failed_refresh_rebuilds_client(self):
+        def refresher(creds):
+            raise RuntimeError("token endpoint unavailable")
+
+        credentials = FakeCredentials()
+        pool, built = make_pool(credentials=credentials, refresher=refresher)
+        client = pool.get("proj", "(default)")
+
+        credentials.expired = True
+        rebuilt = pool.get("proj", "(default)")
+        self.assertIsNot(rebuilt, client)
+        self.assertTrue(client.closed)
+        self.assertEqual(len(built), 2)
+
+    def test_concurrent_lookups_build_one_client(self):
+        pool, built = make_pool()
+        barrier = threading.Barrier(16)
+
+        def worker():
+            barrier.wait()
+            pool.get("proj", "(default)")
+
+        threads = [threading.Thread(target=worker) for _ in range(16)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(len(built), 1)
+        self.assertEqual(pool.stats()["hits"], 15)
+
+    def test_slow_build_does_not_block_other_keys(self):
+        building = threading.Event()
+        release = threading.Event()
+
+        def factory(project, database, creds):
+            if database == "slow":
+                building.set()
+                release.wait(5)
+            return FakeClient(project, database, creds)
+
+        pool = FirestoreClientPool(
+            client_factory=factory,
+            async_client_factory=factory,
+            credentials_loader=lambda: (FakeCredentials(), None),
+        )
+        slow = threading.Thread(target=pool.get, args=("proj", "slow"))
+        slow.start()
+        self.assertTrue(building.wait(5))
+        try:
+            # Built while the other key is still stuck in its factory
+            self.assertEqual(pool.get("proj", "(default)").database, "(default)")
+            self.assertTrue(slow.is_alive())
+        finally:
+            release.set()
+            slow.join()
+        self.assertEqual(pool.stats()["size"], 2)
+
+    def test_close_all(self):
+        pool, built = make_pool()
+        pool.get("proj", "(default)")
+        pool.get("proj", "analytics")
+        pool.close_all()
+
+        self.assertTrue(all(client.closed for client in built))
+        self.assertEqual(pool.stats()["size"], 0)
+        # A second shutdown is a no-op
+        pool.close_all()
+
+
+if __name__ == '__main__':
+    unittest.main()
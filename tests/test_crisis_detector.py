@@ -0,0 +1,149 @@
+import unittest
+import os
+import sys
+import asyncio
+from unittest import mock
+
+# Add the project root to the path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from google.adk.models import LlmRequest
+from google.genai import types
+
+from capymind_agent.tools import crisis_detector as detector_module
+from capymind_agent.tools import firestore_data
+from capymind_agent.tools.crisis_detector import (
+    HIGH,
+    MEDIUM,
+    CrisisDetector,
+    _expand,
+    crisis_detector,
+    crisis_guard,
+)
+from capymind_agent.tools.doc_cache import DocumentCache
+from tests.fake_firestore import FakeAsyncFirestoreClient, FakeCallbackContext, FakeFirestoreClient
+
+
+def user_request(text):
+    return LlmRequest(contents=[types.Content(role="user", parts=[types.Part(text=text)])])
+
+
+class TestPhraseExpansion(unittest.TestCase):
+    """Phrase patterns expand to every literal phrase they match."""
+
+    def test_groups_and_optionals(self):
+        self.assertEqual(
+            sorted(_expand("(end|take) my (own )?life")),
+            ["end my life", "end my own life", "take my life", "take my own life"],
+        )
+        self.assertEqual(sorted(_expand("kill my ?self")), ["kill my self", "kill myself"])
+        self.assertEqual(_expand("suicid\\w*"), ["suicid\\w*"])
+
+    def test_rejects_unsupported_syntax(self):
+        for pattern in ("kill.*", "(unclosed", "closed)", "a\\w*b"):
+            with self.assertRaises(ValueError, msg=pattern):
+                _expand(pattern)
+
+
+class TestDetect(unittest.TestCase):
+    """The bundled phrase lists classify messages across languages."""
+
+    def assertLevel(self, text, level):
+        detection = crisis_detector.detect(text)
+        self.assertEqual(detection.level if detection else None, level, text)
+
+    def test_high_risk_multilingual(self):
+        for text in (
+            "I want to KILL myself.",
+            "i dont want to wake up tomorrow",
+            "Хочу покінчити з собою",
+            "я хочу умереть",
+            "me quiero matar",
+            "não quero mais viver",
+            "Ich möchte sterben",
+            "je pense à me suicider",
+            "mam myśli samobójcze",
+        ):
+            self.assertLevel(text, HIGH)
+
+    def test_medium_risk(self):
+        self.assertLevel("I can't take it anymore", MEDIUM)
+        self.assertLevel("я так більше не можу", MEDIUM)
+
+    def test_high_wins_over_earlier_medium(self):
+        self.assertLevel("I feel hopeless and I want to die", HIGH)
+
+    def test_guards_and_benign_messages(self):
+        for text in (
+            "I was killing myself laughing",
+            "we watched Suicide Squad",
+            "this cake is to die for",
+            "Show me my notes",
+            "",
+        ):
+            self.assertLevel(text, None)
+
+    def test_guard_only_covers_its_own_words(self):
+        self.assertLevel("died laughing yesterday, today I want to die", HIGH)
+
+    def test_custom_phrases(self):
+        detector = CrisisDetector({"high": {"xx": ["blue (moon|sky)"]}, "guards": {"xx": ["blue moon cafe"]}})
+        self.assertEqual(detector.detect("Once in a BLUE moon").language, "xx")
+        self.assertIsNone(detector.detect("meet at the blue moon cafe"))
+
+
+class TestCrisisGuard(unittest.TestCase):
+    """crisis_guard short-circuits the model with local crisis numbers."""
+
+    def setUp(self):
+        self.client = FakeFirestoreClient()
+        self.async_client = FakeAsyncFirestoreClient(self.client)
+        patches = [
+            mock.patch.object(firestore_data, "_get_async_firestore_client", return_value=self.async_client),
+            mock.patch.object(firestore_data, "document_cache", DocumentCache()),
+        ]
+        for patcher in patches:
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        self.context = FakeCallbackContext("u1")
+
+    def guard(self, request):
+        return asyncio.run(crisis_guard(self.context, request))
+
+    def test_high_risk_answers_with_local_numbers(self):
+        self.client.seed("settings", "u1", {"Location": "Kyiv, Ukraine", "SecondsFromUTC": 7200})
+        response = self.guard(user_request("I want to end my life"))
+        text = response.content.parts[0].text
+        self.assertIn("7333", text)
+        self.assertIn("call 112", text)
+        self.assertIn("Are you safe right now?", text)
+
+    def test_unknown_location_gives_generic_numbers(self):
+        text = self.guard(user_request("I want to end my life")).content.parts[0].text
+        self.assertIn("112 in Europe", text)
+        self.assertIn("which country", text)
+
+    def test_slow_settings_read_times_out(self):
+        self.client.seed("settings", "u1", {"Location": "Kyiv"})
+        self.async_client.latency = 0.2
+        with mock.patch.object(detector_module, "_LOOKUP_TIMEOUT", 0.01):
+            text = self.guard(user_request("I want to end my life")).content.parts[0].text
+        self.assertNotIn("7333", text)
+
+    def test_medium_risk_adds_instruction(self):
+        request = user_request("I can't go on")
+        self.assertIsNone(self.guard(request))
+        self.assertIn("safety and crisis protocol", request.config.system_instruction)
+
+    def test_benign_and_follow_up_calls_pass_through(self):
+        self.assertIsNone(self.guard(user_request("Show me my notes")))
+        request = user_request("I want to die")
+        request.contents.append(types.Content(
+            role="user",
+            parts=[types.Part(function_response=types.FunctionResponse(name="capy_crisis_lines", response={}))],
+        ))
+        self.assertIsNone(self.guard(request))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,187 @@
+import unittest
+import os
+import sys
+import time
+import asyncio
+from unittest import mock
+
+# Add the project root to the path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from capymind_agent.tools import crisis_lines, firestore_data
+from capymind_agent.tools.crisis_lines import CrisisLineDirectory, Match, crisis_directory
+from capymind_agent.tools.doc_cache import DocumentCache
+from capymind_agent.tools.resilience import FirestoreGuard
+from capymind_agent.tools.text import normalize
+from tests.fake_firestore import FakeAsyncFirestoreClient, FakeFirestoreClient, FakeToolContext
+
+HOUR = 3600
+
+
+class TestDirectory(unittest.TestCase):
+    """The bundled directory is well formed."""
+
+    def test_every_country_has_numbers(self):
+        self.assertTrue(crisis_directory.version)
+        for code, country in crisis_directory.countries.items():
+            self.assertTrue(country["emergency"], code)
+            self.assertTrue(country["lines"], code)
+            for region in country.get("regions", {}).values():
+                for line in country["lines"] + region.get("lines", []):
+                    self.assertTrue(line.get("phone") or line.get("sms"), (code, line))
+
+    def test_normalize(self):
+        self.assertEqual(normalize("  Montréal,  QC "), "montreal qc")
+        self.assertEqual(normalize("São-Paulo"), "sao paulo")
+
+
+class TestLookup(unittest.TestCase):
+    """Free-form settings locations resolve to a country and optional region."""
+
+    def assertResolves(self, location, country, region=None, method="exact", seconds_from_utc=None):
+        self.assertEqual(
+            crisis_directory.lookup(location, seconds_from_utc),
+            Match(country, region, method),
+        )
+
+    def test_exact_names_aliases_and_native_spellings(self):
+        self.assertResolves("Ukraine", "UA")
+        self.assertResolves("Kyiv, Ukraine", "UA")
+        self.assertResolves("Київ", "UA")
+        self.assertResolves("united states of america", "US")
+        self.assertResolves("Sydney, NSW 2000, Australia", "AU", "NSW")
+
+    def test_regions(self):
+        self.assertResolves("Montréal, QC", "CA", "QC")
+        self.assertResolves("Glasgow, Scotland", "GB", "SCT")
+        self.assertResolves("Toronto, ON", "CA", "ON")
+        self.assertResolves("Atlanta, Georgia, USA", "US", "GA")
+        # Longest alias wins: 'New South Wales' is not Wales
+        self.assertResolves("New South Wales", "AU", "NSW")
+
+    def test_fuzzy_typos(self):
+        self.assertResolves("Ukrane", "UA", method="fuzzy")
+        self.assertResolves("Germny", "DE", method="fuzzy")
+        self.assertResolves("Sao Paolo, Brazl", "BR", method="fuzzy")
+        self.assertResolves("Londn", "GB", method="fuzzy")
+
+    def test_utc_offset_breaks_ties(self):
+        self.assertResolves("Perth, WA", "AU", "WA", seconds_from_utc=8 * HOUR)
+        self.assertResolves("Spokane, WA", "US", "WA", seconds_from_utc=-7 * HOUR)
+
+    def test_more_specific_parts_outvote_region_codes(self):
+        # 'IN' is also Indiana's code
+        self.assertResolves("Mumbai, IN", "IN")
+        self.assertResolves("Berlin, DE", "DE")
+
+    def test_region_codes_need_the_offset_to_stand_alone(self):
+        self.assertIsNone(crisis_directory.lookup("Austin, TX"))
+        self.assertResolves("Austin, TX 78701", "US", "TX", seconds_from_utc=-6 * HOUR)
+        self.assertResolves("Victoria, BC", "CA", "BC", seconds_from_utc=-8 * HOUR)
+
+    def test_codes_and_shared_names_do_not_hand_out_another_countrys_lines(self):
+        # Codes inside words, or a code against a name, never resolve
+        for location in ("La Paz, Bolivia", "Ciudad de Guatemala", "Tbilisi, Georgia", "in Lagos", "Paris, TX"):
+            with self.subTest(location=location):
+                self.assertIsNone(crisis_directory.lookup(location))
+        self.assertIsNone(crisis_directory.lookup("Tbilisi, Georgia", 4 * HOUR))
+        self.assertIsNone(crisis_directory.lookup("Sydney NSW 2000 Australia").region)
+        # The offset settles a code against a name
+        self.assertResolves("Paris, TX", "US", "TX", seconds_from_utc=-6 * HOUR)
+        self.assertResolves("Paris, TX", "FR", seconds_from_utc=HOUR)
+
+    def test_offset_only(self):
+        self.assertResolves(None, "IN", method="timezone", seconds_from_utc=int(5.5 * HOUR))
+        # Several countries share UTC+2
+        self.assertIsNone(crisis_directory.lookup("", 2 * HOUR))
+
+    def test_unknown(self):
+        self.assertIsNone(crisis_directory.lookup("Atlantis"))
+        self.assertIsNone(crisis_directory.lookup(None))
+
+    def test_entry_lists_region_lines_first(self):
+        entry = crisis_directory.entry(Match("CA", "QC", "exact"))
+        self.assertEqual(entry["region"], "Quebec")
+        self.assertEqual(entry["emergency"], "911")
+        self.assertEqual(entry["lines"][0]["phone"], "1-866-277-3553")
+        self.assertIn({"name": "9-8-8 Suicide Crisis Helpline", "phone": "988", "sms": "988"}, entry["lines"])
+
+    def test_custom_directory(self):
+        directory = CrisisLineDirectory({
+            "version": "test",
+            "countries": {
+                "XX": {"name": "Freedonia", "utc_offsets": [4], "emergency": "1", "lines": [{"phone": "2"}]},
+            },
+        })
+        self.assertEqual(directory.lookup("freedonia"), Match("XX", None, "exact"))
+        self.assertEqual(directory.lookup(None, 4 * HOUR), Match("XX", None, "timezone"))
+
+
+class TestCrisisLinesTool(unittest.TestCase):
+    """capy_crisis_lines reads settings only when no location is passed."""
+
+    def setUp(self):
+        self.client = FakeFirestoreClient()
+        patches = [
+            mock.patch.object(
+                firestore_data, "_get_async_firestore_client",
+                return_value=FakeAsyncFirestoreClient(self.client),
+            ),
+            mock.patch.object(firestore_data, "document_cache", DocumentCache()),
+            mock.patch.object(
+                firestore_data, "firestore_guard",
+                FirestoreGuard(retries=0, deadlines={"get_settings": 0.2}),
+            ),
+        ]
+        for patcher in patches:
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        self.addCleanup(firestore_data.firestore_guard.close)
+        self.context = FakeToolContext("u1")
+
+    def call(self, **kwargs):
+        return asyncio.run(crisis_lines.capy_crisis_lines(self.context, **kwargs))
+
+    def test_reads_location_from_settings(self):
+        self.client.seed("settings", "u1", {"Location": "Kyiv", "SecondsFromUTC": 7200})
+        result = self.call()
+        self.assertTrue(result["found"])
+        self.assertEqual(result["data"]["country"], "UA")
+        self.assertEqual(result["data"]["lines"][0]["phone"], "7333")
+        self.assertEqual(self.client.reads, 1)
+
+    def test_nested_settings(self):
+        self.client.seed("settings", "u1", {"settings": {"SecondsFromUTC": 19800}})
+        result = self.call()
+        self.assertEqual(result["data"]["country"], "IN")
+        self.assertEqual(result["data"]["match"], "timezone")
+
+    def test_explicit_location_skips_firestore(self):
+        result = self.call(location="Toronto")
+        self.assertEqual(result["data"]["country"], "CA")
+        self.assertEqual(self.client.reads, 0)
+
+    def test_not_found_defers_to_search(self):
+        for location in ("Atlantis", "La Paz, Bolivia"):
+            with self.subTest(location=location):
+                result = self.call(location=location)
+                self.assertTrue(result["ok"])
+                self.assertFalse(result["found"])
+                self.assertNotIn("data", result)
+
+    def test_missing_settings(self):
+        self.assertFalse(self.call()["found"])
+
+    def test_slow_settings_give_up_at_the_guard_deadline(self):
+        self.client.seed("settings", "u1", {"Location": "Kyiv"})
+        self.client.inject(delay=2.0)
+        started = time.monotonic()
+        result = self.call()
+        self.assertLess(time.monotonic() - started, 1.0)
+        self.assertTrue(result["ok"])
+        self.assertFalse(result["found"])
+        self.assertEqual(firestore_data.firestore_guard.stats()["timeouts"], 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
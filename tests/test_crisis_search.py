@@ -0,0 +1,227 @@
+import unittest
+import os
+import sys
+import asyncio
+import tempfile
+import threading
+from unittest import mock
+
+# Add the project root to the path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from capymind_agent.tools import crisis_search, firestore_data
+from capymind_agent.tools.crisis_search import SearchCache, location_key, top_locations, warm
+from capymind_agent.tools.doc_cache import DocumentCache
+from capymind_agent.tools.session_prefetch import STATE_KEY
+from tests.fake_firestore import FakeAsyncFirestoreClient, FakeCallbackContext, FakeFirestoreClient, FakeToolContext
+
+
+class StubSearch:
+    """Stands in for the web search agent: counts searches per location."""
+
+    def __init__(self, delay=0.0):
+        self.delay = delay
+        self.queries = []
+
+    async def __call__(self, location):
+        self.queries.append(location)
+        await asyncio.sleep(self.delay)
+        return f"- Helpline for {location}: 555-0100\n- Emergency: 112"
+
+
+class TestSearchCache(unittest.TestCase):
+    """TTL, LRU eviction and persistence of search answers by normalized location."""
+
+    def setUp(self):
+        self.now = [1000.0]
+        self.cache = SearchCache(max_entries=3, ttl_seconds=100, clock=lambda: self.now[0])
+
+    def test_normalized_keys(self):
+        self.assertEqual(location_key(" Lagos,  NIGERIA "), location_key("lagos nigeria"))
+        self.cache.put("Lagos, Nigeria", "answer")
+        self.assertEqual(self.cache.get("lagos nigeria"), "answer")
+        self.assertIsNone(self.cache.get("Abuja, Nigeria"))
+        self.assertEqual(self.cache.stats()["hit_rate"], 0.5)
+
+    def test_ttl(self):
+        self.cache.put("Lagos", "answer")
+        self.now[0] += 99
+        self.assertEqual(self.cache.get("Lagos"), "answer")
+        self.now[0] += 1
+        self.assertIsNone(self.cache.get("Lagos"))
+        self.assertEqual(self.cache.stats()["expirations"], 1)
+        self.assertEqual(len(self.cache), 0)
+
+    def test_lru_eviction(self):
+        for location in ("Lagos", "Accra", "Nairobi"):
+            self.cache.put(location, location)
+        # Touch Lagos so Accra is the least recently used
+        self.cache.get("Lagos")
+        self.cache.put("Dakar", "Dakar")
+        self.assertIsNone(self.cache.get("Accra"))
+        self.assertEqual([self.cache.get(location) for location in ("Lagos", "Nairobi", "Dakar")], ["Lagos", "Nairobi", "Dakar"])
+        self.assertEqual(self.cache.stats()["evictions"], 1)
+
+    def test_persistence(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "search_cache.json")
+            cache = SearchCache(ttl_seconds=100, path=path, clock=lambda: self.now[0])
+            cache.put("Lagos, Nigeria", "lagos answer")
+            # put() only changes memory
+            self.assertFalse(os.path.exists(path))
+            cache.save()
+            self.now[0] += 60
+            cache.put("Accra", "accra answer")
+            cache.save()
+
+            # A new instance (a cold start) finds both
+            restored = SearchCache(ttl_seconds=100, path=path, clock=lambda: self.now[0])
+            self.assertEqual(restored.get("lagos nigeria"), "lagos answer")
+            # Expired entries are not loaded
+            self.now[0] += 50
+            self.assertEqual(SearchCache(ttl_seconds=100, path=path, clock=lambda: self.now[0]).load(), 1)
+            # Only the newest fit a smaller cache
+            small = SearchCache(max_entries=1, ttl_seconds=1000, path=path, clock=lambda: self.now[0])
+            self.assertEqual(small.get("Accra"), "accra answer")
+
+            with open(path, "w") as f:
+                f.write("{not json")
+            with self.assertLogs("capymind.crisis_search", "WARNING"):
+                self.assertEqual(SearchCache(path=path).load(), 0)
+
+
+    def test_instances_merge_their_entries(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "search_cache.json")
+            first, second = (SearchCache(ttl_seconds=100, path=path, clock=lambda: self.now[0]) for _ in range(2))
+            first.put("Lagos", "lagos answer")
+            first.save()
+            self.now[0] += 1
+            second.put("Accra", "accra answer")
+            second.put("Lagos", "newer lagos answer")
+            second.save()
+            self.now[0] += 1
+            first.put("Dakar", "dakar answer")
+            first.save()
+
+            # Nothing was overwritten, the newest Lagos answer won, and the
+            # first instance picked up the second one's entries while saving
+            restored = SearchCache(ttl_seconds=100, path=path, clock=lambda: self.now[0])
+            self.assertEqual(
+                [restored.get(location) for location in ("Lagos", "Accra", "Dakar")],
+                ["newer lagos answer", "accra answer", "dakar answer"],
+            )
+            self.assertEqual(first.get("Accra"), "accra answer")
+            self.assertEqual(first.get("Lagos"), "newer lagos answer")
+
+    def test_concurrent_saves_wait_for_each_other(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "search_cache.json")
+            first, second = (SearchCache(ttl_seconds=100, path=path, clock=lambda: self.now[0]) for _ in range(2))
+            first.put("Lagos", "lagos answer")
+            second.put("Accra", "accra answer")
+            read = first._read
+            saving = threading.Thread(target=second.save)
+
+            def read_while_second_saves():
+                # second saves between first's read and its replace
+                saving.start()
+                saving.join(0.2)
+                self.assertTrue(saving.is_alive())
+                return read()
+
+            with mock.patch.object(first, "_read", side_effect=read_while_second_saves):
+                first.save()
+            saving.join()
+            restored = SearchCache(ttl_seconds=100, path=path, clock=lambda: self.now[0])
+            self.assertEqual([restored.get("Lagos"), restored.get("Accra")], ["lagos answer", "accra answer"])
+
+    def test_search_saves_in_a_thread(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "search_cache.json")
+            cache = SearchCache(path=path)
+            with mock.patch("asyncio.to_thread", wraps=asyncio.to_thread) as to_thread:
+                asyncio.run(crisis_search.search_crisis_lines("Lagos", cache, StubSearch()))
+            to_thread.assert_called_once_with(cache.save)
+            self.assertEqual(SearchCache(path=path).get("lagos"), "- Helpline for Lagos: 555-0100\n- Emergency: 112")
+
+
+class TestSearchTool(unittest.TestCase):
+    """capy_search_crisis_lines with a stub search: one search per place, shared by its users."""
+
+    def setUp(self):
+        self.client = FakeFirestoreClient()
+        self.search = StubSearch(delay=0.01)
+        self.cache = SearchCache()
+        patches = [
+            mock.patch.object(firestore_data, "_get_async_firestore_client", return_value=FakeAsyncFirestoreClient(self.client)),
+            mock.patch.object(firestore_data, "document_cache", DocumentCache()),
+            mock.patch.object(crisis_search, "search_cache", self.cache),
+            mock.patch.object(crisis_search, "agent_search", self.search),
+        ]
+        for patcher in patches:
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def call(self, context, **kwargs):
+        return crisis_search.capy_search_crisis_lines(context, **kwargs)
+
+    def test_users_in_one_city_share_a_search(self):
+        spellings = ["Lagos, Nigeria", "lagos nigeria", "LAGOS,NIGERIA", "Lagos Nigeria ", "Abuja, Nigeria"]
+        for i, location in enumerate(spellings):
+            self.client.seed("settings", f"u{i}", {"Location": location})
+
+        async def burst():
+            # Two waves: the first overlaps, the second finds the cache warm
+            first = await asyncio.gather(*(self.call(FakeToolContext(f"u{i}")) for i in range(len(spellings))))
+            second = await asyncio.gather(*(self.call(FakeToolContext(f"u{i}")) for i in range(len(spellings))))
+            return first + second
+
+        results = asyncio.run(burst())
+        self.assertTrue(all(result["ok"] for result in results))
+        self.assertEqual(sorted(self.search.queries), ["Abuja, Nigeria", "Lagos, Nigeria"])
+        # The overlapping first wave shares one search per place; the second is all hits
+        self.assertEqual([result["cached"] for result in results], [False] * 5 + [True] * 5)
+        self.assertIn("Helpline for Lagos, Nigeria", results[1]["result"])
+        self.assertEqual(self.cache.stats()["hits"], 5)
+
+    def test_location_argument_and_prefetched_settings(self):
+        context = FakeCallbackContext("u1")
+        context.state[STATE_KEY] = {"settings": {"Location": "Accra"}}
+        self.assertEqual(asyncio.run(self.call(context))["location"], "Accra")
+        self.assertEqual(asyncio.run(self.call(context, location="Dakar"))["location"], "Dakar")
+        # Nothing read from Firestore
+        self.assertEqual(self.client.reads, 0)
+        self.assertEqual(self.search.queries, ["Accra", "Dakar"])
+
+    def test_no_location(self):
+        result = asyncio.run(self.call(FakeToolContext("u1")))
+        self.assertFalse(result["ok"])
+        self.assertIn("ask the user", result["error"])
+        self.assertEqual(self.search.queries, [])
+
+
+class TestWarm(unittest.TestCase):
+    def setUp(self):
+        self.client = FakeFirestoreClient()
+        locations = ["Lagos, Nigeria"] * 5 + ["lagos nigeria"] + ["Accra"] * 3 + ["Dakar"] + ["Kyiv"] * 10 + [""]
+        for i, location in enumerate(locations):
+            self.client.seed("settings", f"u{i}", {"Location": location})
+
+    def test_top_locations_skip_the_directory(self):
+        # Kyiv is in the bundled directory, so never searched
+        self.assertEqual(top_locations(self.client, 2), [("Lagos, Nigeria", 6), ("Accra", 3)])
+        self.assertEqual(top_locations(self.client, 1, uncovered_only=False), [("Kyiv", 10)])
+
+    def test_warm_then_hits(self):
+        cache = SearchCache()
+        search = StubSearch()
+        locations = [location for location, _ in top_locations(self.client, 10)]
+        self.assertEqual(asyncio.run(warm(cache, locations, search)), 3)
+        self.assertEqual(asyncio.run(warm(cache, locations, search)), 0)
+        self.assertEqual(len(search.queries), 3)
+        self.assertIsNotNone(cache.get("LAGOS, NIGERIA"))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,144 @@
+import unittest
+import os
+import sys
+import time
+from unittest import mock
+
+# Add the project root to the path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from capymind_agent.tools import firestore_data
+from capymind_agent.tools.doc_cache import DocumentCache
+from tests.fake_firestore import FakeFirestoreClient, FakeToolContext
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def wait_for(predicate, timeout=1.0):
+    deadline = time.monotonic() + timeout
+    while not predicate() and time.monotonic() < deadline:
+        time.sleep(0.005)
+    return predicate()
+
+
+class TestDocumentCache(unittest.TestCase):
+    """Tests for the TTL + LRU document cache."""
+
+    def test_ttl_expiry(self):
+        clock = FakeClock()
+        cache = DocumentCache(max_entries=4, ttl_seconds=10, clock=clock)
+        cache.put("a", {"v": 1})
+
+        clock.now = 9.9
+        self.assertEqual(cache.get("a"), {"v": 1})
+        clock.now = 10.0
+        self.assertIsNone(cache.get("a"))
+
+        stats = cache.stats()
+        self.assertEqual(stats["hits"], 1)
+        self.assertEqual(stats["misses"], 1)
+        self.assertEqual(stats["expirations"], 1)
+        self.assertEqual(stats["size"], 0)
+
+    def test_lru_eviction(self):
+        cache = DocumentCache(max_entries=2, ttl_seconds=60)
+        cache.put("a", 1)
+        cache.put("b", 2)
+        cache.get("a")  # 'b' is now least recently used
+        cache.put("c", 3)
+
+        self.assertIsNone(cache.get("b"))
+        self.assertEqual(cache.get("a"), 1)
+        self.assertEqual(cache.get("c"), 3)
+        self.assertEqual(cache.stats()["evictions"], 1)
+
+    def test_returns_copies(self):
+        cache = DocumentCache()
+        cache.put("a", {"nested": {"v": 1}})
+        cache.get("a")["nested"]["v"] = 2
+        self.assertEqual(cache.get("a"), {"nested": {"v": 1}})
+
+    def test_disabled_with_zero_ttl(self):
+        cache = DocumentCache(ttl_seconds=0)
+        cache.put("a", 1)
+        self.assertIsNone(cache.get("a"))
+        self.assertEqual(cache.stats()["size"], 0)
+
+    def test_snapshot_listener_invalidates_on_change(self):
+        client = FakeFirestoreClient()
+        ref = client.seed("settings", "u1", {"Location": "Kyiv"})
+        cache = DocumentCache(watch=True)
+        cache.put("k", {"Location": "Kyiv"}, doc_ref=ref)
+
+        self.assertEqual(cache.get("k"), {"Location": "Kyiv"})
+        ref.update({"Location": "Lviv"})
+        self.assertIsNone(cache.get("k"))
+        self.assertEqual(cache.stats()["invalidations"], 1)
+        self.assertTrue(wait_for(lambda: not client._listeners[ref._path]))
+
+    def test_eviction_releases_listener(self):
+        client = FakeFirestoreClient()
+        first = client.seed("users", "u1", {})
+        second = client.seed("users", "u2", {})
+        cache = DocumentCache(max_entries=1, watch=True)
+
+        cache.put("u1", {}, doc_ref=first)
+        cache.put("u2", {}, doc_ref=second)
+        self.assertEqual(client._listeners[first._path], [])
+        self.assertEqual(len(client._listeners[second._path]), 1)
+
+        cache.clear()
+        self.assertEqual(client._listeners[second._path], [])
+
+
+class TestFirestoreDataCaching(unittest.TestCase):
+    """get_user / get_settings read through the document cache."""
+
+    def setUp(self):
+        self.client = FakeFirestoreClient()
+        self.client.seed("users", "u1", {"FirstName": "Ada"})
+        self.client.seed("settings", "u1", {"Location": "Kyiv", "SecondsFromUTC": 7200})
+        self.cache = DocumentCache(watch=True)
+        patches = [
+            mock.patch.object(firestore_data, "_get_firestore_client", return_value=self.client),
+            mock.patch.object(firestore_data, "document_cache", self.cache),
+        ]
+        for patcher in patches:
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        self.addCleanup(self.cache.clear)
+        self.context = FakeToolContext("u1")
+
+    def test_repeated_reads_hit_cache(self):
+        for _ in range(3):
+            result = firestore_data.capy_firestore_data("get_settings", self.context)
+            self.assertEqual(result, {"ok": True, "data": {"Location": "Kyiv", "SecondsFromUTC": 7200, "id": "u1"}})
+        firestore_data.capy_firestore_data("get_user", self.context)
+        firestore_data.capy_firestore_data("get_user", self.context)
+
+        self.assertEqual(self.client.reads, 2)
+        self.assertEqual(self.cache.stats()["hits"], 3)
+
+    def test_change_is_visible_on_next_read(self):
+        firestore_data.capy_firestore_data("get_settings", self.context)
+        self.client.collection("settings").document("u1").update({"Location": "Lviv"})
+
+        result = firestore_data.capy_firestore_data("get_settings", self.context)
+        self.assertEqual(result["data"]["Location"], "Lviv")
+        self.assertEqual(self.client.reads, 2)
+
+    def test_missing_document_is_not_cached(self):
+        context = FakeToolContext("ghost")
+        result = firestore_data.capy_firestore_data("get_user", context)
+        self.assertEqual(result, {"ok": False, "error": "user 'ghost' not found"})
+        self.assertEqual(self.cache.stats()["size"], 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,95 @@
+import unittest
+import os
+import sys
+import asyncio
+from datetime import timedelta
+
+# Add the project root to the path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from google.cloud.firestore import Query
+
+from tests.fake_firestore import (
+    SYNTHETIC_EPOCH,
+    FakeAsyncFirestoreClient,
+    FakeFirestoreClient,
+    seed_synthetic,
+)
+
+
+class TestIndexedQueries(unittest.TestCase):
+    """Equality indexes built on first query stay in sync with later writes."""
+
+    def setUp(self):
+        self.client = FakeFirestoreClient()
+        self.ada = self.client.seed("users", "ada", {})
+        self.bob = self.client.seed("users", "bob", {})
+        for i in range(4):
+            self.client.seed("notes", f"a{i}", {"user": self.ada, "timestamp": i, "tags": ["x"]})
+        self.client.seed("notes", "b0", {"user": self.bob, "timestamp": 10})
+
+    def ids(self, query):
+        return [snap.id for snap in query.stream()]
+
+    def notes_of(self, user_ref):
+        return self.client.collection("notes").where("user", "==", user_ref).order_by("timestamp", direction=Query.DESCENDING)
+
+    def test_equality_and_in(self):
+        self.assertEqual(self.ids(self.notes_of(self.ada).limit(2)), ["a3", "a2"])
+        both = self.client.collection("notes").where("user", "in", [self.ada, self.bob]).order_by("timestamp")
+        self.assertEqual(self.ids(both), ["a0", "a1", "a2", "a3", "b0"])
+
+    def test_writes_after_index_built(self):
+        self.assertEqual(len(self.ids(self.notes_of(self.bob))), 1)
+        self.client.collection("notes").document("a0").update({"user": self.bob})
+        self.client.collection("notes").document("b1").set({"user": self.bob, "timestamp": 11})
+        self.client.collection("notes").document("b0").delete()
+        self.assertEqual(self.ids(self.notes_of(self.bob)), ["b1", "a0"])
+        self.assertEqual(self.ids(self.notes_of(self.ada)), ["a3", "a2", "a1"])
+
+    def test_unhashable_values(self):
+        query = self.client.collection("notes").where("tags", "==", ["x"])
+        self.assertEqual(len(self.ids(query)), 4)
+
+    def test_results_are_copies(self):
+        snap = next(self.notes_of(self.ada).stream())
+        snap.to_dict()["timestamp"] = 99
+        snap._data["timestamp"] = 99
+        self.assertEqual(self.ids(self.notes_of(self.ada).limit(1)), ["a3"])
+
+
+class TestSyntheticData(unittest.TestCase):
+    """seed_synthetic is deterministic and queryable."""
+
+    def test_deterministic(self):
+        first, second = FakeFirestoreClient(), FakeFirestoreClient()
+        users = seed_synthetic(first, users=50, notes_per_user=5, seed=7)
+        seed_synthetic(second, users=50, notes_per_user=5, seed=7)
+        self.assertEqual(len(users), 50)
+        self.assertEqual(first.count("users"), 50)
+        self.assertEqual(first.count("settings"), 50)
+        self.assertEqual(first.count("notes"), second.count("notes"))
+        self.assertGreater(first.count("notes"), 0)
+
+        note = next(first.collection("notes").limit(1).stream()).to_dict()
+        self.assertLess(note["timestamp"], SYNTHETIC_EPOCH + timedelta(days=365))
+        self.assertIn(note["user"].id, users)
+
+
+class TestLatency(unittest.TestCase):
+    """RPCs are counted and delayed by latency plus jitter."""
+
+    def test_rpcs_counted(self):
+        client = FakeFirestoreClient(jitter=0.0001)
+        client.seed("users", "u1", {})
+        client.collection("users").document("u1").get()
+        list(client.collection("users").stream())
+        async_client = FakeAsyncFirestoreClient(client)
+        asyncio.run(async_client.collection("users").document("u1").get())
+        self.assertEqual(client.rpcs, 3)
+        self.assertEqual(async_client.rpcs, 3)
+        self.assertEqual(client.reads, 3)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,560 @@
+import unittest
+import os
+import sys
+import time
+import asyncio
+from datetime import datetime, timedelta, timezone
+from unittest import mock
+
+from google.api_core.exceptions import ServiceUnavailable
+
+# Add the project root to the path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from capymind_agent.tools import firestore_data, notes_stats
+from capymind_agent.tools.doc_cache import DocumentCache
+from capymind_agent.tools.notes_digest import NotesDigest
+from capymind_agent.tools.notes_search import NotesSearchIndex, snippet, terms
+from capymind_agent.tools.resilience import FirestoreGuard
+from tests.fake_firestore import FakeAsyncFirestoreClient, FakeFirestoreClient, FakeToolContext
+
+BASE_TIME = datetime(2025, 1, 1, 8, 0, tzinfo=timezone.utc)
+
+
+def seed_user(client, user_id="u1", notes=3):
+    user_ref = client.seed("users", user_id, {"FirstName": "Ada"})
+    client.seed("settings", user_id, {"Location": "Kyiv"})
+    for i in range(notes):
+        client.seed(
+            "notes",
+            f"{user_id}-n{i}",
+            {"text": f"note {i}", "timestamp": BASE_TIME + timedelta(hours=i), "user": user_ref},
+        )
+    return user_ref
+
+
+class FirestoreDataTestCase(unittest.TestCase):
+    """Runs capy_firestore_data against the in-memory fake with a fresh cache."""
+
+    def setUp(self):
+        self.client = FakeFirestoreClient()
+        self.async_client = FakeAsyncFirestoreClient(self.client)
+        self.cache = DocumentCache()
+        patches = [
+            mock.patch.object(firestore_data, "_get_firestore_client", return_value=self.client),
+            mock.patch.object(firestore_data, "_get_async_firestore_client", return_value=self.async_client),
+            mock.patch.object(firestore_data, "document_cache", self.cache),
+        ]
+        for patcher in patches:
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        self.context = FakeToolContext("u1")
+
+    def call(self, operation, **kwargs):
+        return firestore_data.capy_firestore_data(operation, self.context, **kwargs)
+
+    def call_async(self, operation, **kwargs):
+        return asyncio.run(firestore_data.capy_firestore_data_async(operation, self.context, **kwargs))
+
+
+class TestToJsonable(unittest.TestCase):
+    """The converter keeps JSON-safe values as they are and converts the rest."""
+
+    def test_converts_firestore_values(self):
+        from google.api_core.datetime_helpers import DatetimeWithNanoseconds
+        from google.cloud.firestore_v1.async_document import AsyncDocumentReference
+        from google.cloud.firestore_v1.document import DocumentReference
+
+        value = {
+            "timestamp": DatetimeWithNanoseconds(2025, 1, 1, 8, tzinfo=timezone.utc),
+            "day": BASE_TIME.date(),
+            "user": DocumentReference("users", "u1"),
+            "async_user": AsyncDocumentReference("users", "u2"),
+            "tags": ["a", {"at": BASE_TIME}],
+            "n": 1,
+            "none": None,
+        }
+        self.assertEqual(
+            firestore_data._to_jsonable(value),
+            {
+                "timestamp": "2025-01-01T08:00:00+00:00",
+                "day": "2025-01-01",
+                "user": "users/u1",
+                "async_user": "users/u2",
+                "tags": ["a", {"at": "2025-01-01T08:00:00+00:00"}],
+                "n": 1,
+                "none": None,
+            },
+        )
+
+    def test_json_safe_structures_are_not_copied(self):
+        value = {"text": "hi", "nested": {"list": [1, 2.5, True, None]}}
+        self.assertIs(firestore_data._to_jsonable(value), value)
+
+    def test_only_changed_branches_are_rebuilt(self):
+        untouched = {"a": [1, 2]}
+        value = {"untouched": untouched, "changed": [BASE_TIME]}
+        result = firestore_data._to_jsonable(value)
+        self.assertIsNot(result, value)
+        self.assertIs(result["untouched"], untouched)
+        self.assertEqual(value["changed"], [BASE_TIME])
+
+    def test_deep_nesting_beyond_recursion_limit(self):
+        depth = sys.getrecursionlimit() * 2
+        value = leaf = []
+        for _ in range(depth):
+            child = []
+            leaf.append(child)
+            leaf = child
+        leaf.append(BASE_TIME)
+
+        result = firestore_data._to_jsonable(value)
+        for _ in range(depth):
+            result = result[0]
+        self.assertEqual(result, ["2025-01-01T08:00:00+00:00"])
+
+
+class TestGetNotes(FirestoreDataTestCase):
+    def test_newest_first_with_limit(self):
+        seed_user(self.client, notes=5)
+        seed_user(self.client, user_id="u2", notes=2)
+
+        result = self.call("get_notes", limit=2)
+        self.assertTrue(result["ok"])
+        self.assertEqual([n["text"] for n in result["data"]], ["note 4", "note 3"])
+        self.assertEqual(result["data"][0]["user"], "users/u1")
+        self.assertEqual(result["data"][0]["timestamp"], "2025-01-01T12:00:00+00:00")
+
+    def test_cursor_pagination_visits_every_note_once(self):
+        user_ref = seed_user(self.client, notes=5)
+        # Two notes sharing a timestamp must not be repeated or skipped across pages
+        self.client.seed("notes", "u1-dup", {"text": "dup", "timestamp": BASE_TIME + timedelta(hours=2), "user": user_ref})
+
+        seen, cursor, pages = [], None, 0
+        while True:
+            result = self.call("get_notes", limit=2, start_after=cursor)
+            self.assertTrue(result["ok"])
+            seen.extend(note["id"] for note in result["data"])
+            pages += 1
+            cursor = result.get("next_cursor")
+            if not cursor:
+                break
+
+        self.assertCountEqual(seen, [f"u1-n{i}" for i in range(5)] + ["u1-dup"])
+        self.assertEqual(pages, 3)
+
+    def test_short_page_has_no_cursor(self):
+        seed_user(self.client, notes=2)
+        self.assertNotIn("next_cursor", self.call("get_notes", limit=5))
+
+    def test_since_until_window(self):
+        seed_user(self.client, notes=5)
+        result = self.call("get_notes", since="2025-01-01T09:00:00Z", until="2025-01-01T11:00:00+00:00")
+        self.assertEqual([n["text"] for n in result["data"]], ["note 2", "note 1"])
+
+    def test_field_projection(self):
+        seed_user(self.client, notes=2)
+        result = self.call("get_notes", fields=["text"])
+        self.assertEqual(set(result["data"][0]), {"id", "text", "timestamp"})
+
+    def test_invalid_filters(self):
+        for kwargs in ({"since": "yesterday"}, {"start_after": "not-a-cursor"}):
+            with self.subTest(**kwargs):
+                result = self.call("get_notes", **kwargs)
+                self.assertFalse(result["ok"])
+                self.assertIn("invalid notes filter", result["error"])
+
+
+class TestGetContext(FirestoreDataTestCase):
+    def test_returns_all_sections(self):
+        seed_user(self.client)
+        with mock.patch.object(self.client, "get_all", wraps=self.client.get_all) as get_all:
+            result = self.call("get_context", limit=2)
+
+        self.assertTrue(result["ok"])
+        data = result["data"]
+        self.assertEqual(list(data), ["user", "settings", "notes"])
+        self.assertEqual(data["user"], {"FirstName": "Ada", "id": "u1"})
+        self.assertEqual(data["settings"], {"Location": "Kyiv", "id": "u1"})
+        self.assertEqual([n["text"] for n in data["notes"]], ["note 2", "note 1"])
+        # Both point reads travel in a single batched request
+        get_all.assert_called_once()
+
+    def test_selected_sections_only(self):
+        seed_user(self.client)
+        result = self.call("get_context", sections=["settings"])
+        self.assertEqual(result["data"], {"settings": {"Location": "Kyiv", "id": "u1"}})
+        self.assertEqual(self.client.reads, 1)
+
+    def test_uses_cached_documents(self):
+        seed_user(self.client, notes=0)
+        self.call("get_settings")
+        reads_before = self.client.reads
+
+        result = self.call("get_context", sections=["user", "settings"])
+        self.assertEqual(result["data"]["settings"], {"Location": "Kyiv", "id": "u1"})
+        self.assertEqual(self.client.reads - reads_before, 1)
+
+    def test_missing_documents_are_null(self):
+        result = self.call("get_context")
+        self.assertEqual(result, {"ok": True, "data": {"user": None, "settings": None, "notes": []}})
+
+    def test_unknown_section(self):
+        result = self.call("get_context", sections=["user", "diary"])
+        self.assertFalse(result["ok"])
+        self.assertIn("diary", result["error"])
+
+
+class TestNotesStats(FirestoreDataTestCase):
+    WINDOW = {"since": "2025-01-01T00:00:00Z", "until": "2025-01-04T00:00:00Z"}
+
+    def setUp(self):
+        super().setUp()
+        user_ref = seed_user(self.client, notes=0)
+        other_ref = seed_user(self.client, user_id="u2", notes=0)
+        # Three notes on Jan 1, none on Jan 2, one on Jan 3, one outside the window
+        for i, day_hour in enumerate([(1, 8), (1, 12), (1, 23), (3, 6), (4, 1)]):
+            day, hour = day_hour
+            timestamp = datetime(2025, 1, day, hour, tzinfo=timezone.utc)
+            self.client.seed("notes", f"n{i}", {"text": "x", "timestamp": timestamp, "user": user_ref})
+        self.client.seed("notes", "other", {"text": "x", "timestamp": BASE_TIME, "user": other_ref})
+
+    def expected(self, method):
+        return {
+            "total": 4,
+            "bucket": "day",
+            "since": "2025-01-01T00:00:00+00:00",
+            "until": "2025-01-04T00:00:00+00:00",
+            "histogram": [
+                {"start": "2025-01-01", "count": 3},
+                {"start": "2025-01-02", "count": 0},
+                {"start": "2025-01-03", "count": 1},
+            ],
+            "method": method,
+        }
+
+    def test_daily_histogram_via_aggregation(self):
+        result = self.call("notes_stats", **self.WINDOW)
+        self.assertEqual(result, {"ok": True, "data": self.expected("aggregation")})
+        # One aggregation per bucket, no per-document reads
+        self.assertEqual(self.client.reads, 3)
+
+    def test_stream_fallback_without_aggregation(self):
+        self.client.supports_aggregation = False
+        result = self.call("notes_stats", **self.WINDOW)
+        self.assertEqual(result, {"ok": True, "data": self.expected("stream")})
+
+    def test_transient_errors_do_not_fall_back_to_streaming(self):
+        for call in (self.call, self.call_async):
+            with self.subTest(call=call.__name__), \
+                    mock.patch.object(firestore_data, "firestore_guard", FirestoreGuard(retries=0)):
+                self.client.inject(ServiceUnavailable("overloaded"))
+                result = call("notes_stats", **self.WINDOW)
+                self.assertFalse(result["ok"])
+                self.assertIn("ServiceUnavailable", result["error"])
+
+    def test_aggregation_bugs_do_not_fall_back_to_streaming(self):
+        reads = self.client.reads
+        with mock.patch.object(notes_stats, "_aggregate_count", side_effect=AttributeError("bug")), \
+                mock.patch.object(notes_stats, "_aggregate_count_async", side_effect=AttributeError("bug")):
+            for call in (self.call, self.call_async):
+                with self.subTest(call=call.__name__):
+                    self.assertFalse(call("notes_stats", **self.WINDOW)["ok"])
+        self.assertEqual(self.client.reads, reads)
+
+    def test_async_matches_sync(self):
+        for supported in (True, False):
+            with self.subTest(supports_aggregation=supported):
+                self.client.supports_aggregation = supported
+                self.assertEqual(self.call_async("notes_stats", **self.WINDOW), self.call("notes_stats", **self.WINDOW))
+
+    def test_weekly_buckets_start_on_monday(self):
+        result = self.call("notes_stats", bucket="week", **self.WINDOW)
+        # 2025-01-01 is a Wednesday
+        self.assertEqual(result["data"]["histogram"], [{"start": "2024-12-30", "count": 4}])
+
+    def test_default_window_is_last_30_days(self):
+        result = self.call("notes_stats")
+        self.assertTrue(result["ok"])
+        self.assertIn(len(result["data"]["histogram"]), (30, 31))
+
+    def test_invalid_arguments(self):
+        cases = [
+            {"bucket": "hour"},
+            {"since": "2025-01-05T00:00:00Z", "until": "2025-01-01T00:00:00Z"},
+            {"since": "2024-01-01T00:00:00Z", "until": "2025-01-01T00:00:00Z"},
+        ]
+        for kwargs in cases:
+            with self.subTest(**kwargs):
+                self.assertFalse(self.call("notes_stats", **kwargs)["ok"])
+
+
+class TestSearchNotes(FirestoreDataTestCase):
+    """search_notes ranks all of a user's notes with an incrementally updated index."""
+
+    TEXTS = [
+        "Barely sleeping again, woke up at 3am worrying about the exam.",
+        "Great walk with Sam by the river, felt calm.",
+        "Sleep is getting better since I stopped coffee after lunch. Still tired at work.",
+        "Work meeting went fine. " * 20 + "Later I could not sleep at all.",
+        "Called mom, we talked about the move.",
+    ]
+
+    def setUp(self):
+        super().setUp()
+        self.now = [1000.0]
+        self.index = NotesSearchIndex(max_users=2, rebuild_seconds=600, clock=lambda: self.now[0])
+        patcher = mock.patch.object(firestore_data, "notes_index", self.index)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.user_ref = seed_user(self.client, notes=0)
+        for i, text in enumerate(self.TEXTS):
+            self.add_note(f"n{i}", text, BASE_TIME + timedelta(days=i))
+        other_ref = seed_user(self.client, user_id="u2", notes=0)
+        self.client.seed("notes", "other", {"text": "sleep sleep sleep", "timestamp": BASE_TIME, "user": other_ref})
+
+    def add_note(self, note_id, text, timestamp):
+        self.client.seed("notes", note_id, {"text": text, "timestamp": timestamp, "user": self.user_ref})
+
+    def test_ranked_snippets(self):
+        result = self.call("search_notes", query="sleeping")
+        data = result["data"]
+        self.assertEqual((data["matches"], data["searched"]), (3, 5))
+        self.assertEqual(
+            [hit["timestamp"][:10] for hit in data["results"]],
+            ["2025-01-01", "2025-01-03", "2025-01-04"],
+        )
+        # Long notes come back as a window around the match
+        long_hit = data["results"][2]["snippet"]
+        self.assertTrue(long_hit.startswith("…"))
+        self.assertIn("could not sleep", long_hit)
+        self.assertEqual(self.call("search_notes", query="sleep", limit=1)["data"]["results"][0]["timestamp"][:10], "2025-01-01")
+
+    def test_incremental_refresh(self):
+        self.call("search_notes", query="river")
+        self.assertEqual(self.client.reads, 5)
+        self.add_note("n5", "Could not sleep, thinking about the river trip.", BASE_TIME + timedelta(days=9))
+        reads = self.client.reads
+        data = self.call("search_notes", query="river")["data"]
+        # Only notes from the watermark on are read again
+        self.assertEqual(self.client.reads - reads, 2)
+        self.assertEqual(data["matches"], 2)
+        self.assertIn("2025-01-10", [hit["timestamp"][:10] for hit in data["results"]])
+        self.assertEqual(self.index.stats()["builds"], 1)
+
+    def test_rebuild_drops_deleted_notes(self):
+        self.call("search_notes", query="mom")
+        self.client.collection("notes").document("n4").delete()
+        self.assertEqual(self.call("search_notes", query="mom")["data"]["matches"], 1)
+        self.now[0] += 601
+        self.assertEqual(self.call("search_notes", query="mom")["data"]["matches"], 0)
+
+    def test_lru_over_users(self):
+        self.call("search_notes", query="sleep")
+        for user_id in ("u2", "u3"):
+            firestore_data.capy_firestore_data("search_notes", FakeToolContext(user_id), query="sleep")
+        self.assertEqual(self.index.stats(), {"builds": 3, "refreshes": 0, "indexed": 6, "evictions": 1, "users": 2})
+
+    def test_date_window_and_errors(self):
+        result = self.call("search_notes", query="sleep", since="2025-01-02T00:00:00Z", until="2025-01-04T00:00:00Z")
+        self.assertEqual([hit["timestamp"][:10] for hit in result["data"]["results"]], ["2025-01-03"])
+        self.assertFalse(self.call("search_notes")["ok"])
+        self.assertFalse(self.call("search_notes", query="sleep", since="yesterday")["ok"])
+
+    def test_async_matches_sync(self):
+        expected = self.call("search_notes", query="walk calm")
+        self.index.clear()
+        self.assertEqual(self.call_async("search_notes", query="walk calm"), expected)
+
+    def test_singular_and_plural_share_a_term(self):
+        pairs = [("time", "times"), ("exercise", "exercises"), ("feeling", "feelings"), ("note", "notes"),
+                 ("worry", "worries"), ("class", "classes"), ("diary", "diaries")]
+        for singular, plural in pairs:
+            with self.subTest(singular=singular):
+                self.assertEqual(terms(singular), terms(plural))
+        self.add_note("n5", "No time for exercise this week.", BASE_TIME + timedelta(days=6))
+        data = self.call("search_notes", query="exercises times")["data"]
+        self.assertEqual([hit["timestamp"][:10] for hit in data["results"]], ["2025-01-07"])
+
+    def test_concurrent_first_searches_share_the_build(self):
+        self.client.latency = 0.05
+
+        async def burst():
+            context = FakeToolContext("u1")
+            return await asyncio.gather(*(
+                firestore_data.capy_firestore_data_async("search_notes", context, query=query)
+                for query in ("sleep", "river", "mom", "exam")
+            ))
+
+        results = asyncio.run(burst())
+        self.assertTrue(all(result["ok"] for result in results))
+        # One read of the five notes, not one per search
+        self.assertEqual(self.client.reads, 5)
+        self.assertEqual(self.index.stats()["indexed"], 5)
+
+    def test_terms_and_snippet(self):
+        self.assertEqual(terms("I was Sleeping; the worries!"), terms("sleep worry"))
+        self.assertEqual(terms("stressed stress"), ["stress", "stress"])
+        text = "a " * 150 + "the exam was hard " + "b " * 150
+        self.assertIn("exam", snippet(text, terms("exams")))
+
+
+class TestGetDigest(FirestoreDataTestCase):
+    """get_digest keeps a per-user summary next to settings and folds in new notes only."""
+
+    NOTES = [
+        # (days after BASE_TIME, UTC hour, text)
+        (0, 21, "Could not sleep, the exam tomorrow keeps me anxious."),
+        (1, 22, "Slept badly again. Exam stress."),
+        (8, 6, "Morning walk by the river before work, felt calm."),
+        (9, 20, "Argued with my sister about mom. Could not sleep."),
+        (15, 21, "Exam went fine! Finally slept."),
+    ]
+
+    def setUp(self):
+        super().setUp()
+        self.now = [BASE_TIME + timedelta(days=20)]
+        self.digest = NotesDigest(half_life_days=7, rebuild_days=30, clock=lambda: self.now[0])
+        patcher = mock.patch.object(firestore_data, "notes_digest", self.digest)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.user_ref = seed_user(self.client, notes=0)
+        # UTC+2: 21:00 UTC is 23:00 local
+        self.client.seed("settings", "u1", {"Location": "Kyiv", "SecondsFromUTC": 7200})
+        for i, (days, hour, text) in enumerate(self.NOTES):
+            self.add_note(f"n{i}", text, BASE_TIME.replace(hour=hour) + timedelta(days=days))
+
+    def add_note(self, note_id, text, timestamp):
+        self.client.seed("notes", note_id, {"text": text, "timestamp": timestamp, "user": self.user_ref})
+
+    def stored(self):
+        return self.client.document("settings/u1/agent/digest").get().to_dict()
+
+    def test_summary(self):
+        data = self.call("get_digest")["data"]
+        self.assertEqual(data["total_notes"], 5)
+        self.assertEqual(data["first_note"], "2025-01-01T21:00:00+00:00")
+        self.assertEqual(data["last_activity"], "2025-01-16T21:00:00+00:00")
+        self.assertEqual(data["new_notes"], 5)
+        weeks = {week["start"]: week["count"] for week in data["notes_per_week"]}
+        self.assertEqual(len(weeks), 8)
+        self.assertEqual(
+            (weeks["2024-12-30"], weeks["2025-01-06"], weeks["2025-01-13"], weeks["2025-01-20"]), (2, 2, 1, 0)
+        )
+        # Local time: three notes at 23:00-00:00, one at 08:00, one at 22:00
+        self.assertEqual(data["time_of_day"], {"night": 1, "morning": 1, "afternoon": 0, "evening": 3})
+        self.assertEqual(sum(data["weekdays"].values()), 5)
+        themes = [theme["theme"] for theme in data["themes"]]
+        self.assertEqual(themes[:2], ["sleep", "study"])
+        self.assertIn("exam", data["keywords"][:2])
+        self.assertNotIn("tomorrow", data["keywords"])
+
+    def test_incremental_update(self):
+        self.call("get_digest")
+        self.assertEqual(self.stored()["total"], 5)
+        self.add_note("n5", "Long run at the gym, slept well.", BASE_TIME + timedelta(days=18))
+        reads = self.client.reads
+        data = self.call("get_digest")["data"]
+        # Digest and settings come from the cache; only the watermark note and the new one are read
+        self.assertEqual(self.client.reads - reads, 2)
+        self.assertEqual((data["total_notes"], data["new_notes"]), (6, 1))
+        self.assertEqual(self.stored()["total"], 6)
+        self.assertEqual(self.stored()["watermark_ids"], ["n5"])
+        self.assertEqual(data["themes"][0]["theme"], "sleep")
+        self.assertIn("exercise", [theme["theme"] for theme in data["themes"]])
+
+        # Another process: nothing cached, nothing new, nothing written
+        self.cache.clear()
+        reads = self.client.reads
+        self.assertEqual(self.call("get_digest")["data"]["new_notes"], 0)
+        self.assertEqual(self.client.reads - reads, 2)
+
+    def test_stored_next_to_settings(self):
+        self.call("get_digest")
+        self.cache.clear()
+        self.assertEqual(self.call("get_settings")["data"], {"Location": "Kyiv", "SecondsFromUTC": 7200, "id": "u1"})
+        self.assertEqual(self.stored()["version"], 2)
+
+    def test_rebuild_after_interval(self):
+        self.call("get_digest")
+        self.client.collection("notes").document("n4").delete()
+        self.assertEqual(self.call("get_digest")["data"]["total_notes"], 5)
+        self.now[0] += timedelta(days=61)
+        self.cache.clear()
+        data = self.call("get_digest")["data"]
+        self.assertEqual((data["total_notes"], data["new_notes"]), (4, 4))
+        # Two months without notes: empty recent weeks, themes faded out
+        self.assertEqual(sum(week["count"] for week in data["notes_per_week"]), 0)
+        self.assertEqual(data["themes"], [])
+
+    def test_no_notes(self):
+        data = firestore_data.capy_firestore_data("get_digest", FakeToolContext("u2"))["data"]
+        self.assertEqual((data["total_notes"], data["last_activity"], data["keywords"]), (0, None, []))
+        self.assertFalse(self.client.document("settings/u2/agent/digest").get().exists)
+
+    def test_async_matches_sync(self):
+        expected = self.call("get_digest")
+        self.client.document("settings/u1/agent/digest").delete()
+        self.cache.clear()
+        self.assertEqual(self.call_async("get_digest"), expected)
+        self.assertEqual(self.stored()["total"], 5)
+
+
+class TestAsyncTool(FirestoreDataTestCase):
+    """capy_firestore_data_async mirrors the sync tool on the AsyncClient surface."""
+
+    CALLS = [
+        ("get_user", {}),
+        ("get_settings", {}),
+        ("get_notes", {"limit": 2}),
+        ("get_notes", {"limit": 1, "fields": ["text"], "since": "2025-01-01T09:00:00Z"}),
+        ("get_context", {}),
+        ("get_context", {"sections": ["notes", "user"], "limit": 1}),
+        ("get_context", {"sections": ["bogus"]}),
+        ("delete_everything", {}),
+    ]
+
+    def test_matches_sync_results(self):
+        seed_user(self.client)
+        for operation, kwargs in self.CALLS:
+            with self.subTest(operation=operation, **kwargs):
+                self.cache.clear()
+                expected = self.call(operation, **kwargs)
+                self.cache.clear()
+                self.assertEqual(self.call_async(operation, **kwargs), expected)
+
+    def test_async_pagination_uses_same_cursor(self):
+        seed_user(self.client, notes=3)
+        first = self.call_async("get_notes", limit=2)
+        second = self.call_async("get_notes", limit=2, start_after=first["next_cursor"])
+        self.assertEqual(second, self.call("get_notes", limit=2, start_after=first["next_cursor"]))
+        self.assertEqual([n["text"] for n in second["data"]], ["note 0"])
+
+    def test_missing_user(self):
+        self.assertEqual(self.call_async("get_user"), {"ok": False, "error": "user 'u1' not found"})
+
+    def test_tool_is_async(self):
+        self.assertIs(firestore_data.firestore_data_tool.func, firestore_data.capy_firestore_data_async)
+
+    def test_concurrent_calls_do_not_block_each_other(self):
+        seed_user(self.client)
+        self.cache.ttl_seconds = 0
+        self.async_client.latency = 0.05
+
+        async def burst():
+            contexts = [FakeToolContext("u1") for _ in range(20)]
+            return await asyncio.gather(
+                *(firestore_data.capy_firestore_data_async("get_settings", c) for c in contexts)
+            )
+
+        started = time.perf_counter()
+        results = asyncio.run(burst())
+        elapsed = time.perf_counter() - started
+
+        self.assertTrue(all(r["ok"] for r in results))
+        # 20 sequential reads would take >= 1s
+        self.assertLess(elapsed, 0.5)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,86 @@
+import unittest
+import os
+import sys
+
+# Add the project root to the path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from capymind_agent.tools.format_data import format_data, iter_format_data
+
+
+class TestFormatData(unittest.TestCase):
+    """Golden output of format_data and its streaming counterpart."""
+
+    def assertFormats(self, data_type, data, expected):
+        self.assertEqual(format_data(data_type, data, None), expected)
+        self.assertEqual("".join(iter_format_data(data_type, data)), expected)
+
+    def test_notes(self):
+        notes = [
+            {"text": "Slept well", "timestamp": "2025-01-02T21:05:00Z"},
+            {"text": "Rough day", "timestamp": "2025-01-01T08:00:00+00:00"},
+            {"timestamp": "not a date"},
+            {"text": "No time"},
+        ]
+        self.assertFormats(
+            "notes",
+            notes,
+            "📝 **Note from January 02, 2025 at 09:05 PM**\nSlept well\n"
+            "\n📝 **Note from January 01, 2025 at 08:00 AM**\nRough day\n"
+            "\n📝 **Note from not a date**\nNo content\n"
+            "\n📝 **Note from Unknown date**\nNo time\n",
+        )
+
+    def test_notes_stream_one_chunk_per_note(self):
+        notes = [{"text": str(i), "timestamp": "2025-01-01T08:00:00Z"} for i in range(3)]
+        self.assertEqual(len(list(iter_format_data("notes", notes))), 3)
+
+    def test_settings(self):
+        settings = {
+            "id": "u1",
+            "settings": {
+                "Location": "Kyiv",
+                "HasMorningReminder": True,
+                "SecondsFromUTC": 7200,
+                "custom_flag": False,
+            },
+        }
+        self.assertFormats(
+            "settings",
+            [settings],
+            "⚙️ **Your Settings:**\n"
+            "\n• **Location**: Kyiv"
+            "\n• **Morning Reminder Enabled**: Yes"
+            "\n• **Timezone Offset (seconds from UTC)**: 7200"
+            "\n• **Custom Flag**: No",
+        )
+
+    def test_user(self):
+        user = {
+            "id": "u1",
+            "FirstName": "Ada",
+            "IsDeleted": False,
+            "IsOnboarded": True,
+            "Timestamp": "2025-01-01T08:00:00Z",
+            "TherapySessionEndAt": "",
+            "favourite_color": "green",
+        }
+        self.assertFormats(
+            "user",
+            user,
+            "👤 **Your Profile:**\n"
+            "\n• **First Name**: Ada"
+            "\n• **Account Status**: Active"
+            "\n• **Onboarding Complete**: Yes"
+            "\n• **Last Updated**: January 01, 2025 at 08:00 AM"
+            "\n• **Therapy Session Ends At**: "
+            "\n• **Favourite Color**: green",
+        )
+
+    def test_empty_and_unknown(self):
+        self.assertFormats("notes", [], "No notes found.")
+        self.assertFormats("diary", [{"a": 1}], "Unknown data type: diary")
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,197 @@
+import unittest
+import os
+import sys
+import asyncio
+import logging
+from typing import List
+
+# Add the project root to the path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from google.adk.agents import Agent
+from google.adk.models import LlmRequest
+from google.adk.runners import Runner
+from google.adk.sessions import InMemorySessionService
+from google.genai import types
+
+from benchmarks.stub_model import StubLlm
+from capymind_agent.tools.history_compactor import (
+    STATE_KEY,
+    HistoryCompactor,
+    content_tokens,
+    render_transcript,
+    request_tokens,
+    split_turns,
+)
+from tests.fake_firestore import FakeCallbackContext
+
+
+def text(role, value):
+    return types.Content(role=role, parts=[types.Part(text=value)])
+
+
+def conversation(turns, words=40):
+    """``turns`` user/model exchanges of about ``words`` words each."""
+    contents = []
+    for i in range(turns):
+        contents.append(text("user", f"turn {i}: " + "work has been stressful lately " * (words // 5)))
+        contents.append(text("model", f"reply {i}: " + "that sounds like a lot to carry " * (words // 6)))
+    return contents
+
+
+def request(contents):
+    return LlmRequest(contents=list(contents), config=types.GenerateContentConfig(system_instruction="Be kind."))
+
+
+class StubSummarizer:
+    """Records calls and summarises by listing the folded user turns."""
+
+    def __init__(self, fail=False):
+        self.calls: List[List[types.Content]] = []
+        self.fail = fail
+
+    async def __call__(self, previous, contents):
+        self.calls.append(contents)
+        if self.fail:
+            raise RuntimeError("summariser unavailable")
+        _, turns = split_turns(contents)
+        folded = ", ".join(turn[0].parts[0].text.split(":")[0] for turn in turns)
+        return f"{previous} | {folded}" if previous else folded
+
+
+class TestHistoryCompactor(unittest.TestCase):
+    """Old turns fold into a rolling summary once the budget is exceeded."""
+
+    def setUp(self):
+        self.context = FakeCallbackContext("u1")
+        self.summarizer = StubSummarizer()
+
+    def compact(self, compactor, llm_request):
+        asyncio.run(compactor.compact(self.context, llm_request))
+        return llm_request
+
+    def test_under_budget_untouched(self):
+        compactor = HistoryCompactor(self.summarizer, budget_tokens=100_000, keep_turns=2)
+        contents = conversation(10)
+        llm_request = self.compact(compactor, request(contents))
+        self.assertEqual(llm_request.contents, contents)
+        self.assertEqual(self.summarizer.calls, [])
+        self.assertNotIn(STATE_KEY, self.context.state)
+
+    def test_fold_then_reuse_summary(self):
+        compactor = HistoryCompactor(self.summarizer, budget_tokens=400, keep_turns=2)
+        contents = conversation(10)
+        self.assertGreater(request_tokens(request(contents)), 400)
+
+        llm_request = self.compact(compactor, request(contents))
+        self.assertEqual(len(self.summarizer.calls), 1)
+        self.assertEqual(llm_request.contents, contents[-4:])
+        self.assertIn("turn 0, turn 1", llm_request.config.system_instruction)
+        self.assertEqual(self.context.state[STATE_KEY]["turns"], 8)
+        self.assertLessEqual(request_tokens(llm_request), 400)
+
+        # The next turn reuses the stored summary without another call
+        contents += conversation(11)[-2:]
+        llm_request = self.compact(compactor, request(contents))
+        self.assertEqual(len(self.summarizer.calls), 1)
+        self.assertEqual(llm_request.contents, contents[16:])
+
+        # Once the unfolded turns outgrow the budget again, only they are summarised
+        contents = conversation(16)
+        llm_request = self.compact(compactor, request(contents))
+        self.assertEqual(len(self.summarizer.calls), 2)
+        self.assertEqual(len(self.summarizer.calls[1]), 2 * 6)
+        self.assertEqual(self.context.state[STATE_KEY]["turns"], 14)
+        self.assertIn("turn 7 | turn 8", llm_request.config.system_instruction)
+
+    def test_safety_turns_stay_verbatim(self):
+        compactor = HistoryCompactor(self.summarizer, budget_tokens=400, keep_turns=2)
+        contents = conversation(10)
+        contents[0] = text("user", "I have been thinking about suicide")
+        contents[4] = text("user", "I want to kill myself")
+        contents[5] = text("model", "I'm really glad you told me. Call 988.")
+        transfer = types.Part(function_call=types.FunctionCall(name="transfer_to_agent", args={"agent_name": "crisis_line"}))
+        contents[9] = types.Content(role="model", parts=[transfer])
+
+        llm_request = self.compact(compactor, request(contents))
+        # Every safety turn, the oldest included
+        self.assertEqual(self.context.state[STATE_KEY]["pinned"], [0, 2, 4])
+        self.assertEqual(llm_request.contents, contents[0:2] + contents[4:6] + contents[8:10] + contents[-4:])
+        # Pinned turns are still part of the summary
+        self.assertIn("I have been thinking about suicide, turn 1, I want to kill myself", llm_request.config.system_instruction)
+
+        # Nor are they dropped by later folds
+        contents += conversation(14)[-8:]
+        llm_request = self.compact(compactor, request(contents))
+        self.assertEqual(self.context.state[STATE_KEY]["pinned"], [0, 2, 4])
+        self.assertEqual(llm_request.contents[:6], contents[0:2] + contents[4:6] + contents[8:10])
+
+    def test_summarizer_failure_keeps_history(self):
+        compactor = HistoryCompactor(StubSummarizer(fail=True), budget_tokens=400, keep_turns=2)
+        contents = conversation(10)
+        llm_request = self.compact(compactor, request(contents))
+        self.assertEqual(llm_request.contents, contents)
+        self.assertNotIn(STATE_KEY, self.context.state)
+
+    def test_turn_boundaries(self):
+        call = types.Part(function_call=types.FunctionCall(name="capy_firestore_data_async", args={"operation": "get_notes"}))
+        response = types.Part(function_response=types.FunctionResponse(name="capy_firestore_data_async", response={"ok": True}))
+        contents = [
+            text("user", "hi"),
+            types.Content(role="model", parts=[call]),
+            types.Content(role="user", parts=[response]),
+            types.Content(role="user", parts=[types.Part(text="For context:"), types.Part(text="[data_fetcher] said: 3 notes")]),
+            text("user", "thanks"),
+        ]
+        preamble, turns = split_turns(contents)
+        self.assertEqual(preamble, [])
+        self.assertEqual([len(turn) for turn in turns], [4, 1])
+        self.assertGreater(content_tokens(contents[1]), 0)
+        transcript = render_transcript(contents)
+        self.assertIn("User: hi", transcript)
+        self.assertIn("CapyMind: [data_fetcher] said: 3 notes", transcript)
+        self.assertIn("[tool result capy_firestore_data_async", transcript)
+
+
+class RecordingStub(StubLlm):
+    requests: list = []
+
+    async def generate_content_async(self, llm_request, stream=False):
+        self.requests.append(llm_request)
+        async for response in super().generate_content_async(llm_request, stream):
+            yield response
+
+
+class TestRunnerIntegration(unittest.TestCase):
+    """The summary saved by the callback persists across turns of a session."""
+
+    def test_session_state(self):
+        logging.getLogger("google_adk").setLevel(logging.ERROR)
+        summarizer = StubSummarizer()
+        compactor = HistoryCompactor(summarizer, budget_tokens=150, keep_turns=2)
+        model = RecordingStub(requests=[])
+        agent = Agent(model=model, name="capymind_agent", instruction="Be kind.", before_model_callback=compactor.compact)
+
+        async def scenario():
+            sessions = InMemorySessionService()
+            runner = Runner(app_name="test", agent=agent, session_service=sessions)
+            session = await sessions.create_session(app_name="test", user_id="u1")
+            for i in range(8):
+                message = text("user", f"turn {i}: " + "I keep worrying about my exams " * 4)
+                async for _ in runner.run_async(user_id="u1", session_id=session.id, new_message=message):
+                    pass
+            return await sessions.get_session(app_name="test", user_id="u1", session_id=session.id)
+
+        session = asyncio.run(scenario())
+        state = session.state[STATE_KEY]
+        self.assertGreater(state["turns"], 0)
+        self.assertGreaterEqual(len(summarizer.calls), 1)
+        self.assertLess(len(summarizer.calls), 8)
+        # The last request carries the unfolded turns only
+        last = model.requests[-1]
+        self.assertEqual(len(split_turns(last.contents)[1]), 8 - state["turns"])
+        self.assertIn("Summary of the earlier part of this session", last.config.system_instruction)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,113 @@
+import unittest
+import os
+import sys
+import asyncio
+from datetime import datetime, timedelta, timezone
+from unittest import mock
+
+# Add the project root to the path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from google.adk.models import LlmRequest
+from google.genai import types
+
+from capymind_agent.tools import firestore_data
+from capymind_agent.tools.doc_cache import DocumentCache
+from capymind_agent.tools.intent_router import DEFAULT_NOTES, MAX_NOTES, Intent, classify, route_data_intent
+from capymind_agent.tools.session_prefetch import CONSENT_KEY
+from tests.fake_firestore import FakeAsyncFirestoreClient, FakeCallbackContext, FakeFirestoreClient
+
+
+def user_request(text):
+    return LlmRequest(contents=[types.Content(role="user", parts=[types.Part(text=text)])])
+
+
+class TestClassify(unittest.TestCase):
+    """Only whole-message data requests are recognised."""
+
+    def test_data_requests(self):
+        cases = {
+            "Show my settings": Intent("settings", DEFAULT_NOTES),
+            "could you please show me my settings?": Intent("settings", DEFAULT_NOTES),
+            "show my profile": Intent("user", DEFAULT_NOTES),
+            "my notes": Intent("notes", DEFAULT_NOTES),
+            "Show me my last 5 notes.": Intent("notes", 5),
+            "show my three latest notes please": Intent("notes", 3),
+            "show my last 100 notes": Intent("notes", MAX_NOTES),
+            "Покажи останні 3 нотатки": Intent("notes", 3),
+            "мои настройки": Intent("settings", DEFAULT_NOTES),
+        }
+        for text, intent in cases.items():
+            self.assertEqual(classify(text), intent, text)
+
+    def test_everything_else_falls_through(self):
+        for text in (
+            "My notes say I was sad all week, what does that mean?",
+            "I'm anxious about my settings at work",
+            "show my feelings",
+            "I feel tired",
+            "",
+        ):
+            self.assertIsNone(classify(text), text)
+
+
+class TestRouteDataIntent(unittest.TestCase):
+    """route_data_intent answers data requests without the model."""
+
+    def setUp(self):
+        self.client = FakeFirestoreClient()
+        patches = [
+            mock.patch.object(
+                firestore_data, "_get_async_firestore_client",
+                return_value=FakeAsyncFirestoreClient(self.client),
+            ),
+            mock.patch.object(firestore_data, "document_cache", DocumentCache()),
+        ]
+        for patcher in patches:
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        self.context = FakeCallbackContext("u1")
+
+    def route(self, request):
+        return asyncio.run(route_data_intent(self.context, request))
+
+    def reply(self, text):
+        response = self.route(user_request(text))
+        return response.content.parts[0].text if response else None
+
+    def test_settings(self):
+        self.client.seed("settings", "u1", {"Location": "Kyiv", "HasMorningReminder": True})
+        self.assertEqual(
+            self.reply("show my settings"),
+            "⚙️ **Your Settings:**\n\n• **Location**: Kyiv\n• **Morning Reminder Enabled**: Yes",
+        )
+        # Asking for their settings is consent to using them
+        self.assertTrue(self.context.state[CONSENT_KEY])
+
+    def test_notes_respect_count(self):
+        user_ref = self.client.seed("users", "u1", {})
+        base = datetime(2025, 1, 1, tzinfo=timezone.utc)
+        for i in range(5):
+            self.client.seed("notes", f"n{i}", {"text": f"note {i}", "timestamp": base + timedelta(days=i), "user": user_ref})
+        reply = self.reply("show my last 2 notes")
+        self.assertEqual(reply.count("📝"), 2)
+        self.assertIn("note 4", reply)
+        self.assertNotIn("note 2", reply)
+
+    def test_no_notes(self):
+        self.assertEqual(self.reply("show my notes"), "No notes found.")
+
+    def test_missing_document_goes_to_the_model(self):
+        self.assertIsNone(self.reply("show my profile"))
+
+    def test_chat_and_follow_up_calls_go_to_the_model(self):
+        self.client.seed("settings", "u1", {"Location": "Kyiv"})
+        self.assertIsNone(self.reply("I feel anxious"))
+        self.assertNotIn(CONSENT_KEY, self.context.state)
+        request = user_request("show my settings")
+        request.contents.append(types.Content(role="model", parts=[types.Part(text="Sure")]))
+        self.assertIsNone(self.route(request))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,215 @@
+import unittest
+import os
+import sys
+import asyncio
+import tempfile
+import importlib
+from types import SimpleNamespace
+from unittest import mock
+
+# Add the project root to the path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from capymind_agent.tools import firestore_data, metrics
+from capymind_agent.tools.doc_cache import DocumentCache
+from capymind_agent.tools.metrics import Counter, Histogram, MetricsPlugin, MetricsRegistry
+from tests.fake_firestore import FakeAsyncFirestoreClient, FakeFirestoreClient, FakeToolContext
+
+
+class TestRegistry(unittest.TestCase):
+    """Prometheus text exposition of counters and histograms."""
+
+    def test_counter_render(self):
+        registry = MetricsRegistry()
+        calls = registry.register(Counter("calls_total", "Calls.", ("tool", "outcome")))
+        calls.inc(tool="a", outcome="ok")
+        calls.inc(2, tool="a", outcome="ok")
+        calls.inc(tool='quo"te', outcome="error")
+        text = registry.render()
+        self.assertIn("# TYPE calls_total counter", text)
+        self.assertIn('calls_total{tool="a",outcome="ok"} 3', text)
+        self.assertIn('calls_total{tool="quo\\"te",outcome="error"} 1', text)
+
+    def test_histogram_buckets_are_cumulative(self):
+        registry = MetricsRegistry()
+        latency = registry.register(Histogram("latency_seconds", "Latency.", ("tool",), buckets=(0.1, 1.0)))
+        for value in (0.05, 0.1, 0.5, 3.0):
+            latency.observe(value, tool="a")
+        text = registry.render()
+        self.assertIn('latency_seconds_bucket{tool="a",le="0.1"} 2', text)
+        self.assertIn('latency_seconds_bucket{tool="a",le="1"} 3', text)
+        self.assertIn('latency_seconds_bucket{tool="a",le="+Inf"} 4', text)
+        self.assertIn('latency_seconds_count{tool="a"} 4', text)
+        self.assertIn('latency_seconds_sum{tool="a"} 3.65', text)
+
+
+def tool_context(call_id, agent_name="data_fetcher"):
+    return SimpleNamespace(function_call_id=call_id, agent_name=agent_name)
+
+
+class TestMetricsPlugin(unittest.TestCase):
+    """Plugin callbacks record latency, outcome and payload size per tool and operation."""
+
+    def setUp(self):
+        self.plugin = MetricsPlugin()
+        self.tool = SimpleNamespace(name="test_tool")
+
+    def run_tool(self, call_id, args, result=None, error=None):
+        context = tool_context(call_id)
+        asyncio.run(self.plugin.before_tool_callback(tool=self.tool, tool_args=args, tool_context=context))
+        if error is not None:
+            asyncio.run(self.plugin.on_tool_error_callback(
+                tool=self.tool, tool_args=args, tool_context=context, error=error
+            ))
+        else:
+            asyncio.run(self.plugin.after_tool_callback(
+                tool=self.tool, tool_args=args, tool_context=context, result=result
+            ))
+
+    def test_outcomes_by_operation(self):
+        labels = {"tool": "test_tool", "operation": "get_notes", "agent": "data_fetcher"}
+        ok_before = metrics.tool_calls.value(outcome="ok", **labels)
+        error_before = metrics.tool_calls.value(outcome="error", **labels)
+        observed_before = metrics.tool_latency.count(**labels)
+
+        self.run_tool("c1", {"operation": "get_notes"}, result={"ok": True, "data": []})
+        self.run_tool("c2", {"operation": "get_notes"}, result={"ok": False, "error": "boom"})
+        self.run_tool("c3", {"operation": "get_notes"}, error=RuntimeError("boom"))
+
+        self.assertEqual(metrics.tool_calls.value(outcome="ok", **labels) - ok_before, 1)
+        self.assertEqual(metrics.tool_calls.value(outcome="error", **labels) - error_before, 2)
+        self.assertEqual(metrics.tool_latency.count(**labels) - observed_before, 3)
+        self.assertEqual(self.plugin._started, {})
+
+    def test_payload_size(self):
+        before = metrics.tool_payload.count(tool="test_tool", operation="notes")
+        self.run_tool("c1", {"data_type": "notes"}, result={"result": "x" * 2000})
+        self.assertEqual(metrics.tool_payload.count(tool="test_tool", operation="notes") - before, 1)
+
+    def test_payload_measured_once_for_both_plugins(self):
+        from capymind_agent.tools.tracing import PAYLOAD_BYTES, TracingPlugin
+
+        context = tool_context("c1")
+        args = {"operation": "get_notes"}
+        result = {"ok": True, "data": [{"text": "x" * 100}]}
+
+        async def after_tool():
+            for plugin in (self.plugin, TracingPlugin()):
+                await plugin.before_tool_callback(tool=self.tool, tool_args=args, tool_context=context)
+            for plugin in (self.plugin, TracingPlugin()):
+                await plugin.after_tool_callback(tool=self.tool, tool_args=args, tool_context=context, result=result)
+
+        with mock.patch.object(metrics.json, "dumps", wraps=metrics.json.dumps) as dumps, \
+                mock.patch("capymind_agent.tools.tracing.trace.get_current_span") as span:
+            span.return_value.is_recording.return_value = True
+            asyncio.run(after_tool())
+        self.assertEqual(dumps.call_count, 1)
+        span.return_value.set_attribute.assert_any_call(PAYLOAD_BYTES, metrics.payload_size(result))
+
+    def test_agent_turns(self):
+        agent = SimpleNamespace(name="test_agent")
+        context = SimpleNamespace(invocation_id="inv-1")
+        before = metrics.agent_latency.count(agent="test_agent")
+        asyncio.run(self.plugin.before_agent_callback(agent=agent, callback_context=context))
+        asyncio.run(self.plugin.after_agent_callback(agent=agent, callback_context=context))
+        self.assertEqual(metrics.agent_latency.count(agent="test_agent") - before, 1)
+
+        # A turn that never finished is dropped at the end of the run
+        asyncio.run(self.plugin.before_agent_callback(agent=agent, callback_context=context))
+        asyncio.run(self.plugin.after_run_callback(invocation_context=SimpleNamespace(invocation_id="inv-1")))
+        self.assertEqual(self.plugin._started, {})
+
+    def test_unfinished_timers_do_not_accumulate(self):
+        # A tool call whose after callback never ran goes with its run
+        context = SimpleNamespace(function_call_id="c1", agent_name="data_fetcher", invocation_id="inv-2")
+        asyncio.run(self.plugin.before_tool_callback(tool=self.tool, tool_args={}, tool_context=context))
+        asyncio.run(self.plugin.after_run_callback(invocation_context=SimpleNamespace(invocation_id="inv-2")))
+        self.assertEqual(self.plugin._started, {})
+
+        # Runs cancelled before after_run_callback are bounded, oldest dropped first
+        plugin = MetricsPlugin(max_pending=3)
+        agent = SimpleNamespace(name="test_agent")
+        for i in range(5):
+            asyncio.run(plugin.before_agent_callback(agent=agent, callback_context=SimpleNamespace(invocation_id=f"inv-{i}")))
+        self.assertEqual(list(plugin._started), [("inv-2", "test_agent"), ("inv-3", "test_agent"), ("inv-4", "test_agent")])
+
+
+class TestFirestoreReads(unittest.TestCase):
+    """Document reads are counted per collection, cache hits excluded."""
+
+    def setUp(self):
+        self.client = FakeFirestoreClient()
+        user_ref = self.client.seed("users", "u1", {"FirstName": "Ada"})
+        self.client.seed("settings", "u1", {"Location": "Kyiv"})
+        for i in range(3):
+            self.client.seed("notes", f"n{i}", {"text": f"note {i}", "timestamp": f"2025-01-0{i + 1}T08:00:00Z", "user": user_ref})
+        patches = [
+            mock.patch.object(firestore_data, "_get_firestore_client", return_value=self.client),
+            mock.patch.object(firestore_data, "_get_async_firestore_client",
+                              return_value=FakeAsyncFirestoreClient(self.client)),
+            mock.patch.object(firestore_data, "document_cache", DocumentCache(ttl_seconds=60)),
+        ]
+        for patch in patches:
+            patch.start()
+            self.addCleanup(patch.stop)
+
+    def reads(self, collection, **labels):
+        return metrics.firestore_reads.value(collection=collection, **labels)
+
+    def test_sync_reads(self):
+        settings, notes = self.reads("settings"), self.reads("notes")
+        firestore_data.capy_firestore_data("get_settings", FakeToolContext("u1"))
+        firestore_data.capy_firestore_data("get_settings", FakeToolContext("u1"))  # cached
+        firestore_data.capy_firestore_data("get_notes", FakeToolContext("u1"), limit=10)
+        self.assertEqual(self.reads("settings") - settings, 1)
+        self.assertEqual(self.reads("notes") - notes, 3)
+
+    def test_async_reads(self):
+        users = self.reads("users")
+        result = asyncio.run(firestore_data.capy_firestore_data_async("get_user", FakeToolContext("missing")))
+        self.assertFalse(result["ok"])
+        # A missing document is still a billed read
+        self.assertEqual(self.reads("users") - users, 1)
+
+    def test_reads_by_operation_and_agent(self):
+        plugin = MetricsPlugin()
+        tool = SimpleNamespace(name="capy_firestore_data")
+
+        async def call(operation, variant):
+            args = {"operation": operation}
+            await plugin.before_tool_callback(tool=tool, tool_args=args, tool_context=tool_context(operation))
+            if variant is firestore_data.capy_firestore_data_async:
+                return await variant(operation, FakeToolContext("u1"))
+            return variant(operation, FakeToolContext("u1"), limit=2)
+
+        context = {"operation": "get_context", "agent": "data_fetcher"}
+        notes = {"operation": "get_notes", "agent": "data_fetcher"}
+        before = self.reads("users", **context), self.reads("notes", **context), self.reads("notes", **notes)
+        self.assertTrue(asyncio.run(call("get_context", firestore_data.capy_firestore_data_async))["ok"])
+        # The sync variant reads in Firestore worker threads
+        self.assertTrue(asyncio.run(call("get_notes", firestore_data.capy_firestore_data))["ok"])
+        after = self.reads("users", **context), self.reads("notes", **context), self.reads("notes", **notes)
+        self.assertEqual([a - b for a, b in zip(after, before)], [1, 3, 3])
+
+
+class TestMetricsEndpoint(unittest.TestCase):
+    """The served app exposes GET /metrics; its session store lives in a temporary directory."""
+
+    def test_scrape(self):
+        from fastapi.testclient import TestClient
+
+        project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+        with tempfile.TemporaryDirectory() as tmp, \
+                mock.patch.dict(os.environ, {"CAPY_SESSION_URI": f"sqlite:///{tmp}/sessions.db"}), \
+                mock.patch.dict(sys.modules):
+            sys.modules.pop("main", None)
+            main = importlib.import_module("main")
+            response = TestClient(main.app).get("/metrics")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.headers["content-type"], metrics.CONTENT_TYPE)
+        self.assertIn("# TYPE capymind_tool_calls_total counter", response.text)
+        self.assertFalse(os.path.exists(os.path.join(project_root, "sessions.db")))
+
+
+if __name__ == "__main__":
+    unittest.main()
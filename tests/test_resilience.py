@@ -0,0 +1,285 @@
+import unittest
+import os
+import sys
+import time
+import asyncio
+import threading
+from unittest import mock
+
+from google.api_core.exceptions import PermissionDenied, ServiceUnavailable
+
+# Add the project root to the path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from capymind_agent.tools import firestore_data
+from capymind_agent.tools.doc_cache import DocumentCache
+from capymind_agent.tools.resilience import CircuitBreaker, FirestoreGuard, StaleResults, parse_deadlines, rpc_options
+from capymind_agent.tools.single_flight import SingleFlight
+from tests.fake_firestore import FakeAsyncFirestoreClient, FakeFirestoreClient, FakeToolContext
+from tests.test_firestore_data import seed_user
+
+
+class TestCircuitBreaker(unittest.TestCase):
+    """Opens after consecutive failures, lets one trial through after the reset time."""
+
+    def setUp(self):
+        self.now = [0.0]
+        self.breaker = CircuitBreaker(failure_threshold=3, reset_seconds=10, clock=lambda: self.now[0])
+
+    def test_opens_and_recovers(self):
+        for _ in range(2):
+            self.breaker.failure()
+        self.breaker.success()
+        for _ in range(3):
+            self.assertTrue(self.breaker.allow())
+            self.breaker.failure()
+        self.assertEqual(self.breaker.state, "open")
+        self.assertFalse(self.breaker.allow())
+
+        self.now[0] += 10
+        self.assertEqual(self.breaker.state, "half_open")
+        self.assertTrue(self.breaker.allow())
+        # Only one trial at a time
+        self.assertFalse(self.breaker.allow())
+        self.breaker.success()
+        self.assertEqual(self.breaker.state, "closed")
+
+    def test_failed_trial_reopens(self):
+        for _ in range(3):
+            self.breaker.failure()
+        self.now[0] += 10
+        self.assertTrue(self.breaker.allow())
+        self.breaker.failure()
+        self.assertFalse(self.breaker.allow())
+        self.now[0] += 10
+        self.assertTrue(self.breaker.allow())
+
+    def test_lost_trial_is_replaced(self):
+        for _ in range(3):
+            self.breaker.failure()
+        self.now[0] += 10
+        self.assertTrue(self.breaker.allow())
+        self.now[0] += 10
+        self.assertTrue(self.breaker.allow())
+
+    def test_parse_deadlines(self):
+        self.assertEqual(parse_deadlines("get_notes=3, search_notes=0.5,bogus"), {"get_notes": 3.0, "search_notes": 0.5})
+        self.assertEqual(parse_deadlines(None), {})
+
+
+class TestStaleResults(unittest.TestCase):
+    """Stored results are private copies, bounded by count and bytes."""
+
+    def setUp(self):
+        self.now = [0.0]
+        self.stale = StaleResults(max_entries=3, max_age_seconds=60, clock=lambda: self.now[0], max_bytes=8000)
+
+    def test_copies_on_put_and_get(self):
+        result = {"ok": True, "data": {"notes": ["a"]}}
+        self.stale.put("k", result)
+        result["data"]["notes"].append("changed by the caller")
+        _, first = self.stale.get("k")
+        first["stale"] = True
+        self.assertEqual(self.stale.get("k"), (0.0, {"ok": True, "data": {"notes": ["a"]}}))
+        self.now[0] += 61
+        self.assertIsNone(self.stale.get("k"))
+
+    def test_bounded_by_entries_and_bytes(self):
+        for i in range(4):
+            self.stale.put(i, {"ok": True, "data": i})
+        self.assertIsNone(self.stale.get(0))
+        self.assertEqual(self.stale.stats()["entries"], 3)
+
+        stale = StaleResults(max_entries=100, max_bytes=8000)
+        # About 900 bytes each: the oldest make room for the newest
+        for i in range(10):
+            stale.put(i, {"ok": True, "data": "x" * 880})
+        self.assertIsNone(stale.get(0))
+        self.assertIsNotNone(stale.get(9))
+        self.assertLessEqual(stale.stats()["bytes"], 8000)
+        # Results over an eighth of the budget are not kept, nor is an older copy
+        stale.put(9, {"ok": True, "data": "x" * 2000})
+        self.assertIsNone(stale.get(9))
+
+
+class GuardTestCase(unittest.TestCase):
+    """The Firestore tool behind a FirestoreGuard, against the fault-injecting fake."""
+
+    def setUp(self):
+        self.client = FakeFirestoreClient(latency=0.005)
+        self.async_client = FakeAsyncFirestoreClient(self.client)
+        self.guard = self.make_guard()
+        patches = [
+            mock.patch.object(firestore_data, "_get_firestore_client", return_value=self.client),
+            mock.patch.object(firestore_data, "_get_async_firestore_client", return_value=self.async_client),
+            # Every call reaches the fake
+            mock.patch.object(firestore_data, "document_cache", DocumentCache(ttl_seconds=0)),
+            mock.patch.object(firestore_data, "firestore_guard", self.guard),
+            # Reads abandoned at a deadline stay in flight for a while
+            mock.patch.object(firestore_data, "single_flight", SingleFlight()),
+        ]
+        for patcher in patches:
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        # Attempts abandoned at a deadline finish before the next test
+        self.addCleanup(self.guard.close)
+        seed_user(self.client)
+        self.context = FakeToolContext("u1")
+
+    def make_guard(self, **kwargs):
+        return FirestoreGuard(**{"backoff": 0.001, "deadlines": {"get_settings": 0.3}, **kwargs})
+
+    def call(self, operation="get_settings", **kwargs):
+        return firestore_data.capy_firestore_data(operation, self.context, **kwargs)
+
+    def call_async(self, operation="get_settings", **kwargs):
+        return asyncio.run(firestore_data.capy_firestore_data_async(operation, self.context, **kwargs))
+
+    def timed(self, call, *args, **kwargs):
+        started = time.perf_counter()
+        result = call(*args, **kwargs)
+        return result, time.perf_counter() - started
+
+
+class TestRetriesAndDeadlines(GuardTestCase):
+    def test_transient_errors_are_retried(self):
+        for call in (self.call, self.call_async):
+            with self.subTest(call=call.__name__):
+                self.client.inject(ServiceUnavailable("blip"), times=2)
+                self.assertEqual(call()["data"]["Location"], "Kyiv")
+        self.assertEqual(self.guard.stats()["retries"], 4)
+
+    def test_retries_are_bounded(self):
+        self.client.inject(ServiceUnavailable("down"), times=5)
+        result = self.call_async()
+        self.assertFalse(result["ok"])
+        self.assertTrue(result["retryable"])
+        self.assertIn("ServiceUnavailable", result["error"])
+        # One attempt plus two retries
+        self.assertEqual(self.client.rpcs, 3)
+
+    def test_request_errors_are_not_retried(self):
+        self.client.inject(PermissionDenied("no"))
+        result = self.call_async()
+        self.assertEqual(result, {"ok": False, "error": "403 no"})
+        self.assertEqual(self.guard.stats()["retries"], 0)
+        self.assertEqual(self.guard.breaker_states(), {"capymind/(default)": "closed"})
+
+    def test_deadline(self):
+        for call in (self.call, self.call_async):
+            with self.subTest(call=call.__name__):
+                self.client.inject(delay=2.0)
+                result, elapsed = self.timed(call)
+                self.assertFalse(result["ok"])
+                # The guard stops waiting and the RPC's own timeout ends it at the same moment
+                self.assertRegex(result["error"], "TimeoutError|DeadlineExceeded")
+                self.assertLess(elapsed, 1.0)
+
+    def test_rpcs_carry_the_remaining_deadline(self):
+        self.assertEqual(rpc_options(), {})
+
+        def options():
+            return {"ok": True, "data": rpc_options()}
+
+        async def options_async():
+            return options()
+
+        for result in (
+            self.guard.call("get_settings", "sync", "db", options),
+            asyncio.run(self.guard.call_async("get_settings", "async", "db", options_async)),
+        ):
+            self.assertIsNone(result["data"]["retry"])
+            self.assertGreater(result["data"]["timeout"], 0.0)
+            self.assertLessEqual(result["data"]["timeout"], 0.3)
+
+    def test_abandoned_reads_end_at_the_deadline(self):
+        # The read stops with its timeout instead of holding its worker thread
+        self.client.inject(delay=5.0)
+        self.assertFalse(self.call()["ok"])
+        time.sleep(0.1)
+        self.assertEqual(self.guard.stats()["running"], 0)
+
+
+class TestSaturation(GuardTestCase):
+    def make_guard(self, **kwargs):
+        return super().make_guard(max_workers=2, retries=0)
+
+    def test_busy_workers_fail_fast(self):
+        # Calls that ignore their deadline, so the threads stay stuck after it
+        release = threading.Event()
+        self.addCleanup(release.set)
+
+        def stuck():
+            release.wait(5)
+            return {"ok": True}
+
+        for key in ("a", "b"):
+            self.assertIn("TimeoutError", self.guard.call("get_settings", key, ("capymind", "(default)"), stuck)["error"])
+        rpcs = self.client.rpcs
+        result, elapsed = self.timed(self.call)
+        self.assertIn("CallsSaturated", result["error"])
+        self.assertLess(elapsed, 0.1)
+        self.assertEqual(self.client.rpcs, rpcs)
+        self.assertEqual((self.guard.stats()["saturated"], self.guard.stats()["running"]), (1, 2))
+        # Counted by the breaker like any failed call
+        self.assertEqual(self.guard.stats()["failures"], 3)
+
+
+class TestStaleAndBreaker(GuardTestCase):
+    def make_guard(self, **kwargs):
+        self.now = [0.0]
+        return super().make_guard(failure_threshold=2, reset_seconds=30, retries=0, clock=lambda: self.now[0])
+
+    def test_stale_result_while_failing(self):
+        fresh = self.call_async()
+        self.client.inject(ServiceUnavailable("down"))
+        self.now[0] += 42
+        stale = self.call_async()
+        self.assertEqual(stale["data"], fresh["data"])
+        self.assertEqual((stale["stale"], stale["stale_seconds"]), (True, 42))
+        # Other calls have nothing stale to fall back on
+        self.client.inject(ServiceUnavailable("down"))
+        self.assertFalse(self.call_async("get_user")["ok"])
+
+    def test_breaker_fails_fast_then_recovers(self):
+        self.call()
+        self.client.inject(ServiceUnavailable("down"), times=2)
+        self.call()
+        self.call()
+        rpcs = self.client.rpcs
+        # Open: answered from stale results without touching Firestore
+        result = self.call()
+        self.assertTrue(result["stale"])
+        self.assertFalse(self.call_async("get_notes")["ok"])
+        self.assertEqual(self.client.rpcs, rpcs)
+        self.assertEqual(self.guard.stats()["rejected"], 2)
+
+        self.now[0] += 30
+        self.assertNotIn("stale", self.call())
+        self.assertEqual(self.guard.breaker_states(), {"capymind/(default)": "closed"})
+
+
+class TestHedging(GuardTestCase):
+    def make_guard(self, **kwargs):
+        return super().make_guard(hedge=True)
+
+    def test_slow_attempt_is_hedged(self):
+        for call in (self.call, self.call_async):
+            with self.subTest(call=call.__name__):
+                self.guard.deadlines["get_settings"] = 5.0
+                # Learn the usual latency first
+                for _ in range(20):
+                    call()
+                self.client.inject(delay=1.0)
+                result, elapsed = self.timed(call)
+                self.assertEqual(result["data"]["Location"], "Kyiv")
+                self.assertLess(elapsed, 0.5)
+        # Warm-up calls slower than the learned p95 may be hedged too
+        self.assertGreaterEqual(self.guard.stats()["hedge_wins"], 2)
+
+    def test_writes_are_not_hedged(self):
+        self.assertIsNone(self.guard._hedge_after("get_digest"))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,227 @@
+import unittest
+import os
+import sys
+import time
+import asyncio
+import logging
+from unittest import mock
+
+from google.api_core.exceptions import ServiceUnavailable
+
+# Add the project root to the path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from google.adk.agents import Agent
+from google.adk.runners import Runner
+from google.adk.sessions import InMemorySessionService
+from google.genai import types
+
+from benchmarks.stub_model import StubLlm
+from capymind_agent.tools import firestore_data, session_prefetch
+from capymind_agent.tools.crisis_lines import crisis_lines_tool
+from capymind_agent.tools.doc_cache import DocumentCache
+from capymind_agent.tools.resilience import FirestoreGuard
+from capymind_agent.tools.session_prefetch import (
+    CONSENT_KEY,
+    CONTEXT_TEXT_KEY,
+    CRISIS_TEXT_KEY,
+    STATE_KEY,
+    SessionPrefetcher,
+    grant_consent,
+    prefetch_user_context,
+)
+from capymind_agent.tools.single_flight import SingleFlight
+from tests.fake_firestore import FakeAsyncFirestoreClient, FakeCallbackContext, FakeFirestoreClient
+
+
+class PrefetchTestCase(unittest.TestCase):
+    """The prefetcher against the Firestore fake, with no document caching."""
+
+    def setUp(self):
+        self.client = FakeFirestoreClient()
+        self.now = [1000.0]
+        self.prefetcher = SessionPrefetcher(ttl_seconds=900, clock=lambda: self.now[0])
+        patches = [
+            mock.patch.object(firestore_data, "_get_async_firestore_client", return_value=FakeAsyncFirestoreClient(self.client)),
+            mock.patch.object(firestore_data, "document_cache", DocumentCache(ttl_seconds=0)),
+            mock.patch.object(firestore_data, "single_flight", SingleFlight()),
+            mock.patch.object(firestore_data, "firestore_guard", FirestoreGuard(retries=0)),
+            mock.patch.object(session_prefetch, "session_prefetcher", self.prefetcher),
+        ]
+        for patcher in patches:
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        self.client.seed("users", "u1", {"FirstName": "Ada", "Locale": "uk", "ChatID": 42, "IsTyping": False})
+        self.client.seed("settings", "u1", {"Location": "Kyiv", "SecondsFromUTC": 7200, "HasMorningReminder": True})
+        self.context = FakeCallbackContext("u1")
+
+    def prefetch(self, context=None):
+        return asyncio.run(prefetch_user_context(context or self.context))
+
+
+class TestSessionPrefetch(PrefetchTestCase):
+    def test_stores_compact_profile_and_settings(self):
+        self.context.state[CONSENT_KEY] = True
+        self.assertIsNone(self.prefetch())
+        state = self.context.state
+        self.assertEqual(state[STATE_KEY], {
+            "fetched_at": 1000.0,
+            "profile": {"FirstName": "Ada", "Locale": "uk"},
+            "settings": {"Location": "Kyiv", "SecondsFromUTC": 7200, "HasMorningReminder": True},
+        })
+        self.assertEqual(state[CONTEXT_TEXT_KEY], (
+            "- First Name: Ada\n"
+            "- Language/Locale: uk\n"
+            "- Location: Kyiv\n"
+            "- Timezone Offset (seconds from UTC): 7200\n"
+            "- Morning Reminder Enabled: Yes"
+        ))
+        self.assertEqual(state[CRISIS_TEXT_KEY], (
+            "Crisis lines for Ukraine (saved location: Kyiv):\n"
+            "- Lifeline Ukraine: call 7333\n"
+            "- Emergency: 112"
+        ))
+
+    def test_profile_rendered_only_after_consent(self):
+        self.prefetch()
+        self.assertEqual(self.context.state[CONTEXT_TEXT_KEY], "")
+        # Crisis lines for the saved location need no consent
+        self.assertIn("Lifeline Ukraine", self.context.state[CRISIS_TEXT_KEY])
+        grant_consent(self.context)
+        self.assertIn("- First Name: Ada", self.context.state[CONTEXT_TEXT_KEY])
+
+        # Being handed to data_fetcher means the user asked for their data
+        context = FakeCallbackContext("u1", agent_name="data_fetcher")
+        self.prefetch(context)
+        self.assertTrue(context.state[CONSENT_KEY])
+        self.assertIn("- Location: Kyiv", context.state[CONTEXT_TEXT_KEY])
+
+    def test_fresh_copy_is_reused_until_ttl(self):
+        self.prefetch()
+        reads = self.client.reads
+        self.client.seed("settings", "u1", {"Location": "Toronto, Canada"})
+        self.now[0] += 899
+        self.prefetch()
+        self.assertEqual(self.client.reads, reads)
+        self.now[0] += 1
+        self.prefetch()
+        self.assertEqual(self.client.reads, reads + 2)
+        self.assertEqual(self.context.state[STATE_KEY]["settings"], {"Location": "Toronto, Canada"})
+        self.assertIn("Canada", self.context.state[CRISIS_TEXT_KEY])
+        self.assertEqual(self.prefetcher.stats(), {"fresh": 1, "fetches": 2, "deferred": 0, "failures": 0})
+
+    def test_missing_documents(self):
+        context = FakeCallbackContext("nobody")
+        self.prefetch(context)
+        self.assertEqual(context.state[STATE_KEY], {"fetched_at": 1000.0, "profile": {}, "settings": {}})
+        self.assertEqual((context.state[CONTEXT_TEXT_KEY], context.state[CRISIS_TEXT_KEY]), ("", ""))
+        reads = self.client.reads
+        self.prefetch(context)
+        self.assertEqual(self.client.reads, reads)
+
+    def test_failed_read_keeps_previous_copy_and_retries(self):
+        self.prefetch()
+        self.now[0] += 900
+        self.client.inject(ServiceUnavailable("down"), times=2)
+        with self.assertLogs("capymind.prefetch", "WARNING"):
+            self.prefetch()
+        state = self.context.state[STATE_KEY]
+        self.assertEqual((state["fetched_at"], state["retry_at"]), (0, 1960.0))
+        self.assertEqual(state["settings"]["Location"], "Kyiv")
+        self.assertEqual(state["profile"]["FirstName"], "Ada")
+        # Not read again on every turn, only once the retry delay has passed
+        reads = self.client.reads
+        self.now[0] += 59
+        self.prefetch()
+        self.assertEqual(self.client.reads, reads)
+        self.now[0] += 1
+        self.prefetch()
+        self.assertEqual(self.context.state[STATE_KEY]["fetched_at"], 1960.0)
+
+    def test_slow_reads_do_not_hold_up_the_callback(self):
+        self.prefetcher.wait_seconds = 0.05
+        slow = FakeAsyncFirestoreClient(self.client, latency=0.3)
+        crisis_line = FakeCallbackContext("u1", agent_name="crisis_line")
+
+        async def scenario():
+            with mock.patch.object(firestore_data, "_get_async_firestore_client", return_value=slow):
+                started = time.perf_counter()
+                await prefetch_user_context(self.context)
+                waited = time.perf_counter() - started
+                self.assertNotIn(STATE_KEY, self.context.state)
+                # Later callbacks wait on the same read instead of starting another
+                await prefetch_user_context(crisis_line)
+                await asyncio.sleep(0.4)
+                reads = self.client.reads
+                await prefetch_user_context(crisis_line)
+                self.assertEqual(self.client.reads, reads)
+                return waited
+
+        self.assertLess(asyncio.run(scenario()), 0.2)
+        self.assertIn("Lifeline Ukraine", crisis_line.state[CRISIS_TEXT_KEY])
+        self.assertEqual(self.client.reads, 2)
+        self.assertEqual(self.prefetcher.stats(), {"fresh": 0, "fetches": 1, "deferred": 2, "failures": 0})
+
+    def test_disabled_or_without_user(self):
+        self.prefetcher.enabled = False
+        self.prefetch()
+        self.prefetcher.enabled = True
+        self.prefetch(FakeCallbackContext(None))
+        self.assertEqual(self.client.reads, 0)
+        self.assertEqual(self.context.state, {})
+
+
+class RecordingStub(StubLlm):
+    requests: list = []
+
+    async def generate_content_async(self, llm_request, stream=False):
+        self.requests.append(llm_request)
+        async for response in super().generate_content_async(llm_request, stream):
+            yield response
+
+
+class TestRunnerIntegration(PrefetchTestCase):
+    """The prefetched data reaches the instructions and answers the first crisis turn."""
+
+    def test_first_crisis_turn_skips_the_tool_call(self):
+        logging.getLogger("google_adk").setLevel(logging.ERROR)
+        model = RecordingStub(requests=[])
+        crisis_line = Agent(
+            model=model,
+            name="crisis_line",
+            instruction="Find crisis lines.\n{crisis_lines_text?}",
+            tools=[crisis_lines_tool],
+            before_agent_callback=prefetch_user_context,
+        )
+        root = Agent(
+            model=model,
+            name="capymind_agent",
+            instruction="Known about the user:\n{user_context_text?}",
+            sub_agents=[crisis_line],
+            before_agent_callback=prefetch_user_context,
+        )
+
+        async def scenario():
+            sessions = InMemorySessionService()
+            runner = Runner(app_name="test", agent=root, session_service=sessions)
+            session = await sessions.create_session(app_name="test", user_id="u1")
+            message = types.Content(role="user", parts=[types.Part(text="I need a crisis line number")])
+            replies = []
+            async for event in runner.run_async(user_id="u1", session_id=session.id, new_message=message):
+                if event.content and event.content.parts and event.content.parts[0].text:
+                    replies.append(event.content.parts[0].text)
+            return replies, await sessions.get_session(app_name="test", user_id="u1", session_id=session.id)
+
+        replies, session = asyncio.run(scenario())
+        # The profile stays out of the instructions until the user consents
+        self.assertNotIn("Ada", model.requests[0].config.system_instruction)
+        # Root transfers, crisis_line answers from its instruction: two model calls, no tool call
+        self.assertEqual(len(model.requests), 2)
+        self.assertIn("Lifeline Ukraine: call 7333", replies[-1])
+        self.assertEqual(session.state[STATE_KEY]["settings"]["Location"], "Kyiv")
+        # Read once for both agents
+        self.assertEqual(self.client.reads, 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
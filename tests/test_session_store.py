@@ -0,0 +1,403 @@
+import unittest
+import os
+import sys
+import asyncio
+import logging
+import sqlite3
+import tempfile
+from types import SimpleNamespace
+from unittest import mock
+
+# Add the project root to the path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from google.adk.agents import Agent
+from google.adk.events import Event, EventActions
+from google.adk.runners import Runner
+from google.genai import types
+
+from benchmarks.stub_model import StubLlm
+from capymind_agent.tools import firestore_data
+from capymind_agent.tools.doc_cache import DocumentCache
+from capymind_agent.tools.format_data import format_data_tool
+from capymind_agent.tools.session_sqlite import SqliteSessionService
+from capymind_agent.tools.session_store import (
+    FirestoreSessionService,
+    FlushSessionsMiddleware,
+    KeyValueSessionService,
+    build_fast_api_app,
+    create_session_service,
+)
+from tests.fake_firestore import FakeAsyncFirestoreClient, FakeFirestoreClient
+from tests.fake_kv import FakeKeyValueStore
+
+APP = "capymind_agent"
+
+
+def build_root() -> Agent:
+    model = StubLlm()
+    data_fetcher = Agent(
+        model=model,
+        name="data_fetcher",
+        instruction="",
+        tools=[firestore_data.firestore_data_tool, format_data_tool],
+    )
+    return Agent(model=model, name=APP, instruction="", sub_agents=[data_fetcher])
+
+
+def message(text: str) -> types.Content:
+    return types.Content(role="user", parts=[types.Part(text=text)])
+
+
+class _SessionStoreCases:
+    """Behaviour shared by every shared-storage session service."""
+
+    def make_store(self):
+        raise NotImplementedError
+
+    def make_service(self, store, **kwargs):
+        raise NotImplementedError
+
+    def rpcs(self, store) -> int:
+        return store.rpcs
+
+    def setUp(self):
+        logging.getLogger("google_adk").setLevel(logging.ERROR)
+        self.store = self.make_store()
+        # The data_fetcher tools read their own Firestore fake
+        client = FakeFirestoreClient()
+        user_ref = client.seed("users", "u1", {"FirstName": "Ada"})
+        client.seed("settings", "u1", {"language": "en"})
+        for i in range(3):
+            client.seed("notes", f"n{i}", {"text": f"note {i}", "timestamp": f"2025-01-0{i + 1}T08:00:00Z", "user": user_ref})
+        patches = [
+            mock.patch.object(firestore_data, "_get_async_firestore_client", return_value=FakeAsyncFirestoreClient(client)),
+            mock.patch.object(firestore_data, "document_cache", DocumentCache(ttl_seconds=0)),
+        ]
+        for patch in patches:
+            patch.start()
+            self.addCleanup(patch.stop)
+
+    async def turn(self, service, session_id: str, text: str):
+        runner = Runner(app_name=APP, agent=build_root(), session_service=service)
+        return [event async for event in runner.run_async(user_id="u1", session_id=session_id, new_message=message(text))]
+
+    def test_state_scopes(self):
+        async def scenario():
+            service = self.make_service(self.store)
+            created = await service.create_session(
+                app_name=APP, user_id="u1", session_id="s1",
+                state={"mood": "calm", "user:name": "Ada", "app:version": 2, "temp:scratch": 1},
+            )
+            other = await self.make_service(self.store).create_session(app_name=APP, user_id="u1")
+            listed = await service.list_sessions(app_name=APP, user_id="u1")
+            return created, other, listed
+
+        created, other, listed = asyncio.run(scenario())
+        self.assertEqual(created.state, {"mood": "calm", "user:name": "Ada", "app:version": 2})
+        # User and app state are shared by the user's other sessions
+        self.assertEqual(other.state, {"user:name": "Ada", "app:version": 2})
+        self.assertEqual(sorted(session.id for session in listed.sessions), sorted(["s1", other.id]))
+        # Listed sessions carry their state, as with ADK's own services
+        self.assertEqual({session.id: session.state for session in listed.sessions}, {"s1": created.state, other.id: other.state})
+
+    def test_turns_across_instances(self):
+        async def scenario():
+            first, second = self.make_service(self.store), self.make_service(self.store)
+            session = await first.create_session(app_name=APP, user_id="u1")
+            await self.turn(first, session.id, "hello there")
+            await self.turn(second, session.id, "show my last 2 notes")
+            await self.turn(first, session.id, "thanks")
+            fresh = self.make_service(self.store)
+            stored = await fresh.get_session(app_name=APP, user_id="u1", session_id=session.id)
+            cached = await first.get_session(app_name=APP, user_id="u1", session_id=session.id)
+            return first, stored, cached
+
+        first, stored, cached = asyncio.run(scenario())
+        texts = [event.content.parts[0].text for event in stored.events if event.author == "user"]
+        self.assertEqual(texts, ["hello there", "show my last 2 notes", "thanks"])
+        self.assertIn("data_fetcher", {event.author for event in stored.events})
+        self.assertEqual([event.id for event in cached.events], [event.id for event in stored.events])
+        # The first instance read only the second instance's turn
+        self.assertGreaterEqual(first.stats()["refreshes"], 1)
+        self.assertEqual(first.stats()["misses"], 0)
+
+    def test_turn_is_one_write(self):
+        async def scenario():
+            service = self.make_service(self.store)
+            session = await service.create_session(app_name=APP, user_id="u1")
+            before = self.rpcs(self.store)
+            events = await self.turn(service, session.id, "show my settings")
+            return service, events, self.rpcs(self.store) - before
+
+        service, events, rpcs = asyncio.run(scenario())
+        self.assertGreater(len(events), 4)
+        self.assertEqual(service.stats()["flushes"], 1)
+        # The runner's session read and one batched write for the whole turn
+        self.assertEqual(rpcs, 2)
+
+    def test_buffered_events_flush_after_delay(self):
+        async def scenario():
+            writer = self.make_service(self.store, flush_delay=0.01)
+            session = await writer.create_session(app_name=APP, user_id="u1")
+            event = Event(author="user", invocation_id="i1", content=message("hi"),
+                          actions=EventActions(state_delta={"user:seen": True}))
+            await writer.append_event(session, event)
+            reader = self.make_service(self.store)
+            before = await reader.get_session(app_name=APP, user_id="u1", session_id=session.id)
+            await asyncio.sleep(0.05)
+            after = await reader.get_session(app_name=APP, user_id="u1", session_id=session.id)
+            return before, after
+
+        before, after = asyncio.run(scenario())
+        self.assertEqual(before.events, [])
+        self.assertEqual(len(after.events), 1)
+        self.assertTrue(after.state["user:seen"])
+
+    def test_buffered_events_written_before_response_ends(self):
+        async def scenario():
+            # A turn that failed midway leaves an event no final response flushes
+            writer = self.make_service(self.store, flush_delay=60)
+            session = await writer.create_session(app_name=APP, user_id="u1")
+            reader = self.make_service(self.store)
+            stored_at_send = []
+
+            async def app(scope, receive, send):
+                await writer.append_event(session, Event(author="user", invocation_id="i1", content=message("hi")))
+                await send({"type": "http.response.start", "status": 500, "headers": []})
+                await send({"type": "http.response.body", "body": b"error"})
+
+            async def send(event):
+                if event["type"] == "http.response.body":
+                    stored = await reader.get_session(app_name=APP, user_id="u1", session_id=session.id)
+                    stored_at_send.append(len(stored.events))
+
+            await FlushSessionsMiddleware(app, writer)({"type": "http", "path": "/run"}, None, send)
+            return stored_at_send
+
+        self.assertEqual(asyncio.run(scenario()), [1])
+
+    def test_requests_flush_only_their_sessions(self):
+        async def scenario():
+            writer = self.make_service(self.store, flush_delay=60)
+            mine = await writer.create_session(app_name=APP, user_id="u1")
+            other = await writer.create_session(app_name=APP, user_id="u2")
+            await writer.append_event(other, Event(author="user", invocation_id="i1", content=message("hi")))
+            flushes = writer.stats()["flushes"]
+
+            async def metrics(scope, receive, send):
+                await send({"type": "http.response.start", "status": 200, "headers": []})
+                await send({"type": "http.response.body", "body": b""})
+
+            async def run(scope, receive, send):
+                await writer.append_event(mine, Event(author="user", invocation_id="i2", content=message("hi")))
+                await metrics(scope, receive, send)
+
+            async def send(event):
+                pass
+
+            # A request that touched no session writes nothing
+            await FlushSessionsMiddleware(metrics, writer)({"type": "http", "path": "/metrics"}, None, send)
+            unrelated = writer.stats()["flushes"] - flushes
+            # A turn writes its own session, not the other user's buffered event
+            await FlushSessionsMiddleware(run, writer)({"type": "http", "path": "/run"}, None, send)
+            reader = self.make_service(self.store)
+            stored = [
+                await reader.get_session(app_name=APP, user_id=session.user_id, session_id=session.id)
+                for session in (mine, other)
+            ]
+            await writer.close()
+            return unrelated, [len(session.events) for session in stored]
+
+        self.assertEqual(asyncio.run(scenario()), (0, [1, 0]))
+
+    def test_close_writes_buffered_events(self):
+        # The lifespan shutdown path
+        async def scenario():
+            writer = self.make_service(self.store, flush_delay=60)
+            session = await writer.create_session(app_name=APP, user_id="u1")
+            await writer.append_event(session, Event(author="user", invocation_id="i1", content=message("hi")))
+            await writer.close()
+            return await self.make_service(self.store).get_session(app_name=APP, user_id="u1", session_id=session.id)
+
+        self.assertEqual(len(asyncio.run(scenario()).events), 1)
+
+    def test_stale_session_rejected(self):
+        async def scenario():
+            service = self.make_service(self.store)
+            session = await service.create_session(app_name=APP, user_id="u1")
+            stale = await service.get_session(app_name=APP, user_id="u1", session_id=session.id)
+            await service.append_event(session, Event(author="user", invocation_id="i1", content=message("hi")))
+            with self.assertRaises(ValueError):
+                await service.append_event(stale, Event(author="user", invocation_id="i2", content=message("again")))
+
+        asyncio.run(scenario())
+
+    def test_delete_and_eviction(self):
+        async def scenario():
+            service = self.make_service(self.store, max_sessions=1)
+            first = await service.create_session(app_name=APP, user_id="u1")
+            second = await service.create_session(app_name=APP, user_id="u1")
+            self.assertEqual(service.stats()["evictions"], 1)
+            await service.delete_session(app_name=APP, user_id="u1", session_id=first.id)
+            missing = await service.get_session(app_name=APP, user_id="u1", session_id=first.id)
+            kept = await service.get_session(app_name=APP, user_id="u1", session_id=second.id)
+            listed = await service.list_sessions(app_name=APP, user_id="u1")
+            return missing, kept, listed
+
+        missing, kept, listed = asyncio.run(scenario())
+        self.assertIsNone(missing)
+        self.assertIsNotNone(kept)
+        self.assertEqual([session.id for session in listed.sessions], [kept.id])
+
+
+class TestFirestoreSessionService(_SessionStoreCases, unittest.TestCase):
+    def make_store(self):
+        return FakeAsyncFirestoreClient()
+
+    def make_service(self, store, **kwargs):
+        return FirestoreSessionService(client=store, **kwargs)
+
+    def test_layout(self):
+        async def scenario():
+            service = self.make_service(self.store)
+            session = await service.create_session(app_name=APP, user_id="u1", state={"user:name": "Ada"})
+            await service.append_event(session, Event(author="user", invocation_id="i1", content=message("hi")))
+            await service.flush()
+            return session
+
+        session = asyncio.run(scenario())
+        sync = self.store._sync
+        self.assertEqual(sync.count(f"adk_apps/{APP}/users"), 1)
+        self.assertEqual(sync.count(f"adk_apps/{APP}/users/u1/sessions/{session.id}/events"), 1)
+        stored = sync.document(f"adk_apps/{APP}/users/u1/sessions/{session.id}").get().to_dict()
+        self.assertEqual(stored["event_count"], 1)
+
+
+class TestKeyValueSessionService(_SessionStoreCases, unittest.TestCase):
+    def make_store(self):
+        return FakeKeyValueStore()
+
+    def make_service(self, store, **kwargs):
+        return KeyValueSessionService(store, **kwargs)
+
+    def test_layout(self):
+        async def scenario():
+            service = self.make_service(self.store)
+            await service.create_session(app_name=APP, user_id="u:1", session_id="s1", state={"user:name": "Ada"})
+            await service.close()
+
+        asyncio.run(scenario())
+        self.assertEqual(self.store.keys_matching("capymind:"), [
+            "capymind:session:capymind_agent:u%3A1:s1",
+            "capymind:sessions:capymind_agent:u%3A1",
+            "capymind:user_state:capymind_agent:u%3A1",
+        ])
+        self.assertTrue(self.store.closed)
+
+
+class TestSqliteSessionService(_SessionStoreCases, unittest.TestCase):
+    def make_store(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        return SimpleNamespace(path=os.path.join(tmp.name, "sessions.db"), services=[])
+
+    def make_service(self, store, **kwargs):
+        kwargs.setdefault("retention_days", 0)
+        service = SqliteSessionService(store.path, readers=2, **kwargs)
+        store.services.append(service)
+        self.addCleanup(asyncio.run, service.close())
+        return service
+
+    def rpcs(self, store) -> int:
+        return sum(service.stats()["reads"] + service.stats()["commits"] for service in store.services)
+
+    def test_layout(self):
+        service = self.make_service(self.store)
+        conn = sqlite3.connect(self.store.path)
+        self.addCleanup(conn.close)
+        self.assertEqual(conn.execute("PRAGMA journal_mode").fetchone()[0], "wal")
+        self.assertEqual(conn.execute("PRAGMA auto_vacuum").fetchone()[0], 2)
+        self.assertEqual(service.stats()["commits"], 0)
+
+    def test_group_commit(self):
+        async def scenario():
+            service = self.make_service(self.store)
+            sessions = await asyncio.gather(*(service.create_session(app_name=APP, user_id=f"u{i}") for i in range(20)))
+            commits = service.stats()["commits"]
+            reply = lambda i: Event(author=APP, invocation_id=f"i{i}", content=types.Content(role="model", parts=[types.Part(text="ok")]))
+            await asyncio.gather(*(service.append_event(session, reply(i)) for i, session in enumerate(sessions)))
+            return service, commits
+
+        service, commits = asyncio.run(scenario())
+        stats = service.stats()
+        self.assertEqual(stats["writes"], 40)
+        # Writes queued while the writer is busy share its next transaction
+        self.assertLess(commits, 20)
+        self.assertLess(stats["commits"] - commits, 20)
+        self.assertEqual(stats["events_written"], 20)
+
+    def test_prune_and_archive(self):
+        archive_path = os.path.join(os.path.dirname(self.store.path), "archive.db")
+
+        async def scenario():
+            service = self.make_service(self.store, retention_days=30, archive_path=archive_path)
+            old = await service.create_session(app_name=APP, user_id="u1", session_id="old")
+            await service.append_event(old, Event(author="user", invocation_id="i1", content=message("hi")))
+            await service.flush()
+            await service.create_session(app_name=APP, user_id="u1", session_id="new")
+            # Thirty-one days later only "new" has been used since
+            later = old.last_update_time + 31 * 86400
+            await service._transact(lambda conn: conn.execute("UPDATE sessions SET update_time = ? WHERE id = 'new'", (later,)))
+            pruned = await service.prune(now=later)
+            listed = await service.list_sessions(app_name=APP, user_id="u1")
+            free_pages = await service._read(lambda conn: conn.execute("PRAGMA freelist_count").fetchone()[0])
+            return pruned, listed, free_pages
+
+        pruned, listed, free_pages = asyncio.run(scenario())
+        self.assertEqual(pruned, 1)
+        # Freed pages went back to the file system
+        self.assertEqual(free_pages, 0)
+        self.assertEqual([session.id for session in listed.sessions], ["new"])
+        archive = sqlite3.connect(archive_path)
+        self.addCleanup(archive.close)
+        self.assertEqual(archive.execute("SELECT id FROM sessions").fetchall(), [("old",)])
+        self.assertEqual(archive.execute("SELECT count(*) FROM events").fetchone()[0], 1)
+
+
+class TestSelection(unittest.TestCase):
+    """CAPY_SESSION_URI picks the shared store; ADK keeps its own schemes."""
+
+    def test_uris(self):
+        with mock.patch.dict(os.environ, {"CAPY_SESSION_BATCH": "5"}):
+            service = create_session_service("firestore://sessions-db")
+        self.assertIsInstance(service, FirestoreSessionService)
+        self.assertEqual(service._database, "sessions-db")
+        self.assertEqual(service.max_batch, 5)
+        self.assertIsNone(create_session_service("sqlite:///./sessions.db"))
+        with tempfile.TemporaryDirectory() as tmp:
+            sqlite_service = create_session_service(f"sqlite+wal:///{tmp}/sessions.db")
+            self.assertIsInstance(sqlite_service, SqliteSessionService)
+            self.assertEqual(sqlite_service.path, f"{tmp}/sessions.db")
+            asyncio.run(sqlite_service.close())
+        self.assertIsNone(create_session_service(None))
+
+        with mock.patch.dict(sys.modules, {"redis": None}):
+            with self.assertRaises(RuntimeError):
+                create_session_service("redis://localhost:6379/0")
+
+    def test_app_serves_the_service(self):
+        from fastapi.testclient import TestClient
+
+        service = KeyValueSessionService(FakeKeyValueStore(), flush_delay=60)
+        project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+        client = TestClient(build_fast_api_app(agents_dir=project_root, session_service=service))
+        response = client.post(f"/apps/{APP}/users/u1/sessions/s1", json={"mood": "calm"})
+        self.assertEqual(response.status_code, 200)
+        # Stored through our service, not an in-memory one
+        stored = asyncio.run(KeyValueSessionService(service.client).get_session(app_name=APP, user_id="u1", session_id="s1"))
+        self.assertEqual(stored.state, {"mood": "calm"})
+        self.assertEqual(client.get(f"/apps/{APP}/users/u1/sessions/s1").json()["state"], {"mood": "calm"})
+
+if __name__ == "__main__":
+    unittest.main()
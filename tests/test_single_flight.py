@@ -0,0 +1,219 @@
+import unittest
+import os
+import sys
+import time
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from unittest import mock
+
+# Add the project root to the path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from capymind_agent.tools import firestore_data
+from capymind_agent.tools.doc_cache import DocumentCache
+from capymind_agent.tools.single_flight import SingleFlight
+from tests.fake_firestore import FakeAsyncFirestoreClient, FakeFirestoreClient, FakeToolContext
+from tests.test_firestore_data import seed_user
+
+
+def run_threads(count, target):
+    barrier = threading.Barrier(count)
+
+    def worker(_):
+        barrier.wait()
+        return target()
+
+    with ThreadPoolExecutor(max_workers=count) as pool:
+        return list(pool.map(worker, range(count)))
+
+
+class TestSingleFlight(unittest.TestCase):
+    """Overlapping calls with one key run once; everyone gets the result."""
+
+    def setUp(self):
+        self.flight = SingleFlight()
+        self.calls = 0
+
+    def slow(self, value=None):
+        self.calls += 1
+        time.sleep(0.05)
+        return {"value": value or [self.calls]}
+
+    def test_threads_share_one_call(self):
+        results = run_threads(8, lambda: self.flight.do("k", self.slow))
+        self.assertEqual(self.calls, 1)
+        self.assertTrue(all(result == {"value": [1]} for result in results))
+        # Every waiter gets its own copy
+        self.assertEqual(len({id(result) for result in results}), 8)
+        self.assertEqual(self.flight.stats(), {"calls": 1, "shared": 7})
+        self.assertEqual(self.flight.in_flight(), 0)
+
+    def test_leader_changes_do_not_reach_waiters(self):
+        def slow():
+            # Return once the waiter has joined
+            while not self.flight.stats()["shared"]:
+                time.sleep(0.001)
+            return {"value": [1]}
+
+        def leader():
+            result = self.flight.do("k", slow)
+            result["value"].append("leader")
+            return result
+
+        def waiter():
+            return self.flight.do("k", slow)
+
+        with ThreadPoolExecutor(max_workers=2) as pool:
+            first = pool.submit(leader)
+            # Let the leader start its call first
+            while not self.flight.in_flight():
+                time.sleep(0.001)
+            second = pool.submit(waiter)
+            self.assertEqual(first.result()["value"], [1, "leader"])
+            self.assertEqual(second.result(), {"value": [1]})
+
+    def test_unshared_results_are_not_copied(self):
+        value = {"value": [1]}
+        self.assertIs(self.flight.do("k", lambda: value), value)
+        with mock.patch("copy.deepcopy") as deepcopy:
+            self.flight.do("k", lambda: value)
+        deepcopy.assert_not_called()
+
+    def test_errors_reach_every_waiter(self):
+        def fail():
+            time.sleep(0.05)
+            raise RuntimeError("backend down")
+
+        def call():
+            try:
+                self.flight.do("k", fail)
+            except RuntimeError as e:
+                return str(e)
+
+        self.assertEqual(run_threads(4, call), ["backend down"] * 4)
+        # Finished calls are not remembered
+        self.assertEqual(self.flight.do("k", lambda: "fresh"), "fresh")
+
+    def test_different_keys_and_disabled(self):
+        run_threads(4, lambda: self.flight.do(threading.get_ident(), self.slow))
+        self.assertEqual(self.calls, 4)
+        disabled = SingleFlight(enabled=False)
+        run_threads(4, lambda: disabled.do("k", self.slow))
+        self.assertEqual(self.calls, 8)
+
+    def test_asyncio_tasks_share_one_call(self):
+        async def slow():
+            self.calls += 1
+            await asyncio.sleep(0.05)
+            return {"value": self.calls}
+
+        async def burst():
+            return await asyncio.gather(*(self.flight.do_async("k", slow) for _ in range(10)))
+
+        results = asyncio.run(burst())
+        self.assertEqual(self.calls, 1)
+        self.assertEqual(results, [{"value": 1}] * 10)
+        # A new event loop starts its own flights
+        asyncio.run(burst())
+        self.assertEqual(self.calls, 2)
+
+    def test_asyncio_leader_changes_do_not_reach_waiters(self):
+        async def slow():
+            await asyncio.sleep(0.01)
+            return {"value": [1]}
+
+        async def leader():
+            result = await self.flight.do_async("k", slow)
+            result["value"].append("leader")
+            return result
+
+        async def burst():
+            return await asyncio.gather(leader(), *(self.flight.do_async("k", slow) for _ in range(3)))
+
+        first, *rest = asyncio.run(burst())
+        self.assertEqual(first, {"value": [1, "leader"]})
+        self.assertEqual(rest, [{"value": [1]}] * 3)
+
+    def test_cancelled_leader_does_not_cancel_waiters(self):
+        async def slow():
+            await asyncio.sleep(0.05)
+            return "done"
+
+        async def scenario():
+            leader = asyncio.ensure_future(self.flight.do_async("k", slow))
+            await asyncio.sleep(0)
+            follower = asyncio.ensure_future(self.flight.do_async("k", slow))
+            await asyncio.sleep(0)
+            leader.cancel()
+            return await follower
+
+        self.assertEqual(asyncio.run(scenario()), "done")
+
+
+class TestFirestoreBursts(unittest.TestCase):
+    """Bursts of identical tool calls against a slow backend read each document once."""
+
+    def setUp(self):
+        self.client = FakeFirestoreClient(latency=0.05)
+        self.async_client = FakeAsyncFirestoreClient(self.client)
+        self.flight = SingleFlight()
+        patches = [
+            mock.patch.object(firestore_data, "_get_firestore_client", return_value=self.client),
+            mock.patch.object(firestore_data, "_get_async_firestore_client", return_value=self.async_client),
+            # No caching: only in-flight calls are merged
+            mock.patch.object(firestore_data, "document_cache", DocumentCache(ttl_seconds=0)),
+            mock.patch.object(firestore_data, "single_flight", self.flight),
+        ]
+        for patcher in patches:
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        seed_user(self.client, notes=3)
+        seed_user(self.client, user_id="u2", notes=3)
+
+    def burst_async(self, calls):
+        async def burst():
+            return await asyncio.gather(*calls())
+        return asyncio.run(burst())
+
+    def test_async_burst(self):
+        results = self.burst_async(lambda: [
+            firestore_data.capy_firestore_data_async("get_settings", FakeToolContext("u1")) for _ in range(20)
+        ])
+        self.assertTrue(all(result == results[0] for result in results))
+        self.assertEqual(self.client.reads, 1)
+
+        self.flight.enabled = False
+        self.burst_async(lambda: [
+            firestore_data.capy_firestore_data_async("get_settings", FakeToolContext("u1")) for _ in range(20)
+        ])
+        self.assertEqual(self.client.reads, 21)
+
+    def test_thread_burst(self):
+        results = run_threads(12, lambda: firestore_data.capy_firestore_data("get_notes", FakeToolContext("u1"), limit=5))
+        self.assertTrue(all(len(result["data"]) == 3 for result in results))
+        self.assertEqual(self.client.reads, 3)
+
+    def test_only_identical_calls_merge(self):
+        self.burst_async(lambda: [
+            firestore_data.capy_firestore_data_async("get_notes", FakeToolContext("u1"), limit=2),
+            firestore_data.capy_firestore_data_async("get_notes", FakeToolContext("u1"), limit=2),
+            firestore_data.capy_firestore_data_async("get_notes", FakeToolContext("u1"), limit=1),
+            firestore_data.capy_firestore_data_async("get_notes", FakeToolContext("u2"), limit=2),
+        ])
+        # limit + 1 notes per distinct query: u1 limit 2, u1 limit 1, u2 limit 2
+        self.assertEqual(self.client.reads, 3 + 2 + 3)
+
+    def test_settings_shared_across_operations(self):
+        # root_agent's get_settings and crisis_line's direct settings read
+        project, database = "capymind", "(default)"
+        self.burst_async(lambda: [
+            firestore_data.capy_firestore_data_async("get_settings", FakeToolContext("u1")),
+            firestore_data._read_document_async(self.async_client, "settings", "u1", None, project, database),
+            firestore_data.capy_firestore_data_async("get_user", FakeToolContext("u1")),
+        ])
+        self.assertEqual(self.client.reads, 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,153 @@
+import unittest
+import os
+import sys
+import json
+import asyncio
+from datetime import datetime, timezone
+from types import SimpleNamespace
+from unittest import mock
+
+# Add the project root to the path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from capymind_agent.tools import firestore_data, tool_budget as tool_budget_module
+from capymind_agent.tools.doc_cache import DocumentCache
+from capymind_agent.tools.firestore_data import decode_cursor
+from capymind_agent.tools.tool_budget import (
+    ELLIPSIS,
+    MIN_NOTE_CHARS,
+    ToolBudget,
+    compact_tool_result,
+    truncate_text,
+)
+from tests.fake_firestore import FakeAsyncFirestoreClient, FakeCallbackContext, FakeFirestoreClient
+
+
+def note(i, words=20):
+    return {
+        "id": f"n{i}",
+        "text": " ".join(f"word{i}-{w}" for w in range(words)),
+        "timestamp": f"2025-03-{28 - i:02d}T08:00:00Z",
+        "user": "users/u1",
+    }
+
+
+def size(value):
+    return len(json.dumps(value, ensure_ascii=False, separators=(",", ":")))
+
+
+class TestToolBudget(unittest.TestCase):
+    """Results are trimmed to the budget and the cuts are reported."""
+
+    def test_truncate_text(self):
+        self.assertEqual(truncate_text("short", 10), "short")
+        cut = truncate_text("one two three four five six", 16)
+        self.assertEqual(cut, "one two three" + ELLIPSIS)
+        self.assertLessEqual(len(cut), 16)
+
+    def test_unused_fields_dropped(self):
+        user = {"id": "u1", "ID": "u1", "ChatID": 42, "FirstName": "Ada", "LastCommand": "/note", "Locale": "en"}
+        result = ToolBudget().compact_result("get_user", {"ok": True, "data": user})
+        self.assertEqual(result["data"], {"FirstName": "Ada", "Locale": "en"})
+        self.assertEqual(result["elided"], {"fields": ["ChatID", "ID", "LastCommand", "id"]})
+        # Fields the model asked for by name stay
+        kept = ToolBudget().compact_result("get_user", {"ok": True, "data": user}, fields=["ChatID"])
+        self.assertEqual(kept["data"]["ChatID"], 42)
+
+    def test_nothing_to_cut(self):
+        result = {"ok": True, "data": [{"text": "calm day", "timestamp": "2025-03-01T08:00:00Z"}]}
+        self.assertIs(ToolBudget().compact_result("get_notes", result), result)
+        error = {"ok": False, "error": "User document not found"}
+        self.assertIs(ToolBudget().compact_result("get_user", error), error)
+
+    def test_long_notes_truncated(self):
+        notes = [note(0, words=300), note(1, words=5)]
+        result = ToolBudget(budget_tokens=5000, note_chars=200).compact_result("get_notes", {"ok": True, "data": notes})
+        first, second = result["data"]
+        self.assertTrue(first["text"].endswith(ELLIPSIS))
+        self.assertLessEqual(len(first["text"]), 200)
+        self.assertEqual(second["text"], notes[1]["text"])
+        self.assertEqual(set(first), {"text", "timestamp"})
+        self.assertEqual(result["elided"], {"fields": ["id", "user"], "truncated_notes": 1, "note_chars": 200})
+        # The input is left as it was
+        self.assertEqual(notes[0]["id"], "n0")
+
+    def test_budget_enforced(self):
+        notes = [note(i, words=150) for i in range(20)]
+        budget = ToolBudget(budget_tokens=400, note_chars=600)
+        result = budget.compact_result("get_notes", {"ok": True, "data": notes, "next_cursor": "old"})
+        self.assertLessEqual(size(result), budget.budget_chars)
+        kept = len(result["data"])
+        self.assertLess(kept, 20)
+        self.assertEqual(result["elided"]["omitted_notes"], 20 - kept)
+        self.assertEqual(result["elided"]["note_chars"], MIN_NOTE_CHARS)
+        # Newest notes are kept; the cursor continues right after the last one sent
+        self.assertEqual(result["data"][0]["timestamp"], notes[0]["timestamp"])
+        self.assertEqual(decode_cursor(result["next_cursor"])[1], f"n{kept - 1}")
+
+    def test_get_context(self):
+        data = {
+            "user": {"id": "u1", "FirstName": "Ada", "IsTyping": False},
+            "settings": None,
+            "notes": [note(i, words=150) for i in range(10)],
+        }
+        result = ToolBudget(budget_tokens=300).compact_result("get_context", {"ok": True, "data": data})
+        self.assertEqual(result["data"]["user"], {"FirstName": "Ada"})
+        self.assertIsNone(result["data"]["settings"])
+        self.assertLessEqual(size(result), 300 * 4)
+        self.assertEqual(result["elided"]["omitted_notes"], 10 - len(result["data"]["notes"]))
+        self.assertNotIn("next_cursor", result)
+
+    def test_format_data_text(self):
+        text = "\n".join(f"📝 **Note {i}**\n" + "x" * 200 for i in range(100))
+        capped = ToolBudget(budget_tokens=250).compact_text(text)
+        self.assertLess(len(capped), 1100)
+        self.assertIn("more characters not shown", capped)
+
+
+class TestCompactToolResult(unittest.TestCase):
+    """The after_tool_callback trims real tool output for the data_fetcher agent."""
+
+    def setUp(self):
+        client = FakeFirestoreClient()
+        user_ref = client.seed("users", "u1", {"ID": "u1", "ChatID": 7, "FirstName": "Ada"})
+        for i in range(20):
+            client.seed("notes", f"n{i:02d}", {
+                "text": "I walked by the river and thought about work " * 40,
+                "timestamp": datetime(2025, 1, i + 1, 8, tzinfo=timezone.utc),
+                "user": user_ref,
+            })
+        patches = [
+            mock.patch.object(firestore_data, "_get_async_firestore_client",
+                              return_value=FakeAsyncFirestoreClient(client)),
+            mock.patch.object(firestore_data, "document_cache", DocumentCache(ttl_seconds=0)),
+            mock.patch.object(tool_budget_module, "tool_budget", ToolBudget(budget_tokens=500)),
+        ]
+        for patch in patches:
+            patch.start()
+            self.addCleanup(patch.stop)
+        self.context = FakeCallbackContext("u1", agent_name="data_fetcher")
+        self.tool = SimpleNamespace(name="capy_firestore_data_async")
+
+    def call(self, **args):
+        raw = asyncio.run(firestore_data.capy_firestore_data_async(tool_context=self.context, **args))
+        return raw, compact_tool_result(self.tool, args, self.context, raw)
+
+    def test_notes_page(self):
+        raw, compacted = self.call(operation="get_notes", limit=20)
+        self.assertLessEqual(size(compacted), 500 * 4)
+        self.assertLess(size(compacted), size(raw) / 4)
+        self.assertIn("omitted_notes", compacted["elided"])
+        # Paging from the new cursor returns the first note left out
+        _, following = self.call(operation="get_notes", limit=1, start_after=compacted["next_cursor"])
+        self.assertEqual(following["data"][0]["timestamp"], raw["data"][len(compacted["data"])]["timestamp"])
+
+    def test_untouched_results(self):
+        _, compacted = self.call(operation="get_settings")
+        self.assertIsNone(compacted)  # error: no settings document
+        other = SimpleNamespace(name="capy_crisis_lines")
+        self.assertIsNone(compact_tool_result(other, {}, self.context, {"ok": True, "data": {"lines": []}}))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,199 @@
+import unittest
+import os
+import sys
+import asyncio
+import logging
+import tempfile
+from unittest import mock
+
+# Add the project root to the path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from google.adk.agents import Agent
+from google.adk.runners import Runner
+from google.adk.sessions import InMemorySessionService
+from google.genai import types
+from opentelemetry.sdk.trace import TracerProvider
+from opentelemetry.sdk.trace.export.in_memory_span_exporter import InMemorySpanExporter
+
+from benchmarks.stub_model import StubLlm
+from capymind_agent.tools import firestore_data
+from capymind_agent.tools.doc_cache import DocumentCache
+from capymind_agent.tools.format_data import format_data_tool
+from capymind_agent.tools.tracing import (
+    DOCUMENTS,
+    FIRESTORE_DOCUMENTS,
+    OPERATION,
+    OUTCOME,
+    PAYLOAD_BYTES,
+    TRANSFER_TO,
+    USER_HASH,
+    OtlpJsonFileExporter,
+    TraceContextMiddleware,
+    TracingPlugin,
+    configure_tracing,
+    load_spans,
+    tracer,
+    user_hash,
+)
+from tests.fake_firestore import FakeAsyncFirestoreClient, FakeFirestoreClient
+
+# The global tracer provider can be set once per process; share one exporter
+exporter = InMemorySpanExporter()
+configure_tracing(exporters=[exporter])
+
+
+def spans_by_name():
+    return {span.name: span for span in exporter.get_finished_spans()}
+
+
+def ancestors(span, spans):
+    """Names of the spans above ``span``, nearest first."""
+    by_id = {candidate.context.span_id: candidate for candidate in spans}
+    names = []
+    while span.parent is not None and span.parent.span_id in by_id:
+        span = by_id[span.parent.span_id]
+        names.append(span.name)
+    return names
+
+
+def build_root() -> Agent:
+    model = StubLlm()
+    data_fetcher = Agent(
+        model=model,
+        name="data_fetcher",
+        instruction="",
+        tools=[firestore_data.firestore_data_tool, format_data_tool],
+    )
+    return Agent(model=model, name="capymind_agent", instruction="", sub_agents=[data_fetcher])
+
+
+class TestAgentSpans(unittest.TestCase):
+    """A data turn is traced from the invocation down to the Firestore query."""
+
+    def setUp(self):
+        logging.getLogger("google_adk").setLevel(logging.ERROR)
+        exporter.clear()
+        client = FakeFirestoreClient()
+        user_ref = client.seed("users", "u1", {"FirstName": "Ada"})
+        for i in range(8):
+            client.seed("notes", f"n{i}", {"text": f"note {i}", "timestamp": f"2025-01-0{i + 1}T08:00:00Z", "user": user_ref})
+        patches = [
+            mock.patch.object(firestore_data, "_get_async_firestore_client",
+                              return_value=FakeAsyncFirestoreClient(client)),
+            mock.patch.object(firestore_data, "document_cache", DocumentCache(ttl_seconds=0)),
+        ]
+        for patch in patches:
+            patch.start()
+            self.addCleanup(patch.stop)
+
+    async def run_turn(self, text):
+        session_service = InMemorySessionService()
+        runner = Runner(
+            app_name="test", agent=build_root(), session_service=session_service, plugins=[TracingPlugin()]
+        )
+        session = await session_service.create_session(app_name="test", user_id="u1")
+        async for _ in runner.run_async(
+            user_id="u1",
+            session_id=session.id,
+            new_message=types.Content(role="user", parts=[types.Part(text=text)]),
+        ):
+            pass
+
+    def test_data_turn(self):
+        asyncio.run(self.run_turn("show my last 5 notes"))
+        finished = exporter.get_finished_spans()
+        spans = spans_by_name()
+
+        root_agent = spans["invoke_agent capymind_agent"]
+        sub_agent = spans["invoke_agent data_fetcher"]
+        transfer = spans["execute_tool transfer_to_agent"]
+        tool = spans["execute_tool capy_firestore_data_async"]
+        query = spans["firestore.query notes"]
+        self.assertEqual(root_agent.parent.span_id, spans["invocation"].context.span_id)
+        # ADK runs the transferred-to agent inside the root agent's model call
+        self.assertIn("invoke_agent capymind_agent", ancestors(sub_agent, finished))
+        self.assertIn("invoke_agent capymind_agent", ancestors(transfer, finished))
+        self.assertIn("invoke_agent data_fetcher", ancestors(tool, finished))
+        self.assertEqual(transfer.attributes[TRANSFER_TO], "data_fetcher")
+        self.assertEqual(tool.attributes[OPERATION], "get_notes")
+        self.assertEqual(tool.attributes[OUTCOME], "ok")
+        self.assertEqual(tool.attributes[DOCUMENTS], 5)
+        self.assertGreater(tool.attributes[PAYLOAD_BYTES], 0)
+        self.assertIn("execute_tool format_data", spans)
+        # Firestore time shows up under the tool call; the query fetches limit + 1
+        self.assertEqual(query.parent.span_id, tool.context.span_id)
+        self.assertEqual(query.attributes[FIRESTORE_DOCUMENTS], 6)
+        self.assertEqual({span.context.trace_id for span in spans.values()}, {root_agent.context.trace_id})
+        # Agent spans identify the user by a keyed hash only
+        self.assertEqual(root_agent.attributes[USER_HASH], user_hash("u1"))
+        self.assertNotEqual(user_hash("u1"), user_hash("u2"))
+        self.assertNotIn("u1", [str(value) for span in finished for value in span.attributes.values()])
+
+
+class TestTraceContextMiddleware(unittest.TestCase):
+    """Incoming traceparent headers become the parent of the request span."""
+
+    def setUp(self):
+        exporter.clear()
+        app = FastAPI()
+
+        @app.get("/apps/{app_name}/work")
+        def work(app_name: str):
+            with tracer.start_as_current_span("work"):
+                return {"app": app_name}
+
+        app.add_middleware(TraceContextMiddleware)
+        self.client = TestClient(app)
+
+    def test_continues_incoming_trace(self):
+        trace_id, parent_id = "0af7651916cd43dd8448eb211c80319c", "b7ad6b7169203331"
+        response = self.client.get("/apps/capy/work", headers={"traceparent": f"00-{trace_id}-{parent_id}-01"})
+        self.assertEqual(response.status_code, 200)
+
+        spans = spans_by_name()
+        server = spans["GET /apps/{app_name}/work"]
+        self.assertEqual(format(server.context.trace_id, "032x"), trace_id)
+        self.assertEqual(format(server.parent.span_id, "016x"), parent_id)
+        self.assertEqual(server.attributes["http.response.status_code"], 200)
+        self.assertEqual(spans["work"].parent.span_id, server.context.span_id)
+
+    def test_new_trace_without_header(self):
+        self.client.get("/apps/capy/work")
+        self.assertIsNone(spans_by_name()["GET /apps/{app_name}/work"].parent)
+
+
+class TestOtlpJsonFileExporter(unittest.TestCase):
+    """Spans round-trip through the OTLP/JSON lines file."""
+
+    def test_round_trip(self):
+        provider = TracerProvider()
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "trace.jsonl")
+            configure_tracing(provider, trace_file=path)
+            local_tracer = provider.get_tracer("test")
+            with local_tracer.start_as_current_span("parent") as parent:
+                with local_tracer.start_as_current_span("child", attributes={DOCUMENTS: 3, OPERATION: "get_notes"}):
+                    pass
+            provider.force_flush()
+
+            spans = {span["name"]: span for span in load_spans(path)}
+        self.assertEqual(spans["child"]["parentSpanId"], format(parent.get_span_context().span_id, "016x"))
+        self.assertEqual(spans["child"]["traceId"], format(parent.get_span_context().trace_id, "032x"))
+        self.assertEqual(spans["child"]["attributes"], {DOCUMENTS: 3, OPERATION: "get_notes"})
+
+    def test_unwritable_path(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            provider = TracerProvider()
+            with provider.get_tracer("test").start_as_current_span("span") as span:
+                pass
+            exporter_ = OtlpJsonFileExporter(os.path.join(tmp, "missing", "trace.jsonl"))
+            with self.assertLogs("capymind.tracing", level="ERROR"):
+                result = exporter_.export([span])
+        self.assertEqual(result.name, "FAILURE")
+
+
+if __name__ == "__main__":
+    unittest.main()